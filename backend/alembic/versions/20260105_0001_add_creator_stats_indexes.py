@@ -0,0 +1,34 @@
+"""Add indexes for creator statistics in admin creators list
+
+Revision ID: c3d4e5f6a7b8
+Revises: b2c3d4e5f6g7
+Create Date: 2026-01-05
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3d4e5f6a7b8'
+down_revision: Union[str, None] = 'b2c3d4e5f6g7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Кількість товарів креатора (LATERAL count по author_id)
+    op.create_index('ix_products_author_id', 'products', ['author_id'])
+
+    # Кількість продажів креатора (LATERAL count по creator_id + type)
+    op.create_index(
+        'ix_creator_transactions_creator_type',
+        'creator_transactions',
+        ['creator_id', 'transaction_type']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_creator_transactions_creator_type', table_name='creator_transactions')
+    op.drop_index('ix_products_author_id', table_name='products')
@@ -0,0 +1,182 @@
+"""Partition transactions ledger by month, add balance snapshots
+
+Revision ID: d4e5f6a7b8c9
+Revises: c3d4e5f6a7b8
+Create Date: 2026-01-06
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4e5f6a7b8c9'
+down_revision: Union[str, None] = 'c3d4e5f6a7b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+APPEND_ONLY_FUNCTION = """
+CREATE OR REPLACE FUNCTION transactions_append_only() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        RAISE EXCEPTION 'transactions ledger is append-only';
+    END IF;
+    IF NEW.amount IS DISTINCT FROM OLD.amount
+        OR NEW.balance_after IS DISTINCT FROM OLD.balance_after
+        OR NEW.type IS DISTINCT FROM OLD.type
+        OR NEW.created_at IS DISTINCT FROM OLD.created_at
+        OR NEW.external_id IS DISTINCT FROM OLD.external_id THEN
+        RAISE EXCEPTION 'transactions ledger is append-only';
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+# Місячні партиції від найстарішої транзакції до +3 місяців від поточного
+CREATE_MONTHLY_PARTITIONS = """
+DO $$
+DECLARE
+    month_start timestamp;
+BEGIN
+    FOR month_start IN
+        SELECT generate_series(
+            date_trunc('month', coalesce(
+                (SELECT min(created_at) FROM transactions_legacy), now()
+            ) AT TIME ZONE 'UTC'),
+            date_trunc('month', now() AT TIME ZONE 'UTC') + interval '3 months',
+            interval '1 month'
+        )
+    LOOP
+        EXECUTE 'CREATE TABLE ' || quote_ident('transactions_' || to_char(month_start, 'YYYY_MM'))
+            || ' PARTITION OF transactions FOR VALUES FROM ('
+            || quote_literal((month_start AT TIME ZONE 'UTC')::text) || ') TO ('
+            || quote_literal(((month_start + interval '1 month') AT TIME ZONE 'UTC')::text) || ')';
+    END LOOP;
+END
+$$
+"""
+
+
+def upgrade() -> None:
+    # 1. Стара таблиця відходить у бік разом з іменами індексів та PK
+    op.execute("ALTER TABLE transactions RENAME TO transactions_legacy")
+    op.execute("ALTER TABLE transactions_legacy RENAME CONSTRAINT transactions_pkey TO transactions_legacy_pkey")
+    op.execute("DROP INDEX IF EXISTS ix_transactions_id")
+    op.execute("DROP INDEX IF EXISTS ix_transactions_user_id")
+    op.execute("DROP INDEX IF EXISTS ix_transactions_type")
+    op.execute("DROP INDEX IF EXISTS ix_transactions_external_id")
+    op.execute("UPDATE transactions_legacy SET created_at = now() WHERE created_at IS NULL")
+
+    # 2. Партиціонована таблиця; PK повинен містити ключ партиціонування
+    op.execute("""
+        CREATE TABLE transactions (
+            id BIGINT NOT NULL DEFAULT nextval('transactions_id_seq'),
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            type transactiontype NOT NULL,
+            amount INTEGER NOT NULL,
+            balance_after INTEGER NOT NULL,
+            description VARCHAR(500),
+            order_id INTEGER REFERENCES orders (id),
+            subscription_id INTEGER REFERENCES subscriptions (id),
+            external_id VARCHAR(100),
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            CONSTRAINT transactions_pkey PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    # Послідовність переходить до нової таблиці, щоб не зникла разом зі старою
+    op.execute("ALTER SEQUENCE transactions_id_seq AS BIGINT OWNED BY transactions.id")
+    op.execute("CREATE TABLE transactions_default PARTITION OF transactions DEFAULT")
+    op.execute(CREATE_MONTHLY_PARTITIONS)
+
+    # 3. Перенесення даних
+    op.execute("""
+        INSERT INTO transactions (
+            id, user_id, type, amount, balance_after, description,
+            order_id, subscription_id, external_id, created_at
+        )
+        SELECT id, user_id, type, amount, balance_after, description,
+               order_id, subscription_id, external_id, created_at
+        FROM transactions_legacy
+    """)
+    op.execute("DROP TABLE transactions_legacy")
+
+    # 4. Індекси (створюються на кожній партиції)
+    op.execute(
+        "CREATE INDEX ix_transactions_user_created "
+        "ON transactions (user_id, created_at DESC, id DESC)"
+    )
+    op.create_index('ix_transactions_type', 'transactions', ['type'])
+    op.create_index('ix_transactions_external_id', 'transactions', ['external_id'])
+
+    # 5. Append-only
+    op.execute(APPEND_ONLY_FUNCTION)
+    op.execute("""
+        CREATE TRIGGER transactions_append_only
+            BEFORE UPDATE OR DELETE ON transactions
+            FOR EACH ROW EXECUTE FUNCTION transactions_append_only()
+    """)
+
+    # 6. Знімки балансів
+    op.execute("""
+        CREATE TABLE wallet_balance_snapshots (
+            user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            balance INTEGER NOT NULL DEFAULT 0,
+            deposited INTEGER NOT NULL DEFAULT 0,
+            transactions_count INTEGER NOT NULL DEFAULT 0,
+            covered_until TIMESTAMP WITH TIME ZONE NOT NULL,
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+            PRIMARY KEY (user_id)
+        )
+    """)
+    op.create_index(
+        'ix_wallet_balance_snapshots_covered_until',
+        'wallet_balance_snapshots',
+        ['covered_until']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_wallet_balance_snapshots_covered_until', table_name='wallet_balance_snapshots')
+    op.drop_table('wallet_balance_snapshots')
+
+    op.execute("ALTER TABLE transactions RENAME TO transactions_partitioned")
+    op.execute(
+        "ALTER TABLE transactions_partitioned RENAME CONSTRAINT transactions_pkey "
+        "TO transactions_partitioned_pkey"
+    )
+    op.execute("DROP INDEX IF EXISTS ix_transactions_user_created")
+    op.execute("DROP INDEX IF EXISTS ix_transactions_type")
+    op.execute("DROP INDEX IF EXISTS ix_transactions_external_id")
+
+    op.execute("""
+        CREATE TABLE transactions (
+            id INTEGER NOT NULL DEFAULT nextval('transactions_id_seq'),
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            type transactiontype NOT NULL,
+            amount INTEGER NOT NULL,
+            balance_after INTEGER NOT NULL,
+            description VARCHAR(500),
+            order_id INTEGER REFERENCES orders (id),
+            subscription_id INTEGER REFERENCES subscriptions (id),
+            external_id VARCHAR(100),
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+            CONSTRAINT transactions_pkey PRIMARY KEY (id)
+        )
+    """)
+    op.execute("ALTER SEQUENCE transactions_id_seq AS INTEGER OWNED BY transactions.id")
+    op.execute("""
+        INSERT INTO transactions
+        SELECT id, user_id, type, amount, balance_after, description,
+               order_id, subscription_id, external_id, created_at
+        FROM transactions_partitioned
+    """)
+    op.execute("DROP TABLE transactions_partitioned")
+    op.execute("DROP FUNCTION IF EXISTS transactions_append_only()")
+
+    op.create_index('ix_transactions_external_id', 'transactions', ['external_id'])
+    op.create_index('ix_transactions_id', 'transactions', ['id'])
+    op.create_index('ix_transactions_type', 'transactions', ['type'])
+    op.create_index('ix_transactions_user_id', 'transactions', ['user_id'])
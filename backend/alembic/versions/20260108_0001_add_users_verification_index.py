@@ -0,0 +1,25 @@
+"""Add index for cleanup of unverified accounts
+
+Revision ID: f6a7b8c9d0e1
+Revises: e5f6a7b8c9d0
+Create Date: 2026-01-08
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6a7b8c9d0e1'
+down_revision: Union[str, None] = 'e5f6a7b8c9d0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_users_email_verified_created', 'users', ['is_email_verified', 'created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_email_verified_created', table_name='users')
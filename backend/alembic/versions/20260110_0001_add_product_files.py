@@ -0,0 +1,60 @@
+"""Add product_files table with archive index
+
+Revision ID: b8c9d0e1f2a3
+Revises: a7b8c9d0e1f2
+Create Date: 2026-01-10
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8c9d0e1f2a3'
+down_revision: Union[str, None] = 'a7b8c9d0e1f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'product_files',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('archive_path', sa.String(length=500), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=True),
+        sa.Column(
+            'status',
+            sa.Enum('INDEXED', 'UNSUPPORTED', 'FAILED', name='archiveindexstatus'),
+            nullable=False
+        ),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('sha256', sa.String(length=64), nullable=True),
+        sa.Column('size_bytes', sa.BigInteger(), nullable=False),
+        sa.Column('entry_count', sa.Integer(), nullable=False),
+        sa.Column('uncompressed_size', sa.BigInteger(), nullable=False),
+        sa.Column('revit_file_count', sa.Integer(), nullable=False),
+        sa.Column('revit_versions', postgresql.ARRAY(sa.Integer()), nullable=False),
+        sa.Column('min_revit_version', sa.Integer(), nullable=True),
+        sa.Column('max_revit_version', sa.Integer(), nullable=True),
+        sa.Column('entries', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('indexed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('archive_path')
+    )
+    op.create_index(op.f('ix_product_files_id'), 'product_files', ['id'])
+    op.create_index(op.f('ix_product_files_product_id'), 'product_files', ['product_id'])
+    op.create_index(op.f('ix_product_files_sha256'), 'product_files', ['sha256'])
+    op.create_index('ix_product_files_product_max_revit', 'product_files', ['product_id', 'max_revit_version'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_product_files_product_max_revit', table_name='product_files')
+    op.drop_index(op.f('ix_product_files_sha256'), table_name='product_files')
+    op.drop_index(op.f('ix_product_files_product_id'), table_name='product_files')
+    op.drop_index(op.f('ix_product_files_id'), table_name='product_files')
+    op.drop_table('product_files')
+    op.execute("DROP TYPE IF EXISTS archiveindexstatus")
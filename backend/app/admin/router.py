@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Body, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, UploadFile, File, Form, Body, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, String, and_, or_, desc, update
 from sqlalchemy.orm import selectinload, joinedload
@@ -12,15 +12,20 @@ import shutil
 from pydantic import BaseModel
 
 from app.core.database import get_db
+from app.core.cache import cache
 from app.core.config import settings
+from app.core.images import generate_image_variants
+from app.products.archive_index import index_archive
 from app.users.dependencies import get_current_admin_user
 from app.users.models import User
 from app.products.models import Product, Category, CategoryTranslation, ProductType
 from app.orders.models import Order, OrderItem, PromoCode
 from app.subscriptions.models import Subscription, SubscriptionStatus, UserProductAccess, AccessType
-from app.wallet.models import CoinPack, Transaction, TransactionType
+from app.wallet.models import CoinPack, Transaction
+from app.wallet.ledger import LedgerService
 from app.wallet.utils import coin_pack_to_response
-from app.wallet.service import WalletAdminService
+from app.wallet.service import WalletAdminService, COIN_PACKS_CACHE_KEY
+from app.products.service import CATEGORIES_CACHE_PATTERN
 from app.admin.schemas import (
     DashboardStats, UserListResponse, CategoryResponse,
     PromoCodeCreate, PromoCodeResponse, OrderListResponse,
@@ -29,10 +34,12 @@ from app.admin.schemas import (
     PromoCodeDetailResponse, PromoCodeUpdate, OrderForPromoCode,
     CoinPackCreate, CoinPackUpdate, CoinPackResponse, CoinPackListResponse,
     AdminAddCoinsRequest, AdminAddCoinsResponse, TransactionForUser,
-    TriggerSchedulerResponse
+    TriggerSchedulerResponse, SchedulerStatusResponse, SchedulerJobRun, RuntimeStatsResponse,
+    LoopDiagnosticsUpdate, LoopDiagnosticsConfig
 )
 from app.core.telegram_service import telegram_service
 from app.core.translations import get_text
+from app.core.export import streaming_export_response, iter_query_rows, apply_date_range
 
 router = APIRouter(tags=["Admin"])
 logger = logging.getLogger(__name__)
@@ -113,11 +120,8 @@ async def get_dashboard_stats(
         select(func.sum(User.balance))
     ) or 0
 
-    total_deposits = await db.scalar(
-        select(func.sum(Transaction.amount)).where(
-            Transaction.type == TransactionType.DEPOSIT
-        )
-    ) or 0
+    # Знімки балансів + поповнення після них, без повного проходу журналу
+    total_deposits = await LedgerService(db).get_total_deposits()
 
     return DashboardStats(
         users={
@@ -182,6 +186,43 @@ async def get_users(
     )
 
 
+# Колонки експорту користувачів
+USERS_EXPORT_FIELDS = (
+    "id", "telegram_id", "username", "first_name", "last_name", "email",
+    "is_email_verified", "is_admin", "is_active", "is_creator", "balance",
+    "creator_balance", "language_code", "referrer_id", "created_at", "last_login_at"
+)
+
+
+@router.get("/users/export")
+async def export_users(
+        format: str = Query("csv", pattern="^(csv|ndjson)$"),
+        date_from: Optional[datetime] = Query(None, description="Зареєстровані з (включно)"),
+        date_to: Optional[datetime] = Query(None, description="Зареєстровані до (не включно)"),
+        search: Optional[str] = None,
+        admin: User = Depends(get_current_admin_user)
+):
+    """Потоковий експорт користувачів у CSV або NDJSON"""
+    query = select(*[getattr(User, field) for field in USERS_EXPORT_FIELDS])
+
+    if search:
+        query = query.where(or_(
+            User.username.ilike(f"%{search}%"),
+            User.first_name.ilike(f"%{search}%"),
+            User.email.ilike(f"%{search}%"),
+            User.telegram_id.cast(String).ilike(f"%{search}%")
+        ))
+
+    query = apply_date_range(query, User.created_at, date_from, date_to).order_by(User.id)
+
+    return streaming_export_response(
+        iter_query_rows(query),
+        fields=USERS_EXPORT_FIELDS,
+        export_format=format,
+        filename="users"
+    )
+
+
 @router.get("/users/{user_id}", response_model=UserDetailResponse)
 async def get_user_details(
         user_id: int,
@@ -399,6 +440,7 @@ async def create_coin_pack(
     pack = CoinPack(**data.model_dump())
     db.add(pack)
     await db.commit()
+    await cache.delete(COIN_PACKS_CACHE_KEY)
     await db.refresh(pack)
 
     return coin_pack_to_response(pack)
@@ -436,6 +478,7 @@ async def update_coin_pack(
         setattr(pack, key, value)
 
     await db.commit()
+    await cache.delete(COIN_PACKS_CACHE_KEY)
     await db.refresh(pack)
 
     return coin_pack_to_response(pack)
@@ -461,6 +504,7 @@ async def delete_coin_pack(
         message = "CoinPack deactivated"
 
     await db.commit()
+    await cache.delete(COIN_PACKS_CACHE_KEY)
 
     return {"success": True, "message": message}
 
@@ -517,6 +561,7 @@ async def create_category(
     )
     db.add(translation)
     await db.commit()
+    await cache.delete_pattern(CATEGORIES_CACHE_PATTERN)
     await db.refresh(category)
 
     return CategoryResponse(id=category.id, slug=category.slug, name=name)
@@ -559,6 +604,7 @@ async def update_category(
             db.add(translation)
 
     await db.commit()
+    await cache.delete_pattern(CATEGORIES_CACHE_PATTERN)
     await db.refresh(category)
 
     return CategoryResponse(
@@ -580,6 +626,7 @@ async def delete_category(
 
     await db.delete(category)
     await db.commit()
+    await cache.delete_pattern(CATEGORIES_CACHE_PATTERN)
 
     return {"success": True, "message": get_text("admin_category_deleted", "uk")}
 
@@ -768,6 +815,59 @@ async def get_orders(
     )
 
 
+# Колонки експорту замовлень
+ORDERS_EXPORT_FIELDS = (
+    "id", "user_id", "username", "email", "subtotal", "discount_amount",
+    "final_total", "status", "promo_code_id", "items_count", "created_at", "paid_at"
+)
+
+
+@router.get("/orders/export")
+async def export_orders(
+        format: str = Query("csv", pattern="^(csv|ndjson)$"),
+        status: Optional[str] = None,
+        date_from: Optional[datetime] = Query(None, description="Створені з (включно)"),
+        date_to: Optional[datetime] = Query(None, description="Створені до (не включно)"),
+        admin: User = Depends(get_current_admin_user)
+):
+    """Потоковий експорт замовлень у CSV або NDJSON"""
+    items_count = (
+        select(func.count(OrderItem.id))
+        .where(OrderItem.order_id == Order.id)
+        .correlate(Order)
+        .scalar_subquery()
+    )
+    query = (
+        select(
+            Order.id,
+            Order.user_id,
+            User.username,
+            User.email,
+            Order.subtotal,
+            Order.discount_amount,
+            Order.final_total,
+            Order.status,
+            Order.promo_code_id,
+            items_count.label("items_count"),
+            Order.created_at,
+            Order.paid_at
+        )
+        .join(User, User.id == Order.user_id)
+    )
+
+    if status:
+        query = query.where(Order.status == status)
+
+    query = apply_date_range(query, Order.created_at, date_from, date_to).order_by(Order.id)
+
+    return streaming_export_response(
+        iter_query_rows(query),
+        fields=ORDERS_EXPORT_FIELDS,
+        export_format=format,
+        filename="orders"
+    )
+
+
 @router.get("/orders/{order_id}", response_model=OrderDetailResponse)
 async def get_order_details(
         order_id: int,
@@ -898,16 +998,97 @@ async def admin_give_subscription(
 
 @router.post("/trigger-scheduler", response_model=TriggerSchedulerResponse)
 async def trigger_subscription_scheduler(
-        admin: User = Depends(get_current_admin_user),
-        db: AsyncSession = Depends(get_db)
+        admin: User = Depends(get_current_admin_user)
 ):
-    """Ручний запуск scheduler для тестування"""
-    from app.core.scheduler import trigger_subscription_check
+    """Ручний запуск підпискових задач планувальника"""
+    from app.core.scheduler import trigger_subscription_check, JobAlreadyRunning
 
-    result = await trigger_subscription_check()
+    try:
+        result = await trigger_subscription_check()
+    except JobAlreadyRunning as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     return TriggerSchedulerResponse(**result)
 
 
+@router.get("/scheduler/jobs", response_model=SchedulerStatusResponse)
+async def get_scheduler_jobs(
+        admin: User = Depends(get_current_admin_user)
+):
+    """Задачі планувальника: розклад, наступний запуск, метрики"""
+    from app.core.scheduler import scheduler
+
+    return SchedulerStatusResponse(
+        leader=await scheduler.get_leader(),
+        jobs=await scheduler.get_jobs_status()
+    )
+
+
+@router.get("/scheduler/jobs/{job_name}/history", response_model=List[SchedulerJobRun])
+async def get_scheduler_job_history(
+        job_name: str,
+        limit: int = Query(20, ge=1, le=50),
+        admin: User = Depends(get_current_admin_user)
+):
+    from app.core.scheduler import scheduler
+
+    try:
+        return await scheduler.get_history(job_name, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+
+@router.post("/scheduler/jobs/{job_name}/run", response_model=SchedulerJobRun)
+async def run_scheduler_job(
+        job_name: str,
+        admin: User = Depends(get_current_admin_user)
+):
+    """Виконує задачу зараз, не чекаючи розкладу"""
+    from app.core.scheduler import scheduler, JobAlreadyRunning
+
+    try:
+        run = await scheduler.run_job(job_name, trigger="admin")
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except JobAlreadyRunning as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+    logger.info(f"Admin {admin.id} ran scheduler job {job_name}: {run['status']}")
+    return run
+
+
+# ============ Runtime ============
+
+@router.get("/runtime", response_model=RuntimeStatsResponse)
+async def get_runtime_stats(
+        admin: User = Depends(get_current_admin_user)
+):
+    """Метрики пулів (bcrypt, libmagic, bleach, зображення), затримки event loop та індексу каталогу цього воркера"""
+    from app.core.executors import executor_stats
+    from app.core.loop_monitor import loop_monitor
+    from app.core.scheduler import scheduler
+    from app.products.catalog_index import catalog_index
+
+    return RuntimeStatsResponse(
+        worker=scheduler.worker_id,
+        executors=executor_stats(),
+        event_loop=loop_monitor.stats(),
+        catalog_index=catalog_index.stats()
+    )
+
+
+@router.patch("/runtime/loop-diagnostics", response_model=LoopDiagnosticsConfig)
+async def update_loop_diagnostics(
+        data: LoopDiagnosticsUpdate,
+        admin: User = Depends(get_current_admin_user)
+):
+    """Вмикає/вимикає діагностику блокувань event loop без перезапуску"""
+    from app.core.loop_monitor import save_loop_config
+
+    config = await save_loop_config(**data.model_dump(exclude_none=True))
+    logger.info(f"Admin {admin.id} updated loop diagnostics: {config}")
+    return config
+
+
 # ============ File Uploads ============
 
 @router.post("/upload/image", response_model=FileUploadResponse)
@@ -941,12 +1122,14 @@ async def upload_image(
     return FileUploadResponse(
         file_path=f"/uploads/{relative_path}",
         file_size_mb=file_size_mb,
-        filename=filename
+        filename=filename,
+        variants=await generate_image_variants(file_path)
     )
 
 
 @router.post("/upload/archive", response_model=FileUploadResponse)
 async def upload_archive(
+        background_tasks: BackgroundTasks,
         file: UploadFile = File(...),
         old_path: Optional[str] = Form(None),
         admin: User = Depends(get_current_admin_user)
@@ -969,6 +1152,9 @@ async def upload_archive(
 
     relative_path, file_size_mb = await save_upload_file(file, file_path, old_path)
 
+    # Вміст архіву індексується у фоні
+    background_tasks.add_task(index_archive, f"/uploads/{relative_path}")
+
     return FileUploadResponse(
         file_path=f"/uploads/{relative_path}",
         file_size_mb=file_size_mb,
@@ -12,6 +12,7 @@ class FileUploadResponse(BaseModel):
     file_path: str
     file_size_mb: float
     filename: str
+    variants: Optional[Dict[str, Any]] = None  # Похідні зображення (srcset, placeholder)
 
 
 class DashboardStats(BaseModel):
@@ -297,5 +298,63 @@ class TriggerSchedulerResponse(BaseModel):
     """Відповідь після ручного запуску scheduler"""
     expired: int
     cancelled_pending: int
-    renewals: Dict[str, int]
-    timestamp: str
\ No newline at end of file
+    renewals: Dict[str, Any]
+    timestamp: str
+
+
+class SchedulerJobStatus(BaseModel):
+    """Задача планувальника з розкладом і метриками"""
+    name: str
+    description: str
+    cron: str
+    jitter_seconds: int
+    next_run_at: Optional[str] = None
+    runs: int
+    failures: int
+    consecutive_failures: int
+    avg_duration_ms: Optional[float] = None
+    last_status: Optional[str] = None
+    last_run_at: Optional[str] = None
+    last_success_at: Optional[str] = None
+    last_duration_ms: Optional[float] = None
+
+
+class SchedulerStatusResponse(BaseModel):
+    leader: Optional[str] = None
+    jobs: List[SchedulerJobStatus]
+
+
+class RuntimeStatsResponse(BaseModel):
+    """Стан пулів блокуючої роботи, затримка event loop та індекс каталогу воркера"""
+    worker: str
+    executors: Dict[str, Dict[str, Any]]
+    event_loop: Dict[str, Any]
+    catalog_index: Dict[str, Any]
+
+
+class LoopDiagnosticsUpdate(BaseModel):
+    """Налаштування діагностики event loop (застосовуються в усіх воркерах)"""
+    enabled: Optional[bool] = None
+    stacks: Optional[bool] = None
+    threshold_ms: Optional[float] = Field(None, ge=5, le=10000)
+    sample_every: Optional[int] = Field(None, ge=1, le=1000)
+
+
+class LoopDiagnosticsConfig(BaseModel):
+    enabled: bool
+    stacks: bool
+    threshold_ms: float
+    sample_every: int
+
+
+class SchedulerJobRun(BaseModel):
+    """Один запуск задачі"""
+    job: str
+    trigger: str
+    worker: str
+    status: str
+    started_at: str
+    finished_at: Optional[str] = None
+    duration_ms: Optional[float] = None
+    result: Any = None
+    error: Optional[str] = None
\ No newline at end of file
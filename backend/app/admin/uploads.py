@@ -1,15 +1,20 @@
 import aiofiles
-import magic
 import os
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, UploadFile, File, HTTPException, status
 from pathlib import Path
 import logging
 
 from app.core.config import settings
+from app.core.executors import ExecutorOverloaded, security_executor
+from app.core.images import generate_image_variants
+from app.products.archive_index import index_archive
+from app.core.lazy import lazy_import
 from app.users.dependencies import get_current_admin_user
 from app.users.models import User
 from app.core.translations import get_text
 
+magic = lazy_import("magic")
+
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
@@ -35,10 +40,16 @@ ALLOWED_ARCHIVE_MIME = [
 ]
 
 
-def validate_file_type(content: bytes, allowed_types: list[str], file_name: str) -> str:
+# libmagic визначає тип за заголовком; весь файл (до 500MB) передавати не потрібно
+MAGIC_HEADER_BYTES = 8192
+
+
+async def validate_file_type(content: bytes, allowed_types: list[str], file_name: str) -> str:
     """
     Перевіряє реальний тип файлу за його вмістом (magic bytes).
 
+    libmagic викликається в security_executor, щоб не блокувати event loop.
+
     Args:
         content: Вміст файлу в байтах
         allowed_types: Список дозволених MIME-типів
@@ -52,7 +63,7 @@ def validate_file_type(content: bytes, allowed_types: list[str], file_name: str)
     """
     try:
         # Отримуємо реальний MIME-тип за вмістом файлу
-        real_mime = magic.from_buffer(content, mime=True)
+        real_mime = await security_executor.run(magic.from_buffer, content[:MAGIC_HEADER_BYTES], mime=True)
 
         if real_mime not in allowed_types:
             logger.warning(f"File {file_name} has fake extension. Real type: {real_mime}")
@@ -63,7 +74,7 @@ def validate_file_type(content: bytes, allowed_types: list[str], file_name: str)
 
         return real_mime
     except Exception as e:
-        if isinstance(e, HTTPException):
+        if isinstance(e, (HTTPException, ExecutorOverloaded)):
             raise
         logger.error(f"Error validating file type for {file_name}: {e}")
         raise HTTPException(
@@ -97,7 +108,7 @@ async def upload_image(
         )
 
     # Перевірка 2: Реальний вміст файлу через magic bytes (надійна)
-    validate_file_type(content, ALLOWED_IMAGE_MIME, file.filename)
+    await validate_file_type(content, ALLOWED_IMAGE_MIME, file.filename)
 
     # Захист від Path Traversal: використовуємо тільки базове ім'я файлу
     safe_filename = os.path.basename(file.filename)
@@ -114,11 +125,15 @@ async def upload_image(
             detail=get_text("admin_upload_error_save_generic", lang)
         )
 
-    return {"file_path": f"/uploads/images/{safe_filename}"}
+    return {
+        "file_path": f"/uploads/images/{safe_filename}",
+        "variants": await generate_image_variants(file_path)
+    }
 
 
 @router.post("/upload/archive", response_model=dict)
 async def upload_archive(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     admin: User = Depends(get_current_admin_user)
 ):
@@ -142,7 +157,7 @@ async def upload_archive(
         )
 
     # Перевірка 2: Реальний вміст файлу через magic bytes (надійна)
-    validate_file_type(content, ALLOWED_ARCHIVE_MIME, file.filename)
+    await validate_file_type(content, ALLOWED_ARCHIVE_MIME, file.filename)
 
     # Захист від Path Traversal: використовуємо тільки базове ім'я файлу
     safe_filename = os.path.basename(file.filename)
@@ -159,4 +174,7 @@ async def upload_archive(
             detail=get_text("admin_upload_error_save_generic", lang)
         )
 
+    # Вміст архіву індексується у фоні
+    background_tasks.add_task(index_archive, f"/uploads/archives/{safe_filename}")
+
     return {"file_path": f"/uploads/archives/{safe_filename}"}
\ No newline at end of file
@@ -16,6 +16,13 @@ class CacheManager:
             retry_on_timeout=True,
             socket_keepalive=True
         )
+        # Клієнт без декодування для готових тіл відповідей (gzip-байти)
+        self.raw = redis.from_url(
+            settings.REDIS_URL,
+            decode_responses=False,
+            retry_on_timeout=True,
+            socket_keepalive=True
+        )
 
     async def get(self, key: str) -> Optional[str]:
         return await self.redis.get(key)
@@ -23,8 +30,8 @@ class CacheManager:
     async def set(self, key: str, value: str, ttl: int = 300):
         await self.redis.setex(key, ttl, value)
 
-    async def delete(self, key: str):
-        await self.redis.delete(key)
+    async def delete(self, *keys: str):
+        await self.redis.delete(*keys)
 
     async def delete_pattern(self, pattern: str):
         keys = []
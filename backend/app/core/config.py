@@ -29,14 +29,27 @@ class Settings(BaseSettings):
     STRIPE_SECRET_KEY: str = ""  # Stripe secret key (sk_live_... or sk_test_...)
     STRIPE_PUBLISHABLE_KEY: str = ""  # Stripe publishable key (pk_live_... or pk_test_...)
     STRIPE_WEBHOOK_SECRET: str = ""  # Stripe webhook signing secret (whsec_...)
+    STRIPE_API_BASE: str = ""  # Порожньо — api.stripe.com; для локального fake-Stripe: http://localhost:12111
+    STRIPE_TIMEOUT_SECONDS: float = 10.0
+    STRIPE_MAX_NETWORK_RETRIES: int = 2
+    STRIPE_MAX_CONNECTIONS: int = 20
 
     RESEND_API_KEY: str = ""
+    RESEND_API_BASE: str = "https://api.resend.com"
     FROM_EMAIL: str = "noreply@ohmyrevit.pp.ua"
 
     FRONTEND_URL: str
+    TRANSLATIONS_DIR: str = ""  # Каталог з додатковими <lang>.json / <lang>.po перекладами
     BACKEND_URL: str
 
     SENTRY_DSN: str = ""
+    WARMUP_TIMEOUT_SECONDS: float = 10.0  # Скільки старт може чекати на прогрів
+
+    # --- Scheduler ---
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULER_TICK_SECONDS: int = 15
+    SCHEDULER_LEADER_TTL_SECONDS: int = 60  # Через скільки лідерство переходить до іншого воркера
+    NOTIFICATION_WORKER_CONCURRENCY: int = 10  # Паралельних відправок у Telegram з черги
 
     ENVIRONMENT: str = "development"
     DEBUG: bool = True
@@ -47,6 +60,35 @@ class Settings(BaseSettings):
     MAX_UPLOAD_SIZE_MB: int = 100
     UPLOAD_PATH: str = "/app/uploads"
 
+    # Токени завантаження
+    DOWNLOAD_TOKEN_TTL_SECONDS: int = 300  # Одноразовий токен у Redis
+    DOWNLOAD_SIGNED_URLS: bool = False  # Видавати підписані токени замість Redis
+    DOWNLOAD_SIGNED_URL_TTL_SECONDS: int = 60
+    DOWNLOAD_EMAIL_LINK_TTL_SECONDS: int = 30 * 24 * 60 * 60  # Підписані посилання в листі після покупки
+    DOWNLOAD_SIGNING_KEY: str = ""  # Порожній — ключ виводиться з SECRET_KEY
+    BULK_DOWNLOAD_SLOTS: int = 4  # Одночасних потокових ZIP на процес
+    BULK_DOWNLOAD_MAX_PRODUCTS: int = 100
+
+    # Похідні зображень (WebP/AVIF, LQIP)
+    IMAGE_VARIANT_WIDTHS: List[int] = [320, 640, 1280]
+    IMAGE_AVIF_ENABLED: bool = False  # Потрібен pillow-avif-plugin
+
+    # Пули для блокуючої роботи та монітор event loop
+    PROCESS_POOL_WORKERS: int = 2  # Процесів для зображень та індексації архівів
+    PROCESS_POOL_MAX_PENDING: int = 32
+    SECURITY_EXECUTOR_WORKERS: int = 4  # Потоків для bcrypt, libmagic, bleach
+    SECURITY_EXECUTOR_MAX_PENDING: int = 64  # Більше — відповідь 503
+    LOOP_LAG_INTERVAL_SECONDS: float = 0.5
+    LOOP_LAG_THRESHOLD_MS: float = 100
+    LOOP_DIAGNOSTICS_ENABLED: bool = True  # Перемикається в адмінці під час роботи
+    LOOP_STACK_SAMPLE_EVERY: int = 1  # Знімати стек для кожного N-го блокування
+    METRICS_TOKEN: str = ""  # Bearer-токен для /metrics; порожній — endpoint вимкнено
+
+    # Індекс каталогу в пам'яті воркера (фільтри та сортування списку товарів)
+    CATALOG_INDEX_ENABLED: bool = True
+    CATALOG_INDEX_SYNC_SECONDS: float = 2  # Як часто підхоплювати зміни інших воркерів
+    CATALOG_INDEX_REBUILD_SECONDS: int = 300  # Повна перебудова (лічильники, рейтинги)
+
     DEFAULT_PAGE_SIZE: int = 20
     MAX_PAGE_SIZE: int = 100
 
@@ -82,6 +124,10 @@ class Settings(BaseSettings):
     MAIL_SSL_TLS: bool = False
     USE_CREDENTIALS: bool = True
     VALIDATE_CERTS: bool = True
+    MAIL_POOL_SIZE: int = 4  # Скільки SMTP-з'єднань тримати відкритими
+    MAIL_IDLE_TIMEOUT_SECONDS: int = 120  # Простій, після якого з'єднання перевідкривається
+    MAIL_TIMEOUT_SECONDS: float = 30.0
+    EMAIL_BATCH_CONCURRENCY: int = 8  # Паралельних відправок у send_batch
 
     # Legacy (використовується в бонусній системі)
     SUBSCRIPTION_PRICE_USD: float = 5.0
@@ -1,27 +1,28 @@
+import asyncio
 import logging
 import time
-from typing import List, Optional, Dict
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
+from email.message import EmailMessage
+from email.utils import formataddr
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Dict, Tuple
 from app.core.config import settings
+from app.core.mail_transport import RESEND_BATCH_LIMIT, ResendClient, SMTPConnectionPool
 from app.core.translations import get_text
 
 logger = logging.getLogger(__name__)
 
-# Налаштування конфігурації SMTP (Gmail fallback)
-gmail_conf = ConnectionConfig(
-    MAIL_USERNAME=settings.MAIL_USERNAME,
-    MAIL_PASSWORD=settings.MAIL_PASSWORD,
-    MAIL_FROM=settings.MAIL_FROM,
-    MAIL_PORT=settings.MAIL_PORT,
-    MAIL_SERVER=settings.MAIL_SERVER,
-    MAIL_STARTTLS=settings.MAIL_STARTTLS,
-    MAIL_SSL_TLS=settings.MAIL_SSL_TLS,
-    USE_CREDENTIALS=settings.USE_CREDENTIALS,
-    VALIDATE_CERTS=settings.VALIDATE_CERTS
-)
+_CONTENT_MARKER = "\x00content\x00"
 
 
-def get_email_template(content: str, language_code: str = "uk") -> str:
+class OutgoingEmail(NamedTuple):
+    """Готовий до відправки лист"""
+    to: str
+    subject: str
+    html_content: str
+    text_content: Optional[str] = None
+
+
+def _render_base_template(content: str, language_code: str) -> str:
     """
     Базовий шаблон для всіх email листів
     Сучасний, мінімалістичний дизайн з градієнтами
@@ -107,6 +108,25 @@ def get_email_template(content: str, language_code: str = "uk") -> str:
     """
 
 
+@lru_cache(maxsize=16)
+def _base_template_parts(language_code: str) -> Tuple[str, str]:
+    """Шаблон без вмісту (до і після content) — будується раз на мову"""
+    head, tail = _render_base_template(_CONTENT_MARKER, language_code).split(_CONTENT_MARKER)
+    return head, tail
+
+
+def precompile_email_templates(languages: List[str]):
+    """Будує базові шаблони наперед (викликається при прогріві)"""
+    for language_code in languages:
+        _base_template_parts(language_code)
+
+
+def get_email_template(content: str, language_code: str = "uk") -> str:
+    """Вставляє content у закешований базовий шаблон мови"""
+    head, tail = _base_template_parts(language_code)
+    return f"{head}{content}{tail}"
+
+
 def get_button_html(text: str, url: str, color: str = "#8B5CF6") -> str:
     """Красива кнопка з градієнтом"""
     return f"""
@@ -119,25 +139,87 @@ def get_button_html(text: str, url: str, color: str = "#8B5CF6") -> str:
 
 
 class EmailService:
-    def __init__(self):
-        self.gmail_client = FastMail(gmail_conf)
-        # Resend імпортується динамічно при використанні
-        self._resend_client = None
+    def __init__(
+            self,
+            resend_client: Optional[ResendClient] = None,
+            smtp_pool: Optional[SMTPConnectionPool] = None
+    ):
+        """
+        Args:
+            resend_client: Клієнт Resend; None — створюється з settings при першому листі
+            smtp_pool: Пул SMTP (fallback); None — створюється з settings при першому листі
+        """
+        self._resend_client = resend_client
+        self._smtp_pool = smtp_pool
 
-    def _get_resend_client(self):
+    def _get_resend_client(self) -> Optional[ResendClient]:
         """Lazy loading для Resend клієнта"""
         if self._resend_client is None and settings.RESEND_API_KEY:
-            try:
-                import resend
-                resend.api_key = settings.RESEND_API_KEY
-                self._resend_client = resend
-                logger.info("Resend client initialized successfully")
-            except ImportError:
-                logger.warning("Resend library not installed, will use Gmail fallback only")
-            except Exception as e:
-                logger.error(f"Failed to initialize Resend client: {str(e)}")
+            self._resend_client = ResendClient(
+                api_key=settings.RESEND_API_KEY,
+                api_base=settings.RESEND_API_BASE,
+                timeout=settings.MAIL_TIMEOUT_SECONDS,
+                max_connections=settings.EMAIL_BATCH_CONCURRENCY
+            )
+            logger.info("Resend client initialized successfully")
         return self._resend_client
 
+    def _get_smtp_pool(self) -> Optional[SMTPConnectionPool]:
+        """Lazy loading для пулу SMTP-з'єднань"""
+        if self._smtp_pool is None and settings.MAIL_SERVER:
+            self._smtp_pool = SMTPConnectionPool(
+                hostname=settings.MAIL_SERVER,
+                port=settings.MAIL_PORT,
+                username=settings.MAIL_USERNAME if settings.USE_CREDENTIALS else None,
+                password=settings.MAIL_PASSWORD if settings.USE_CREDENTIALS else None,
+                use_tls=settings.MAIL_SSL_TLS,
+                start_tls=settings.MAIL_STARTTLS,
+                validate_certs=settings.VALIDATE_CERTS,
+                size=settings.MAIL_POOL_SIZE,
+                idle_timeout=settings.MAIL_IDLE_TIMEOUT_SECONDS,
+                timeout=settings.MAIL_TIMEOUT_SECONDS
+            )
+        return self._smtp_pool
+
+    @staticmethod
+    def _resend_params(email: OutgoingEmail) -> Dict:
+        params = {
+            "from": f"OhMyRevit <{settings.FROM_EMAIL}>",
+            "to": [email.to],
+            "subject": email.subject,
+            "html": email.html_content,
+            "reply_to": "support@ohmyrevit.pp.ua",
+            "headers": {
+                "X-Entity-Ref-ID": f"ohmyrevit-{int(time.time())}",
+            }
+        }
+        if email.text_content:
+            params["text"] = email.text_content
+        return params
+
+    @staticmethod
+    def _smtp_message(email: OutgoingEmail) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = formataddr(("OhMyRevit", settings.MAIL_FROM))
+        message["To"] = email.to
+        message["Subject"] = email.subject
+        message.set_content(email.text_content or "")
+        message.add_alternative(email.html_content, subtype="html")
+        return message
+
+    async def _send_smtp(self, email: OutgoingEmail) -> bool:
+        pool = self._get_smtp_pool()
+        if pool is None:
+            logger.error(f"❌ SMTP is not configured, email to {email.to} was not sent")
+            return False
+        try:
+            await pool.send(self._smtp_message(email))
+            logger.info(f"✅ Email sent successfully via SMTP to {email.to}")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Failed to send email to {email.to} via SMTP: {str(e)}")
+            return False
+
     async def send_email(
             self,
             to: str,
@@ -147,45 +229,78 @@ class EmailService:
     ) -> bool:
         """
         Універсальний метод відправки email з fallback механізмом.
-        Спочатку пробує Resend, якщо не вдається - використовує Gmail SMTP.
+        Спочатку пробує Resend, якщо не вдається - використовує SMTP пул.
         """
+        email = OutgoingEmail(to, subject, html_content, text_content)
+
         # Спроба 1: Resend (primary)
-        if settings.RESEND_API_KEY:
+        resend = self._get_resend_client()
+        if resend:
             try:
-                resend = self._get_resend_client()
-                if resend:
-                    params = {
-                        "from": f"OhMyRevit <{settings.FROM_EMAIL}>",
-                        "to": [to],
-                        "subject": subject,
-                        "html": html_content,
-                        "reply_to": "support@ohmyrevit.pp.ua",
-                        "headers": {
-                            "X-Entity-Ref-ID": f"ohmyrevit-{int(time.time())}",
-                        }
-                    }
-
-                    response = resend.Emails.send(params)
-                    logger.info(f"✅ Email sent successfully via Resend to {to} (ID: {response.get('id', 'unknown')})")
-                    return True
+                email_id = await resend.send(self._resend_params(email))
+                logger.info(f"✅ Email sent successfully via Resend to {to} (ID: {email_id})")
+                return True
             except Exception as e:
-                logger.warning(f"⚠️ Resend failed: {str(e)}, falling back to Gmail SMTP")
+                logger.warning(f"⚠️ Resend failed: {str(e)}, falling back to SMTP")
 
-        # Спроба 2: Gmail SMTP (fallback)
-        try:
-            message = MessageSchema(
-                subject=subject,
-                recipients=[to],
-                body=html_content,
-                subtype=MessageType.html
-            )
+        # Спроба 2: SMTP (fallback)
+        return await self._send_smtp(email)
 
-            await self.gmail_client.send_message(message)
-            logger.info(f"✅ Email sent successfully via Gmail SMTP to {to}")
-            return True
-        except Exception as e:
-            logger.error(f"❌ Failed to send email via both Resend and Gmail: {str(e)}")
-            return False
+    async def send_batch(
+            self,
+            emails: List[OutgoingEmail],
+            concurrency: Optional[int] = None
+    ) -> List[bool]:
+        """
+        Масова відправка листів
+
+        Resend отримує листи пачками по RESEND_BATCH_LIMIT, пачки, які Resend
+        не прийняв, і все решта йде через SMTP пул. Одночасно виконується не
+        більше concurrency запитів.
+
+        Returns:
+            Результат для кожного листа в порядку emails
+        """
+        semaphore = asyncio.Semaphore(concurrency or settings.EMAIL_BATCH_CONCURRENCY)
+        results = [False] * len(emails)
+        smtp_indexes = list(range(len(emails)))
+
+        resend = self._get_resend_client()
+        if resend:
+            async def send_chunk(start: int) -> List[int]:
+                chunk = emails[start:start + RESEND_BATCH_LIMIT]
+                async with semaphore:
+                    try:
+                        await resend.send_batch([self._resend_params(email) for email in chunk])
+                    except Exception as e:
+                        logger.warning(f"⚠️ Resend batch failed: {str(e)}, falling back to SMTP")
+                        return list(range(start, start + len(chunk)))
+                for index in range(start, start + len(chunk)):
+                    results[index] = True
+                return []
+
+            failed = await asyncio.gather(*(
+                send_chunk(start) for start in range(0, len(emails), RESEND_BATCH_LIMIT)
+            ))
+            smtp_indexes = [index for chunk in failed for index in chunk]
+
+        async def send_one(index: int):
+            async with semaphore:
+                results[index] = await self._send_smtp(emails[index])
+
+        await asyncio.gather(*(send_one(index) for index in smtp_indexes))
+
+        logger.info(f"Email batch: {sum(results)}/{len(emails)} sent")
+        return results
+
+    async def close(self):
+        """Закриває з'єднання з Resend та SMTP"""
+        if self._resend_client is not None:
+            await self._resend_client.close()
+            self._resend_client = None
+        if self._smtp_pool is not None:
+            await self._smtp_pool.close()
+            self._smtp_pool = None
 
     async def send_verification_email(
             self,
@@ -514,12 +629,12 @@ class EmailService:
         html_content = get_email_template(content, language_code)
         return await self.send_email(to=user_email, subject=subject, html_content=html_content)
 
-    async def send_subscription_confirmation(
+    def render_subscription_confirmation(
             self,
             user_email: str,
             end_date: str,
             language_code: str = "uk"
-    ) -> bool:
+    ) -> OutgoingEmail:
         """Підтвердження підписки"""
         t = lambda k, **kwargs: get_text(k, language_code, **kwargs)
         subject = f"OhMyRevit – {t('email_subscription_subject')}"
@@ -576,15 +691,23 @@ class EmailService:
         </div>
         """
 
-        html_content = get_email_template(content, language_code)
-        return await self.send_email(to=user_email, subject=subject, html_content=html_content)
+        return OutgoingEmail(user_email, subject, get_email_template(content, language_code))
 
-    async def send_download_links(
+    async def send_subscription_confirmation(
             self,
             user_email: str,
-            products: List[Dict],
+            end_date: str,
             language_code: str = "uk"
     ) -> bool:
+        email = self.render_subscription_confirmation(user_email, end_date, language_code)
+        return (await self.send_batch([email]))[0]
+
+    def render_download_links(
+            self,
+            user_email: str,
+            products: List[Dict],
+            language_code: str = "uk"
+    ) -> OutgoingEmail:
         """Посилання для завантаження продуктів"""
         t = lambda k, **kwargs: get_text(k, language_code, **kwargs)
         subject = f"OhMyRevit – {t('email_download_subject')}"
@@ -639,9 +762,22 @@ class EmailService:
         </div>
         """
 
-        html_content = get_email_template(content, language_code)
-        return await self.send_email(to=user_email, subject=subject, html_content=html_content)
+        return OutgoingEmail(user_email, subject, get_email_template(content, language_code))
+
+    async def send_download_links(
+            self,
+            user_email: str,
+            products: List[Dict],
+            language_code: str = "uk"
+    ) -> bool:
+        """
+        Лист з посиланнями на файли покупки
 
+        Args:
+            products: [{"title", "download_url", "file_size_mb"}, ...]
+        """
+        email = self.render_download_links(user_email, products, language_code)
+        return (await self.send_batch([email]))[0]
 
     async def send_creator_application_approved(
             self,
@@ -0,0 +1,137 @@
+"""
+Обмежені пули для блокуючої роботи
+
+Синхронні CPU-важкі виклики (bcrypt, libmagic, bleach, Pillow, читання
+архівів) не виконуються в event loop: вони йдуть через BoundedExecutor, який
+- створює пул при першому використанні;
+- обмежує кількість задач у черзі та в роботі (max_pending) і при
+  переповненні одразу відповідає 503, а не накопичує запити;
+- рахує метрики: скільки задач прийнято, виконано, відхилено, пікова
+  кількість одночасних задач і тривалість.
+
+Пули:
+- security_executor — потоки для bcrypt, libmagic, bleach (bcrypt і
+  libmagic відпускають GIL, bleach — ні, але loop отримує свої кванти часу);
+- cpu_executor — процеси для зображень та індексації архівів.
+"""
+import asyncio
+import functools
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from app.core.config import settings
+from app.core.exceptions import AppException
+
+T = TypeVar("T")
+
+
+class ExecutorOverloaded(AppException):
+    """Черга пулу заповнена"""
+    def __init__(self, name: str):
+        super().__init__(
+            message="Сервер перевантажений, спробуйте пізніше",
+            error_code="server_busy",
+            status_code=503,
+            details={"executor": name}
+        )
+
+
+class BoundedExecutor:
+    """Пул з обмеженою чергою та метриками"""
+
+    def __init__(self, name: str, factory: Callable[[], Executor], max_pending: int):
+        self.name = name
+        self.max_pending = max_pending
+        self._factory = factory
+        self._executor: Optional[Executor] = None
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = self._factory()
+        return self._executor
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Виконує func у пулі
+
+        Raises:
+            ExecutorOverloaded: Якщо в черзі вже max_pending задач
+        """
+        if self.in_flight >= self.max_pending:
+            self.rejected += 1
+            raise ExecutorOverloaded(self.name)
+
+        if kwargs:
+            func = functools.partial(func, **kwargs)
+
+        self.in_flight += 1
+        self.submitted += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        started = time.perf_counter()
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        except BaseException:
+            self.failed += 1
+            raise
+        else:
+            self.completed += 1
+            return result
+        finally:
+            self.in_flight -= 1
+            elapsed = (time.perf_counter() - started) * 1000
+            self.total_ms += elapsed
+            self.max_ms = max(self.max_ms, elapsed)
+
+    def stats(self) -> Dict[str, Any]:
+        finished = self.completed + self.failed
+        return {
+            "name": self.name,
+            "max_pending": self.max_pending,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "avg_ms": round(self.total_ms / finished, 1) if finished else None,
+            "max_ms": round(self.max_ms, 1),
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+security_executor = BoundedExecutor(
+    "security",
+    lambda: ThreadPoolExecutor(max_workers=settings.SECURITY_EXECUTOR_WORKERS, thread_name_prefix="security"),
+    settings.SECURITY_EXECUTOR_MAX_PENDING
+)
+
+cpu_executor = BoundedExecutor(
+    "cpu",
+    lambda: ProcessPoolExecutor(max_workers=settings.PROCESS_POOL_WORKERS),
+    settings.PROCESS_POOL_MAX_PENDING
+)
+
+EXECUTORS = (security_executor, cpu_executor)
+
+
+def executor_stats() -> Dict[str, Dict[str, Any]]:
+    return {executor.name: executor.stats() for executor in EXECUTORS}
+
+
+def shutdown_executors():
+    for executor in EXECUTORS:
+        executor.shutdown()
@@ -0,0 +1,148 @@
+"""
+Потоковий експорт великих вибірок у CSV / NDJSON
+
+Рядки читаються серверним курсором (yield_per) і відразу кодуються в
+відповідь, тому пам'ять не залежить від розміру вибірки.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Sequence
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy.sql import Select
+
+from app.core.database import AsyncSessionLocal
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+# Кількість рядків, які драйвер отримує з курсора за один раз
+EXPORT_FETCH_SIZE = 1000
+
+# Кількість рядків у одному chunk відповіді
+EXPORT_CHUNK_ROWS = 500
+
+
+def _to_primitive(value: Any) -> Any:
+    """Приводить значення БД до JSON/CSV-сумісного вигляду"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def apply_date_range(
+        query: Select,
+        column: Any,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None
+) -> Select:
+    """Додає фільтр [date_from, date_to) по колонці дати"""
+    if date_from is not None:
+        query = query.where(column >= date_from)
+    if date_to is not None:
+        query = query.where(column < date_to)
+    return query
+
+
+async def iter_query_rows(
+        query: Select,
+        row_mapper: Optional[Callable[[Any], Dict[str, Any]]] = None,
+        fetch_size: int = EXPORT_FETCH_SIZE
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Стрімить рядки запиту серверним курсором
+
+    Використовує окрему сесію: залежність get_db закривається до того,
+    як StreamingResponse почне віддавати тіло.
+    """
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(query.execution_options(yield_per=fetch_size))
+        if row_mapper is None:
+            async for row in result.mappings():
+                yield dict(row)
+        else:
+            async for row in result:
+                yield row_mapper(row)
+
+
+async def _encode_csv(
+        rows: AsyncIterator[Dict[str, Any]],
+        fields: Sequence[str]
+) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(fields), extrasaction="ignore")
+    # BOM, щоб Excel коректно відкривав кирилицю
+    buffer.write("\ufeff")
+    writer.writeheader()
+
+    pending = 0
+    async for row in rows:
+        writer.writerow({key: _to_primitive(row.get(key)) for key in fields})
+        pending += 1
+        if pending >= EXPORT_CHUNK_ROWS:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+
+    tail = buffer.getvalue()
+    if tail:
+        yield tail.encode("utf-8")
+
+
+async def _encode_ndjson(
+        rows: AsyncIterator[Dict[str, Any]],
+        fields: Sequence[str]
+) -> AsyncIterator[bytes]:
+    lines = []
+    async for row in rows:
+        lines.append(json.dumps(
+            {key: _to_primitive(row.get(key)) for key in fields},
+            ensure_ascii=False
+        ))
+        if len(lines) >= EXPORT_CHUNK_ROWS:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def streaming_export_response(
+        rows: AsyncIterator[Dict[str, Any]],
+        fields: Sequence[str],
+        export_format: str,
+        filename: str
+) -> StreamingResponse:
+    """
+    Формує StreamingResponse з потоку рядків
+
+    Args:
+        rows: Асинхронний потік словників (наприклад, iter_query_rows)
+        fields: Колонки експорту в потрібному порядку
+        export_format: "csv" або "ndjson"
+        filename: Ім'я файлу без розширення
+    """
+    if export_format not in EXPORT_MEDIA_TYPES:
+        raise ValueError(f"Unsupported export format: {export_format}")
+
+    encoder = _encode_csv if export_format == "csv" else _encode_ndjson
+
+    return StreamingResponse(
+        encoder(rows, fields),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.{export_format}"',
+            "Cache-Control": "no-store",
+        }
+    )
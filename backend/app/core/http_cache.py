@@ -0,0 +1,84 @@
+"""
+HTTP-кешування публічних відповідей каталогу
+
+Відповідь будується із запису response_cache, де вже є дайджест тіла і
+час зміни, тож ETag і Last-Modified відомі без звернення до БД. Якщо
+If-None-Match (або If-Modified-Since) збігається, повертається 304 без тіла.
+
+Cache-Control для кожного маршруту задається політикою: max-age для
+браузера і Telegram WebView, s-maxage і stale-while-revalidate для
+nginx/Cloudflare. Відповіді залежать від мови та стиснення, тому Vary
+містить Accept-Language і Accept-Encoding.
+"""
+from datetime import datetime
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import NamedTuple, Optional
+
+from fastapi import Request, Response
+
+from app.core.response_cache import body_etag, body_last_modified, body_response
+
+VARY = "Accept-Language, Accept-Encoding"
+
+
+class CachePolicy(NamedTuple):
+    max_age: int
+    s_maxage: int
+    stale_while_revalidate: int
+
+    def header(self) -> str:
+        return (
+            f"public, max-age={self.max_age}, s-maxage={self.s_maxage}, "
+            f"stale-while-revalidate={self.stale_while_revalidate}"
+        )
+
+
+# Списки та картки змінюються частіше, довідники — рідко
+CATALOG_POLICY = CachePolicy(max_age=30, s_maxage=60, stale_while_revalidate=300)
+PRODUCT_POLICY = CachePolicy(max_age=60, s_maxage=120, stale_while_revalidate=600)
+REFERENCE_POLICY = CachePolicy(max_age=300, s_maxage=600, stale_while_revalidate=3600)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Слабке порівняння ETag з If-None-Match (RFC 9110, 13.1.2)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def _not_modified_since(if_modified_since: Optional[str], last_modified: Optional[datetime]) -> bool:
+    if not if_modified_since or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    return since.tzinfo is not None and last_modified.replace(microsecond=0) <= since
+
+
+def conditional_response(request: Request, blob: bytes, policy: CachePolicy) -> Response:
+    """
+    Відповідь з валідаторами або 304
+
+    If-None-Match має пріоритет: If-Modified-Since перевіряється лише без нього.
+    """
+    etag = body_etag(blob)
+    last_modified = body_last_modified(blob)
+    headers = {"ETag": etag, "Cache-Control": policy.header(), "Vary": VARY}
+    if last_modified:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        not_modified = etag_matches(if_none_match, etag)
+    else:
+        not_modified = _not_modified_since(request.headers.get("if-modified-since"), last_modified)
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+
+    response = body_response(blob, request.headers.get("accept-encoding"))
+    response.headers.update(headers)
+    return response
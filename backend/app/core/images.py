@@ -0,0 +1,169 @@
+"""
+Похідні зображень для каталогу
+
+Після завантаження зображення створюються зменшені копії у WebP (та AVIF,
+якщо увімкнено і доступний плагін) для ширин IMAGE_VARIANT_WIDTHS і
+крихітний LQIP-плейсхолдер (data URI). Pillow працює в спільному пулі процесів (cpu_executor),
+тому декодування великих фото не блокує event loop.
+
+Результат — карта варіантів, готова для <img srcset>:
+    {
+        "width": 3000, "height": 2000,
+        "placeholder": "data:image/webp;base64,...",
+        "srcset": {
+            "webp": "/uploads/images/variants/x.jpg_320.webp 320w, ...",
+            "avif": "..."
+        }
+    }
+Карта зберігається поруч з варіантами (variants/<ім'я файлу>.json), а при
+збереженні товару копіюється в products.image_variants. Варіанти названі за
+повним ім'ям оригіналу з розширенням, тож x.jpg і x.png не перетинаються.
+"""
+import asyncio
+import base64
+import io
+import json
+import logging
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+from app.core.config import settings
+from app.core.executors import cpu_executor
+
+logger = logging.getLogger(__name__)
+
+VARIANTS_DIR = "variants"
+
+# <ім'я оригіналу>_<ширина>.<формат> або <ім'я оригіналу>.json
+_VARIANT_NAME = re.compile(r"^(?P<source>.+?)(?:_\d+\.(?:webp|avif)|\.json)$")
+
+# Ширина плейсхолдера: ~100-300 байт у base64
+LQIP_WIDTH = 16
+
+WEBP_QUALITY = 80
+AVIF_QUALITY = 60
+LQIP_QUALITY = 30
+
+
+def _avif_available() -> bool:
+    from PIL import Image
+
+    try:
+        import pillow_avif  # noqa: F401 — реєструє AVIF у Pillow
+    except ImportError:
+        pass
+    return ".avif" in Image.registered_extensions()
+
+
+def _upload_url(path: Path, upload_root: Path) -> str:
+    return f"/uploads/{path.relative_to(upload_root).as_posix()}"
+
+
+def build_variants(source: str, upload_root: str, widths: Iterable[int], avif: bool = False) -> Dict[str, Any]:
+    """
+    Створює похідні зображення (виконується в окремому процесі)
+
+    Ширини, більші за оригінал, пропускаються; найменша створюється завжди.
+    """
+    from PIL import Image, ImageOps
+
+    source_path = Path(source)
+    root = Path(upload_root)
+    output_dir = source_path.parent / VARIANTS_DIR
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+        width, height = image.size
+
+        formats = {"webp": ("WEBP", {"quality": WEBP_QUALITY, "method": 4})}
+        if avif:
+            if _avif_available():
+                formats["avif"] = ("AVIF", {"quality": AVIF_QUALITY})
+            else:
+                logger.warning("AVIF requested but not supported by Pillow, skipping")
+
+        widths = sorted(set(widths))
+        target_widths = [w for w in widths if w < width] or widths[:1]
+
+        srcset = {name: [] for name in formats}
+        for target_width in target_widths:
+            target_width = min(target_width, width)
+            resized = image.resize(
+                (target_width, max(1, round(height * target_width / width))),
+                Image.LANCZOS
+            )
+            for name, (pil_format, options) in formats.items():
+                path = output_dir / f"{source_path.name}_{target_width}.{name}"
+                resized.save(path, pil_format, **options)
+                srcset[name].append(f"{_upload_url(path, root)} {target_width}w")
+
+        placeholder = image.resize((LQIP_WIDTH, max(1, round(height * LQIP_WIDTH / width))), Image.BILINEAR)
+        buffer = io.BytesIO()
+        placeholder.save(buffer, "WEBP", quality=LQIP_QUALITY)
+
+    variants = {
+        "width": width,
+        "height": height,
+        "placeholder": "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode(),
+        "srcset": {name: ", ".join(entries) for name, entries in srcset.items()},
+    }
+    (output_dir / f"{source_path.name}.json").write_text(json.dumps(variants))
+    return variants
+
+
+async def generate_image_variants(source: Path) -> Optional[Dict[str, Any]]:
+    """
+    Створює похідні для завантаженого зображення у пулі процесів
+
+    Returns:
+        Карта варіантів або None, якщо обробка не вдалася (оригінал лишається)
+    """
+    try:
+        return await cpu_executor.run(
+            build_variants,
+            str(source),
+            settings.UPLOAD_PATH,
+            tuple(settings.IMAGE_VARIANT_WIDTHS),
+            settings.IMAGE_AVIF_ENABLED
+        )
+    except Exception as e:
+        logger.error(f"Failed to build image variants for {source}: {e}")
+        return None
+
+
+def variant_source_name(filename: str) -> Optional[str]:
+    """Ім'я файлу оригіналу для файлу з variants/ (None — не варіант)"""
+    match = _VARIANT_NAME.match(filename)
+    return match.group("source") if match else None
+
+
+def _manifest_path(url: str) -> Optional[Path]:
+    if not url or not url.startswith("/uploads/"):
+        return None
+    source = Path(settings.UPLOAD_PATH) / url.removeprefix("/uploads/")
+    path = source.parent / VARIANTS_DIR / f"{source.name}.json"
+    if not path.is_file():
+        # Варіанти, створені до іменування за повним ім'ям файлу
+        path = source.parent / VARIANTS_DIR / f"{source.stem}.json"
+    return path
+
+
+def _read_manifests(urls: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    variants = {}
+    for url in dict.fromkeys(urls):
+        path = _manifest_path(url)
+        if path is None or not path.is_file():
+            continue
+        try:
+            variants[url] = json.loads(path.read_text())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Broken image variants manifest {path}: {e}")
+    return variants
+
+
+async def collect_image_variants(urls: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """Карти варіантів для URL зображень товару: {url: карта}"""
+    return await asyncio.to_thread(_read_manifests, [url for url in urls if url])
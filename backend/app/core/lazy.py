@@ -0,0 +1,45 @@
+"""
+Відкладений імпорт важких залежностей
+
+stripe, sentry_sdk, bleach, magic потрібні лише частині запитів, але при
+звичайному імпорті завантажуються під час старту кожного воркера.
+lazy_import повертає замінник модуля, який імпортує його при першому
+зверненні до атрибута:
+
+    stripe = lazy_import("stripe")
+    ...
+    except stripe.error.StripeError:  # імпорт відбувся тут
+"""
+import importlib
+import sys
+from types import ModuleType
+
+
+class LazyModule(ModuleType):
+    """Модуль, що імпортується при першому доступі до атрибута"""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_module"] = None
+
+    def _load(self) -> ModuleType:
+        module = self.__dict__["_module"]
+        if module is None:
+            module = importlib.import_module(self.__name__)
+            self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.__dict__["_module"] is not None
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Повертає вже завантажений модуль або LazyModule"""
+    return sys.modules.get(name) or LazyModule(name)
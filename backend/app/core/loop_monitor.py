@@ -0,0 +1,254 @@
+"""
+Діагностика блокувань event loop
+
+Heartbeat-задача прокидається кожні LOOP_LAG_INTERVAL_SECONDS і міряє, наскільки
+пізніше запланованого вона отримала керування. Затримки потрапляють у
+гістограму, а більші за поріг — у лог і кільцевий буфер останніх подій.
+
+Стек блокуючого коду знімає сторожовий потік: якщо heartbeat прострочений
+більше ніж на поріг, потік бере поточний кадр потоку loop через
+sys._current_frames(). Це вибірковий аналог slow-callback логування asyncio
+(loop.set_debug), але без його накладних витрат на кожен callback, тож
+діагностику можна тримати увімкненою в продакшені. LOOP_STACK_SAMPLE_EVERY
+задає, для якої частки блокувань знімається стек. Стеки агрегуються за
+місцем виклику (найглибший кадр коду додатку) — так видно топ порушників.
+
+Налаштування змінюються адміністратором під час роботи: вони зберігаються в
+Redis і кожен воркер перечитує їх раз на LOOP_CONFIG_REFRESH_SECONDS.
+"""
+import asyncio
+import json
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional
+
+from app.core.cache import cache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Скільки останніх блокувань зберігається
+RECENT_EVENTS = 50
+
+# Межі кошиків гістограми затримки, мс
+LAG_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Скільки місць виклику показувати і скільки кадрів стека зберігати
+TOP_CALL_SITES = 20
+MAX_CALL_SITES = 200
+STACK_DEPTH = 15
+
+LOOP_CONFIG_KEY = "runtime:loop_diagnostics"
+LOOP_CONFIG_REFRESH_SECONDS = 10
+
+_APP_ROOT = str(Path(__file__).resolve().parents[1])
+
+
+def _call_site(stack: traceback.StackSummary) -> str:
+    """Найглибший кадр коду додатку (або просто найглибший кадр)"""
+    for frame in reversed(stack):
+        if frame.filename.startswith(_APP_ROOT) and not frame.filename.endswith("loop_monitor.py"):
+            return f"{Path(frame.filename).relative_to(Path(_APP_ROOT).parent)}:{frame.lineno} in {frame.name}"
+    frame = stack[-1]
+    return f"{frame.filename}:{frame.lineno} in {frame.name}"
+
+
+class LoopLagMonitor:
+    def __init__(
+        self,
+        interval: float,
+        threshold_ms: float,
+        enabled: bool = True,
+        stacks: bool = True,
+        sample_every: int = 1
+    ):
+        self.interval = interval
+        self.threshold_ms = threshold_ms
+        self.enabled = enabled
+        self.stacks = stacks
+        self.sample_every = max(1, sample_every)
+        self.reset()
+
+        self._deadline: Optional[float] = None
+        self._captured_deadline: Optional[float] = None
+        self._pending_stack: Optional[traceback.StackSummary] = None
+        self._loop_thread_id: Optional[int] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def reset(self):
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self.samples = 0
+        self.blocked = 0
+        self.stalls_seen = 0
+        self.buckets = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.lag_sum_ms = 0.0
+        self.call_sites: Dict[str, Dict[str, Any]] = {}
+        self.recent: Deque[Dict[str, Any]] = deque(maxlen=RECENT_EVENTS)
+
+    def configure(self, **options: Any) -> Dict[str, Any]:
+        """Змінює налаштування; невідомі ключі ігноруються"""
+        if "enabled" in options:
+            self.enabled = bool(options["enabled"])
+        if "stacks" in options:
+            self.stacks = bool(options["stacks"])
+        if options.get("threshold_ms"):
+            self.threshold_ms = float(options["threshold_ms"])
+        if options.get("sample_every"):
+            self.sample_every = max(1, int(options["sample_every"]))
+        return self.config()
+
+    def config(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "stacks": self.stacks,
+            "threshold_ms": self.threshold_ms,
+            "sample_every": self.sample_every,
+        }
+
+    def record(self, lag_ms: float, stack: Optional[traceback.StackSummary] = None):
+        self.samples += 1
+        self.last_lag_ms = lag_ms
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+        self.lag_sum_ms += lag_ms
+        self.buckets[next((i for i, bound in enumerate(LAG_BUCKETS_MS) if lag_ms <= bound), -1)] += 1
+        if lag_ms < self.threshold_ms:
+            return
+
+        self.blocked += 1
+        event = {"at": datetime.now(timezone.utc).isoformat(), "lag_ms": round(lag_ms, 1)}
+        if stack:
+            site = _call_site(stack)
+            event["call_site"] = site
+            self._add_call_site(site, lag_ms, stack)
+            logger.warning(f"Event loop blocked for {lag_ms:.0f} ms at {site}")
+        else:
+            logger.warning(f"Event loop blocked for {lag_ms:.0f} ms")
+        self.recent.append(event)
+
+    def _add_call_site(self, site: str, lag_ms: float, stack: traceback.StackSummary):
+        entry = self.call_sites.get(site)
+        if entry is None:
+            if len(self.call_sites) >= MAX_CALL_SITES:
+                return
+            entry = self.call_sites[site] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0}
+        entry["count"] += 1
+        entry["total_ms"] += lag_ms
+        entry["max_ms"] = max(entry["max_ms"], lag_ms)
+        entry["stack"] = "".join(stack.format())
+
+    def top_call_sites(self, limit: int = TOP_CALL_SITES) -> List[Dict[str, Any]]:
+        ranked = sorted(self.call_sites.items(), key=lambda item: item[1]["total_ms"], reverse=True)
+        return [
+            {
+                "call_site": site,
+                "count": entry["count"],
+                "total_ms": round(entry["total_ms"], 1),
+                "max_ms": round(entry["max_ms"], 1),
+                "stack": entry["stack"],
+            }
+            for site, entry in ranked[:limit]
+        ]
+
+    def _watch(self):
+        """Сторожовий потік: знімає стек loop, поки той заблокований"""
+        while not self._stop.wait(max(self.threshold_ms / 2000, 0.005)):
+            deadline = self._deadline
+            if not (self.enabled and self.stacks) or deadline is None or deadline == self._captured_deadline:
+                continue
+            if (time.perf_counter() - deadline) * 1000 < self.threshold_ms:
+                continue
+
+            self._captured_deadline = deadline
+            self.stalls_seen += 1
+            if self.stalls_seen % self.sample_every:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is not None:
+                self._pending_stack = traceback.extract_stack(frame, limit=STACK_DEPTH)
+
+    def _start_watchdog(self):
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def _refresh_config(self):
+        try:
+            raw = await cache.redis.get(LOOP_CONFIG_KEY)
+        except Exception as e:
+            logger.debug(f"Cannot read loop diagnostics config: {e}")
+            return
+        if raw:
+            self.configure(**json.loads(raw))
+
+    async def run(self, refresh_config: bool = True):
+        self._start_watchdog()
+        next_refresh = 0.0
+        try:
+            while True:
+                if refresh_config and time.monotonic() >= next_refresh:
+                    await self._refresh_config()
+                    next_refresh = time.monotonic() + LOOP_CONFIG_REFRESH_SECONDS
+
+                if not self.enabled:
+                    self._deadline = None
+                    await asyncio.sleep(LOOP_CONFIG_REFRESH_SECONDS if refresh_config else self.interval)
+                    continue
+
+                self._deadline = time.perf_counter() + self.interval
+                await asyncio.sleep(self.interval)
+                lag_ms = max(0.0, (time.perf_counter() - self._deadline) * 1000)
+                stack, self._pending_stack = self._pending_stack, None
+                self.record(lag_ms, stack)
+        finally:
+            self._deadline = None
+            self._stop.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.config(),
+            "interval_ms": round(self.interval * 1000),
+            "samples": self.samples,
+            "last_lag_ms": round(self.last_lag_ms, 1),
+            "max_lag_ms": round(self.max_lag_ms, 1),
+            "blocked": self.blocked,
+            "histogram": self.histogram(),
+            "top_call_sites": self.top_call_sites(),
+            "recent": list(self.recent),
+        }
+
+    def histogram(self) -> Dict[str, int]:
+        """Кумулятивна гістограма: {"<=межа": кількість}"""
+        result = {}
+        total = 0
+        for bound, count in zip((*LAG_BUCKETS_MS, "+Inf"), self.buckets):
+            total += count
+            result[f"le_{bound}"] = total
+        return result
+
+
+loop_monitor = LoopLagMonitor(
+    settings.LOOP_LAG_INTERVAL_SECONDS,
+    settings.LOOP_LAG_THRESHOLD_MS,
+    enabled=settings.LOOP_DIAGNOSTICS_ENABLED,
+    sample_every=settings.LOOP_STACK_SAMPLE_EVERY
+)
+
+
+async def save_loop_config(**options: Any) -> Dict[str, Any]:
+    """Зберігає налаштування для всіх воркерів і застосовує їх у поточному"""
+    config = loop_monitor.configure(**options)
+    await cache.redis.set(LOOP_CONFIG_KEY, json.dumps(config))
+    return config
+
+
+async def run_loop_monitor(monitor: Optional[LoopLagMonitor] = None):
+    await (monitor or loop_monitor).run()
@@ -0,0 +1,171 @@
+"""
+Транспорти доставки email
+
+ResendClient — асинхронний клієнт Resend API поверх httpx (бібліотека resend
+синхронна і блокує event loop на час HTTP-запиту). SMTPConnectionPool тримає
+кілька відкритих SMTP-з'єднань і перевикористовує їх між листами замість
+підключення, TLS та логіну на кожне повідомлення, як це робить FastMail.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from email.message import EmailMessage
+from typing import Deque, Dict, List, Optional, Tuple
+
+import aiosmtplib
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Resend приймає до 100 листів в одному запиті /emails/batch
+RESEND_BATCH_LIMIT = 100
+
+
+class ResendClient:
+    """Неблокуючий клієнт Resend API зі спільним пулом з'єднань"""
+
+    def __init__(
+            self,
+            api_key: str,
+            api_base: str = "https://api.resend.com",
+            timeout: float = 30.0,
+            max_connections: int = 10,
+            transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self._client = httpx.AsyncClient(
+            base_url=api_base,
+            headers={"Authorization": f"Bearer {api_key}"},
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections
+            ),
+            transport=transport
+        )
+
+    async def send(self, params: Dict) -> str:
+        """Відправляє один лист, повертає ID від Resend"""
+        response = await self._client.post("/emails", json=params)
+        response.raise_for_status()
+        return response.json().get("id", "unknown")
+
+    async def send_batch(self, params_list: List[Dict]) -> List[str]:
+        """
+        Відправляє до RESEND_BATCH_LIMIT листів одним запитом
+
+        Returns:
+            ID листів у порядку params_list
+        """
+        if len(params_list) > RESEND_BATCH_LIMIT:
+            raise ValueError(f"Resend batch is limited to {RESEND_BATCH_LIMIT} emails")
+
+        response = await self._client.post("/emails/batch", json=params_list)
+        response.raise_for_status()
+        return [item.get("id", "unknown") for item in response.json().get("data", [])]
+
+    async def close(self):
+        await self._client.aclose()
+
+
+class SMTPConnectionPool:
+    """
+    Пул постійних SMTP-з'єднань
+
+    Не більше size з'єднань одночасно; вільні з'єднання чекають наступного
+    листа до idle_timeout. Якщо сервер закрив з'єднання, лист повторюється
+    один раз через нове підключення.
+    """
+
+    def __init__(
+            self,
+            hostname: str,
+            port: int,
+            username: Optional[str] = None,
+            password: Optional[str] = None,
+            use_tls: bool = False,
+            start_tls: bool = True,
+            validate_certs: bool = True,
+            size: int = 4,
+            idle_timeout: float = 120.0,
+            timeout: float = 30.0
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.start_tls = start_tls
+        self.validate_certs = validate_certs
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+
+        self._idle: Deque[Tuple[aiosmtplib.SMTP, float]] = deque()
+        self._slots = asyncio.Semaphore(size)
+        # Лічильник підключень — для логів і тестів
+        self.connections_opened = 0
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        client = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            use_tls=self.use_tls,
+            start_tls=self.start_tls and not self.use_tls,
+            validate_certs=self.validate_certs,
+            timeout=self.timeout
+        )
+        await client.connect()
+        if self.username:
+            await client.login(self.username, self.password or "")
+        self.connections_opened += 1
+        return client
+
+    def _take_idle(self) -> Optional[aiosmtplib.SMTP]:
+        now = time.monotonic()
+        while self._idle:
+            client, released_at = self._idle.pop()
+            if client.is_connected and now - released_at < self.idle_timeout:
+                return client
+            client.close()
+        return None
+
+    async def send(self, message: EmailMessage) -> None:
+        """
+        Відправляє лист через вільне з'єднання пулу
+
+        Raises:
+            aiosmtplib.SMTPException: Якщо сервер відхилив лист
+        """
+        async with self._slots:
+            client = self._take_idle()
+            reused = client is not None
+            if client is None:
+                client = await self._connect()
+
+            try:
+                await client.send_message(message)
+            except aiosmtplib.SMTPServerDisconnected:
+                client.close()
+                if not reused:
+                    raise
+                # Сервер закрив з'єднання під час простою — одна повторна спроба
+                client = await self._connect()
+                try:
+                    await client.send_message(message)
+                except Exception:
+                    client.close()
+                    raise
+            except Exception:
+                client.close()
+                raise
+
+            self._idle.append((client, time.monotonic()))
+
+    async def close(self):
+        while self._idle:
+            client, _ = self._idle.pop()
+            try:
+                await client.quit()
+            except Exception:
+                client.close()
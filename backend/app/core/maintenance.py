@@ -0,0 +1,290 @@
+"""
+Службове прибирання даних
+
+Кожна задача видаляє записи множинним DELETE ... RETURNING обмеженими
+пачками: кандидати вибираються підзапитом з LIMIT і FOR UPDATE SKIP LOCKED,
+кожна пачка — окрема коротка транзакція. ORM-об'єкти не завантажуються, тож
+хвиля спам-реєстрацій не роздуває пам'ять воркера. Кожен прохід повертає
+метрики (deleted, batches, duration_ms), які планувальник пише в історію.
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import delete, exists, func, select, union
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.images import VARIANTS_DIR, variant_source_name
+from app.creators.models import CreatorApplication
+from app.orders.models import Order
+from app.products.models import Product
+from app.subscriptions.models import Subscription, SubscriptionStatus, UserProductAccess
+from app.users.models import User
+from app.wallet.models import Transaction
+
+logger = logging.getLogger(__name__)
+
+# Скільки рядків (файлів, ключів) видаляється за одну пачку
+MAINTENANCE_BATCH_SIZE = 500
+
+# Верхня межа пачок за один прохід, щоб задача не займала лідера надовго
+MAINTENANCE_MAX_BATCHES = 100
+
+# Через скільки непідтверджений email-акаунт видаляється
+UNVERIFIED_ACCOUNT_TTL = timedelta(hours=1)
+
+# Через скільки PENDING підписка вважається завислою
+STALE_PENDING_SUBSCRIPTION_TTL = timedelta(hours=24)
+
+# Файл без посилань не видаляється, поки він молодший за цей час:
+# товар може ще не бути збережений після завантаження
+ORPHAN_UPLOAD_GRACE = timedelta(hours=24)
+
+UPLOAD_SUBDIRS = ("images", "archives")
+
+DOWNLOAD_TOKEN_PATTERNS = ("download_token:*", "download_bundle:*")
+
+
+class MaintenanceService:
+    def __init__(self, db: AsyncSession, batch_size: int = MAINTENANCE_BATCH_SIZE):
+        self.db = db
+        self.batch_size = batch_size
+
+    async def _delete_in_batches(self, name: str, build_statement: Callable[[int], Any]) -> Dict[str, Any]:
+        """
+        Виконує DELETE ... RETURNING пачками, доки пачка не вийде неповною
+
+        Args:
+            name: Назва для логів
+            build_statement: Будує DELETE для пачки заданого розміру
+        """
+        started = time.perf_counter()
+        deleted = 0
+        batches = 0
+
+        while batches < MAINTENANCE_MAX_BATCHES:
+            result = await self.db.execute(
+                build_statement(self.batch_size),
+                execution_options={"synchronize_session": False}
+            )
+            rows = result.all()
+            await self.db.commit()
+
+            if not rows:
+                break
+            batches += 1
+            deleted += len(rows)
+            logger.info(f"Maintenance {name}: deleted {len(rows)} rows (ids {rows[0][0]}..{rows[-1][0]})")
+
+            if len(rows) < self.batch_size:
+                break
+
+        return {
+            "deleted": deleted,
+            "batches": batches,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+
+    async def purge_unverified_accounts(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Видаляє email-акаунти, не підтверджені протягом UNVERIFIED_ACCOUNT_TTL
+
+        Видаляються лише акаунти без telegram_id, з незавершеною верифікацією
+        і без залежних записів (замовлення, підписки, транзакції, реферали,
+        доступи до товарів, заявки креатора, власні товари): інакше FK зірве
+        всю пачку.
+        Пошук іде по індексу (is_email_verified, created_at).
+        """
+        cutoff = (now or datetime.now(timezone.utc)) - UNVERIFIED_ACCOUNT_TTL
+        candidate = aliased(User)
+        referred = aliased(User)
+
+        def build(limit: int):
+            candidates = (
+                select(candidate.id)
+                .where(
+                    candidate.is_email_verified.is_(False),
+                    candidate.created_at < cutoff,
+                    candidate.email.isnot(None),
+                    candidate.verification_token.isnot(None),
+                    candidate.telegram_id.is_(None),
+                    ~exists().where(Order.user_id == candidate.id),
+                    ~exists().where(Subscription.user_id == candidate.id),
+                    ~exists().where(Transaction.user_id == candidate.id),
+                    ~exists().where(referred.referrer_id == candidate.id),
+                    ~exists().where(UserProductAccess.user_id == candidate.id),
+                    ~exists().where(CreatorApplication.user_id == candidate.id),
+                    ~exists().where(Product.author_id == candidate.id),
+                )
+                .order_by(candidate.created_at)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+            return (
+                delete(User)
+                .where(User.id.in_(candidates.scalar_subquery()))
+                # Підтверджені акаунти не видаляються навіть при гонці з верифікацією
+                .where(User.is_email_verified.is_(False))
+                .returning(User.id)
+            )
+
+        return await self._delete_in_batches("unverified_accounts", build)
+
+    async def purge_stale_pending_subscriptions(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Видаляє PENDING підписки, що так і не були оплачені"""
+        cutoff = (now or datetime.now(timezone.utc)) - STALE_PENDING_SUBSCRIPTION_TTL
+        candidate = aliased(Subscription)
+
+        def build(limit: int):
+            candidates = (
+                select(candidate.id)
+                .where(
+                    candidate.status == SubscriptionStatus.PENDING,
+                    candidate.created_at < cutoff,
+                    ~exists().where(Transaction.subscription_id == candidate.id),
+                )
+                .order_by(candidate.id)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+            return (
+                delete(Subscription)
+                .where(Subscription.id.in_(candidates.scalar_subquery()))
+                .where(Subscription.status == SubscriptionStatus.PENDING)
+                .returning(Subscription.id)
+            )
+
+        return await self._delete_in_batches("stale_pending_subscriptions", build)
+
+    async def _referenced_uploads(self) -> Set[str]:
+        """Шляхи /uploads/..., на які посилаються товари та профілі"""
+        gallery = select(func.unnest(Product.gallery_image_urls).label("path"))
+        stmt = union(
+            select(Product.main_image_url.label("path")),
+            select(Product.zip_file_path.label("path")),
+            gallery,
+            select(User.photo_url.label("path")).where(User.photo_url.like("/uploads/%")),
+        )
+        result = await self.db.execute(stmt)
+        return {path for path in result.scalars() if path}
+
+    async def purge_orphan_uploads(
+        self,
+        upload_dir: Optional[Path] = None,
+        now: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """
+        Видаляє файли завантажень, на які не посилається жоден запис
+
+        За прохід видаляється не більше batch_size * MAINTENANCE_MAX_BATCHES
+        файлів; решта дочекається наступного запуску.
+        """
+        started = time.perf_counter()
+        root = Path(upload_dir or settings.UPLOAD_PATH)
+        cutoff = ((now or datetime.now(timezone.utc)) - ORPHAN_UPLOAD_GRACE).timestamp()
+        limit = self.batch_size * MAINTENANCE_MAX_BATCHES
+
+        referenced = await self._referenced_uploads()
+        orphans = await asyncio.to_thread(_find_orphan_uploads, root, referenced, cutoff, limit)
+        freed_bytes = await asyncio.to_thread(_remove_files, orphans)
+
+        if orphans:
+            logger.info(f"Maintenance orphan_uploads: deleted {len(orphans)} files, {freed_bytes} bytes")
+        return {
+            "deleted": len(orphans),
+            "freed_bytes": freed_bytes,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+
+
+def _find_orphan_uploads(root: Path, referenced: Set[str], cutoff: float, limit: int) -> List[Path]:
+    orphans = []
+
+    def scan(directory: Path, is_referenced: Callable[[str], bool]) -> bool:
+        """Додає застарілі файли без посилань; True — ліміт вичерпано"""
+        if not directory.is_dir():
+            return False
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                if is_referenced(entry.name):
+                    continue
+                if entry.stat(follow_symlinks=False).st_mtime >= cutoff:
+                    continue
+                orphans.append(Path(entry.path))
+                if len(orphans) >= limit:
+                    return True
+        return False
+
+    for subdir in UPLOAD_SUBDIRS:
+        if scan(root / subdir, lambda name: f"/uploads/{subdir}/{name}" in referenced):
+            return orphans
+
+    # Похідні зображень живуть, поки є їх оригінал (старі варіанти названі за stem)
+    prefix = "/uploads/images/"
+    sources = {path.removeprefix(prefix) for path in referenced if path.startswith(prefix)}
+    sources |= {Path(name).stem for name in sources}
+    scan(root / "images" / VARIANTS_DIR, lambda name: variant_source_name(name) in sources)
+    return orphans
+
+
+def _remove_files(paths: Iterable[Path]) -> int:
+    freed = 0
+    for path in paths:
+        try:
+            size = path.stat().st_size
+            path.unlink()
+            freed += size
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            logger.error(f"Failed to delete orphan upload {path}: {e}")
+    return freed
+
+
+async def sweep_download_tokens(batch_size: int = MAINTENANCE_BATCH_SIZE) -> Dict[str, Any]:
+    """
+    Видаляє токени завантаження без TTL
+
+    Токени живуть у Redis з TTL і зникають самі; ключ без TTL може лишитися
+    лише після збою між SET та EXPIRE, тому SCAN проходить пачками і
+    видаляє тільки такі ключі.
+    """
+    started = time.perf_counter()
+    deleted = 0
+    scanned = 0
+    batch: List[str] = []
+
+    async def flush():
+        nonlocal deleted
+        async with cache.redis.pipeline(transaction=False) as pipe:
+            for key in batch:
+                pipe.ttl(key)
+            ttls = await pipe.execute()
+        stale = [key for key, ttl in zip(batch, ttls) if ttl == -1]
+        if stale:
+            deleted += await cache.redis.delete(*stale)
+        batch.clear()
+
+    for pattern in DOWNLOAD_TOKEN_PATTERNS:
+        async for key in cache.redis.scan_iter(match=pattern, count=batch_size):
+            scanned += 1
+            batch.append(key)
+            if len(batch) >= batch_size:
+                await flush()
+    if batch:
+        await flush()
+
+    return {
+        "deleted": deleted,
+        "scanned": scanned,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
@@ -0,0 +1,59 @@
+"""
+Метрики воркера у текстовому форматі Prometheus
+
+Віддаються на /metrics, якщо задано METRICS_TOKEN (Authorization: Bearer).
+Кожен воркер звітує про себе: мітка worker відрізняє процеси.
+"""
+from typing import Iterable, List
+
+from app.core.executors import EXECUTORS
+from app.core.loop_monitor import LAG_BUCKETS_MS, LoopLagMonitor, loop_monitor
+
+EXECUTOR_COUNTERS = ("submitted", "completed", "failed", "rejected")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _loop_lines(monitor: LoopLagMonitor, worker: str) -> List[str]:
+    labels = f'worker="{_escape(worker)}"'
+    lines = [
+        "# HELP event_loop_lag_seconds Event loop heartbeat lag",
+        "# TYPE event_loop_lag_seconds histogram",
+    ]
+    cumulative = 0
+    for bound, count in zip((*LAG_BUCKETS_MS, None), monitor.buckets):
+        cumulative += count
+        le = "+Inf" if bound is None else f"{bound / 1000:g}"
+        lines.append(f'event_loop_lag_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+    lines += [
+        f"event_loop_lag_seconds_sum{{{labels}}} {monitor.lag_sum_ms / 1000:.6f}",
+        f"event_loop_lag_seconds_count{{{labels}}} {monitor.samples}",
+        "# HELP event_loop_blocked_total Heartbeats late by more than the threshold",
+        "# TYPE event_loop_blocked_total counter",
+        f"event_loop_blocked_total{{{labels}}} {monitor.blocked}",
+        "# HELP event_loop_blocking_seconds_total Blocking time by call site (sampled)",
+        "# TYPE event_loop_blocking_seconds_total counter",
+    ]
+    for site in monitor.top_call_sites():
+        lines.append(
+            f'event_loop_blocking_seconds_total{{{labels},call_site="{_escape(site["call_site"])}"}} '
+            f'{site["total_ms"] / 1000:.6f}'
+        )
+    return lines
+
+
+def _executor_lines(worker: str) -> Iterable[str]:
+    for counter in EXECUTOR_COUNTERS:
+        yield f"# TYPE executor_tasks_{counter}_total counter"
+        for executor in EXECUTORS:
+            yield f'executor_tasks_{counter}_total{{worker="{_escape(worker)}",executor="{executor.name}"}} {getattr(executor, counter)}'
+    yield "# TYPE executor_tasks_in_flight gauge"
+    for executor in EXECUTORS:
+        yield f'executor_tasks_in_flight{{worker="{_escape(worker)}",executor="{executor.name}"}} {executor.in_flight}'
+
+
+def render_metrics(worker: str) -> str:
+    lines = [*_loop_lines(loop_monitor, worker), *_executor_lines(worker)]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,96 @@
+"""
+Черга Telegram-сповіщень
+
+Фонові задачі (автопродовження, масові розсилки) не чекають на Telegram API:
+повідомлення записуються в Redis-список, а воркер у кожному процесі
+відправляє їх з обмеженою паралельністю. Невдала відправка повторюється до
+NOTIFICATION_MAX_ATTEMPTS разів.
+"""
+import asyncio
+import json
+import logging
+from typing import Iterable, Optional, Tuple
+
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.telegram_service import telegram_service
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_QUEUE_KEY = "notifications:telegram"
+NOTIFICATION_MAX_ATTEMPTS = 3
+
+# Скільки чекати нових повідомлень в одному BLPOP, секунди
+NOTIFICATION_POLL_TIMEOUT = 5
+
+
+async def enqueue_telegram_messages(messages: Iterable[Tuple[Optional[int], str]]) -> int:
+    """
+    Додає повідомлення в чергу одним запитом до Redis
+
+    Args:
+        messages: Пари (telegram_id, текст); без telegram_id пропускаються
+
+    Returns:
+        Кількість доданих повідомлень
+    """
+    payloads = [
+        json.dumps({"chat_id": chat_id, "text": text, "attempts": 0}, ensure_ascii=False)
+        for chat_id, text in messages
+        if chat_id
+    ]
+    if payloads:
+        await cache.redis.rpush(NOTIFICATION_QUEUE_KEY, *payloads)
+    return len(payloads)
+
+
+async def _deliver(raw: str, slots: asyncio.Semaphore):
+    async with slots:
+        try:
+            item = json.loads(raw)
+            sent = await telegram_service.send_message(item["chat_id"], item["text"])
+            if sent:
+                return
+
+            item["attempts"] += 1
+            if item["attempts"] < NOTIFICATION_MAX_ATTEMPTS:
+                await cache.redis.rpush(NOTIFICATION_QUEUE_KEY, json.dumps(item, ensure_ascii=False))
+            else:
+                logger.error(
+                    f"Telegram notification to {item['chat_id']} dropped after {item['attempts']} attempts"
+                )
+        except Exception as e:
+            logger.error(f"Failed to deliver queued notification: {e}")
+
+
+async def run_notification_worker():
+    """Фоновий воркер: забирає повідомлення з черги та відправляє їх"""
+    slots = asyncio.Semaphore(settings.NOTIFICATION_WORKER_CONCURRENCY)
+    pending = set()
+
+    logger.info("Telegram notification worker started")
+
+    try:
+        while True:
+            try:
+                popped = await cache.redis.blpop(NOTIFICATION_QUEUE_KEY, timeout=NOTIFICATION_POLL_TIMEOUT)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Notification worker error: {e}")
+                await asyncio.sleep(NOTIFICATION_POLL_TIMEOUT)
+                continue
+
+            if popped is None:
+                continue
+
+            # Не забираємо з черги більше, ніж можемо відправляти одночасно
+            await slots.acquire()
+            slots.release()
+
+            task = asyncio.create_task(_deliver(popped[1], slots))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+    finally:
+        for task in pending:
+            task.cancel()
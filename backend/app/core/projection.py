@@ -0,0 +1,59 @@
+"""
+Розріджені набори полів (?fields=id,title,price)
+
+Клієнт обирає поля відповіді; id повертається завжди. Для проекції
+створюється (і кешується) похідна Pydantic-модель з тими самими типами, тож
+серіалізація полів не відрізняється від повної відповіді. projection_key
+дає стабільний суфікс для ключів кешу.
+"""
+from functools import lru_cache
+from typing import FrozenSet, Optional, Type
+
+from pydantic import BaseModel, create_model
+
+ALWAYS_INCLUDED = frozenset({"id"})
+
+
+class UnknownFieldsError(ValueError):
+    """fields містить поля, яких немає в моделі"""
+
+    def __init__(self, fields: FrozenSet[str]):
+        self.fields = fields
+        super().__init__(f"Unknown fields: {', '.join(sorted(fields))}")
+
+
+def parse_fields(raw: Optional[str], model: Type[BaseModel]) -> Optional[FrozenSet[str]]:
+    """
+    Розбирає параметр fields
+
+    Returns:
+        Набір полів або None, якщо потрібні всі поля моделі
+
+    Raises:
+        UnknownFieldsError: Невідоме поле
+    """
+    if not raw:
+        return None
+    fields = {name.strip() for name in raw.split(",") if name.strip()}
+    unknown = fields - set(model.model_fields)
+    if unknown:
+        raise UnknownFieldsError(frozenset(unknown))
+    fields |= ALWAYS_INCLUDED & set(model.model_fields)
+    if fields >= set(model.model_fields):
+        return None
+    return frozenset(fields)
+
+
+@lru_cache(maxsize=256)
+def projection_model(model: Type[BaseModel], fields: Optional[FrozenSet[str]]) -> Type[BaseModel]:
+    """Модель лише з полями проекції (порядок полів — як у model)"""
+    if fields is None:
+        return model
+    return create_model(
+        f"{model.__name__}Projection",
+        **{name: (info.annotation, info) for name, info in model.model_fields.items() if name in fields}
+    )
+
+
+def projection_key(fields: Optional[FrozenSet[str]]) -> str:
+    return "all" if fields is None else ",".join(sorted(fields))
@@ -0,0 +1,133 @@
+"""
+Кеш готових тіл JSON-відповідей
+
+У Redis зберігається фінальне тіло відповіді: JSON, серіалізований orjson
+один раз при промаху, і стиснутий gzip, якщо він більший за
+GZIP_MIN_SIZE. Запис: заголовок (формат RAW / GZIP, 16 байт BLAKE2b від
+JSON для ETag, час зміни для Last-Modified) і тіло. При влучанні
+байти віддаються як є через Response: без json.loads, без повторної
+валідації response_model і без повторної серіалізації. Клієнтам з
+Accept-Encoding: gzip стиснуте тіло віддається без розпакування.
+"""
+import gzip
+import hashlib
+import struct
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Optional, Type
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+from app.core.cache import cache
+
+RAW = b"\x00"
+GZIP = b"\x01"
+
+# Формат, дайджест тіла, час зміни (секунди epoch, 0 — невідомо)
+_HEADER = struct.Struct(">c16sQ")
+
+# Менші тіла не стискаються: виграш не покриває заголовки і CPU
+GZIP_MIN_SIZE = 1024
+GZIP_LEVEL = 5
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+def encode_body(
+    content: Any,
+    model: Optional[Type[BaseModel]] = None,
+    last_modified: Optional[datetime] = None
+) -> bytes:
+    """
+    Серіалізує відповідь у запис кешу
+
+    Args:
+        content: Дані відповіді
+        model: response_model маршруту — зайві поля відкидаються так само,
+            як це зробив би FastAPI
+        last_modified: Час зміни сутності для Last-Modified
+    """
+    if model is not None:
+        content = model.model_validate(content).model_dump(mode="json")
+    return encode_json(orjson.dumps(content), last_modified)
+
+
+def encode_json(body: bytes, last_modified: Optional[datetime] = None) -> bytes:
+    """Запис кешу з уже серіалізованого JSON (наприклад, зібраного з карток)"""
+    digest = hashlib.blake2b(body, digest_size=16).digest()
+    modified = int(last_modified.timestamp()) if last_modified else 0
+    if len(body) < GZIP_MIN_SIZE:
+        return _HEADER.pack(RAW, digest, modified) + body
+    return _HEADER.pack(GZIP, digest, modified) + gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _payload(blob: bytes) -> bytes:
+    return blob[_HEADER.size:]
+
+
+def decode_body(blob: bytes) -> bytes:
+    """JSON-тіло запису кешу"""
+    if blob[:1] == GZIP:
+        return gzip.decompress(_payload(blob))
+    return _payload(blob)
+
+
+def body_etag(blob: bytes) -> str:
+    """
+    ETag запису: дайджест JSON-тіла
+
+    Слабкий (W/), бо те саме тіло віддається і стиснутим, і ні.
+    """
+    return f'W/"{_HEADER.unpack_from(blob)[1].hex()}"'
+
+
+def body_last_modified(blob: bytes) -> Optional[datetime]:
+    modified = _HEADER.unpack_from(blob)[2]
+    return datetime.fromtimestamp(modified, timezone.utc) if modified else None
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    return "gzip" in (accept_encoding or "").lower()
+
+
+def body_response(blob: bytes, accept_encoding: Optional[str] = None, status_code: int = 200) -> Response:
+    """Response з запису кешу без повторної серіалізації"""
+    headers = {"Vary": "Accept-Encoding"}
+    if blob[:1] == GZIP and accepts_gzip(accept_encoding):
+        headers["Content-Encoding"] = "gzip"
+        body = _payload(blob)
+    else:
+        body = decode_body(blob)
+    return Response(content=body, status_code=status_code, media_type=JSON_MEDIA_TYPE, headers=headers)
+
+
+async def get_cached_body(key: str) -> Optional[bytes]:
+    return await cache.raw.get(key)
+
+
+async def set_cached_body(key: str, blob: bytes, ttl: int = 300):
+    await cache.raw.set(key, blob, ex=ttl)
+
+
+async def cached_body(
+    key: str,
+    build: Callable[[], Awaitable[Any]],
+    ttl: int = 300,
+    model: Optional[Type[BaseModel]] = None
+) -> Optional[bytes]:
+    """
+    Запис кешу за ключем; при промаху будує його з build()
+
+    Returns:
+        Запис або None, якщо build() повернув None
+    """
+    blob = await get_cached_body(key)
+    if blob:
+        return blob
+    content = await build()
+    if content is None:
+        return None
+    blob = encode_body(content, model)
+    await set_cached_body(key, blob, ttl)
+    return blob
@@ -1,9 +1,17 @@
 """
 HTML Sanitization utilities для захисту від XSS атак
+
+bleach працює синхронно і на довгих описах займає десятки мілісекунд, тому
+з async-коду викликаються sanitize_html_async / sanitize_text_async: короткий
+текст очищається на місці, довгий — у security_executor.
 """
-import bleach
 from typing import Optional
 
+from app.core.executors import security_executor
+from app.core.lazy import lazy_import
+
+bleach = lazy_import("bleach")
+
 # Дозволені HTML теги для опису товарів
 ALLOWED_TAGS = [
     'p', 'br', 'strong', 'em', 'u', 'ul', 'ol', 'li',
@@ -20,6 +28,9 @@ ALLOWED_ATTRIBUTES = {
 # Дозволені протоколи для посилань
 ALLOWED_PROTOCOLS = ['http', 'https', 'mailto']
 
+# Текст до цієї довжини дешевше очистити на місці, ніж передавати в пул
+SANITIZE_INLINE_LENGTH = 2000
+
 
 def sanitize_html(text: Optional[str], strip: bool = False) -> str:
     """
@@ -75,3 +86,14 @@ def sanitize_text(text: Optional[str]) -> str:
         Текст без HTML
     """
     return sanitize_html(text, strip=True)
+
+
+async def sanitize_html_async(text: Optional[str], strip: bool = False) -> str:
+    """sanitize_html, що не блокує event loop на довгих текстах"""
+    if not text or len(text) <= SANITIZE_INLINE_LENGTH:
+        return sanitize_html(text, strip)
+    return await security_executor.run(sanitize_html, text, strip)
+
+
+async def sanitize_text_async(text: Optional[str]) -> str:
+    return await sanitize_html_async(text, strip=True)
@@ -1,18 +1,65 @@
+"""
+Планувальник фонових задач
+
+Планувальник запускається в кожному воркері uvicorn, але задачі виконує лише
+лідер — воркер, що тримає Redis-блокування scheduler:leader. Лідер продовжує
+блокування на кожному такті; якщо він зупинився, через SCHEDULER_LEADER_TTL
+лідерство переходить до іншого воркера. Час наступного запуску кожної задачі
+зберігається в Redis, тому новий лідер продовжує той самий розклад.
+
+Розклад задається cron-виразом (хвилина година день місяць день_тижня, UTC),
+до часу запуску додається випадковий jitter. Кожен запуск (за розкладом, з
+адмінки або з CLI) виконується під блокуванням задачі й записується в історію.
+
+Запуск однієї задачі вручну:
+    python -m app.core.scheduler list
+    python -m app.core.scheduler run subscriptions_auto_renew
+"""
+import argparse
 import asyncio
+import json
 import logging
+import os
+import random
+import socket
+import time
+import uuid
 from datetime import datetime, timedelta, timezone
-from sqlalchemy import select, and_
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, Optional
 
+from app.core.cache import cache
+from app.core.config import settings
 from app.core.database import AsyncSessionLocal
-from app.subscriptions.service import SubscriptionService
+from app.core.maintenance import MaintenanceService, sweep_download_tokens
 from app.core.telegram_service import telegram_service
-from app.core.config import settings
-from app.users.models import User
+from app.products.archive_index import backfill_archive_index
+from app.subscriptions.service import SubscriptionService
+from app.wallet.ledger import LedgerService
 
 logger = logging.getLogger(__name__)
 
 ADMIN_TELEGRAM_IDS = getattr(settings, 'ADMIN_TELEGRAM_IDS', [])
 
+# Скільки записів історії зберігати для кожної задачі
+JOB_HISTORY_SIZE = 50
+
+# Після стількох невдач поспіль адміністратори отримують сповіщення
+JOB_FAILURE_ALERT_THRESHOLD = 3
+
+# Compare-and-set для блокувань: змінювати лише власне блокування
+_RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
 
 async def notify_admins(message: str):
     for admin_id in ADMIN_TELEGRAM_IDS:
@@ -22,225 +69,478 @@ async def notify_admins(message: str):
             logger.error(f"Failed to notify admin {admin_id}: {e}")
 
 
-async def cleanup_unverified_accounts():
+# ============ Cron ============
+
+class CronSchedule:
     """
-    Видаляє акаунти, які не підтвердили email протягом 1 години.
-
-    Умови для видалення:
-    - email не None (тобто це email-реєстрація)
-    - is_email_verified = False
-    - має verification_token (процес верифікації не завершений)
-    - created_at старіший за 1 годину
-    - немає telegram_id (не Telegram користувач)
+    Cron-вираз з п'яти полів: хвилина, година, день місяця, місяць, день тижня
+
+    Підтримуються *, числа, діапазони a-b, списки a,b та крок */n або a-b/n.
+    День тижня: 0 — неділя ... 6 — субота (7 теж неділя).
     """
-    try:
-        async with AsyncSessionLocal() as db:
-            cutoff_time = datetime.now(timezone.utc) - timedelta(hours=1)
-
-            # Знаходимо неактивовані акаунти
-            stmt = select(User).where(
-                and_(
-                    User.email.isnot(None),  # Має email
-                    User.is_email_verified.is_(False),  # Не підтверджений
-                    User.verification_token.isnot(None),  # Токен верифікації
-                    User.created_at < cutoff_time,  # Старіший за 1 годину
-                    User.telegram_id.is_(None)  # Не Telegram користувач
-                )
-            )
 
-            result = await db.execute(stmt)
-            unverified_users = result.scalars().all()
-
-            if unverified_users:
-                deleted_count = 0
-                for user in unverified_users:
-                    # Подвійна перевірка - НЕ видаляти підтверджені акаунти
-                    if user.is_email_verified:
-                        logger.warning(
-                            f"⚠️ Skipping verified account: {user.email} "
-                            f"(should not be in cleanup list!)"
-                        )
-                        continue
-
-                    logger.info(
-                        f"Deleting unverified account: {user.email} "
-                        f"(created at {user.created_at}, "
-                        f"verified: {user.is_email_verified})"
-                    )
-                    await db.delete(user)
-                    deleted_count += 1
-
-                await db.commit()
-                logger.info(
-                    f"✅ Cleanup: Deleted {deleted_count} "
-                    f"unverified email accounts"
-                )
-                return deleted_count
+    _FIELDS = (("minute", 0, 59), ("hour", 0, 23), ("day", 1, 31), ("month", 1, 12), ("weekday", 0, 7))
+
+    def __init__(self, expression: str):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression must have 5 fields: '{expression}'")
+
+        self.expression = expression
+        values = [self._parse_field(part, low, high) for part, (_, low, high) in zip(parts, self._FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = values
+        self.weekdays = frozenset(day % 7 for day in weekdays)
+        # Як у cron: якщо обмежені і день місяця, і день тижня — підходить будь-який
+        self._days_restricted = parts[2] != "*"
+        self._weekdays_restricted = parts[4] != "*"
+
+    @staticmethod
+    def _parse_field(field: str, low: int, high: int) -> FrozenSet[int]:
+        values = set()
+        for item in field.split(","):
+            step = 1
+            if "/" in item:
+                item, step_str = item.split("/", 1)
+                step = int(step_str)
+                if step < 1:
+                    raise ValueError(f"Invalid cron step: '{field}'")
+            if item == "*":
+                start, end = low, high
+            elif "-" in item:
+                start, end = (int(x) for x in item.split("-", 1))
             else:
-                logger.debug("Cleanup: No unverified accounts to delete")
-                return 0
-
-    except Exception as e:
-        logger.error(
-            f"Error during unverified accounts cleanup: {e}",
-            exc_info=True
-        )
-        return 0
-
-
-async def run_subscription_expiration_check():
-    await asyncio.sleep(60)
-
-    logger.info("Subscription scheduler started")
+                start = int(item)
+                end = high if step > 1 else start
+            if not (low <= start <= end <= high):
+                raise ValueError(f"Cron field '{field}' is out of range {low}-{high}")
+            values.update(range(start, end + 1, step))
+        return frozenset(values)
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.isoweekday() % 7) in self.weekdays
+        if self._days_restricted and self._weekdays_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, moment: datetime) -> datetime:
+        """Найближчий момент строго після moment (UTC, з точністю до хвилини)"""
+        candidate = moment.astimezone(timezone.utc).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 4)
+
+        while candidate < limit:
+            if candidate.month not in self.months:
+                month = candidate.month % 12 + 1
+                year = candidate.year + (1 if month == 1 else 0)
+                candidate = candidate.replace(year=year, month=month, day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+                continue
+            if candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+                continue
+            return candidate
+
+        raise ValueError(f"Cron expression never fires: '{self.expression}'")
+
+
+# ============ Locks ============
+
+class RedisLock:
+    """Блокування в Redis з токеном власника"""
+
+    def __init__(self, key: str, ttl_seconds: float):
+        self.key = key
+        self.ttl_ms = int(ttl_seconds * 1000)
+        self.token = uuid.uuid4().hex
+        self._renew = cache.redis.register_script(_RENEW_SCRIPT)
+        self._release = cache.redis.register_script(_RELEASE_SCRIPT)
+
+    async def acquire(self) -> bool:
+        return bool(await cache.redis.set(self.key, self.token, nx=True, px=self.ttl_ms))
+
+    async def renew(self) -> bool:
+        return bool(await self._renew(keys=[self.key], args=[self.token, self.ttl_ms]))
+
+    async def acquire_or_renew(self) -> bool:
+        return await self.renew() or await self.acquire()
+
+    async def release(self) -> bool:
+        return bool(await self._release(keys=[self.key], args=[self.token]))
+
+
+# ============ Jobs ============
+
+class ScheduledJob:
+    """Задача планувальника"""
+
+    def __init__(
+            self,
+            name: str,
+            cron: str,
+            func: Callable[[], Awaitable[Any]],
+            description: str = "",
+            jitter_seconds: int = 0,
+            timeout_seconds: int = 30 * 60
+    ):
+        self.name = name
+        self.schedule = CronSchedule(cron)
+        self.func = func
+        self.description = description
+        self.jitter_seconds = jitter_seconds
+        self.timeout_seconds = timeout_seconds
+
+    def next_run_after(self, moment: datetime) -> datetime:
+        jitter = random.uniform(0, self.jitter_seconds) if self.jitter_seconds else 0
+        return self.schedule.next_after(moment) + timedelta(seconds=jitter)
+
+
+class JobAlreadyRunning(Exception):
+    """Задача вже виконується в іншому воркері або процесі"""
+
+
+class Scheduler:
+    """Реєстр задач, виконання під блокуванням та історія запусків у Redis"""
+
+    def __init__(self, prefix: str = "scheduler"):
+        self.prefix = prefix
+        self.jobs: Dict[str, ScheduledJob] = {}
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._running: Dict[str, asyncio.Task] = {}
+
+    def add_job(self, job: ScheduledJob) -> ScheduledJob:
+        if job.name in self.jobs:
+            raise ValueError(f"Job '{job.name}' is already registered")
+        self.jobs[job.name] = job
+        return job
+
+    def get_job(self, name: str) -> ScheduledJob:
+        job = self.jobs.get(name)
+        if job is None:
+            raise ValueError(f"Unknown job: {name}")
+        return job
+
+    def _key(self, *parts: str) -> str:
+        return ":".join((self.prefix, *parts))
+
+    # ============ Execution ============
+
+    async def run_job(self, name: str, trigger: str = "manual") -> Dict[str, Any]:
+        """
+        Виконує задачу зараз і записує запуск в історію
+
+        Raises:
+            ValueError: Невідома задача
+            JobAlreadyRunning: Задача вже виконується
+        """
+        job = self.get_job(name)
+        lock = RedisLock(self._key("running", name), job.timeout_seconds + 60)
+        if not await lock.acquire():
+            raise JobAlreadyRunning(f"Job '{name}' is already running")
+
+        started_at = datetime.now(timezone.utc)
+        started = time.perf_counter()
+        run = {
+            "job": name,
+            "trigger": trigger,
+            "worker": self.worker_id,
+            "started_at": started_at.isoformat(),
+        }
+        try:
+            result = await asyncio.wait_for(job.func(), timeout=job.timeout_seconds)
+            run.update(status="success", result=result)
+        except asyncio.CancelledError:
+            run.update(status="cancelled")
+            raise
+        except Exception as e:
+            logger.error(f"Scheduler job {name} failed: {e}", exc_info=True)
+            run.update(status="failed", error=str(e)[:500])
+        finally:
+            run["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            run["finished_at"] = datetime.now(timezone.utc).isoformat()
+            await lock.release()
+            await self._record_run(run)
+
+        logger.info(f"Scheduler job {name}: {run['status']} in {run['duration_ms']} ms")
+        return run
+
+    async def _record_run(self, run: Dict[str, Any]):
+        name = run["job"]
+        metrics_key = self._key("metrics", name)
+        try:
+            async with cache.redis.pipeline(transaction=True) as pipe:
+                pipe.lpush(self._key("history", name), json.dumps(run, default=str))
+                pipe.ltrim(self._key("history", name), 0, JOB_HISTORY_SIZE - 1)
+                pipe.hincrby(metrics_key, "runs", 1)
+                pipe.hincrbyfloat(metrics_key, "total_duration_ms", run["duration_ms"])
+                pipe.hset(metrics_key, mapping={
+                    "last_status": run["status"],
+                    "last_run_at": run["started_at"],
+                    "last_duration_ms": run["duration_ms"],
+                })
+                if run["status"] == "success":
+                    pipe.hset(metrics_key, mapping={"last_success_at": run["finished_at"], "consecutive_failures": 0})
+                elif run["status"] == "failed":
+                    pipe.hincrby(metrics_key, "failures", 1)
+                    pipe.hincrby(metrics_key, "consecutive_failures", 1)
+                results = await pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to record scheduler run of {name}: {e}")
+            return
 
-    consecutive_errors = 0
-    max_consecutive_errors = 3
+        if run["status"] == "failed" and results[-1] == JOB_FAILURE_ALERT_THRESHOLD:
+            await notify_admins(
+                f"🚨 SCHEDULER ERROR\n\n"
+                f"Job {name} failed {JOB_FAILURE_ALERT_THRESHOLD} times consecutively.\n"
+                f"Last error: {run.get('error', '')[:200]}\n"
+                f"Time: {run['finished_at']}"
+            )
 
-    while True:
+    async def tick(self, now: Optional[datetime] = None) -> List[str]:
+        """
+        Запускає задачі, час яких настав (викликає лише лідер)
+
+        Задачі виконуються окремими asyncio-задачами, тож довга задача не
+        затримує інші. Returns: імена запущених задач.
+        """
+        now = now or datetime.now(timezone.utc)
+        next_runs_key = self._key("next_run")
+        stored = await cache.redis.hgetall(next_runs_key)
+
+        started = []
+        updates = {}
+        for name, job in self.jobs.items():
+            next_run = stored.get(name)
+            if next_run is None:
+                updates[name] = job.next_run_after(now).isoformat()
+                continue
+            if datetime.fromisoformat(next_run) > now:
+                continue
+
+            updates[name] = job.next_run_after(now).isoformat()
+            running = self._running.get(name)
+            if running is not None and not running.done():
+                logger.warning(f"Scheduler job {name} is still running, skipping this run")
+                continue
+            self._running[name] = asyncio.create_task(self._run_scheduled(name))
+            started.append(name)
+
+        if updates:
+            await cache.redis.hset(next_runs_key, mapping=updates)
+        return started
+
+    async def _run_scheduled(self, name: str):
         try:
-            start_time = datetime.now(timezone.utc)
+            await self.run_job(name, trigger="schedule")
+        except JobAlreadyRunning as e:
+            logger.warning(str(e))
+        except Exception as e:
+            logger.error(f"Scheduler job {name} crashed: {e}", exc_info=True)
+
+    async def cancel_running(self):
+        for task in self._running.values():
+            task.cancel()
+        self._running.clear()
+
+    # ============ Introspection ============
+
+    async def get_history(self, name: str, limit: int = 20) -> List[Dict[str, Any]]:
+        self.get_job(name)
+        items = await cache.redis.lrange(self._key("history", name), 0, limit - 1)
+        return [json.loads(item) for item in items]
+
+    async def get_jobs_status(self) -> List[Dict[str, Any]]:
+        next_runs = await cache.redis.hgetall(self._key("next_run"))
+        statuses = []
+        for name, job in self.jobs.items():
+            metrics = await cache.redis.hgetall(self._key("metrics", name))
+            runs = int(metrics.get("runs", 0))
+            statuses.append({
+                "name": name,
+                "description": job.description,
+                "cron": job.schedule.expression,
+                "jitter_seconds": job.jitter_seconds,
+                "next_run_at": next_runs.get(name),
+                "runs": runs,
+                "failures": int(metrics.get("failures", 0)),
+                "consecutive_failures": int(metrics.get("consecutive_failures", 0)),
+                "avg_duration_ms": round(float(metrics.get("total_duration_ms", 0)) / runs, 1) if runs else None,
+                "last_status": metrics.get("last_status"),
+                "last_run_at": metrics.get("last_run_at"),
+                "last_success_at": metrics.get("last_success_at"),
+                "last_duration_ms": float(metrics["last_duration_ms"]) if "last_duration_ms" in metrics else None,
+            })
+        return statuses
+
+    async def get_leader(self) -> Optional[str]:
+        return await cache.redis.get(self._key("leader", "worker"))
+
+
+scheduler = Scheduler()
+
+
+# ============ Job definitions ============
+
+async def maintenance_unverified_accounts():
+    async with AsyncSessionLocal() as db:
+        return await MaintenanceService(db).purge_unverified_accounts()
 
-            async with AsyncSessionLocal() as db:
-                service = SubscriptionService(db)
 
-                expired_count = await service.check_and_update_expired()
-                if expired_count > 0:
-                    logger.info(
-                        f"Scheduler: Marked {expired_count} "
-                        f"subscriptions as EXPIRED"
-                    )
+async def maintenance_stale_pending_subscriptions():
+    async with AsyncSessionLocal() as db:
+        return await MaintenanceService(db).purge_stale_pending_subscriptions()
 
-                cancelled_count = (
-                    await service.cancel_stale_pending_subscriptions()
-                )
-                if cancelled_count > 0:
-                    logger.info(
-                        f"Scheduler: Cancelled {cancelled_count} "
-                        f"stale PENDING subscriptions"
-                    )
 
-                renewal_result = await service.process_auto_renewals()
-                if (renewal_result["renewed"] > 0 or
-                        renewal_result["failed"] > 0):
-                    logger.info(
-                        f"Scheduler: Auto-renewals processed - "
-                        f"renewed: {renewal_result['renewed']}, "
-                        f"failed: {renewal_result['failed']}, "
-                        f"skipped: {renewal_result['skipped']}"
-                    )
+async def maintenance_orphan_uploads():
+    async with AsyncSessionLocal() as db:
+        return await MaintenanceService(db).purge_orphan_uploads()
 
-            # Очищення непідтверджених акаунтів
-            deleted_count = await cleanup_unverified_accounts()
-            if deleted_count > 0:
-                logger.info(
-                    f"Scheduler: Deleted {deleted_count} "
-                    f"unverified email accounts"
-                )
 
-            elapsed = (
-                (datetime.now(timezone.utc) - start_time).total_seconds()
-            )
-            logger.info(f"Scheduler cycle completed in {elapsed:.2f}s")
+async def maintain_wallet_ledger():
+    """Створює наступні партиції журналу та оновлює знімки балансів"""
+    async with AsyncSessionLocal() as db:
+        service = LedgerService(db)
+        await service.ensure_partitions()
+        result = await service.refresh_snapshots()
+        return result["users"]
 
-            consecutive_errors = 0
 
-        except Exception as e:
-            consecutive_errors += 1
-            logger.error(
-                f"Scheduler error (attempt {consecutive_errors}): {e}",
-                exc_info=True
-            )
+async def subscriptions_expire():
+    async with AsyncSessionLocal() as db:
+        return await SubscriptionService(db).check_and_update_expired()
 
-            if consecutive_errors >= max_consecutive_errors:
-                error_message = (
-                    f"🚨 SCHEDULER ERROR\n\n"
-                    f"Scheduler failed {consecutive_errors} times "
-                    f"consecutively.\n"
-                    f"Last error: {str(e)[:200]}\n"
-                    f"Time: {datetime.now(timezone.utc).isoformat()}"
-                )
-                await notify_admins(error_message)
-                consecutive_errors = 0
 
-        await asyncio.sleep(6 * 60 * 60)
+async def subscriptions_auto_renew():
+    async with AsyncSessionLocal() as db:
+        return await SubscriptionService(db).process_auto_renewals()
+
+
+for _job in (
+    ScheduledJob("subscriptions_expire", "*/15 * * * *", subscriptions_expire,
+                 description="Позначає прострочені підписки як EXPIRED", jitter_seconds=60),
+    ScheduledJob("subscriptions_auto_renew", "5 * * * *", subscriptions_auto_renew,
+                 description="Автопродовження підписок", jitter_seconds=120),
+    ScheduledJob("cleanup_unverified_accounts", "*/15 * * * *", maintenance_unverified_accounts,
+                 description="Видаляє непідтверджені email-акаунти", jitter_seconds=60),
+    ScheduledJob("cleanup_stale_pending_subscriptions", "*/30 * * * *", maintenance_stale_pending_subscriptions,
+                 description="Видаляє неоплачені PENDING підписки", jitter_seconds=60),
+    ScheduledJob("cleanup_download_tokens", "40 * * * *", sweep_download_tokens,
+                 description="Прибирає токени завантаження без TTL", jitter_seconds=120),
+    ScheduledJob("cleanup_orphan_uploads", "30 3 * * *", maintenance_orphan_uploads,
+                 description="Видаляє файли завантажень без посилань", jitter_seconds=300),
+    ScheduledJob("archive_index_backfill", "*/10 * * * *", backfill_archive_index,
+                 description="Індексує архіви товарів, завантажені до product_files", jitter_seconds=120),
+    ScheduledJob("wallet_ledger_maintenance", "20 * * * *", maintain_wallet_ledger,
+                 description="Партиції журналу транзакцій та знімки балансів", jitter_seconds=120),
+):
+    scheduler.add_job(_job)
+
+
+# ============ Runner ============
+
+async def run_scheduler(instance: Scheduler = scheduler):
+    """
+    Цикл планувальника у воркері
 
+    Кожен воркер пробує стати лідером; задачі запускає тільки лідер.
+    """
+    lock = RedisLock(instance._key("leader"), settings.SCHEDULER_LEADER_TTL_SECONDS)
+    is_leader = False
 
-async def run_daily_subscription_renewal():
-    logger.info("Daily subscription renewal scheduler started")
+    logger.info(f"Scheduler started in worker {instance.worker_id}")
 
-    while True:
-        try:
-            now = datetime.now(timezone.utc)
-            next_midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
-
-            if now >= next_midnight:
-                next_midnight += timedelta(days=1)
-
-            seconds_until_midnight = (next_midnight - now).total_seconds()
-
-            logger.info(f"Next renewal check at {next_midnight.isoformat()}")
-            await asyncio.sleep(seconds_until_midnight)
-
-            async with AsyncSessionLocal() as db:
-                service = SubscriptionService(db)
-
-                expired_count = await service.check_and_update_expired()
-                logger.info(
-                    f"Daily check: {expired_count} subscriptions expired"
-                )
-
-                result = await service.process_auto_renewals()
-                logger.info(
-                    f"Daily renewal: renewed={result['renewed']}, "
-                    f"failed={result['failed']}, "
-                    f"skipped={result['skipped']}"
-                )
-
-                if result['renewed'] > 0 or result['failed'] > 0:
-                    summary = (
-                        f"📊 Daily Subscription Report\n\n"
-                        f"✅ Renewed: {result['renewed']}\n"
-                        f"❌ Failed: {result['failed']}\n"
-                        f"⏭️ Skipped: {result['skipped']}\n"
-                        f"🗑️ Expired: {expired_count}\n"
-                        f"📅 {datetime.now(timezone.utc)}"
-                        f".strftime('%Y-%m-%d %H:%M UTC')"
+    try:
+        while True:
+            try:
+                was_leader = is_leader
+                is_leader = await lock.acquire_or_renew()
+                if is_leader and not was_leader:
+                    logger.info(f"Scheduler leadership acquired by {instance.worker_id}")
+                    await cache.redis.set(
+                        instance._key("leader", "worker"), instance.worker_id,
+                        px=lock.ttl_ms
                     )
-                    await notify_admins(summary)
-
-        except asyncio.CancelledError:
-            logger.info("Daily renewal scheduler stopped")
-            break
-        except Exception as e:
-            logger.error(
-                f"Daily renewal scheduler error: {e}",
-                exc_info=True
-            )
-            await notify_admins(
-                f"🚨 Daily renewal error: {str(e)[:200]}"
-            )
-            await asyncio.sleep(3600)
+                elif was_leader and not is_leader:
+                    logger.warning(f"Scheduler leadership lost by {instance.worker_id}")
+
+                if is_leader:
+                    await cache.redis.pexpire(instance._key("leader", "worker"), lock.ttl_ms)
+                    await instance.tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Scheduler loop error: {e}", exc_info=True)
+
+            await asyncio.sleep(settings.SCHEDULER_TICK_SECONDS)
+    finally:
+        await instance.cancel_running()
+        if is_leader:
+            try:
+                await lock.release()
+            except Exception:
+                pass
 
 
 async def trigger_subscription_check():
-    async with AsyncSessionLocal() as db:
-        service = SubscriptionService(db)
-
-        expired = await service.check_and_update_expired()
-        cancelled = await service.cancel_stale_pending_subscriptions()
-        renewals = await service.process_auto_renewals()
+    """Запускає підпискові задачі зараз (адмінський ручний запуск)"""
+    runs = {}
+    for name in ("subscriptions_expire", "cleanup_stale_pending_subscriptions", "subscriptions_auto_renew"):
+        runs[name] = await scheduler.run_job(name, trigger="admin")
 
-        return {
-            "expired": expired,
-            "cancelled_pending": cancelled,
-            "renewals": renewals,
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        }
+    return {
+        "expired": runs["subscriptions_expire"].get("result") or 0,
+        "cancelled_pending": (runs["cleanup_stale_pending_subscriptions"].get("result") or {}).get("deleted", 0),
+        "renewals": runs["subscriptions_auto_renew"].get("result") or {},
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
 
 
 async def get_scheduler_health():
     return {
         "status": "healthy",
+        "leader": await scheduler.get_leader(),
         "last_check": datetime.now(timezone.utc).isoformat(),
         "environment": settings.ENVIRONMENT
     }
+
+
+# ============ CLI ============
+
+async def _run_cli(args: argparse.Namespace):
+    if args.command == "list":
+        for status in await scheduler.get_jobs_status():
+            print(
+                f"{status['name']:<32} {status['cron']:<16} "
+                f"next={status['next_run_at'] or '-'} last={status['last_status'] or '-'}"
+            )
+    elif args.command == "history":
+        for run in await scheduler.get_history(args.job, args.limit):
+            print(json.dumps(run, ensure_ascii=False))
+    else:
+        run = await scheduler.run_job(args.job, trigger="cli")
+        print(json.dumps(run, ensure_ascii=False, indent=2, default=str))
+        if run["status"] != "success":
+            raise SystemExit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Задачі планувальника OhMyRevit")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="Показати задачі та їх стан")
+    run_parser = commands.add_parser("run", help="Виконати задачу зараз")
+    run_parser.add_argument("job", choices=sorted(scheduler.jobs))
+    history_parser = commands.add_parser("history", help="Історія запусків задачі")
+    history_parser.add_argument("job", choices=sorted(scheduler.jobs))
+    history_parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_run_cli(args))
+
+
+if __name__ == "__main__":
+    main()
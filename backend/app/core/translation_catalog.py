@@ -0,0 +1,199 @@
+"""
+Скомпільований каталог перекладів
+
+Каталог будується один раз при старті: для кожної мови створюється незмінна
+таблиця, в яку вже домішано fallback-мову, тому get_text робить один пошук
+замість двох. Шаблони розбираються наперед — для рядків без плейсхолдерів
+форматування не виконується взагалі, а набір плейсхолдерів відомий заздалегідь
+і перевіряється validate().
+
+Додаткові мови та переклади завантажуються з файлів <lang>.json
+({"key": "text"}) або <lang>.po (msgid — ключ, msgstr — текст).
+"""
+import ast
+import json
+from pathlib import Path
+from string import Formatter
+from types import MappingProxyType
+from typing import Dict, FrozenSet, List, Mapping, NamedTuple
+
+_formatter = Formatter()
+
+
+class _KeepMissing(dict):
+    """Залишає {name} як є, якщо параметр не передали"""
+
+    def __missing__(self, key: str) -> str:
+        return "{" + key + "}"
+
+
+class CompiledMessage:
+    """Переклад з наперед розібраним шаблоном"""
+
+    __slots__ = ("text", "placeholders", "_format")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.placeholders: FrozenSet[str] = frozenset(
+            field for _, field, _, _ in _formatter.parse(text) if field is not None
+        )
+        self._format = text.format
+
+    def render(self, kwargs: Mapping) -> str:
+        try:
+            return self._format(**kwargs)
+        except (KeyError, IndexError):
+            # Частина параметрів не передана — підставляємо те, що є
+            return self.text.format_map(_KeepMissing(kwargs))
+
+
+class CatalogIssue(NamedTuple):
+    """Проблема, знайдена validate()"""
+    lang: str
+    key: str
+    problem: str
+
+
+class TranslationCatalog:
+    """Незмінні таблиці перекладів для всіх мов"""
+
+    def __init__(self, sources: Dict[str, Dict[str, str]], default_lang: str = "uk"):
+        """
+        Args:
+            sources: {мова: {ключ: текст}}
+            default_lang: Мова, на яку падають відсутні мови та ключі
+        """
+        if default_lang not in sources:
+            raise ValueError(f"Default language '{default_lang}' is missing in catalogue")
+
+        self.default_lang = default_lang
+        self._sources = {lang: dict(messages) for lang, messages in sources.items()}
+
+        # Тексти з домішаною fallback-мовою та шаблони лише для рядків з плейсхолдерами
+        self._texts: Dict[str, Dict[str, str]] = {}
+        self._templates: Dict[str, Dict[str, CompiledMessage]] = {}
+        default_templates = {key: CompiledMessage(text) for key, text in sources[default_lang].items()}
+        for lang, messages in sources.items():
+            texts = dict(sources[default_lang])
+            templates = dict(default_templates)
+            if lang != default_lang:
+                texts.update(messages)
+                templates.update((key, CompiledMessage(text)) for key, text in messages.items())
+            self._texts[lang] = texts
+            self._templates[lang] = {key: message for key, message in templates.items() if message.placeholders}
+
+        self._default_texts = self._texts[default_lang]
+        self._default_templates = self._templates[default_lang]
+
+    @property
+    def languages(self) -> List[str]:
+        return list(self._texts)
+
+    def table(self, lang: str) -> Mapping[str, str]:
+        """Тексти мови (тільки для читання)"""
+        return MappingProxyType(self._texts.get(lang, self._default_texts))
+
+    def placeholders(self, key: str, lang: str = "uk") -> FrozenSet[str]:
+        template = self._templates.get(lang, self._default_templates).get(key)
+        return template.placeholders if template else frozenset()
+
+    def get(self, key: str, lang: str = "uk", **kwargs) -> str:
+        """Отримати переклад за ключем з підтримкою параметрів"""
+        if kwargs:
+            template = self._templates.get(lang, self._default_templates).get(key)
+            if template is not None:
+                return template.render(kwargs)
+        return self._texts.get(lang, self._default_texts).get(key, key)
+
+    def validate(self) -> List[CatalogIssue]:
+        """
+        Порівнює всі мови з мовою за замовчуванням
+
+        Знаходить відсутні ключі (буде показано текст fallback-мови), ключі,
+        яких немає в мові за замовчуванням, і розбіжності плейсхолдерів.
+        """
+        default_messages = self._sources[self.default_lang]
+        issues = []
+        for lang, messages in self._sources.items():
+            if lang == self.default_lang:
+                continue
+            for key in default_messages.keys() - messages.keys():
+                issues.append(CatalogIssue(lang, key, "missing"))
+            for key, text in messages.items():
+                if key not in default_messages:
+                    issues.append(CatalogIssue(lang, key, "unknown key"))
+                    continue
+                expected = self.placeholders(key, self.default_lang)
+                actual = self.placeholders(key, lang)
+                if actual != expected:
+                    issues.append(CatalogIssue(
+                        lang, key, f"placeholders {sorted(actual)} != {sorted(expected)}"
+                    ))
+        return sorted(issues)
+
+
+# ============ Loaders ============
+
+def _unquote_po(value: str) -> str:
+    return ast.literal_eval(value.strip()) if value.strip() else ""
+
+
+def load_po(path: Path) -> Dict[str, str]:
+    """Читає msgid/msgstr з .po файлу (без plural-форм і контекстів)"""
+    messages: Dict[str, str] = {}
+    msgid, msgstr, current = None, None, None
+
+    def flush():
+        if msgid and msgstr:
+            messages[msgid] = msgstr
+
+    for raw_line in Path(path).read_text(encoding="utf-8").splitlines():
+        line = raw_line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("msgid "):
+            flush()
+            msgid, msgstr, current = _unquote_po(line[6:]), None, "msgid"
+        elif line.startswith("msgstr "):
+            msgstr, current = _unquote_po(line[7:]), "msgstr"
+        elif line.startswith('"'):
+            if current == "msgid":
+                msgid += _unquote_po(line)
+            elif current == "msgstr":
+                msgstr += _unquote_po(line)
+        else:
+            current = None
+    flush()
+    return messages
+
+
+def load_json(path: Path) -> Dict[str, str]:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or not all(isinstance(v, str) for v in data.values()):
+        raise ValueError(f"{path}: expected a flat object of strings")
+    return data
+
+
+def load_directory(directory: str) -> Dict[str, Dict[str, str]]:
+    """
+    Завантажує <lang>.json та <lang>.po з каталогу
+
+    Returns:
+        {мова: {ключ: текст}}; .po перекриває .json тієї ж мови
+    """
+    sources: Dict[str, Dict[str, str]] = {}
+    root = Path(directory)
+    for pattern, loader in (("*.json", load_json), ("*.po", load_po)):
+        for path in sorted(root.glob(pattern)):
+            sources.setdefault(path.stem, {}).update(loader(path))
+    return sources
+
+
+def merge_sources(*sources: Dict[str, Dict[str, str]]) -> Dict[str, Dict[str, str]]:
+    """Об'єднує кілька джерел; пізніші перекривають ранні"""
+    merged: Dict[str, Dict[str, str]] = {}
+    for source in sources:
+        for lang, messages in source.items():
+            merged.setdefault(lang, {}).update(messages)
+    return merged
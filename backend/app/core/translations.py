@@ -1,5 +1,11 @@
+import logging
 from typing import Dict
 
+from app.core.config import settings
+from app.core.translation_catalog import TranslationCatalog, load_directory, merge_sources
+
+logger = logging.getLogger(__name__)
+
 
 # Мультимовні переклади для всього додатку
 # Підтримуються мови: UK, EN, RU, DE, ES
@@ -225,6 +231,10 @@ TRANSLATIONS: Dict[str, Dict[str, str]] = {
         "product_service_default_description": "Без опису",
         "product_error_not_found": "Товар не знайдено",
         "product_error_not_implemented": "Функціонал ще не реалізовано",
+        "product_error_batch_ids_invalid": "ids має бути списком цілих чисел через кому",
+        "product_error_batch_ids_empty": "Список ids порожній",
+        "product_error_batch_ids_too_many": "Забагато ids (максимум {max})",
+        "product_error_unknown_fields": "Невідомі поля: {fields}",
         "product_success_deleted": "Товар успішно видалено",
         "product_error_translation_update": "Помилка оновлення перекладу",
         "product_success_translation_update": "Переклад на {lang} оновлено",
@@ -683,15 +693,28 @@ TRANSLATIONS: Dict[str, Dict[str, str]] = {
 }
 
 
-def get_text(key: str, lang: str = "uk", **kwargs) -> str:
-    """Отримати переклад за ключем з підтримкою параметрів"""
-    # Fallback до української мови якщо мова не знайдена
-    lang_data = TRANSLATIONS.get(lang, TRANSLATIONS["uk"])
-    text = lang_data.get(key, TRANSLATIONS["uk"].get(key, key))
+def build_catalog() -> TranslationCatalog:
+    """Компілює вбудовані переклади разом з файлами з TRANSLATIONS_DIR"""
+    sources = TRANSLATIONS
+    if settings.TRANSLATIONS_DIR:
+        sources = merge_sources(TRANSLATIONS, load_directory(settings.TRANSLATIONS_DIR))
+    return TranslationCatalog(sources, default_lang="uk")
+
+
+catalog = build_catalog()
+
+# Прямий виклик методу каталогу — без зайвого рівня функції на гарячому шляху
+get_text = catalog.get
+
+
+def validate_translations() -> int:
+    """Логує проблеми каталогу, повертає їх кількість"""
+    issues = catalog.validate()
+    missing = [issue for issue in issues if issue.problem == "missing"]
+    for issue in issues:
+        if issue.problem != "missing":
+            logger.warning(f"Translation issue [{issue.lang}] {issue.key}: {issue.problem}")
+    if missing:
+        logger.info(f"Translations: {len(missing)} keys fall back to '{catalog.default_lang}'")
+    return len(issues)
 
-    if kwargs:
-        try:
-            return text.format(**kwargs)
-        except KeyError:
-            return text
-    return text
@@ -1,34 +1,121 @@
 # backend/app/core/warmup.py
 """
 Прогрів додатку для уникнення холодного старту
+
+warmup_application відкриває з'єднання пулів БД і Redis, будує шаблони листів
+та заповнює найгарячіші кеші до першого запиту. Реєстрація Telegram webhook
+виконується окремою фоновою задачею і не затримує старт.
 """
 import asyncio
 import logging
+import time
+
+import httpx
 from sqlalchemy import text
-from app.core.database import engine
+
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.database import engine, AsyncSessionLocal
 
 logger = logging.getLogger(__name__)
 
+# Скільки з'єднань пулу БД відкрити наперед
+WARMUP_DB_CONNECTIONS = 5
 
-async def warmup_database():
-    """Прогріває з'єднання з базою даних"""
-    try:
+# Затримки між спробами setWebhook, секунди
+WEBHOOK_RETRY_DELAYS = (1, 5, 15, 60)
+
+
+async def warmup_database(connections: int = WARMUP_DB_CONNECTIONS):
+    """Відкриває кілька з'єднань пулу одночасно, щоб перші запити їх не чекали"""
+    async def ping():
         async with engine.connect() as conn:
-            # Простий запит для перевірки з'єднання
-            result = await conn.execute(text("SELECT 1"))
-            result.scalar()
-            logger.info("✅ Database connection warmed up")
+            await conn.execute(text("SELECT 1"))
+
+    try:
+        await asyncio.gather(*(ping() for _ in range(min(connections, settings.DB_POOL_SIZE))))
+        logger.info("✅ Database connection warmed up")
     except Exception as e:
         logger.error(f"❌ Database warmup failed: {e}")
 
 
+async def warmup_redis():
+    """Відкриває з'єднання з Redis"""
+    try:
+        await cache.redis.ping()
+        logger.info("✅ Redis connection warmed up")
+    except Exception as e:
+        logger.error(f"❌ Redis warmup failed: {e}")
+
+
+def warmup_templates():
+    """Будує базові шаблони листів для всіх мов каталогу"""
+    from app.core.email import precompile_email_templates
+    from app.core.translations import catalog
+
+    precompile_email_templates(catalog.languages)
+    logger.info("✅ Email templates compiled")
+
+
+async def warmup_caches():
+    """Заповнює кеш першої сторінки каталогу та пакетів монет"""
+    from app.core.translations import catalog
+    from app.products.schemas import ProductFilter
+    from app.products.service import product_service
+    from app.wallet.service import WalletService
+
+    try:
+        async with AsyncSessionLocal() as db:
+            # Ті самі параметри, що й GET /products без фільтрів
+            for language_code in catalog.languages:
+                await product_service.get_products_list_body(
+                    language_code=language_code, db=db, filters=ProductFilter(sort_by="newest")
+                )
+
+            service = WalletService(db)
+            for pack in await service.get_active_coin_packs():
+                await service.get_coin_pack_cached(pack.id)
+        logger.info("✅ Hot caches filled")
+    except Exception as e:
+        logger.error(f"❌ Cache warmup failed: {e}")
+
+
 async def warmup_application():
     """Виконує прогрів всього додатку"""
     logger.info("🔥 Starting application warmup...")
+    started = time.perf_counter()
+
+    warmup_templates()
+    await asyncio.gather(warmup_database(), warmup_redis())
+    await warmup_caches()
+
+    logger.info(f"✅ Application warmup completed in {time.perf_counter() - started:.2f}s")
+
+
+async def register_telegram_webhook():
+    """
+    Реєструє Telegram webhook у фоні
 
-    # Прогріваємо базу даних
-    await warmup_database()
+    Не блокує старт: виконується окремою задачею з повторами, якщо Telegram
+    недоступний.
+    """
+    if not settings.TELEGRAM_BOT_TOKEN or not settings.BACKEND_URL:
+        return
 
-    # Можна додати інші прогріви (Redis, зовнішні API)
+    webhook_url = f"{settings.BACKEND_URL}/webhook/{settings.TELEGRAM_BOT_TOKEN}"
+    for attempt, delay in enumerate((0, *WEBHOOK_RETRY_DELAYS)):
+        await asyncio.sleep(delay)
+        try:
+            async with httpx.AsyncClient(timeout=10) as client:
+                resp = await client.post(
+                    f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/setWebhook",
+                    json={"url": webhook_url, "drop_pending_updates": False}
+                )
+            if resp.status_code == 200:
+                logger.info(f"Telegram Webhook set to: {webhook_url}")
+                return
+            logger.error(f"Failed to set webhook: {resp.text}")
+        except Exception as e:
+            logger.error(f"Error setting webhook (attempt {attempt + 1}): {e}")
 
-    logger.info("✅ Application warmup completed")
\ No newline at end of file
+    logger.error("Telegram webhook was not registered, giving up")
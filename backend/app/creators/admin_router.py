@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 
 from app.core.database import get_db
 from app.core.auth import require_admin
+from app.core.export import streaming_export_response, iter_query_rows
 from app.users.models import User
-from app.creators.admin_service import CreatorAdminService
+from app.creators.admin_service import CreatorAdminService, CREATORS_EXPORT_FIELDS
 from app.creators import admin_schemas
 from app.core.email import email_service
 from app.core.telegram_service import telegram_service
@@ -407,16 +408,73 @@ async def reject_payout(
 
 @router.get("/list", response_model=List[admin_schemas.CreatorListResponse])
 async def get_creators_list(
-    limit: int = 100,
-    offset: int = 0,
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    sort_by: str = Query("created_at", description="created_at, products, sales або balance"),
+    order: str = Query("desc", description="asc або desc"),
+    cursor: Optional[str] = Query(None, description="Курсор з заголовка X-Next-Cursor"),
+    min_products: Optional[int] = Query(None, ge=0),
+    min_sales: Optional[int] = Query(None, ge=0),
+    min_balance: Optional[int] = Query(None, ge=0),
+    search: Optional[str] = None,
     admin: User = Depends(require_admin),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Отримати список всіх креаторів з статистикою.
+
+    Для keyset-пагінації передайте **cursor** із заголовка `X-Next-Cursor`
+    попередньої відповіді.
+    """
+    service = CreatorAdminService(db)
+
+    try:
+        creators, next_cursor = await service.get_creators_list(
+            limit=limit,
+            offset=offset,
+            sort_by=sort_by,
+            order=order,
+            cursor=cursor,
+            min_products=min_products,
+            min_sales=min_sales,
+            min_balance=min_balance,
+            search=search
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    return creators
+
+
+@router.get("/export")
+async def export_creators(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    min_products: Optional[int] = Query(None, ge=0),
+    min_sales: Optional[int] = Query(None, ge=0),
+    min_balance: Optional[int] = Query(None, ge=0),
+    search: Optional[str] = None,
+    admin: User = Depends(require_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Потоковий експорт всієї бази креаторів у CSV або NDJSON.
     """
     service = CreatorAdminService(db)
-    return await service.get_creators_list(limit, offset)
+    query = service.get_creators_export_query(min_products, min_sales, min_balance, search)
+
+    return streaming_export_response(
+        iter_query_rows(query),
+        fields=CREATORS_EXPORT_FIELDS,
+        export_format=format,
+        filename="creators"
+    )
 
 
 @router.get("/stats/moderation")
@@ -1,16 +1,36 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_
+from sqlalchemy import select, func, and_, or_, true, tuple_, literal, Select
 from sqlalchemy.orm import selectinload
-from typing import List, Optional
+from typing import List, Optional, Tuple, Dict, Any
 from datetime import datetime
 import logging
 
+from app.core.config import settings
+from app.core.pagination import encode_cursor, decode_cursor, parse_cursor_datetime
 from app.creators.models import CreatorApplication, CreatorPayout, CreatorTransaction, CreatorApplicationStatus, PayoutStatus
 from app.products.models import Product, ModerationStatus
+from app.products.service import invalidate_product_cache
 from app.users.models import User
 
 logger = logging.getLogger(__name__)
 
+# Поля сортування списку креаторів
+CREATORS_SORT_FIELDS = ("created_at", "products", "sales", "balance")
+
+# Відповідність поля сортування ключу в рядку результату
+CREATORS_SORT_KEYS = {
+    "created_at": "created_at",
+    "products": "total_products",
+    "sales": "total_sales",
+    "balance": "creator_balance",
+}
+
+# Колонки експорту креаторів
+CREATORS_EXPORT_FIELDS = (
+    "id", "email", "telegram_id", "first_name", "is_creator",
+    "creator_balance", "total_products", "total_sales", "created_at"
+)
+
 
 class CreatorAdminService:
     """Сервіс адмін функцій для маркетплейсу"""
@@ -109,6 +129,7 @@ class CreatorAdminService:
         product.is_active = True  # Автоматично активувати
 
         await self.db.commit()
+        await invalidate_product_cache(product_id)
         await self.db.refresh(product)
         return product
 
@@ -148,6 +169,7 @@ class CreatorAdminService:
         product.is_active = False
 
         await self.db.commit()
+        await invalidate_product_cache(product_id)
         await self.db.refresh(product)
         return product
 
@@ -234,51 +256,145 @@ class CreatorAdminService:
 
     # ============ Statistics ============
 
-    async def get_creators_list(self, limit: int = 100, offset: int = 0):
-        """Список всіх креаторів з статистикою"""
-        query = (
-            select(User)
-            .where(User.is_creator == True)
-            .order_by(User.created_at.desc())
-            .limit(limit)
-            .offset(offset)
+    def _creators_query(
+        self,
+        min_products: Optional[int] = None,
+        min_sales: Optional[int] = None,
+        min_balance: Optional[int] = None,
+        search: Optional[str] = None
+    ) -> Tuple[Select, Dict[str, Any]]:
+        """
+        Запит списку креаторів зі статистикою.
+
+        Агрегати рахуються через LATERAL-підзапити в тому ж запиті,
+        замість двох окремих count(*) на кожного креатора.
+        """
+        products_stats = (
+            select(func.count(Product.id).label("total_products"))
+            .where(Product.author_id == User.id)
+            .lateral("products_stats")
         )
-        result = await self.db.execute(query)
-        creators = result.scalars().all()
-
-        # Додати статистику для кожного
-        creators_with_stats = []
-        for creator in creators:
-            # Кількість товарів
-            products_count_query = select(func.count(Product.id)).where(
-                Product.author_id == creator.id
+        sales_stats = (
+            select(func.count(CreatorTransaction.id).label("total_sales"))
+            .where(
+                CreatorTransaction.creator_id == User.id,
+                CreatorTransaction.transaction_type == "sale"
             )
-            products_result = await self.db.execute(products_count_query)
-            total_products = products_result.scalar() or 0
-
-            # Кількість продажів
-            sales_count_query = select(func.count(CreatorTransaction.id)).where(
-                and_(
-                    CreatorTransaction.creator_id == creator.id,
-                    CreatorTransaction.transaction_type == "sale"
-                )
+            .lateral("sales_stats")
+        )
+
+        query = (
+            select(
+                User.id,
+                User.email,
+                User.telegram_id,
+                User.first_name,
+                User.is_creator,
+                User.creator_balance,
+                products_stats.c.total_products,
+                sales_stats.c.total_sales,
+                User.created_at
             )
-            sales_result = await self.db.execute(sales_count_query)
-            total_sales = sales_result.scalar() or 0
-
-            creators_with_stats.append({
-                "id": creator.id,
-                "email": creator.email,
-                "telegram_id": creator.telegram_id,
-                "first_name": creator.first_name,
-                "is_creator": creator.is_creator,
-                "creator_balance": creator.creator_balance,
-                "total_products": total_products,
-                "total_sales": total_sales,
-                "created_at": creator.created_at
-            })
-
-        return creators_with_stats
+            .select_from(User)
+            .join(products_stats, true())
+            .join(sales_stats, true())
+            .where(User.is_creator == True)
+        )
+
+        if min_products is not None:
+            query = query.where(products_stats.c.total_products >= min_products)
+        if min_sales is not None:
+            query = query.where(sales_stats.c.total_sales >= min_sales)
+        if min_balance is not None:
+            query = query.where(User.creator_balance >= min_balance)
+        if search:
+            query = query.where(or_(
+                User.first_name.ilike(f"%{search}%"),
+                User.username.ilike(f"%{search}%"),
+                User.email.ilike(f"%{search}%")
+            ))
+
+        sort_columns = {
+            "created_at": User.created_at,
+            "products": products_stats.c.total_products,
+            "sales": sales_stats.c.total_sales,
+            # NULL-баланс рахується як 0: інакше порівняння кортежів у курсорі дає NULL
+            "balance": func.coalesce(User.creator_balance, 0),
+        }
+        return query, sort_columns
+
+    async def get_creators_list(
+        self,
+        limit: int = 100,
+        offset: int = 0,
+        sort_by: str = "created_at",
+        order: str = "desc",
+        cursor: Optional[str] = None,
+        min_products: Optional[int] = None,
+        min_sales: Optional[int] = None,
+        min_balance: Optional[int] = None,
+        search: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Список креаторів з статистикою (один запит до БД).
+
+        Підтримує keyset-пагінацію: якщо передано cursor, offset ігнорується.
+
+        Returns:
+            Tuple[List[dict], Optional[str]]: Креатори та курсор наступної сторінки
+        """
+        if sort_by not in CREATORS_SORT_FIELDS:
+            raise ValueError(f"Invalid sort field. Use one of: {', '.join(CREATORS_SORT_FIELDS)}")
+        if order not in ("asc", "desc"):
+            raise ValueError("Invalid order. Use 'asc' or 'desc'")
+
+        query, sort_columns = self._creators_query(min_products, min_sales, min_balance, search)
+        sort_column = sort_columns[sort_by]
+        descending = order == "desc"
+
+        if cursor:
+            last_value, last_id = decode_cursor(cursor, 2)
+            # bool — теж int у Python, але Postgres не порівняє його з числом
+            if type(last_id) is not int:
+                raise ValueError("Invalid cursor")
+            if sort_by == "created_at":
+                last_value = parse_cursor_datetime(last_value)
+            elif type(last_value) is not int:
+                raise ValueError("Invalid cursor")
+            position = tuple_(sort_column, User.id)
+            boundary = tuple_(literal(last_value), literal(last_id))
+            query = query.where(position < boundary if descending else position > boundary)
+        elif offset:
+            query = query.offset(offset)
+
+        if descending:
+            query = query.order_by(sort_column.desc(), User.id.desc())
+        else:
+            query = query.order_by(sort_column.asc(), User.id.asc())
+
+        result = await self.db.execute(query.limit(limit))
+        creators = [dict(row) for row in result.mappings().all()]
+
+        next_cursor = None
+        if creators and len(creators) == limit:
+            last = creators[-1]
+            last_value = last[CREATORS_SORT_KEYS[sort_by]]
+            if last_value is None and sort_by == "balance":
+                last_value = 0
+            next_cursor = encode_cursor(last_value, last["id"])
+
+        return creators, next_cursor
+
+    def get_creators_export_query(
+        self,
+        min_products: Optional[int] = None,
+        min_sales: Optional[int] = None,
+        min_balance: Optional[int] = None,
+        search: Optional[str] = None
+    ) -> Select:
+        """Запит для потокового експорту всієї бази креаторів"""
+        query, _ = self._creators_query(min_products, min_sales, min_balance, search)
+        return query.order_by(User.id.asc())
 
     async def get_moderation_stats(self):
         """Статистика модерації"""
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum as SQLEnum, func
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, Enum as SQLEnum, func
 from sqlalchemy.orm import relationship
 import enum
 from app.core.database import Base
@@ -120,5 +120,10 @@ class CreatorTransaction(Base):
     product = relationship("Product", foreign_keys=[product_id])
     payout = relationship("CreatorPayout", foreign_keys=[payout_id])
 
+    __table_args__ = (
+        # Статистика креатора (кількість продажів) для адмін-списку
+        Index('ix_creator_transactions_creator_type', 'creator_id', 'transaction_type'),
+    )
+
     def __repr__(self):
         return f"<CreatorTransaction(id={self.id}, type={self.transaction_type}, amount={self.amount_coins})>"
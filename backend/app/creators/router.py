@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, UploadFile, File
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from pathlib import Path
@@ -9,6 +9,8 @@ from app.core.database import get_db
 from app.users.dependencies import get_current_user
 from app.users.models import User
 from app.core.config import settings
+from app.core.images import generate_image_variants
+from app.products.archive_index import index_archive
 from app.creators.service import CreatorService
 from app.creators import schemas
 from app.core.email import email_service
@@ -540,15 +542,17 @@ async def upload_image(
     async with aiofiles.open(file_path, 'wb') as f:
         await f.write(content)
 
-    # Повертаємо шлях до файлу
+    # Повертаємо шлях до файлу та похідні для srcset
     return {
         "file_path": f"/uploads/images/{filename}",
-        "filename": filename
+        "filename": filename,
+        "variants": await generate_image_variants(file_path)
     }
 
 
 @router.post("/upload/archive", dependencies=[Depends(check_marketplace_enabled)])
 async def upload_archive(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user)
 ):
@@ -592,6 +596,9 @@ async def upload_archive(
     # Розмір файлу в MB
     file_size_mb = len(content) / (1024 * 1024)
 
+    # Вміст архіву індексується у фоні
+    background_tasks.add_task(index_archive, f"/uploads/archives/{filename}")
+
     # Повертаємо шлях до файлу та розмір
     return {
         "file_path": f"/uploads/archives/{filename}",
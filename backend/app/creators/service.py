@@ -1,7 +1,7 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, update
+from sqlalchemy import select, func, and_, update, insert
 from sqlalchemy.orm import selectinload
-from typing import Optional, List
+from typing import Optional, List, Dict, Tuple
 from datetime import datetime
 
 from app.creators.models import CreatorApplication, CreatorApplicationStatus, CreatorPayout, CreatorTransaction
@@ -9,7 +9,9 @@ from app.users.models import User
 from app.products.models import Product, ModerationStatus
 from app.orders.models import Order
 from app.core.config import settings
-from app.core.sanitize import sanitize_html, sanitize_text
+from app.core.images import collect_image_variants
+from app.products.archive_index import link_product_files
+from app.core.sanitize import sanitize_html_async, sanitize_text_async
 import logging
 
 logger = logging.getLogger(__name__)
@@ -312,8 +314,7 @@ class CreatorService:
 
         # Розраховуємо комісію платформи та дохід креатора
         commission_percent = settings.MARKETPLACE_COMMISSION_PERCENT  # 15%
-        platform_commission = int(sale_coins * commission_percent / 100)
-        creator_earnings = sale_coins - platform_commission
+        platform_commission, creator_earnings = self.split_sale_coins(sale_coins)
 
         # Нараховуємо монети креатору БЕЗ блокування (запобігаємо Deadlock)
         # Використовуємо атомарний UPDATE замість SELECT FOR UPDATE
@@ -366,6 +367,69 @@ class CreatorService:
 
         return transaction
 
+    @staticmethod
+    def split_sale_coins(sale_coins: int) -> Tuple[int, int]:
+        """Розподіляє суму продажу на (комісія платформи, дохід креатора)"""
+        platform_commission = int(sale_coins * settings.MARKETPLACE_COMMISSION_PERCENT / 100)
+        return platform_commission, sale_coins - platform_commission
+
+    async def process_creator_sales_batch(
+        self,
+        sales: List[Tuple[Product, int]],
+        order_id: int,
+        locked_users: Dict[int, User]
+    ) -> int:
+        """
+        Нараховує дохід креаторам за всі товари замовлення.
+
+        Комісії рахуються в пам'яті, баланси оновлюються на вже заблокованих
+        (SELECT ... FOR UPDATE в OrderService) рядках авторів, а записи
+        sale/commission пишуться одним bulk INSERT.
+
+        Args:
+            sales: Пари (товар, сума продажу в монетах)
+            order_id: ID замовлення
+            locked_users: Заблоковані рядки користувачів за id
+
+        Returns:
+            Кількість оброблених продажів креаторів
+        """
+        commission_percent = settings.MARKETPLACE_COMMISSION_PERCENT
+        ledger_rows = []
+
+        for product, sale_coins in sales:
+            author = locked_users.get(product.author_id)
+            if not author or not author.is_creator:
+                logger.warning(f"Product {product.id} author {product.author_id} is not a creator")
+                continue
+
+            platform_commission, creator_earnings = self.split_sale_coins(sale_coins)
+            author.creator_balance = (author.creator_balance or 0) + creator_earnings
+
+            ledger_rows.append({
+                "creator_id": author.id,
+                "transaction_type": "sale",
+                "amount_coins": creator_earnings,
+                "description": f"Продаж товару #{product.id} (Комісія {commission_percent}%)",
+                "order_id": order_id,
+                "product_id": product.id
+            })
+            ledger_rows.append({
+                "creator_id": author.id,  # Зберігаємо зв'язок з креатором
+                "transaction_type": "commission",
+                "amount_coins": -platform_commission,  # Негативна сума = комісія
+                "description": f"Комісія платформи {commission_percent}% від продажу",
+                "order_id": order_id,
+                "product_id": product.id
+            })
+
+        if ledger_rows:
+            await self.db.execute(insert(CreatorTransaction), ledger_rows)
+
+        # НЕ робимо commit - це частина транзакції замовлення
+        logger.info(f"Creator sales processed for order {order_id}: {len(ledger_rows) // 2} sales")
+        return len(ledger_rows) // 2
+
     # ============ Creator Product Management ============
 
     async def create_creator_product(
@@ -399,13 +463,17 @@ class CreatorService:
             compatibility=product_data.get("compatibility"),
             is_on_sale=False,
         )
+        product.image_variants = await collect_image_variants(
+            [product.main_image_url, *product.gallery_image_urls]
+        )
 
         self.db.add(product)
         await self.db.flush()
+        await link_product_files(self.db, product)
 
         # КРИТИЧНО: Санітизуємо вхідний текст від XSS атак
-        safe_title = sanitize_text(product_data["title_uk"])
-        safe_description = sanitize_html(product_data["description_uk"])
+        safe_title = await sanitize_text_async(product_data["title_uk"])
+        safe_description = await sanitize_html_async(product_data["description_uk"])
 
         # Додаємо переклад (поки тільки українська)
         translation = ProductTranslation(
@@ -499,6 +567,7 @@ class CreatorService:
 
         if "zip_file_path" in update_data:
             product.zip_file_path = update_data["zip_file_path"]
+            await link_product_files(self.db, product)
 
         if "file_size_mb" in update_data:
             product.file_size_mb = Decimal(str(update_data["file_size_mb"]))
@@ -506,14 +575,19 @@ class CreatorService:
         if "compatibility" in update_data:
             product.compatibility = update_data["compatibility"]
 
+        if "main_image_url" in update_data or "gallery_image_urls" in update_data:
+            product.image_variants = await collect_image_variants(
+                [product.main_image_url, *(product.gallery_image_urls or [])]
+            )
+
         # КРИТИЧНО: Санітизуємо вхідний текст від XSS атак
         if "title_uk" in update_data or "description_uk" in update_data:
             translation = next((t for t in product.translations if t.language_code == "uk"), None)
             if translation:
                 if "title_uk" in update_data:
-                    translation.title = sanitize_text(update_data["title_uk"])
+                    translation.title = await sanitize_text_async(update_data["title_uk"])
                 if "description_uk" in update_data:
-                    translation.description = sanitize_html(
+                    translation.description = await sanitize_html_async(
                         update_data["description_uk"]
                     )
 
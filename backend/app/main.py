@@ -1,30 +1,36 @@
 import asyncio
+import hmac
 import logging
 from contextlib import asynccontextmanager
 
-import httpx
-import sentry_sdk
-from fastapi import FastAPI, APIRouter, Depends
+from fastapi import FastAPI, APIRouter, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from sentry_sdk.integrations.fastapi import FastApiIntegration
 
 from app.admin.router import router as admin_main_router
 from app.bot.router import router as bot_webhook_router
 from app.collections.router import router as collections_router
 from app.core.config import settings
 from app.core.database import engine
-from app.core.scheduler import run_subscription_expiration_check
-from app.core.translations import get_text
+from app.core.email import email_service
+from app.core.executors import shutdown_executors
+from app.core.loop_monitor import run_loop_monitor
+from app.core.scheduler import run_scheduler
+from app.core.warmup import warmup_application, register_telegram_webhook
+from app.wallet.inbox import run_inbox_worker
+from app.core.notifications import run_notification_worker
+from app.wallet.stripe_gateway import close_stripe_gateway
+from app.core.translations import get_text, validate_translations
 from app.orders.router import router as orders_router
 from app.products.router import router as products_router, admin_router as products_admin_router
+from app.products.catalog_index import run_catalog_index
 from app.products.models import Product, ProductType
 from app.profile.router import router as profile_router
 from app.subscriptions.router import router as subscriptions_router
 from app.users.router import auth_router
 from app.core.rate_limit import RateLimiter
 from app.core.exceptions import AppException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse
 
 from app.wallet.router import router as wallet_router
 from app.wallet.router import admin_router as wallet_admin_router
@@ -43,6 +49,10 @@ if settings.ENVIRONMENT == "production":
     if not settings.SENTRY_DSN:
         raise ValueError("SENTRY_DSN is required in production environment")
 
+    # Sentry імпортується лише там, де він увімкнений
+    import sentry_sdk
+    from sentry_sdk.integrations.fastapi import FastApiIntegration
+
     sentry_sdk.init(
         dsn=settings.SENTRY_DSN,
         integrations=[
@@ -58,28 +68,36 @@ limiter = RateLimiter(max_requests=100, window=60)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info(get_text("main_startup_log", "uk"))
+    validate_translations()
+
+    # Реєстрація webhook не блокує старт
+    webhook_task = asyncio.create_task(register_telegram_webhook())
+
+    try:
+        await asyncio.wait_for(warmup_application(), timeout=settings.WARMUP_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        logger.warning("Application warmup timed out, continuing startup")
 
-    if settings.TELEGRAM_BOT_TOKEN and settings.BACKEND_URL:
-        webhook_url = f"{settings.BACKEND_URL}/webhook/{settings.TELEGRAM_BOT_TOKEN}"
-        try:
-            async with httpx.AsyncClient() as client:
-                resp = await client.post(
-                    f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/setWebhook",
-                    json={"url": webhook_url, "drop_pending_updates": False}
-                )
-                if resp.status_code == 200:
-                    logger.info(f"Telegram Webhook set to: {webhook_url}")
-                else:
-                    logger.error(f"Failed to set webhook: {resp.text}")
-        except Exception as e:
-            logger.error(f"Error setting webhook: {e}")
-
-    scheduler_task = asyncio.create_task(run_subscription_expiration_check())
+    scheduler_task = asyncio.create_task(run_scheduler()) if settings.SCHEDULER_ENABLED else None
+    inbox_task = asyncio.create_task(run_inbox_worker())
+    notification_task = asyncio.create_task(run_notification_worker())
+    loop_monitor_task = asyncio.create_task(run_loop_monitor())
+    catalog_index_task = asyncio.create_task(run_catalog_index()) if settings.CATALOG_INDEX_ENABLED else None
 
     yield
 
     logger.info(get_text("main_shutdown_log", "uk"))
-    scheduler_task.cancel()
+    webhook_task.cancel()
+    if scheduler_task:
+        scheduler_task.cancel()
+    inbox_task.cancel()
+    notification_task.cancel()
+    loop_monitor_task.cancel()
+    if catalog_index_task:
+        catalog_index_task.cancel()
+    await close_stripe_gateway()
+    await email_service.close()
+    shutdown_executors()
     await engine.dispose()
 
 
@@ -91,6 +109,7 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/api/docs" if is_dev else None,
     redoc_url="/api/redoc" if is_dev else None,
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -135,6 +154,18 @@ async def health_check():
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Метрики цього воркера для Prometheus"""
+    from app.core.metrics import render_metrics
+    from app.core.scheduler import scheduler
+
+    expected = f"Bearer {settings.METRICS_TOKEN}"
+    if not settings.METRICS_TOKEN or not hmac.compare_digest(request.headers.get("authorization", ""), expected):
+        return PlainTextResponse("Not Found", status_code=404)
+    return PlainTextResponse(render_metrics(scheduler.worker_id), media_type="text/plain; version=0.0.4")
+
+
 # ============ API v1 Router ============
 api_v1_router = APIRouter(
     prefix="/api/v1",
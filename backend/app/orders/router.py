@@ -1,5 +1,5 @@
 import logging
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from decimal import Decimal
@@ -26,6 +26,7 @@ router = APIRouter(tags=["Orders"])
 @router.post("/checkout")
 async def create_checkout_order(
         data: CreateOrderRequest,
+        background_tasks: BackgroundTasks,
         current_user: User = Depends(get_current_user),
         db: AsyncSession = Depends(get_db)
 ):
@@ -45,7 +46,8 @@ async def create_checkout_order(
             user_id=current_user.id,
             product_ids=data.product_ids,
             promo_code=data.promo_code,
-            language_code=lang
+            language_code=lang,
+            background_tasks=background_tasks
         )
 
         return CheckoutResponse(
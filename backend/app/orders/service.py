@@ -1,8 +1,9 @@
-from typing import Optional, List
+from typing import Optional, List, Dict, Iterable, Tuple
 from decimal import Decimal
+from fastapi import BackgroundTasks
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, insert, or_
+from sqlalchemy.orm import selectinload, joinedload, aliased
 from datetime import datetime, timezone
 import logging
 
@@ -13,9 +14,11 @@ from app.core.config import settings
 from app.subscriptions.models import UserProductAccess, AccessType
 from app.referrals.models import ReferralLog, ReferralBonusType
 from app.wallet.models import Transaction, TransactionType
+from app.core.email import email_service
 from app.core.telegram_service import telegram_service
 from app.core.translations import get_text
 from app.creators.service import CreatorService
+from app.profile.download_service import signed_download_url
 
 logger = logging.getLogger(__name__)
 
@@ -78,24 +81,93 @@ class OrderService:
             raise ValueError("User not found")
         return user.balance >= required_coins, user.balance
 
+    async def _load_products(self, product_ids: List[int]) -> List[Product]:
+        """Завантажує товари разом з перекладами та авторами одним запитом"""
+        result = await self.db.execute(
+            select(Product)
+            .where(Product.id.in_(product_ids))
+            .options(
+                joinedload(Product.translations),
+                joinedload(Product.author)
+            )
+            .order_by(Product.id)
+        )
+        return list(result.unique().scalars().all())
+
+    async def _lock_users(
+            self,
+            user_ids: Iterable[int],
+            referrer_of: Optional[int] = None
+    ) -> Dict[int, User]:
+        """
+        Блокує рядки всіх учасників замовлення одним запитом.
+
+        Рядки блокуються в порядку id, тому паралельні замовлення з
+        перетином покупців/креаторів/реферерів не створюють deadlock.
+
+        Args:
+            user_ids: ID користувачів для блокування
+            referrer_of: Також заблокувати реферера цього користувача
+        """
+        condition = User.id.in_(set(user_ids))
+        if referrer_of is not None:
+            buyer = aliased(User)
+            referrer_id = (
+                select(buyer.referrer_id)
+                .where(buyer.id == referrer_of)
+                .scalar_subquery()
+            )
+            condition = or_(condition, User.id == referrer_id)
+
+        result = await self.db.execute(
+            select(User)
+            .where(condition)
+            .order_by(User.id)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )
+        return {u.id: u for u in result.scalars().all()}
+
+    def _product_names(self, products: List[Product], language_code: str) -> List[str]:
+        names = []
+        for p in products:
+            t = p.get_translation(language_code)
+            names.append(t.title if t else f"#{p.id}")
+        return names
+
+    async def _ensure_not_owned(self, user_id: int, products: List[Product], language_code: str):
+        """ValueError, якщо користувач вже має доступ до якогось із товарів"""
+        existing_access_result = await self.db.execute(
+            select(UserProductAccess.product_id)
+            .where(
+                UserProductAccess.user_id == user_id,
+                UserProductAccess.product_id.in_([p.id for p in products])
+            )
+        )
+        existing_product_ids = set(existing_access_result.scalars().all())
+
+        if existing_product_ids:
+            existing_products = [p for p in products if p.id in existing_product_ids]
+            product_names = []
+            for p in existing_products:
+                translation = p.get_translation(language_code)
+                product_names.append(translation.title if translation else f"Product #{p.id}")
+            raise ValueError(f"Ви вже маєте доступ до: {', '.join(product_names)}")
+
     async def create_order(
             self,
             user_id: int,
             product_ids: List[int],
             promo_code: Optional[str] = None,
-            language_code: str = "uk"
+            language_code: str = "uk",
+            background_tasks: Optional[BackgroundTasks] = None
     ) -> dict:
-        user_query = select(User).where(User.id == user_id).with_for_update()
-        user_res = await self.db.execute(user_query)
-        user = user_res.scalar_one_or_none()
-
-        if not user:
-            raise ValueError(get_text("order_error_user_not_found", language_code))
-
-        products_result = await self.db.execute(
-            select(Product).where(Product.id.in_(product_ids))
-        )
-        products = list(products_result.scalars().all())
+        """
+        Args:
+            background_tasks: Якщо передано — лист з посиланнями на файли
+                відправляється після відповіді
+        """
+        products = await self._load_products(product_ids)
 
         if not products:
             raise ValueError(get_text("order_error_products_not_found", language_code))
@@ -107,32 +179,21 @@ class OrderService:
                 product_name = translation.title if translation else f"Product #{product.id}"
                 raise ValueError(f"Ви не можете купити власний товар: {product_name}")
 
-        product_ids_list = [p.id for p in products]
-        existing_access_query = (
-            select(UserProductAccess)
-            .where(
-                UserProductAccess.user_id == user_id,
-                UserProductAccess.product_id.in_(product_ids_list)
-            )
-            .with_for_update()
-        )
-        existing_access_result = await self.db.execute(existing_access_query)
-        existing_access = existing_access_result.scalars().all()
-
-        if existing_access:
-            existing_product_ids = {a.product_id for a in existing_access}
-            existing_products = [p for p in products if p.id in existing_product_ids]
-            product_names = []
-            for p in existing_products:
-                translation = p.get_translation(language_code)
-                product_names.append(translation.title if translation else f"Product #{p.id}")
-            raise ValueError(f"Ви вже маєте доступ до: {', '.join(product_names)}")
+        # Швидка перевірка до блокувань; остаточна — після блокування покупця
+        await self._ensure_not_owned(user_id, products, language_code)
 
         subtotal_usd = sum(p.get_actual_price() for p in products)
         subtotal_coins = self.usd_to_coins(subtotal_usd)
 
         if subtotal_coins == 0:
+            users = await self._lock_users([user_id])
+            user = users.get(user_id)
+            if not user:
+                raise ValueError(get_text("order_error_user_not_found", language_code))
+            await self._ensure_not_owned(user_id, products, language_code)
+
             order = await self._create_free_order(user_id, products)
+            self._queue_download_links(background_tasks, user, products, language_code)
             return {
                 "order": order,
                 "coins_spent": 0,
@@ -146,21 +207,41 @@ class OrderService:
         final_coins = subtotal_coins - discount_data["discount_coins"]
         final_coins = max(final_coins, 0)
 
+        # Один запит блокує покупця, його реферера та авторів товарів
+        author_ids = {p.author_id for p in products if p.author_id}
+        users = await self._lock_users({user_id} | author_ids, referrer_of=user_id)
+        user = users.get(user_id)
+
+        if not user:
+            raise ValueError(get_text("order_error_user_not_found", language_code))
+
+        # Паралельна покупка того ж товару чекала на блокування покупця і вже закомітилась
+        await self._ensure_not_owned(user_id, products, language_code)
+
         if user.balance < final_coins:
             raise ValueError(
                 f"INSUFFICIENT_FUNDS|{final_coins}|{user.balance}|{final_coins - user.balance}"
             )
 
+        if discount_data["promo_code_id"]:
+            # Блокуємо промокод для запобігання race condition (перевищення max_uses)
+            promo_query = select(PromoCode).where(
+                PromoCode.id == discount_data["promo_code_id"]
+            ).with_for_update()
+            promo_result = await self.db.execute(promo_query)
+            promo = promo_result.scalar_one_or_none()
+
+            if promo:
+                # Перевіряємо ліміт ПІСЛЯ блокування
+                if promo.max_uses and promo.current_uses >= promo.max_uses:
+                    await self.db.rollback()
+                    raise ValueError("Promo code usage limit reached")
+
+                promo.current_uses += 1
+
         user.balance -= final_coins
         new_balance = user.balance
 
-        # КРИТИЧНО: Перевіряємо що баланс не став від'ємним (race condition захист)
-        if user.balance < 0:
-            await self.db.rollback()
-            raise ValueError(
-                f"INSUFFICIENT_FUNDS|{final_coins}|{user.balance + final_coins}|{final_coins - (user.balance + final_coins)}"
-            )
-
         order = Order(
             user_id=user_id,
             subtotal=subtotal_usd,
@@ -182,58 +263,33 @@ class OrderService:
         self.db.add(order)
         await self.db.flush()
 
-        product_names = []
-        for p in products:
-            t = p.get_translation(language_code)
-            product_names.append(t.title if t else f"#{p.id}")
-
-        description = f"Покупка: {', '.join(product_names)}"
+        description = f"Покупка: {', '.join(self._product_names(products, language_code))}"
         if len(description) > 450:
             description = description[:450] + "..."
 
-        transaction = Transaction(
-            user_id=user_id,
-            type=TransactionType.PURCHASE,
-            amount=-final_coins,
-            balance_after=new_balance,
-            description=description,
-            order_id=order.id
-        )
-        self.db.add(transaction)
-
-        for product in products:
-            self.db.add(UserProductAccess(
-                user_id=user_id,
-                product_id=product.id,
-                access_type=AccessType.PURCHASE
-            ))
-
-        if discount_data["promo_code_id"]:
-            # Блокуємо промокод для запобігання race condition (перевищення max_uses)
-            promo_query = select(PromoCode).where(
-                PromoCode.id == discount_data["promo_code_id"]
-            ).with_for_update()
-            promo_result = await self.db.execute(promo_query)
-            promo = promo_result.scalar_one_or_none()
-
-            if promo:
-                # Перевіряємо ліміт ПІСЛЯ блокування
-                if promo.max_uses and promo.current_uses >= promo.max_uses:
-                    await self.db.rollback()
-                    raise ValueError("Promo code usage limit reached")
-
-                promo.current_uses += 1
-
-        # КРИТИЧНО: Нараховуємо комісії креаторам ДО commit
-        # Якщо це впаде - вся транзакція скасується
-        await self._process_creator_commissions(products, order.id, final_coins)
-
-        # КРИТИЧНО: Нараховуємо реферальні бонуси ДО commit
-        # Якщо це впаде - вся транзакція скасується (гарантія атомарності)
-        await self._process_referral_bonus(user, final_coins, order.id, language_code)
+        ledger_rows = [{
+            "user_id": user_id,
+            "type": TransactionType.PURCHASE,
+            "amount": -final_coins,
+            "balance_after": new_balance,
+            "description": description,
+            "order_id": order.id
+        }]
+
+        # КРИТИЧНО: Реферальний бонус і комісії креаторам рахуються ДО commit
+        # Якщо щось впаде - вся транзакція скасується (гарантія атомарності)
+        referrer = users.get(user.referrer_id) if user.referrer_id else None
+        referral_row = self._process_referral_bonus(user, referrer, final_coins, order.id)
+        if referral_row:
+            ledger_rows.append(referral_row)
+
+        await self.db.execute(insert(Transaction), ledger_rows)
+        await self._grant_access(user_id, products)
+        await self._process_creator_commissions(products, order.id, final_coins, users)
 
         await self.db.commit()
         await self.db.refresh(order)
+        self._queue_download_links(background_tasks, user, products, language_code)
 
         # Відправляємо Telegram повідомлення ПІСЛЯ commit (не критично якщо впадуть)
         try:
@@ -242,7 +298,7 @@ class OrderService:
             logger.error(f"Failed to send purchase notification: {e}")
 
         # Відправляємо повідомлення реферу (якщо є)
-        if user.referrer_id:
+        if referral_row:
             try:
                 await self._send_referral_notification(user, final_coins)
             except Exception as e:
@@ -259,6 +315,20 @@ class OrderService:
             "new_balance": new_balance
         }
 
+    async def _grant_access(self, user_id: int, products: List[Product]):
+        """Надає доступ до всіх товарів замовлення одним INSERT"""
+        await self.db.execute(
+            insert(UserProductAccess),
+            [
+                {
+                    "user_id": user_id,
+                    "product_id": product.id,
+                    "access_type": AccessType.PURCHASE
+                }
+                for product in products
+            ]
+        )
+
     async def _create_free_order(self, user_id: int, products: List[Product]) -> Order:
         order = Order(
             user_id=user_id,
@@ -276,51 +346,39 @@ class OrderService:
                     price_at_purchase=Decimal("0.00")
                 )
             )
-            self.db.add(UserProductAccess(
-                user_id=user_id,
-                product_id=product.id,
-                access_type=AccessType.PURCHASE
-            ))
 
         self.db.add(order)
+        await self.db.flush()
+        await self._grant_access(user_id, products)
+
         await self.db.commit()
         await self.db.refresh(order)
         return order
 
-    async def _process_referral_bonus(
+    def _process_referral_bonus(
             self,
             buyer: User,
+            referrer: Optional[User],
             coins_spent: int,
-            order_id: int,
-            language_code: str
-    ):
-        """Нараховує реферальний бонус (викликається ДО commit)"""
-        if not buyer.referrer_id:
-            return
+            order_id: int
+    ) -> Optional[dict]:
+        """
+        Нараховує реферальний бонус (викликається ДО commit)
 
-        referrer_query = select(User).where(User.id == buyer.referrer_id).with_for_update()
-        referrer_res = await self.db.execute(referrer_query)
-        referrer = referrer_res.scalar_one_or_none()
+        Реферер має бути вже заблокований в _lock_users.
 
+        Returns:
+            Рядок транзакції для bulk INSERT або None
+        """
         if not referrer:
-            return
+            return None
 
         bonus_coins = int(coins_spent * settings.REFERRAL_PURCHASE_PERCENT)
         if bonus_coins <= 0:
-            return
+            return None
 
         referrer.balance += bonus_coins
 
-        transaction = Transaction(
-            user_id=referrer.id,
-            type=TransactionType.REFERRAL,
-            amount=bonus_coins,
-            balance_after=referrer.balance,
-            description=f"Реферальний бонус за покупку {buyer.first_name}",
-            order_id=order_id
-        )
-        self.db.add(transaction)
-
         referral_log = ReferralLog(
             referrer_id=referrer.id,
             referred_user_id=buyer.id,
@@ -331,50 +389,59 @@ class OrderService:
 
         # НЕ робимо commit тут - це частина головної транзакції
         # Telegram повідомлення відправимо ПІСЛЯ commit у create_order
+        return {
+            "user_id": referrer.id,
+            "type": TransactionType.REFERRAL,
+            "amount": bonus_coins,
+            "balance_after": referrer.balance,
+            "description": f"Реферальний бонус за покупку {buyer.first_name}",
+            "order_id": order_id
+        }
 
-    async def _process_creator_commissions(
+    def _allocate_sale_coins(
             self,
             products: List[Product],
-            order_id: int,
             total_coins_spent: int
-    ):
-        """Нараховує комісії креаторам за продані товари"""
-        if not products:
-            return
-
-        creator_service = CreatorService(self.db)
-
+    ) -> List[Tuple[Product, int]]:
+        """Розподіляє сплачені монети між товарами креаторів"""
         # Якщо один товар - вся сума йде на нього
         if len(products) == 1:
             product = products[0]
-            if product.author_id:  # Товар креатора
-                await creator_service.process_creator_sale(
-                    product_id=product.id,
-                    order_id=order_id,
-                    sale_coins=total_coins_spent
-                )
-            return
+            return [(product, total_coins_spent)] if product.author_id else []
 
         # Якщо кілька товарів - розподіляємо пропорційно ціні
         total_price_usd = sum(p.get_actual_price() for p in products)
         if total_price_usd == 0:
-            return
+            return []
 
+        sales = []
         for product in products:
             if not product.author_id:  # Пропускаємо адмін товари
                 continue
 
             # Розраховуємо частку монет для цього товару
-            product_price_usd = product.get_actual_price()
-            product_share = float(product_price_usd / total_price_usd)
+            product_share = float(product.get_actual_price() / total_price_usd)
             product_coins = int(total_coins_spent * product_share)
 
             if product_coins > 0:
-                await creator_service.process_creator_sale(
-                    product_id=product.id,
-                    order_id=order_id,
-                    sale_coins=product_coins
-                )
+                sales.append((product, product_coins))
+
+        return sales
+
+    async def _process_creator_commissions(
+            self,
+            products: List[Product],
+            order_id: int,
+            total_coins_spent: int,
+            locked_users: Dict[int, User]
+    ):
+        """Нараховує комісії креаторам за продані товари"""
+        sales = self._allocate_sale_coins(products, total_coins_spent)
+        if not sales:
+            return
+
+        creator_service = CreatorService(self.db)
+        await creator_service.process_creator_sales_batch(sales, order_id, locked_users)
 
     async def _send_purchase_notification(
             self,
@@ -384,10 +451,7 @@ class OrderService:
             new_balance: int,
             language_code: str
     ):
-        product_names = []
-        for p in products:
-            t = p.get_translation(language_code)
-            product_names.append(t.title if t else f"#{p.id}")
+        product_names = self._product_names(products, language_code)
 
         message = (
             f"✅ Покупка успішна!\n\n"
@@ -398,6 +462,30 @@ class OrderService:
         )
         await telegram_service.send_message(user.telegram_id, message)
 
+    def _queue_download_links(
+            self,
+            background_tasks: Optional[BackgroundTasks],
+            user: User,
+            products: List[Product],
+            language_code: str
+    ):
+        """Ставить лист з посиланнями на файли покупки (лише на підтверджений email)"""
+        if background_tasks is None or not user.email or not user.is_email_verified:
+            return
+
+        ttl = settings.DOWNLOAD_EMAIL_LINK_TTL_SECONDS
+        links = [
+            {
+                "title": title,
+                "download_url": signed_download_url(user.id, product.id, ttl),
+                "file_size_mb": product.file_size_mb,
+            }
+            for product, title in zip(products, self._product_names(products, language_code))
+            if product.zip_file_path
+        ]
+        if links:
+            background_tasks.add_task(email_service.send_download_links, user.email, links, language_code)
+
     async def _send_referral_notification(self, buyer: User, coins_spent: int):
         """Відправити повідомлення реферу про бонус"""
         from app.core.database import AsyncSessionLocal
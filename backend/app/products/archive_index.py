@@ -0,0 +1,307 @@
+"""
+Індексація архівів товарів
+
+Після завантаження архів один раз читається в пулі процесів:
+- список записів ZIP/7z читається з central directory / заголовків без
+  розпакування всього архіву;
+- для .rfa/.rvt у ZIP з потоку BasicFileInfo визначається версія Revit
+  (файл розпаковується у SpooledTemporaryFile, тож пам'ять обмежена);
+- рахується SHA-256 архіву.
+
+Результат зберігається в product_files і прив'язується до товару за
+zip_file_path. Фільтр сумісності та перегляд вмісту працюють з цією таблицею
+і не відкривають архів на кожен запит.
+"""
+import hashlib
+import logging
+import re
+import shutil
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.executors import cpu_executor
+from app.products.models import ArchiveIndexStatus, Product, ProductFile
+
+logger = logging.getLogger(__name__)
+
+REVIT_EXTENSIONS = (".rfa", ".rvt", ".rte", ".rft")
+
+# Скільки записів зберігати для перегляду вмісту
+ARCHIVE_PREVIEW_ENTRIES = 500
+
+# Скільки Revit-файлів одного архіву розпаковувати для визначення версії
+REVIT_FILES_INSPECTED = 200
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Файли до цього розміру розпаковуються в пам'ять, більші — на диск
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+# Скільки архівів без індексу обробляє один запуск backfill
+ARCHIVE_BACKFILL_BATCH = 50
+
+_VERSION_PATTERNS = (
+    re.compile(r"Format:\s*(20\d{2})"),
+    re.compile(r"Autodesk Revit\s+(20\d{2})"),
+)
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def revit_version_from_basic_file_info(data: bytes) -> Optional[int]:
+    """Версія Revit з потоку BasicFileInfo (текст у UTF-16 або ASCII)"""
+    for text in (data.decode("utf-16-le", errors="ignore"), data.decode("latin-1")):
+        for pattern in _VERSION_PATTERNS:
+            match = pattern.search(text)
+            if match:
+                return int(match.group(1))
+    return None
+
+
+def _revit_version(stream) -> Optional[int]:
+    import olefile
+
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as spool:
+        shutil.copyfileobj(stream, spool, HASH_CHUNK_SIZE)
+        spool.seek(0)
+        if not olefile.isOleFile(spool):
+            return None
+        spool.seek(0)
+        with olefile.OleFileIO(spool) as ole:
+            if not ole.exists("BasicFileInfo"):
+                return None
+            return revit_version_from_basic_file_info(ole.openstream("BasicFileInfo").read())
+
+
+def _list_zip(path: Path) -> Dict[str, Any]:
+    entries = []
+    versions = set()
+    revit_files = 0
+    with zipfile.ZipFile(path) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            entries.append({"name": info.filename, "size": info.file_size})
+            if not info.filename.lower().endswith(REVIT_EXTENSIONS):
+                continue
+            revit_files += 1
+            if revit_files > REVIT_FILES_INSPECTED:
+                continue
+            try:
+                with archive.open(info) as stream:
+                    version = _revit_version(stream)
+            except Exception as e:
+                logger.warning(f"Cannot read Revit version of {info.filename} in {path.name}: {e}")
+                continue
+            if version:
+                versions.add(version)
+    return {"entries": entries, "revit_files": revit_files, "versions": versions}
+
+
+def _list_7z(path: Path) -> Dict[str, Any]:
+    import py7zr
+
+    # Версії з 7z не визначаються: розпакування solid-блоку читає весь архів
+    with py7zr.SevenZipFile(path, mode="r") as archive:
+        entries = [
+            {"name": info.filename, "size": info.uncompressed or 0}
+            for info in archive.list()
+            if not info.is_directory
+        ]
+    revit_files = sum(1 for entry in entries if entry["name"].lower().endswith(REVIT_EXTENSIONS))
+    return {"entries": entries, "revit_files": revit_files, "versions": set()}
+
+
+def inspect_archive(path: str) -> Dict[str, Any]:
+    """
+    Читає вміст архіву (виконується в окремому процесі)
+
+    Returns:
+        Поля для product_files
+    """
+    archive_path = Path(path)
+    result: Dict[str, Any] = {
+        "sha256": _file_sha256(archive_path),
+        "size_bytes": archive_path.stat().st_size,
+        "entry_count": 0,
+        "uncompressed_size": 0,
+        "revit_file_count": 0,
+        "revit_versions": [],
+        "min_revit_version": None,
+        "max_revit_version": None,
+        "entries": [],
+        "error": None,
+    }
+
+    try:
+        if zipfile.is_zipfile(archive_path):
+            listing = _list_zip(archive_path)
+        elif archive_path.suffix.lower() == ".7z":
+            listing = _list_7z(archive_path)
+        else:
+            result["status"] = ArchiveIndexStatus.UNSUPPORTED
+            return result
+    except Exception as e:
+        result["status"] = ArchiveIndexStatus.FAILED
+        result["error"] = str(e)[:500]
+        return result
+
+    versions = sorted(listing["versions"])
+    result.update(
+        status=ArchiveIndexStatus.INDEXED,
+        entry_count=len(listing["entries"]),
+        uncompressed_size=sum(entry["size"] for entry in listing["entries"]),
+        revit_file_count=listing["revit_files"],
+        revit_versions=versions,
+        min_revit_version=versions[0] if versions else None,
+        max_revit_version=versions[-1] if versions else None,
+        entries=listing["entries"][:ARCHIVE_PREVIEW_ENTRIES],
+    )
+    return result
+
+
+async def save_archive_index(db: AsyncSession, archive_url: str, data: Dict[str, Any]):
+    """Записує результат індексації (upsert за шляхом архіву)"""
+    product_id = (
+        select(Product.id)
+        .where(Product.zip_file_path == archive_url)
+        .order_by(Product.id.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    stmt = insert(ProductFile).values(archive_path=archive_url, product_id=product_id, **data)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ProductFile.archive_path],
+        set_={
+            **{key: stmt.excluded[key] for key in data},
+            "product_id": func.coalesce(stmt.excluded.product_id, ProductFile.product_id),
+            "indexed_at": func.now(),
+        }
+    )
+    await db.execute(stmt)
+    await db.commit()
+
+
+async def index_archive(archive_url: str) -> Optional[Dict[str, Any]]:
+    """
+    Індексує завантажений архів (фонова задача після upload)
+
+    Args:
+        archive_url: Шлях виду /uploads/archives/<file>
+    """
+    path = Path(settings.UPLOAD_PATH) / archive_url.removeprefix("/uploads/")
+    try:
+        data = await cpu_executor.run(inspect_archive, str(path))
+        async with AsyncSessionLocal() as db:
+            await save_archive_index(db, archive_url, data)
+    except Exception as e:
+        logger.error(f"Failed to index archive {archive_url}: {e}", exc_info=True)
+        return None
+
+    logger.info(
+        f"Indexed archive {archive_url}: {data['status'].value}, {data['entry_count']} entries, "
+        f"Revit {data['revit_versions']}"
+    )
+    return data
+
+
+async def link_product_files(db: AsyncSession, product: Product):
+    """
+    Прив'язує індекс архіву до товару після збереження zip_file_path
+
+    Індекс попереднього архіву товару відв'язується. Коміт — на стороні виклику.
+    """
+    await db.execute(
+        update(ProductFile)
+        .where(ProductFile.product_id == product.id, ProductFile.archive_path != product.zip_file_path)
+        .values(product_id=None)
+    )
+    await db.execute(
+        update(ProductFile)
+        .where(ProductFile.archive_path == product.zip_file_path)
+        .values(product_id=product.id)
+    )
+
+
+def compatible_with_revit(version: int):
+    """
+    Умова для запиту товарів: усі Revit-файли архіву відкриваються у version
+
+    Використовує індекс (product_id, max_revit_version). Товари, архів яких
+    ще не проіндексовано (до backfill або RAR), вважаються сумісними.
+    """
+    indexed = (
+        select(ProductFile.id)
+        .where(
+            ProductFile.product_id == Product.id,
+            ProductFile.status == ArchiveIndexStatus.INDEXED
+        )
+    )
+    return or_(
+        indexed.where(ProductFile.max_revit_version <= version).exists(),
+        ~indexed.exists()
+    )
+
+
+async def backfill_archive_index(limit: int = ARCHIVE_BACKFILL_BATCH) -> Dict[str, Any]:
+    """
+    Індексує архіви товарів, завантажені до появи product_files
+
+    Обробляє до limit архівів за запуск (задача планувальника повторює,
+    доки є що індексувати). Відсутній на диску файл записується як FAILED,
+    щоб не потрапляти у вибірку знову.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(Product.zip_file_path)
+            .where(
+                Product.zip_file_path.like("/uploads/%"),
+                ~select(ProductFile.id).where(ProductFile.archive_path == Product.zip_file_path).exists()
+            )
+            .distinct()
+            .limit(limit)
+        )
+        archive_urls = list(result.scalars())
+
+        indexed = failed = 0
+        for archive_url in archive_urls:
+            path = Path(settings.UPLOAD_PATH) / archive_url.removeprefix("/uploads/")
+            if not path.is_file():
+                await save_archive_index(db, archive_url, {
+                    "status": ArchiveIndexStatus.FAILED,
+                    "error": "Archive file not found",
+                })
+                failed += 1
+                continue
+            try:
+                data = await cpu_executor.run(inspect_archive, str(path))
+                await save_archive_index(db, archive_url, data)
+            except Exception as e:
+                # Фіксуємо FAILED, щоб битий архів не брався щоразу (лише явний reindex)
+                logger.error(f"Failed to index archive {archive_url}: {e}", exc_info=True)
+                await db.rollback()
+                await save_archive_index(db, archive_url, {
+                    "status": ArchiveIndexStatus.FAILED,
+                    "error": str(e) or type(e).__name__,
+                })
+                failed += 1
+                continue
+            indexed += 1
+
+    if archive_urls:
+        logger.info(f"Archive index backfill: {indexed} indexed, {failed} failed")
+    return {"indexed": indexed, "failed": failed, "remaining": len(archive_urls) == limit}
@@ -0,0 +1,354 @@
+"""
+Колонковий індекс каталогу в пам'яті воркера
+
+Публічні товари зберігаються як NumPy-масиви (id, ціна, рейтинг, дата,
+завантаження, автор, знижка), а категорії та типи — як булеві маски
+(bitset) над тими ж рядками. Фільтр списку — це AND масок, сортування —
+заздалегідь пораховані перестановки, тож сторінка і total рахуються
+векторно без запиту до Postgres. Пошук по тексту та сумісність з Revit
+індекс не обслуговує — такі запити йдуть у БД.
+
+Postgres лишається джерелом правди. Зміна товару публікується в Redis
+(лічильник версій + sorted set id -> версія); кожен воркер раз на
+CATALOG_INDEX_SYNC_SECONDS довантажує змінені товари і патчить індекс, а раз
+на CATALOG_INDEX_REBUILD_SECONDS перебудовує його повністю (лічильники
+завантажень і рейтинги змінюються без подій). Воркер, що змінив товар,
+патчить індекс одразу на наступному запиті списку.
+
+NumPy імпортується лише при побудові індексу (не на старті застосунку),
+а масиви будуються в потоці, щоб не блокувати event loop.
+"""
+import asyncio
+import logging
+import time
+from decimal import ROUND_CEILING, ROUND_FLOOR, Decimal
+from functools import cached_property
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.products.models import Product, product_categories, public_product_condition
+from app.products.schemas import ProductFilter
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CATALOG_VERSION_KEY = "catalog:version"
+CATALOG_CHANGES_KEY = "catalog:changes"
+
+# Скільки останніх версій змін тримати; воркер, що відстав більше, перебудовує індекс
+CATALOG_CHANGES_KEEP = 1000
+
+# Атомарно: нова версія, id товарів з цією версією, обрізання старих змін
+_PUBLISH_SCRIPT = """
+local version = redis.call('incr', KEYS[1])
+for _, product_id in ipairs(ARGV) do
+    redis.call('zadd', KEYS[2], version, product_id)
+end
+redis.call('zremrangebyscore', KEYS[2], '-inf', version - tonumber(%d))
+return version
+""" % CATALOG_CHANGES_KEEP
+
+# NULL у колонках: у DESC-сортуванні Postgres ставить NULL першими
+_NULL_FIRST_DESC = 2 ** 63 - 1  # np.iinfo(np.int64).max
+_NO_AUTHOR = -1
+_NO_RATING = -1
+_NO_SALE_FLAG = -1
+
+_COLUMNS = ("ids", "price", "rating", "created", "downloads", "author", "on_sale")
+
+
+def _cents(value: Optional[Decimal], empty: int) -> int:
+    return empty if value is None else int(value * 100)
+
+
+def _row_values(row: Any) -> Tuple[int, ...]:
+    return (
+        row.id,
+        _cents(row.price, 0),
+        _cents(row.average_rating, _NO_RATING),
+        int(row.created_at.timestamp() * 1_000_000) if row.created_at else _NULL_FIRST_DESC,
+        _NULL_FIRST_DESC if row.downloads_count is None else row.downloads_count,
+        _NO_AUTHOR if row.author_id is None else row.author_id,
+        _NO_SALE_FLAG if row.is_on_sale is None else int(row.is_on_sale),
+    )
+
+
+class CatalogSnapshot:
+    """Незмінний зріз каталогу: колонки, маски категорій і типів"""
+
+    def __init__(
+            self,
+            columns: Dict[str, "np.ndarray"],
+            categories: Dict[int, "np.ndarray"],
+            types: Dict[str, "np.ndarray"]
+    ):
+        self.columns = columns
+        self.categories = categories
+        self.types = types
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Any], links: Iterable[Tuple[int, int]]) -> "CatalogSnapshot":
+        """Зріз з рядків products і пар (product_id, category_id)"""
+        import numpy as np
+
+        rows = list(rows)
+        values = np.array([_row_values(row) for row in rows], dtype=np.int64).reshape(len(rows), len(_COLUMNS))
+        columns = {name: np.ascontiguousarray(values[:, i]) for i, name in enumerate(_COLUMNS)}
+
+        ids = columns["ids"]
+        types = {}
+        product_types = np.array([row.product_type.value for row in rows], dtype=object)
+        for product_type in set(product_types):
+            types[product_type] = product_types == product_type
+
+        categories = {}
+        positions = {product_id: i for i, product_id in enumerate(ids.tolist())}
+        for product_id, category_id in links:
+            if product_id in positions:
+                mask = categories.setdefault(category_id, np.zeros(len(ids), dtype=bool))
+                mask[positions[product_id]] = True
+        return cls(columns, categories, types)
+
+    @property
+    def size(self) -> int:
+        return len(self.columns["ids"])
+
+    def without(self, product_ids: Iterable[int]) -> "CatalogSnapshot":
+        import numpy as np
+
+        keep = ~np.isin(self.columns["ids"], np.fromiter(product_ids, dtype=np.int64))
+        return CatalogSnapshot(
+            {name: column[keep] for name, column in self.columns.items()},
+            {key: mask[keep] for key, mask in self.categories.items()},
+            {key: mask[keep] for key, mask in self.types.items()},
+        )
+
+    def concat(self, other: "CatalogSnapshot") -> "CatalogSnapshot":
+        import numpy as np
+
+        def masks(ours: Dict, theirs: Dict) -> Dict:
+            return {
+                key: np.concatenate([
+                    ours.get(key, np.zeros(self.size, dtype=bool)),
+                    theirs.get(key, np.zeros(other.size, dtype=bool)),
+                ])
+                for key in ours.keys() | theirs.keys()
+            }
+
+        return CatalogSnapshot(
+            {name: np.concatenate([column, other.columns[name]]) for name, column in self.columns.items()},
+            masks(self.categories, other.categories),
+            masks(self.types, other.types),
+        )
+
+    @cached_property
+    def orders(self) -> Dict[str, "np.ndarray"]:
+        """Перестановки рядків для кожного сортування (як ProductService._list_order)"""
+        import numpy as np
+
+        ids = self.columns["ids"]
+        return {
+            "newest": np.lexsort((ids, self.columns["created"]))[::-1],
+            "price_asc": np.lexsort((-ids, self.columns["price"])),
+            "price_desc": np.lexsort((ids, self.columns["price"]))[::-1],
+            "popular": np.lexsort((ids, self.columns["downloads"]))[::-1],
+        }
+
+    def mask(self, filters: Optional[ProductFilter]) -> "np.ndarray":
+        """Рядки, що проходять фільтри (умови ProductService._list_conditions)"""
+        import numpy as np
+
+        mask = np.ones(self.size, dtype=bool)
+        if not filters:
+            return mask
+        empty = np.zeros(self.size, dtype=bool)
+        columns = self.columns
+
+        if filters.category_id:
+            mask &= self.categories.get(filters.category_id, empty)
+        if filters.product_type:
+            mask &= self.types.get(filters.product_type.value, empty)
+        if filters.is_on_sale is not None:
+            mask &= columns["on_sale"] == int(filters.is_on_sale)
+        if filters.min_price is not None:
+            mask &= columns["price"] >= int((filters.min_price * 100).to_integral_value(ROUND_CEILING))
+        if filters.max_price is not None:
+            mask &= columns["price"] <= int((filters.max_price * 100).to_integral_value(ROUND_FLOOR))
+        if filters.min_rating is not None:
+            mask &= columns["rating"] >= int((filters.min_rating * 100).to_integral_value(ROUND_CEILING))
+        if filters.creator_only is True:
+            mask &= columns["author"] != _NO_AUTHOR
+        if filters.author_id is not None:
+            mask &= columns["author"] == filters.author_id
+        return mask
+
+    def query(self, filters: Optional[ProductFilter], limit: int, offset: int) -> Tuple[List[int], int]:
+        """ID сторінки в порядку сортування і загальна кількість"""
+        sort_by = filters.sort_by.value if filters and filters.sort_by else "newest"
+        order = self.orders.get(sort_by, self.orders["newest"])
+        matched = order[self.mask(filters)[order]]
+        return self.columns["ids"][matched[offset:offset + limit]].tolist(), len(matched)
+
+
+def _build_snapshot(
+        rows: List[Any],
+        links: List[Any],
+        base: Optional[CatalogSnapshot] = None,
+        replaced: Iterable[int] = ()
+) -> CatalogSnapshot:
+    """
+    Будує зріз (виконується в потоці)
+
+    З base — замінює в ньому товари replaced на rows. Перестановки
+    сортувань рахуються тут же, а не на першому запиті списку.
+    """
+    snapshot = CatalogSnapshot.from_rows(rows, links)
+    if base is not None:
+        snapshot = base.without(replaced).concat(snapshot)
+    snapshot.orders
+    return snapshot
+
+
+class CatalogIndex:
+    """Індекс каталогу воркера з синхронізацією через події в Redis"""
+
+    def __init__(self):
+        self.snapshot: Optional[CatalogSnapshot] = None
+        self.version = 0
+        self.built_at: Optional[float] = None
+        self.rebuilds = 0
+        self.patches = 0
+        self.queries = 0
+        self._pending: Set[int] = set()
+        self._lock = asyncio.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.snapshot is not None
+
+    def can_serve(self, filters: Optional[ProductFilter]) -> bool:
+        if not self.ready:
+            return False
+        return not filters or (not filters.search and filters.revit_version is None)
+
+    async def query(
+            self,
+            db: AsyncSession,
+            filters: Optional[ProductFilter],
+            limit: int,
+            offset: int
+    ) -> Tuple[List[int], int]:
+        if self._pending:
+            await self.patch(db, self._pending)
+        self.queries += 1
+        return self.snapshot.query(filters, limit, offset)
+
+    async def publish_change(self, product_ids: Iterable[int]):
+        """Повідомляє всі воркери про зміну товарів"""
+        product_ids = list(product_ids)
+        if self.ready:
+            self._pending.update(product_ids)
+        try:
+            publish = cache.redis.register_script(_PUBLISH_SCRIPT)
+            await publish(keys=[CATALOG_VERSION_KEY, CATALOG_CHANGES_KEY], args=product_ids)
+        except Exception as e:
+            # Інші воркери підхоплять зміну під час повної перебудови
+            logger.warning(f"Cannot publish catalog change {product_ids}: {e}")
+
+    @staticmethod
+    async def _load(db: AsyncSession, product_ids: Optional[List[int]] = None) -> Tuple[List[Any], List[Any]]:
+        """Рядки товарів і пари (product_id, category_id) з БД"""
+        query = select(
+            Product.id, Product.price, Product.average_rating, Product.created_at, Product.downloads_count,
+            Product.author_id, Product.is_on_sale, Product.product_type
+        ).where(public_product_condition())
+        if product_ids is not None:
+            query = query.where(Product.id.in_(product_ids))
+        rows = (await db.execute(query)).all()
+
+        links_query = select(product_categories.c.product_id, product_categories.c.category_id)
+        if product_ids is not None:
+            links_query = links_query.where(product_categories.c.product_id.in_(product_ids))
+        links = (await db.execute(links_query)).all()
+        return rows, links
+
+    async def rebuild(self, db: AsyncSession):
+        async with self._lock:
+            version = int(await cache.redis.get(CATALOG_VERSION_KEY) or 0)
+            started = time.perf_counter()
+            rows, links = await self._load(db)
+            self.snapshot = await asyncio.to_thread(_build_snapshot, rows, links)
+            self.version = version
+            self._pending.clear()
+            self.built_at = time.time()
+            self.rebuilds += 1
+        logger.info(
+            f"Catalog index rebuilt: {self.snapshot.size} products in "
+            f"{(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+
+    async def patch(self, db: AsyncSession, product_ids: Iterable[int]):
+        """Перечитує товари з БД; непублічні та видалені випадають з індексу"""
+        product_ids = sorted(set(product_ids))
+        async with self._lock:
+            self._pending.difference_update(product_ids)
+            rows, links = await self._load(db, product_ids)
+            self.snapshot = await asyncio.to_thread(
+                _build_snapshot, rows, links, self.snapshot, product_ids
+            )
+            self.patches += 1
+
+    async def sync(self, db: AsyncSession):
+        """Застосовує зміни інших воркерів або перебудовує індекс"""
+        if not self.ready or time.time() - self.built_at >= settings.CATALOG_INDEX_REBUILD_SECONDS:
+            await self.rebuild(db)
+            return
+
+        version = int(await cache.redis.get(CATALOG_VERSION_KEY) or 0)
+        if version == self.version:
+            return
+        if version < self.version or version - self.version >= CATALOG_CHANGES_KEEP:
+            # Redis очищено або частину змін вже обрізано
+            await self.rebuild(db)
+            return
+
+        changes = await cache.redis.zrangebyscore(
+            CATALOG_CHANGES_KEY, f"({self.version}", version, withscores=True
+        )
+        if changes:
+            await self.patch(db, (int(product_id) for product_id, _ in changes))
+        self.version = version
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "products": self.snapshot.size if self.ready else 0,
+            "categories": len(self.snapshot.categories) if self.ready else 0,
+            "version": self.version,
+            "built_at": self.built_at,
+            "rebuilds": self.rebuilds,
+            "patches": self.patches,
+            "queries": self.queries,
+        }
+
+
+catalog_index = CatalogIndex()
+
+
+async def run_catalog_index(index: Optional[CatalogIndex] = None):
+    """Фонова синхронізація індексу воркера"""
+    index = index or catalog_index
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                await index.sync(db)
+        except Exception as e:
+            logger.error(f"Catalog index sync failed: {e}")
+        await asyncio.sleep(settings.CATALOG_INDEX_SYNC_SECONDS)
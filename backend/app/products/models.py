@@ -1,7 +1,8 @@
 from sqlalchemy import (
-    Column, Integer, String, Text, Numeric, Boolean,
-    ForeignKey, Table, DateTime, Enum, ARRAY, UniqueConstraint
+    or_, Column, Integer, String, Text, Numeric, Boolean,
+    ForeignKey, Table, DateTime, Enum, ARRAY, UniqueConstraint, BigInteger, Index
 )
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship, Mapped
 from sqlalchemy.sql import func
 import enum
@@ -101,7 +102,7 @@ class Product(Base):
     )
 
     # Marketplace: автор товару (NULL = адмін/платформа)
-    author_id = Column(Integer, ForeignKey('users.id'), nullable=True)
+    author_id = Column(Integer, ForeignKey('users.id'), nullable=True, index=True)
 
     # Marketplace: статус модерації (NULL або APPROVED = старі товари, автоматично публічні)
     moderation_status = Column(Enum(ModerationStatus), nullable=True, default=None)
@@ -114,6 +115,8 @@ class Product(Base):
     # Медіа
     main_image_url = Column(String(500), nullable=False)
     gallery_image_urls = Column(ARRAY(String), default=list)
+    # Похідні зображень {url: {width, height, placeholder, srcset}}
+    image_variants = Column(JSONB, nullable=True)
 
     # Файли
     zip_file_path = Column(String(500), nullable=False)
@@ -187,6 +190,14 @@ class Product(Base):
         return f"<Product(id={self.id}, type={self.product_type})>"
 
 
+def public_product_condition():
+    """Умова публічного товару: схвалений або legacy без статусу модерації"""
+    return or_(
+        Product.moderation_status == ModerationStatus.APPROVED,
+        Product.moderation_status.is_(None)  # Старі товари без модерації
+    )
+
+
 class ProductTranslation(Base):
     """Модель для зберігання перекладів товару"""
     __tablename__ = "product_translations"
@@ -216,4 +227,48 @@ class ProductTranslation(Base):
     )
 
     def __repr__(self):
-        return f"<ProductTranslation(product_id={self.product_id}, lang={self.language_code})>"
\ No newline at end of file
+        return f"<ProductTranslation(product_id={self.product_id}, lang={self.language_code})>"
+
+
+class ArchiveIndexStatus(str, enum.Enum):
+    INDEXED = "indexed"
+    UNSUPPORTED = "unsupported"  # Формат без читання списку файлів (RAR)
+    FAILED = "failed"
+
+
+class ProductFile(Base):
+    """Результат індексації архіву товару: вміст, розміри, версії Revit"""
+    __tablename__ = "product_files"
+
+    id = Column(Integer, primary_key=True, index=True)
+    archive_path = Column(String(500), nullable=False, unique=True)  # /uploads/archives/...
+    product_id = Column(Integer, ForeignKey('products.id', ondelete='SET NULL'), nullable=True, index=True)
+
+    status = Column(Enum(ArchiveIndexStatus), nullable=False)
+    error = Column(Text, nullable=True)
+
+    sha256 = Column(String(64), nullable=True, index=True)
+    size_bytes = Column(BigInteger, nullable=False, default=0)
+    entry_count = Column(Integer, nullable=False, default=0)
+    uncompressed_size = Column(BigInteger, nullable=False, default=0)
+    revit_file_count = Column(Integer, nullable=False, default=0)
+
+    # Версії Revit, знайдені в .rfa/.rvt; файл відкривається в своїй та новіших
+    # версіях, тому для фільтра сумісності індексується максимальна
+    revit_versions = Column(ARRAY(Integer), nullable=False, default=list)
+    min_revit_version = Column(Integer, nullable=True)
+    max_revit_version = Column(Integer, nullable=True)
+
+    # Перші ARCHIVE_PREVIEW_ENTRIES записів для "що всередині"
+    entries = Column(JSONB, nullable=False, default=list)
+
+    indexed_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    product = relationship("Product", backref="files")
+
+    __table_args__ = (
+        Index('ix_product_files_product_max_revit', 'product_id', 'max_revit_version'),
+    )
+
+    def __repr__(self):
+        return f"<ProductFile(path={self.archive_path}, status={self.status})>"
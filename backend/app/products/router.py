@@ -1,29 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Header, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query, Header, BackgroundTasks, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List
-from sqlalchemy import select, func
+from sqlalchemy import select, func, or_
 from sqlalchemy.orm import selectinload, joinedload
 from pydantic import BaseModel
 
 from app.core.database import get_db
 from app.core.auth import require_admin
 from app.users.models import User
-from app.products.service import product_service
+from app.products.service import (
+    product_service, categories_cache_key, CATEGORIES_CACHE_PATTERN, CATEGORIES_CACHE_TTL
+)
 from app.products.schemas import (
     ProductCreate,
     ProductUpdate,
     ProductResponse,
+    ProductListResponse,
     PaginatedProductsResponse,
     ProductFilter,
     CategoryCreate,
-    CategoryResponse
+    CategoryResponse,
+    ProductFilesResponse,
+    ProductBatchResponse
 )
-from app.products.models import Category, CategoryTranslation, Product, ProductType
+from app.products.models import Category, CategoryTranslation, Product, ProductType, ProductFile, ModerationStatus
 from app.core.translations import get_text
+from app.core.cache import cache
+from app.core.projection import UnknownFieldsError, parse_fields
+from app.core.http_cache import CATALOG_POLICY, PRODUCT_POLICY, REFERENCE_POLICY, conditional_response
+from app.core.response_cache import cached_body
 
 router = APIRouter()
 admin_router = APIRouter()
 
+PLATFORM_STATS_CACHE_TTL = 300
+
+# Скільки товарів можна запросити через /products/batch
+MAX_BATCH_IDS = 100
+
 
 class PlatformStatsResponse(BaseModel):
     total_downloads: int
@@ -43,8 +57,19 @@ def _parse_language_header(accept_language: str) -> str:
     return lang
 
 
+def _parse_fields(fields: Optional[str], model, language_code: str):
+    try:
+        return parse_fields(fields, model)
+    except UnknownFieldsError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=get_text("product_error_unknown_fields", language_code, fields=", ".join(sorted(e.fields)))
+        )
+
+
 @router.get("", response_model=PaginatedProductsResponse)
 async def get_products(
+        request: Request,
         accept_language: Optional[str] = Header(default="uk"),
         category_id: Optional[int] = Query(None),
         product_type: Optional[str] = Query(None),
@@ -56,83 +81,127 @@ async def get_products(
         creator_only: Optional[bool] = Query(None, description="Показувати тільки товари креаторів"),
         author_id: Optional[int] = Query(None, description="Фільтр по автору"),
         search: Optional[str] = Query(None, min_length=2, max_length=100, description="Пошук по назві/опису"),
+        revit_version: Optional[int] = Query(None, ge=2000, le=2100, description="Сумісність з версією Revit"),
         limit: int = Query(20, ge=1, le=100),
         offset: int = Query(0, ge=0),
+        fields: Optional[str] = Query(None, description="Поля відповіді через кому (id завжди)"),
         db: AsyncSession = Depends(get_db)
 ):
     language_code = _parse_language_header(accept_language)
+    projection = _parse_fields(fields, ProductListResponse, language_code)
     filters = ProductFilter(
         category_id=category_id, product_type=product_type, is_on_sale=is_on_sale,
         min_price=min_price, max_price=max_price, min_rating=min_rating,
-        sort_by=sort_by, creator_only=creator_only, author_id=author_id, search=search
+        sort_by=sort_by, creator_only=creator_only, author_id=author_id, search=search,
+        revit_version=revit_version
     )
-    return await product_service.get_products_list(
-        language_code=language_code, db=db, filters=filters, limit=limit, offset=offset
+    body = await product_service.get_products_list_body(
+        language_code=language_code, db=db, filters=filters, limit=limit, offset=offset, fields=projection
     )
+    return conditional_response(request, body, CATALOG_POLICY)
 
 
 @router.get("/categories", response_model=List[CategoryResponse])
 async def get_categories(
+        request: Request,
         accept_language: Optional[str] = Header(default="uk"),
         db: AsyncSession = Depends(get_db)
 ):
     language_code = _parse_language_header(accept_language)
 
-    result = await db.execute(
-        select(Category).options(
-            joinedload(Category.translations)
+    async def build():
+        result = await db.execute(
+            select(Category).options(
+                joinedload(Category.translations)
+            )
         )
-    )
-    categories = result.scalars().unique().all()
-
-    response_data = []
-    for category in categories:
-        translation = next(
-            (t for t in category.translations if t.language_code == language_code),
-            next((t for t in category.translations if t.language_code == 'uk'), None)
-        )
-        if translation:
-            response_data.append({
-                "id": category.id,
-                "slug": category.slug,
-                "name": translation.name
-            })
-    return response_data
+        categories = result.scalars().unique().all()
+
+        response_data = []
+        for category in categories:
+            translation = next(
+                (t for t in category.translations if t.language_code == language_code),
+                next((t for t in category.translations if t.language_code == 'uk'), None)
+            )
+            if translation:
+                response_data.append({
+                    "id": category.id,
+                    "slug": category.slug,
+                    "name": translation.name
+                })
+        return response_data
+
+    body = await cached_body(categories_cache_key(language_code), build, ttl=CATEGORIES_CACHE_TTL)
+    return conditional_response(request, body, REFERENCE_POLICY)
 
 
 @router.get("/stats/platform", response_model=PlatformStatsResponse)
 async def get_platform_stats(
+        request: Request,
         db: AsyncSession = Depends(get_db)
 ):
     """
     Публічна статистика платформи.
     Повертає загальну кількість завантажень, користувачів, товарів та безкоштовних товарів.
     """
-    # Total downloads (all products)
-    total_downloads = await db.scalar(
-        select(func.coalesce(func.sum(Product.downloads_count), 0))
-    ) or 0
-
-    # Total users
-    total_users = await db.scalar(select(func.count(User.id))) or 0
-
-    # Total products
-    total_products = await db.scalar(
-        select(func.count(Product.id))
-    ) or 0
-
-    # Free products
-    free_products = await db.scalar(
-        select(func.count(Product.id))
-        .where(Product.product_type == ProductType.FREE)
-    ) or 0
-
-    return PlatformStatsResponse(
-        total_downloads=int(total_downloads),
-        total_users=total_users,
-        total_products=total_products,
-        free_products=free_products
-    )
+    async def build():
+        # Total downloads (all products)
+        total_downloads = await db.scalar(
+            select(func.coalesce(func.sum(Product.downloads_count), 0))
+        ) or 0
+
+        # Total users
+        total_users = await db.scalar(select(func.count(User.id))) or 0
+
+        # Total products
+        total_products = await db.scalar(
+            select(func.count(Product.id))
+        ) or 0
+
+        # Free products
+        free_products = await db.scalar(
+            select(func.count(Product.id))
+            .where(Product.product_type == ProductType.FREE)
+        ) or 0
+
+        return PlatformStatsResponse(
+            total_downloads=int(total_downloads),
+            total_users=total_users,
+            total_products=total_products,
+            free_products=free_products
+        ).model_dump()
+
+    # Статистика приблизна: оновлюється раз на PLATFORM_STATS_CACHE_TTL
+    body = await cached_body("platform_stats:body", build, ttl=PLATFORM_STATS_CACHE_TTL)
+    return conditional_response(request, body, REFERENCE_POLICY)
+
+
+@router.get("/batch", response_model=ProductBatchResponse)
+async def get_products_batch(
+        request: Request,
+        ids: str = Query(..., description="ID товарів через кому, до MAX_BATCH_IDS"),
+        lang: Optional[str] = Query(None, description="Мова; за замовчуванням з Accept-Language"),
+        fields: Optional[str] = Query(None, description="Поля відповіді через кому (id завжди)"),
+        accept_language: Optional[str] = Header(default="uk"),
+        db: AsyncSession = Depends(get_db)
+):
+    """Картки кількох товарів (кошик, колекції, доступи) одним запитом"""
+    language_code = _parse_language_header(lang or accept_language)
+    projection = _parse_fields(fields, ProductListResponse, language_code)
+    try:
+        product_ids = list(dict.fromkeys(int(value) for value in ids.split(",") if value.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=get_text("product_error_batch_ids_invalid", language_code))
+    if not product_ids:
+        raise HTTPException(status_code=400, detail=get_text("product_error_batch_ids_empty", language_code))
+    if len(product_ids) > MAX_BATCH_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=get_text("product_error_batch_ids_too_many", language_code, max=MAX_BATCH_IDS)
+        )
+
+    body = await product_service.get_cards_batch_body(product_ids, language_code, db, projection)
+    return conditional_response(request, body, CATALOG_POLICY)
 
 
 @router.get("/autocomplete/search", response_model=List[dict])
@@ -175,20 +244,65 @@ async def autocomplete_search(
 
 @router.get("/{product_id}", response_model=ProductResponse)
 async def get_product(
+        request: Request,
         product_id: int,
         accept_language: Optional[str] = Header(default="uk"),
+        fields: Optional[str] = Query(None, description="Поля відповіді через кому (id завжди)"),
         db: AsyncSession = Depends(get_db),
         background_tasks: BackgroundTasks = BackgroundTasks()
 ):
     language_code = _parse_language_header(accept_language)
-    product = await product_service.get_product(product_id=product_id, language_code=language_code, db=db)
-    if not product:
+    projection = _parse_fields(fields, ProductResponse, language_code)
+    body = await product_service.get_product_body(
+        product_id=product_id, language_code=language_code, db=db, fields=projection
+    )
+    if not body:
         raise HTTPException(
             status_code=404,
             detail=get_text("product_error_not_found", language_code)
         )
     background_tasks.add_task(product_service.increment_view_count, product_id, db)
-    return product
+    return conditional_response(request, body, PRODUCT_POLICY)
+
+
+@router.get("/{product_id}/files", response_model=ProductFilesResponse)
+async def get_product_files(
+        product_id: int,
+        accept_language: Optional[str] = Header(default="uk"),
+        db: AsyncSession = Depends(get_db)
+):
+    """Що всередині архіву товару (з індексу, без читання архіву)"""
+    language_code = _parse_language_header(accept_language)
+    result = await db.execute(
+        select(ProductFile)
+        .join(Product, Product.id == ProductFile.product_id)
+        .where(
+            ProductFile.product_id == product_id,
+            ProductFile.archive_path == Product.zip_file_path,
+            or_(
+                Product.moderation_status == ModerationStatus.APPROVED,
+                Product.moderation_status.is_(None)
+            )
+        )
+    )
+    product_file = result.scalar_one_or_none()
+    if not product_file:
+        raise HTTPException(
+            status_code=404,
+            detail=get_text("product_error_not_found", language_code)
+        )
+
+    return ProductFilesResponse(
+        status=product_file.status.value,
+        entry_count=product_file.entry_count,
+        uncompressed_size=product_file.uncompressed_size,
+        revit_file_count=product_file.revit_file_count,
+        revit_versions=product_file.revit_versions or [],
+        min_revit_version=product_file.min_revit_version,
+        max_revit_version=product_file.max_revit_version,
+        entries=product_file.entries or [],
+        sha256=product_file.sha256
+    )
 
 
 @router.get("/slug/{slug}", response_model=ProductResponse)
@@ -320,6 +434,7 @@ async def create_category(
     category = Category(**category_data.dict())
     db.add(category)
     await db.commit()
+    await cache.delete_pattern(CATEGORIES_CACHE_PATTERN)
     await db.refresh(category)
 
     return category
\ No newline at end of file
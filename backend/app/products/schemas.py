@@ -1,6 +1,6 @@
 # backend/app/products/schemas.py
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from decimal import Decimal
 from datetime import datetime
 from enum import Enum
@@ -94,6 +94,7 @@ class ProductFilter(BaseModel):
     creator_only: Optional[bool] = None  # Фільтр для товарів тільки від креаторів
     author_id: Optional[int] = Field(None, description="Фільтр по конкретному автору (креатору)")
     search: Optional[str] = Field(None, min_length=2, max_length=100, description="Пошук по назві/опису")
+    revit_version: Optional[int] = Field(None, ge=2000, le=2100, description="Сумісність з версією Revit")
 
 
 class ProductTranslationResponse(BaseModel):
@@ -112,6 +113,7 @@ class ProductResponse(BaseModel):
     product_type: str
     main_image_url: str
     gallery_image_urls: List[str]
+    image_variants: Dict[str, Any] = {}
     zip_file_path: str
     file_size_mb: float
     compatibility: Optional[str]
@@ -133,6 +135,7 @@ class ProductListResponse(BaseModel):
     price: Decimal # Decimal
     product_type: str
     main_image_url: str
+    main_image_variants: Optional[Dict[str, Any]] = None
     is_on_sale: bool
     sale_price: Optional[Decimal] # Decimal
     actual_price: Decimal # Decimal
@@ -151,7 +154,31 @@ class PaginatedProductsResponse(BaseModel):
     pages: int
 
 
+class ProductBatchResponse(BaseModel):
+    """Картки кількох товарів у порядку запиту"""
+    products: List[ProductListResponse]
+    missing: List[int]  # Неіснуючі або непублічні товари
+
+
 class ProductAdminResponse(ProductResponse):
     translations: List[ProductTranslationResponse]
     updated_at: Optional[datetime]
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ProductFileEntry(BaseModel):
+    name: str
+    size: int
+
+
+class ProductFilesResponse(BaseModel):
+    """Вміст архіву товару з індексу"""
+    status: str
+    entry_count: int
+    uncompressed_size: int
+    revit_file_count: int
+    revit_versions: List[int]
+    min_revit_version: Optional[int] = None
+    max_revit_version: Optional[int] = None
+    entries: List[ProductFileEntry]
+    sha256: Optional[str] = None
@@ -1,24 +1,196 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, FrozenSet, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, or_, func
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import load_only, noload, selectinload
 from fastapi import BackgroundTasks, HTTPException
 from datetime import datetime, timezone
 import logging
 import json
 
-from app.products.models import Product, Category, ProductTranslation, ProductType, ModerationStatus
+import orjson
+
+from app.products.models import (
+    Product, Category, ProductTranslation, ProductType, ModerationStatus, public_product_condition
+)
 from app.products.translation_service import translation_service
-from app.products.schemas import ProductCreate, ProductUpdate, ProductFilter
+from app.products.archive_index import compatible_with_revit, link_product_files
+from app.products.catalog_index import catalog_index
+from app.products.schemas import (
+    ProductCreate, ProductUpdate, ProductFilter, ProductResponse, ProductListResponse
+)
 from app.core.cache import cache
+from app.core.projection import projection_key, projection_model
+from app.core.response_cache import encode_body, encode_json, get_cached_body, set_cached_body
+from app.core.images import collect_image_variants
 from app.core.translations import get_text
-from app.core.sanitize import sanitize_html, sanitize_text
+from app.core.sanitize import sanitize_html_async, sanitize_text_async
 from app.subscriptions.models import Subscription, SubscriptionStatus, UserProductAccess, AccessType
 from app.core.telegram_service import telegram_service
 from app.users.models import User
 
 logger = logging.getLogger(__name__)
 
+PRODUCT_CACHE_TTL = 300
+CATEGORIES_CACHE_TTL = 3600
+CATEGORIES_CACHE_PATTERN = "categories:*"
+
+
+def categories_cache_key(language_code: str) -> str:
+    return f"categories:{language_code}:body"
+
+
+def product_card_key(product_id: int, language_code: str, fields: Optional[FrozenSet[str]] = None) -> str:
+    # Під шаблоном product:{id}:*, тож скидається разом з карткою товару
+    if fields is None:
+        return f"product:{product_id}:card:{language_code}"
+    # Проекція без локалізованих полів однакова для всіх мов
+    lang = language_code if fields & LOCALIZED_FIELDS else "-"
+    return f"product:{product_id}:card:{lang}:{projection_key(fields)}"
+
+
+# Поля, від яких залежить склад і порядок списків (кешованих списків ID)
+LIST_FIELDS = {
+    "price", "product_type", "is_on_sale", "sale_price", "zip_file_path", "category_ids",
+}
+
+
+async def invalidate_product_cache(product_id: int, lists: bool = True, search_lists: bool = False):
+    """
+    Скидає кеш товару: деталі та картки всіма мовами
+
+    Args:
+        lists: Скинути всі списки ID (змінився склад або порядок)
+        search_lists: Скинути лише пошукові списки (змінився текст)
+    """
+    await cache.delete_pattern(f"product:{product_id}:*")
+    if lists:
+        await cache.delete_pattern("products_list:*")
+        await catalog_index.publish_change([product_id])
+    elif search_lists:
+        await cache.delete_pattern("products_list:search:*")
+
+
+def _author_name(product: Product) -> Optional[str]:
+    if not product.author:
+        return None
+    full_name = f"{product.author.first_name or ''} {product.author.last_name or ''}".strip()
+    if full_name:
+        return full_name
+    if product.author.username:
+        return product.author.username
+    return f"User {product.author.id}"
+
+
+def _category_name(category: Category, language_code: str) -> str:
+    translation = category.get_translation(language_code)
+    return translation.name if translation else category.slug
+
+
+# Поля, що беруться з перекладу товару
+TRANSLATION_FIELDS = frozenset({"title", "description"})
+
+# Поля, значення яких залежить від мови
+LOCALIZED_FIELDS = TRANSLATION_FIELDS | {"categories"}
+
+# Поля відповіді -> колонки products, потрібні для них (для load_only)
+_FIELD_COLUMNS = {
+    "price": (Product.price,),
+    "product_type": (Product.product_type,),
+    "main_image_url": (Product.main_image_url,),
+    "main_image_variants": (Product.main_image_url, Product.image_variants),
+    "gallery_image_urls": (Product.gallery_image_urls,),
+    "image_variants": (Product.image_variants,),
+    "zip_file_path": (Product.zip_file_path,),
+    "file_size_mb": (Product.file_size_mb,),
+    "compatibility": (Product.compatibility,),
+    "is_on_sale": (Product.is_on_sale,),
+    "sale_price": (Product.sale_price,),
+    "actual_price": (Product.price, Product.is_on_sale, Product.sale_price),
+    "views_count": (Product.views_count,),
+    "downloads_count": (Product.downloads_count,),
+    "author_id": (Product.author_id,),
+    "author_name": (Product.author_id,),
+}
+
+# Значення полів: (товар, переклад, мова) -> значення
+_CARD_VALUES = {
+    "id": lambda p, t, lang: p.id,
+    "title": lambda p, t, lang: t.title,
+    "description": lambda p, t, lang: t.description[:200] + "...",
+    "price": lambda p, t, lang: float(p.price),
+    "product_type": lambda p, t, lang: p.product_type.value,
+    "main_image_url": lambda p, t, lang: p.main_image_url,
+    "main_image_variants": lambda p, t, lang: (p.image_variants or {}).get(p.main_image_url),
+    "is_on_sale": lambda p, t, lang: p.is_on_sale,
+    "sale_price": lambda p, t, lang: float(p.sale_price) if p.sale_price else None,
+    "actual_price": lambda p, t, lang: float(p.get_actual_price()),
+    "categories": lambda p, t, lang: [_category_name(cat, lang) for cat in p.categories],
+    "views_count": lambda p, t, lang: p.views_count,
+    "file_size_mb": lambda p, t, lang: float(p.file_size_mb),
+    "author_id": lambda p, t, lang: p.author_id,
+    "author_name": lambda p, t, lang: _author_name(p),
+}
+
+_DETAIL_VALUES = {
+    **_CARD_VALUES,
+    "description": lambda p, t, lang: t.description,
+    "gallery_image_urls": lambda p, t, lang: p.gallery_image_urls,
+    "image_variants": lambda p, t, lang: p.image_variants or {},
+    "zip_file_path": lambda p, t, lang: p.zip_file_path,
+    "compatibility": lambda p, t, lang: p.compatibility,
+    "categories": lambda p, t, lang: [
+        {"id": cat.id, "name": _category_name(cat, lang), "slug": cat.slug} for cat in p.categories
+    ],
+    "downloads_count": lambda p, t, lang: p.downloads_count,
+    "created_at": lambda p, t, lang: p.created_at.isoformat() if p.created_at else None,
+}
+
+
+def _load_options(fields: Optional[FrozenSet[str]]) -> list:
+    """
+    Опції завантаження товару під проекцію
+
+    Непотрібні колонки не читаються (load_only), а переклади, категорії та
+    автор завантажуються лише для полів, яким вони потрібні.
+    """
+    translations = selectinload(Product.translations)
+    categories = selectinload(Product.categories).selectinload(Category.translations)
+    author = selectinload(Product.author)
+    if fields is None:
+        return [translations, categories, author]
+
+    columns = {Product.id, Product.moderation_status, Product.created_at, Product.updated_at}
+    for name in fields:
+        columns.update(_FIELD_COLUMNS.get(name, ()))
+    options = [
+        load_only(*columns),
+        translations if fields & TRANSLATION_FIELDS else noload(Product.translations),
+    ]
+    if "categories" in fields:
+        options.append(categories)
+    if "author_name" in fields:
+        options.append(author)
+    return options
+
+
+def _project(
+        values: Dict[str, Any],
+        product: Product,
+        language_code: str,
+        fields: Optional[FrozenSet[str]]
+) -> Optional[Dict[str, Any]]:
+    """Словник полів товару; None, якщо потрібен переклад, а його немає"""
+    translation = None
+    if fields is None or fields & TRANSLATION_FIELDS:
+        translation = product.get_translation(language_code)
+        if not translation:
+            return None
+    return {
+        name: getter(product, translation, language_code)
+        for name, getter in values.items()
+        if fields is None or name in fields
+    }
+
 
 class ProductService:
     async def create_product(
@@ -39,6 +211,9 @@ class ProductService:
                 is_on_sale=product_data.is_on_sale,
                 sale_price=product_data.sale_price
             )
+            product.image_variants = await collect_image_variants(
+                [product.main_image_url, *product.gallery_image_urls]
+            )
 
             if product_data.category_ids:
                 categories = await db.execute(
@@ -48,10 +223,11 @@ class ProductService:
 
             db.add(product)
             await db.flush()
+            await link_product_files(db, product)
 
             # КРИТИЧНО: Санітизуємо вхідний текст від XSS атак
-            safe_title = sanitize_text(product_data.title_uk)
-            safe_description = sanitize_html(product_data.description_uk)
+            safe_title = await sanitize_text_async(product_data.title_uk)
+            safe_description = await sanitize_html_async(product_data.description_uk)
 
             uk_translation = ProductTranslation(
                 product_id=product.id,
@@ -101,7 +277,7 @@ class ProductService:
                 safe_description
             )
 
-            await cache.delete_pattern("products_list:*")
+            await invalidate_product_cache(product.id)
 
             logger.info(f"Created product ID: {product.id}")
             return product
@@ -148,8 +324,7 @@ class ProductService:
                 successful = sum(1 for success in results.values() if success)
                 logger.info(f"Translate product {product_id}: success {successful}/{len(results)} langs")
 
-                await cache.delete_pattern(f"product:{product_id}:*")
-                await cache.delete_pattern("products_list:*")
+                await invalidate_product_cache(product_id, lists=False, search_lists=True)
 
             except Exception as e:
                 logger.error(f"Error translating product {product_id}: {str(e)}")
@@ -158,20 +333,12 @@ class ProductService:
             self,
             product_id: int,
             language_code: str,
-            db: AsyncSession
+            db: AsyncSession,
+            fields: Optional[FrozenSet[str]] = None
     ) -> Optional[Dict[str, Any]]:
-        cache_key = f"product:{product_id}:{language_code}"
-        cached_data = await cache.get(cache_key)
-        if cached_data:
-            return json.loads(cached_data)
-
-        from app.users.models import User
-
         result = await db.execute(
             select(Product)
-            .options(selectinload(Product.translations))
-            .options(selectinload(Product.categories).selectinload(Category.translations))
-            .options(selectinload(Product.author))
+            .options(*_load_options(fields))
             .where(Product.id == product_id)
         )
         product = result.scalar_one_or_none()
@@ -183,214 +350,263 @@ class ProductService:
         if product.moderation_status not in [ModerationStatus.APPROVED, None]:
             return None  # Повертаємо 404 для непублічних товарів
 
-        translation = product.get_translation(language_code)
-        if not translation:
-            translation = product.get_translation('uk')
-            if not translation:
-                return None
-
-        author_name = None
-        if product.author:
-            full_name = f"{product.author.first_name or ''} {product.author.last_name or ''}".strip()
-            if full_name:
-                author_name = full_name
-            elif product.author.username:
-                author_name = product.author.username
-            else:
-                author_name = f"User {product.author.id}"
-
-        response = {
-            "id": product.id,
-            "title": translation.title,
-            "description": translation.description,
-            "price": float(product.price),
-            "product_type": product.product_type.value,
-            "main_image_url": product.main_image_url,
-            "gallery_image_urls": product.gallery_image_urls,
-            "zip_file_path": product.zip_file_path,
-            "file_size_mb": float(product.file_size_mb),
-            "compatibility": product.compatibility,
-            "is_on_sale": product.is_on_sale,
-            "sale_price": float(product.sale_price) if product.sale_price else None,
-            "actual_price": float(product.get_actual_price()),
-            "categories": [
-                {"id": cat.id,
-                 "name": cat.get_translation(language_code).name if cat.get_translation(language_code) else cat.slug,
-                 "slug": cat.slug}
-                for cat in product.categories
-            ],
-            "views_count": product.views_count,
-            "downloads_count": product.downloads_count,
-            "created_at": product.created_at.isoformat() if product.created_at else None,
-            "author_id": product.author_id,
-            "author_name": author_name
-        }
-
-        await cache.set(cache_key, json.dumps(response), ttl=300)
-
+        response = _project(_DETAIL_VALUES, product, language_code, fields)
+        if response is not None:
+            # Для Last-Modified; проекція відкидає поля, яких не просили
+            response["created_at"] = product.created_at.isoformat() if product.created_at else None
+            response["updated_at"] = product.updated_at.isoformat() if product.updated_at else None
         return response
 
-    async def get_products_list(
+    async def get_product_body(
             self,
+            product_id: int,
             language_code: str,
             db: AsyncSession,
-            filters: Optional[ProductFilter] = None,
-            limit: int = 20,
-            offset: int = 0
-    ) -> Dict[str, Any]:
-        filters_dict = filters.model_dump(exclude_none=True) if filters else {}
-        filters_str = json.dumps(filters_dict, sort_keys=True)
-        cache_key = f"products_list:{language_code}:{limit}:{offset}:{filters_str}"
-
-        cached_data = await cache.get(cache_key)
-        if cached_data:
-            return json.loads(cached_data)
-
-        from app.users.models import User
-
-        query = select(Product).options(
-            selectinload(Product.translations),
-            selectinload(Product.categories).selectinload(Category.translations),
-            selectinload(Product.author)
+            fields: Optional[FrozenSet[str]] = None
+    ) -> Optional[bytes]:
+        """Готове тіло відповіді GET /products/{id} (запис кешу response_cache)"""
+        cache_key = f"product:{product_id}:{language_code}:body"
+        if fields is not None:
+            cache_key += f":{projection_key(fields)}"
+        blob = await get_cached_body(cache_key)
+        if blob:
+            return blob
+
+        product = await self.get_product(product_id, language_code, db, fields)
+        if product is None:
+            return None
+        modified = product["updated_at"] or product["created_at"]
+        blob = encode_body(
+            product,
+            projection_model(ProductResponse, fields),
+            datetime.fromisoformat(modified) if modified else None
         )
+        await set_cached_body(cache_key, blob, ttl=PRODUCT_CACHE_TTL)
+        return blob
 
+    @staticmethod
+    def _list_conditions(filters: Optional[ProductFilter]) -> list:
+        """Умови WHERE списку товарів (спільні для сторінки та підрахунку)"""
         # КРИТИЧНО: Показуємо тільки схвалені товари (або legacy без статусу)
-        query = query.where(
-            or_(
-                Product.moderation_status == ModerationStatus.APPROVED,
-                Product.moderation_status.is_(None)  # Старі товари без модерації
-            )
-        )
-
-        if filters:
-            if filters.category_id:
-                query = query.join(Product.categories).where(
-                    Category.id == filters.category_id
-                )
-            if filters.product_type:
-                query = query.where(Product.product_type == filters.product_type)
-            if filters.is_on_sale is not None:
-                query = query.where(Product.is_on_sale == filters.is_on_sale)
-            if filters.min_price is not None:
-                query = query.where(Product.price >= filters.min_price)
-            if filters.max_price is not None:
-                query = query.where(Product.price <= filters.max_price)
-            if filters.min_rating is not None:
-                query = query.where(Product.average_rating >= filters.min_rating)
-            if filters.creator_only is True:
-                query = query.where(Product.author_id.isnot(None))
-            if filters.author_id is not None:
-                query = query.where(Product.author_id == filters.author_id)
-            if filters.search:
-                # Пошук по назві та опису в перекладах (ILIKE для case-insensitive)
-                search_pattern = f"%{filters.search}%"
-                from app.products.models import ProductTranslation
-                query = query.join(Product.translations).where(
-                    (ProductTranslation.title.ilike(search_pattern)) |
-                    (ProductTranslation.description.ilike(search_pattern))
-                )
-
-        if filters and filters.sort_by:
-            if filters.sort_by == "price_asc":
-                query = query.order_by(Product.price.asc())
-            elif filters.sort_by == "price_desc":
-                query = query.order_by(Product.price.desc())
-            elif filters.sort_by == "newest":
-                query = query.order_by(Product.created_at.desc())
-            elif filters.sort_by == "popular":
-                query = query.order_by(Product.downloads_count.desc())
+        conditions = [public_product_condition()]
+        if not filters:
+            return conditions
+
+        if filters.category_id:
+            conditions.append(Product.categories.any(Category.id == filters.category_id))
+        if filters.product_type:
+            conditions.append(Product.product_type == filters.product_type)
+        if filters.is_on_sale is not None:
+            conditions.append(Product.is_on_sale == filters.is_on_sale)
+        if filters.min_price is not None:
+            conditions.append(Product.price >= filters.min_price)
+        if filters.max_price is not None:
+            conditions.append(Product.price <= filters.max_price)
+        if filters.min_rating is not None:
+            conditions.append(Product.average_rating >= filters.min_rating)
+        if filters.creator_only is True:
+            conditions.append(Product.author_id.isnot(None))
+        if filters.author_id is not None:
+            conditions.append(Product.author_id == filters.author_id)
+        if filters.revit_version is not None:
+            conditions.append(compatible_with_revit(filters.revit_version))
+        if filters.search:
+            # Пошук по назві та опису в перекладах (ILIKE для case-insensitive)
+            search_pattern = f"%{filters.search}%"
+            conditions.append(Product.translations.any(
+                (ProductTranslation.title.ilike(search_pattern)) |
+                (ProductTranslation.description.ilike(search_pattern))
+            ))
+        return conditions
+
+    @staticmethod
+    def _list_order(filters: Optional[ProductFilter]) -> list:
+        sort_by = filters.sort_by if filters else None
+        if sort_by == "price_asc":
+            order = Product.price.asc()
+        elif sort_by == "price_desc":
+            order = Product.price.desc()
+        elif sort_by == "popular":
+            order = Product.downloads_count.desc()
         else:
-            query = query.order_by(Product.created_at.desc())
-
-        query = query.limit(limit).offset(offset)
-        result = await db.execute(query)
-        products = result.scalars().unique().all()
-
-        products_list = []
-        for product in products:
-            translation = product.get_translation(language_code)
-            if translation:
-                author_name = None
-                if product.author:
-                    full_name = f"{product.author.first_name or ''} {product.author.last_name or ''}".strip()
-                    if full_name:
-                        author_name = full_name
-                    elif product.author.username:
-                        author_name = product.author.username
-                    else:
-                        author_name = f"User {product.author.id}"
-
-                products_list.append({
-                    "id": product.id,
-                    "title": translation.title,
-                    "description": translation.description[:200] + "...",
-                    "price": float(product.price),
-                    "product_type": product.product_type.value,
-                    "main_image_url": product.main_image_url,
-                    "is_on_sale": product.is_on_sale,
-                    "sale_price": float(product.sale_price) if product.sale_price else None,
-                    "actual_price": float(product.get_actual_price()),
-                    "categories": [
-                        cat.get_translation(language_code).name if cat.get_translation(language_code) else cat.slug for
-                        cat in product.categories],
-                    "views_count": product.views_count,
-                    "file_size_mb": float(product.file_size_mb),
-                    "author_id": product.author_id,
-                    "author_name": author_name
-                })
-
-        count_query = select(func.count(Product.id))
-
-        # КРИТИЧНО: Підраховуємо тільки схвалені товари
-        count_query = count_query.where(
-            or_(
-                Product.moderation_status == ModerationStatus.APPROVED,
-                Product.moderation_status.is_(None)
-            )
+            order = Product.created_at.desc()
+        # id робить порядок стабільним між сторінками
+        return [order, Product.id.desc()]
+
+    async def _query_list_ids(
+            self,
+            db: AsyncSession,
+            filters: Optional[ProductFilter],
+            limit: int,
+            offset: int
+    ) -> Tuple[List[int], int]:
+        """ID товарів сторінки в порядку сортування і загальна кількість"""
+        if catalog_index.can_serve(filters):
+            return await catalog_index.query(db, filters, limit, offset)
+
+        conditions = self._list_conditions(filters)
+        ids_result = await db.execute(
+            select(Product.id)
+            .where(*conditions)
+            .order_by(*self._list_order(filters))
+            .limit(limit)
+            .offset(offset)
         )
+        total = await db.scalar(select(func.count(Product.id)).where(*conditions))
+        return list(ids_result.scalars()), total or 0
 
-        if filters and filters.category_id:
-            count_query = count_query.join(Product.categories).where(
-                Category.id == filters.category_id
+    async def _load_cards(
+            self,
+            db: AsyncSession,
+            product_ids: List[int],
+            language_code: str,
+            fields: Optional[FrozenSet[str]] = None
+    ) -> Dict[int, Dict[str, Any]]:
+        """Картки публічних товарів одним запитом: {id: картка}"""
+        if not product_ids:
+            return {}
+        result = await db.execute(
+            select(Product)
+            .options(*_load_options(fields))
+            .where(
+                Product.id.in_(product_ids),
+                # Непублічні товари не потрапляють у картки (batch приймає довільні id)
+                public_product_condition()
             )
+        )
+        cards = {}
+        for product in result.scalars():
+            card = _project(_CARD_VALUES, product, language_code, fields)
+            if card:
+                cards[product.id] = card
+        return cards
 
-        if filters:
-            if filters.product_type:
-                count_query = count_query.where(Product.product_type == filters.product_type)
-            if filters.is_on_sale is not None:
-                count_query = count_query.where(Product.is_on_sale == filters.is_on_sale)
-            if filters.min_price is not None:
-                count_query = count_query.where(Product.price >= filters.min_price)
-            if filters.max_price is not None:
-                count_query = count_query.where(Product.price <= filters.max_price)
-            if filters.min_rating is not None:
-                count_query = count_query.where(Product.average_rating >= filters.min_rating)
-            if filters.creator_only is True:
-                count_query = count_query.where(Product.author_id.isnot(None))
-            if filters.author_id is not None:
-                count_query = count_query.where(Product.author_id == filters.author_id)
-            if filters.search:
-                search_pattern = f"%{filters.search}%"
-                from app.products.models import ProductTranslation
-                count_query = count_query.join(Product.translations).where(
-                    (ProductTranslation.title.ilike(search_pattern)) |
-                    (ProductTranslation.description.ilike(search_pattern))
-                )
-
-        total_result = await db.execute(count_query)
-        total_count = total_result.scalar() or 0
+    async def get_products_list(
+            self,
+            language_code: str,
+            db: AsyncSession,
+            filters: Optional[ProductFilter] = None,
+            limit: int = 20,
+            offset: int = 0
+    ) -> Dict[str, Any]:
+        product_ids, total_count = await self._query_list_ids(db, filters, limit, offset)
+        cards = await self._load_cards(db, product_ids, language_code)
 
-        response = {
-            "products": products_list,
+        return {
+            "products": [cards[product_id] for product_id in product_ids if product_id in cards],
             "total": total_count,
             "limit": limit,
             "offset": offset,
             "pages": (total_count + limit - 1) // limit
         }
 
-        await cache.set(cache_key, json.dumps(response), ttl=300)
+    async def get_cards(
+            self,
+            product_ids: List[int],
+            language_code: str,
+            db: AsyncSession,
+            fields: Optional[FrozenSet[str]] = None
+    ) -> Dict[int, bytes]:
+        """
+        Серіалізовані картки товарів: {id: JSON}
+
+        Картки читаються одним MGET; відсутні в кеші завантажуються одним
+        запитом до БД і записуються одним pipeline. Товари без картки
+        (видалені, без перекладу) у результат не потрапляють. Кожна
+        проекція fields кешується окремо.
+        """
+        if not product_ids:
+            return {}
+        keys = [product_card_key(product_id, language_code, fields) for product_id in product_ids]
+        cached = await cache.raw.mget(keys)
+        cards = {product_id: card for product_id, card in zip(product_ids, cached) if card}
+
+        missing = [product_id for product_id in product_ids if product_id not in cards]
+        if missing:
+            model = projection_model(ProductListResponse, fields)
+            loaded = await self._load_cards(db, missing, language_code, fields)
+            async with cache.raw.pipeline(transaction=False) as pipe:
+                for product_id, card in loaded.items():
+                    cards[product_id] = orjson.dumps(model.model_validate(card).model_dump(mode="json"))
+                    pipe.set(product_card_key(product_id, language_code, fields), cards[product_id], ex=PRODUCT_CACHE_TTL)
+                await pipe.execute()
+        return cards
+
+    async def _cached_list_ids(
+            self,
+            db: AsyncSession,
+            filters: Optional[ProductFilter],
+            limit: int,
+            offset: int
+    ) -> Tuple[List[int], int]:
+        """ID сторінки і total з індексу каталогу або з кешу (не залежать від мови)"""
+        if catalog_index.can_serve(filters):
+            # Індекс у пам'яті швидший за поїздку в Redis
+            return await self._query_list_ids(db, filters, limit, offset)
+
+        filters_dict = filters.model_dump(exclude_none=True) if filters else {}
+        filters_str = json.dumps(filters_dict, sort_keys=True, default=str)
+        # Пошукові списки окремо: їх скидає і зміна тексту товару
+        kind = "search" if filters_dict.get("search") else "ids"
+        cache_key = f"products_list:{kind}:{limit}:{offset}:{filters_str}"
+
+        cached = await cache.raw.get(cache_key)
+        if cached:
+            entry = orjson.loads(cached)
+            return entry["ids"], entry["total"]
 
-        return response
+        product_ids, total = await self._query_list_ids(db, filters, limit, offset)
+        await cache.raw.set(cache_key, orjson.dumps({"ids": product_ids, "total": total}), ex=PRODUCT_CACHE_TTL)
+        return product_ids, total
+
+    async def get_products_list_body(
+            self,
+            language_code: str,
+            db: AsyncSession,
+            filters: Optional[ProductFilter] = None,
+            limit: int = 20,
+            offset: int = 0,
+            fields: Optional[FrozenSet[str]] = None
+    ) -> bytes:
+        """
+        Готове тіло відповіді GET /products (запис response_cache)
+
+        Сторінка збирається з кешованого списку ID і карток без повторної
+        серіалізації: JSON карток склеюється як є.
+        """
+        product_ids, total = await self._cached_list_ids(db, filters, limit, offset)
+        cards = await self.get_cards(product_ids, language_code, db, fields)
+
+        tail = orjson.dumps({
+            "total": total,
+            "limit": limit,
+            "offset": offset,
+            "pages": (total + limit - 1) // limit
+        })
+        body = b'{"products":[' + b",".join(
+            cards[product_id] for product_id in product_ids if product_id in cards
+        ) + b"]," + tail[1:]
+        return encode_json(body)
+
+    async def get_cards_batch_body(
+            self,
+            product_ids: List[int],
+            language_code: str,
+            db: AsyncSession,
+            fields: Optional[FrozenSet[str]] = None
+    ) -> bytes:
+        """
+        Готове тіло GET /products/batch: картки в порядку запиту
+
+        Один MGET і щонайбільше один запит до БД для відсутніх карток.
+        Недоступні товари повертаються в missing.
+        """
+        cards = await self.get_cards(product_ids, language_code, db, fields)
+        missing = [product_id for product_id in product_ids if product_id not in cards]
+        body = b'{"products":[' + b",".join(
+            cards[product_id] for product_id in product_ids if product_id in cards
+        ) + b'],"missing":' + orjson.dumps(missing) + b"}"
+        return encode_json(body)
 
     async def update_product(
             self,
@@ -417,6 +633,14 @@ class ProductService:
         for field, value in update_fields.items():
             setattr(product, field, value)
 
+        if "zip_file_path" in update_fields:
+            await link_product_files(db, product)
+
+        if "main_image_url" in update_fields or "gallery_image_urls" in update_fields:
+            product.image_variants = await collect_image_variants(
+                [product.main_image_url, *(product.gallery_image_urls or [])]
+            )
+
         if update_data.category_ids is not None:
             if update_data.category_ids:
                 categories = await db.execute(
@@ -443,20 +667,20 @@ class ProductService:
             # КРИТИЧНО: Санітизуємо вхідний текст від XSS атак
             if uk_trans:
                 if update_data.title_uk:
-                    uk_trans.title = sanitize_text(update_data.title_uk)
+                    uk_trans.title = await sanitize_text_async(update_data.title_uk)
                 if update_data.description_uk:
-                    uk_trans.description = sanitize_html(
+                    uk_trans.description = await sanitize_html_async(
                         update_data.description_uk
                     )
 
                 title_to_translate = uk_trans.title
                 description_to_translate = uk_trans.description
             else:
-                safe_title = sanitize_text(
+                safe_title = await sanitize_text_async(
                     update_data.title_uk or
                     get_text("product_service_default_title", "uk")
                 )
-                safe_desc = sanitize_html(
+                safe_desc = await sanitize_html_async(
                     update_data.description_uk or
                     get_text("product_service_default_description", "uk")
                 )
@@ -482,8 +706,12 @@ class ProductService:
         await db.commit()
         await db.refresh(product)
 
-        await cache.delete_pattern(f"product:{product_id}:*")
-        await cache.delete_pattern("products_list:*")
+        changed = update_data.model_fields_set
+        await invalidate_product_cache(
+            product_id,
+            lists=bool(changed & LIST_FIELDS),
+            search_lists=bool(changed & {"title_uk", "description_uk"})
+        )
 
         logger.info(f"Updated product ID: {product_id}, cache cleared")
         return product
@@ -507,8 +735,7 @@ class ProductService:
         await db.delete(product)
         await db.commit()
 
-        await cache.delete_pattern(f"product:{product_id}:*")
-        await cache.delete_pattern("products_list:*")
+        await invalidate_product_cache(product_id)
 
         logger.info(f"Deleted product ID: {product_id}, cache cleared")
         return True
@@ -0,0 +1,138 @@
+"""
+Потоковий ZIP для "завантажити всі покупки"
+
+Архів формується на льоту: файли товарів вже стиснуті (.zip/.rar/.7z), тож
+записуються як stored-записи без повторного стиснення. zipfile пише у
+непозиційований потік з data descriptor-ами після кожного запису, тому
+архів віддається частинами з постійною пам'яттю і без тимчасового файлу.
+ZIP64 вмикається автоматично для великих файлів і архівів.
+
+Кількість одночасних масових завантажень на процес обмежена слотами.
+"""
+import asyncio
+import zipfile
+from pathlib import Path
+from typing import AsyncIterator, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+
+# Розмір частини, яка читається з диска і віддається клієнту
+ARCHIVE_CHUNK_SIZE = 1024 * 1024
+
+
+class _ChunkSink:
+    """Непозиційований потік, куди zipfile пише; записане забирає генератор"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._offset = 0
+
+    def write(self, data: bytes) -> int:
+        if data:
+            self._chunks.append(bytes(data))
+            self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        # zipfile використовує tell() для зміщень у central directory
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(entries: Iterable[Tuple[Path, str]], chunk_size: int = ARCHIVE_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Генерує ZIP-архив частинами
+
+    Args:
+        entries: Пари (файл на диску, ім'я в архіві)
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for path, arcname in entries:
+            info = zipfile.ZipInfo.from_file(path, arcname)
+            info.compress_type = zipfile.ZIP_STORED
+            with open(path, "rb") as source, archive.open(info, mode="w") as target:
+                while True:
+                    block = source.read(chunk_size)
+                    if not block:
+                        break
+                    target.write(block)
+                    yield sink.drain()
+    # Data descriptor останнього запису та central directory
+    data = sink.drain()
+    if data:
+        yield data
+
+
+async def stream_zip(
+    entries: Iterable[Tuple[Path, str]],
+    chunk_size: int = ARCHIVE_CHUNK_SIZE,
+    on_close: Optional[Callable[[], None]] = None
+) -> AsyncIterator[bytes]:
+    """
+    Асинхронна обгортка iter_zip: читання з диска виконується в потоці
+
+    on_close викликається завжди, зокрема коли клієнт обірвав з'єднання.
+    """
+    chunks = iter_zip(entries, chunk_size)
+    try:
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                break
+            yield chunk
+    finally:
+        try:
+            chunks.close()
+        except ValueError:
+            # Скасовано посеред читання: генератор ще виконується в потоці
+            pass
+        if on_close is not None:
+            on_close()
+
+
+class BulkDownloadSlots:
+    """Обмежує кількість одночасних масових завантажень у процесі"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.in_use = 0
+
+    def try_acquire(self) -> bool:
+        if self.in_use >= self.size:
+            return False
+        self.in_use += 1
+        return True
+
+    def release(self):
+        self.in_use = max(0, self.in_use - 1)
+
+    def lease(self) -> Optional[Callable[[], None]]:
+        """
+        Займає слот
+
+        Returns:
+            Функція звільнення (повторний виклик нічого не робить) або None,
+            якщо вільних слотів немає
+        """
+        if not self.try_acquire():
+            return None
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                self.release()
+
+        return release
+
+
+bulk_download_slots = BulkDownloadSlots(settings.BULK_DOWNLOAD_SLOTS)
@@ -1,87 +1,167 @@
 """
 Сервіс для безпечного завантаження файлів з одноразовими токенами
+
+Два види токенів:
+- одноразові — випадковий рядок у Redis (download_token:<token> -> "user:product"),
+  споживається атомарно через GETDEL, тож два паралельні запити не
+  можуть використати той самий токен;
+- підписані (DOWNLOAD_SIGNED_URLS) — "s1.<user>.<expires>.<підпис>" без
+  звернення до Redis. Підпис — HMAC-SHA256 від "<expires>:<user>:<path>",
+  де path — шлях завантаження (/api/v1/profile/download/<product_id>), тож
+  його може перевірити і Python, і nginx (njs, crypto.createHmac). Такий
+  токен багаторазовий до закінчення короткого TTL.
 """
+import base64
+import hashlib
+import hmac
 import secrets
-from typing import Optional
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
 from app.core.cache import cache
+from app.core.config import settings
+
+SIGNED_TOKEN_PREFIX = "s1"
+
+
+class DownloadGrant(NamedTuple):
+    """Дозвіл на завантаження, отриманий з токена"""
+    user_id: int
+    product_id: int
+
+
+def download_path(product_id: int) -> str:
+    return f"/api/v1/profile/download/{product_id}"
+
+
+def signed_download_url(user_id: int, product_id: int, ttl: int) -> str:
+    """Повне посилання на завантаження з підписаним токеном (для листів)"""
+    token = DownloadTokenService.sign(user_id, product_id, ttl)
+    return f"{settings.BACKEND_URL}{download_path(product_id)}?download_token={token}"
+
+
+def _signing_key() -> bytes:
+    key = settings.DOWNLOAD_SIGNING_KEY or f"download:{settings.SECRET_KEY}"
+    return key.encode()
+
+
+def _signature(user_id: int, product_id: int, expires: int) -> str:
+    message = f"{expires}:{user_id}:{download_path(product_id)}".encode()
+    digest = hmac.new(_signing_key(), message, hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
 
 
 class DownloadTokenService:
     """Сервіс для генерації та перевірки одноразових токенів завантаження"""
 
-    TOKEN_TTL = 300  # 5 хвилин
+    TOKEN_TTL = settings.DOWNLOAD_TOKEN_TTL_SECONDS
     TOKEN_PREFIX = "download_token:"
+    # Окремий простір імен: інакше токен "bundle:<x>" погашався б як одиночний
+    BUNDLE_PREFIX = "download_bundle:"
+
+    @classmethod
+    def _new_token(cls) -> str:
+        return secrets.token_urlsafe(32)
 
     @classmethod
     async def generate_token(cls, user_id: int, product_id: int) -> str:
         """
-        Генерує одноразовий токен для завантаження файлу
+        Генерує токен для завантаження файлу
 
         Returns:
-            Токен (32 символи hex)
+            Підписаний токен, якщо увімкнено DOWNLOAD_SIGNED_URLS, інакше одноразовий
         """
-        token = secrets.token_urlsafe(32)
-        cache_key = f"{cls.TOKEN_PREFIX}{token}"
+        return (await cls.generate_tokens(user_id, [product_id]))[product_id]
 
-        # Зберігаємо в Redis: user_id та product_id
-        await cache.set(
-            cache_key,
-            f"{user_id}:{product_id}",
-            ttl=cls.TOKEN_TTL
-        )
+    @classmethod
+    async def generate_tokens(cls, user_id: int, product_ids: Iterable[int]) -> Dict[int, str]:
+        """
+        Генерує токени для кількох товарів ("завантажити все")
 
-        return token
+        Одноразові токени записуються в Redis одним pipeline.
+
+        Returns:
+            {product_id: токен}
+        """
+        product_ids = list(dict.fromkeys(product_ids))
+        if settings.DOWNLOAD_SIGNED_URLS:
+            return {product_id: cls.sign(user_id, product_id) for product_id in product_ids}
+
+        tokens = {product_id: cls._new_token() for product_id in product_ids}
+        if tokens:
+            async with cache.redis.pipeline(transaction=False) as pipe:
+                for product_id, token in tokens.items():
+                    pipe.set(f"{cls.TOKEN_PREFIX}{token}", f"{user_id}:{product_id}", ex=cls.TOKEN_TTL)
+                await pipe.execute()
+        return tokens
+
+    @classmethod
+    def sign(cls, user_id: int, product_id: int, ttl: Optional[int] = None) -> str:
+        """Підписаний токен, що не потребує Redis"""
+        expires = int(time.time()) + (ttl or settings.DOWNLOAD_SIGNED_URL_TTL_SECONDS)
+        return f"{SIGNED_TOKEN_PREFIX}.{user_id}.{expires}.{_signature(user_id, product_id, expires)}"
+
+    @classmethod
+    def verify_signed(cls, token: str, product_id: int) -> Optional[DownloadGrant]:
+        """Перевіряє підписаний токен для товару; None, якщо підпис невірний або час минув"""
+        try:
+            prefix, user_id, expires, signature = token.split(".")
+            user_id, expires = int(user_id), int(expires)
+        except ValueError:
+            return None
+
+        if prefix != SIGNED_TOKEN_PREFIX or expires < time.time():
+            return None
+        if not hmac.compare_digest(signature, _signature(user_id, product_id, expires)):
+            return None
+        return DownloadGrant(user_id, product_id)
 
     @classmethod
-    async def verify_and_consume_token(
-        cls,
-        token: str,
-        expected_user_id: int,
-        expected_product_id: int
-    ) -> bool:
+    async def consume(cls, token: str, product_id: int) -> Optional[DownloadGrant]:
         """
-        Перевіряє токен і видаляє його (одноразове використання)
+        Перевіряє токен для товару і, якщо він одноразовий, атомарно видаляє його
 
         Returns:
-            True якщо токен валідний
+            DownloadGrant або None, якщо токен недійсний, використаний чи виданий
+            для іншого товару
         """
-        cache_key = f"{cls.TOKEN_PREFIX}{token}"
-
-        # Отримуємо дані з Redis
-        cached_data = await cache.get(cache_key)
+        if token.startswith(f"{SIGNED_TOKEN_PREFIX}."):
+            return cls.verify_signed(token, product_id)
 
+        cached_data = await cache.redis.getdel(f"{cls.TOKEN_PREFIX}{token}")
         if not cached_data:
-            return False
+            return None
 
         try:
-            user_id, product_id = map(int, cached_data.split(':'))
+            user_id, token_product_id = map(int, cached_data.split(':'))
         except (ValueError, AttributeError):
-            return False
-
-        # Перевіряємо чи співпадають дані
-        if user_id != expected_user_id or product_id != expected_product_id:
-            return False
+            return None
 
-        # Видаляємо токен (одноразове використання)
-        await cache.delete(cache_key)
+        if token_product_id != product_id:
+            return None
+        return DownloadGrant(user_id, product_id)
 
-        return True
+    @classmethod
+    async def generate_bundle_token(cls, user_id: int, product_ids: Iterable[int]) -> str:
+        """Одноразовий токен на архів з кількох товарів"""
+        token = cls._new_token()
+        product_list = ",".join(str(product_id) for product_id in dict.fromkeys(product_ids))
+        await cache.redis.set(f"{cls.BUNDLE_PREFIX}{token}", f"{user_id}:{product_list}", ex=cls.TOKEN_TTL)
+        return token
 
     @classmethod
-    async def get_token_data(cls, token: str) -> Optional[str]:
+    async def consume_bundle(cls, token: str) -> Optional[Tuple[int, List[int]]]:
         """
-        Отримує дані токену без його видалення
+        Атомарно споживає токен архіву
 
         Returns:
-            Строка "user_id:product_id" або None
-        """
-        cache_key = f"{cls.TOKEN_PREFIX}{token}"
-        return await cache.get(cache_key)
-
-    @classmethod
-    async def consume_token(cls, token: str) -> None:
+            (user_id, [product_id, ...]) або None
         """
-        Видаляє токен з кешу (після використання)
-        """
-        cache_key = f"{cls.TOKEN_PREFIX}{token}"
-        await cache.delete(cache_key)
+        cached_data = await cache.redis.getdel(f"{cls.BUNDLE_PREFIX}{token}")
+        if not cached_data:
+            return None
+        try:
+            user_id, product_list = cached_data.split(":")
+            return int(user_id), [int(product_id) for product_id in product_list.split(",")]
+        except (ValueError, AttributeError):
+            return None
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, Header, HTTPException, status, Body
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy import select, update, or_, exists
 from sqlalchemy.orm import selectinload
 from typing import Optional, List
 from datetime import datetime
@@ -21,10 +22,14 @@ from app.bonuses.service import BonusService
 from app.referrals.models import ReferralLog
 from app.referrals.schemas import ReferralInfoResponse, ReferralLogItem, ReferrerInfo
 from app.core.translations import get_text
+from app.profile.download_service import DownloadTokenService
+from app.profile.archive_stream import bulk_download_slots, stream_zip
 
 router = APIRouter(tags=["Profile"])
 logger = logging.getLogger(__name__)
 
+MAX_DOWNLOAD_TOKENS_PER_REQUEST = 200
+
 
 @router.post("/bonus/claim", response_model=BonusClaimResponse)
 async def claim_daily_bonus(
@@ -173,30 +178,33 @@ async def update_current_user_profile(
     return UserResponse.from_orm(current_user)
 
 
+async def get_accessible_product_ids(db: AsyncSession, user_id: int, product_ids: List[int]) -> set:
+    """Безкоштовні товари та товари з наданим доступом — одним запитом"""
+    if not product_ids:
+        return set()
+
+    result = await db.execute(
+        select(Product.id).where(
+            Product.id.in_(product_ids),
+            or_(
+                Product.product_type == ProductType.FREE,
+                exists().where(
+                    UserProductAccess.user_id == user_id,
+                    UserProductAccess.product_id == Product.id
+                )
+            )
+        )
+    )
+    return set(result.scalars().all())
+
+
 @router.post("/check-access", response_model=dict)
 async def check_product_access(
         product_ids: List[int] = Body(..., embed=True),
         current_user: User = Depends(get_current_user),
         db: AsyncSession = Depends(get_db)
 ):
-    accessible_ids = set()
-
-    if not product_ids:
-        return {"accessible_product_ids": []}
-
-    free_products = await db.execute(
-        select(Product.id).where(Product.id.in_(product_ids), Product.product_type == ProductType.FREE)
-    )
-    accessible_ids.update(free_products.scalars().all())
-
-    granted_access = await db.execute(
-        select(UserProductAccess.product_id).where(
-            UserProductAccess.user_id == current_user.id,
-            UserProductAccess.product_id.in_(product_ids)
-        )
-    )
-    accessible_ids.update(granted_access.scalars().all())
-
+    accessible_ids = await get_accessible_product_ids(db, current_user.id, product_ids)
     return {"accessible_product_ids": list(accessible_ids)}
 
 
@@ -210,36 +218,156 @@ def get_archive_media_type(filename: str) -> str:
     return 'application/octet-stream'
 
 
+def _download_token_ttl() -> int:
+    if settings.DOWNLOAD_SIGNED_URLS:
+        return settings.DOWNLOAD_SIGNED_URL_TTL_SECONDS
+    return settings.DOWNLOAD_TOKEN_TTL_SECONDS
+
+
+@router.post("/download/archive/token")
+async def generate_archive_token(
+        product_ids: List[int] = Body(..., embed=True),
+        current_user: User = Depends(get_current_user),
+        db: AsyncSession = Depends(get_db)
+):
+    """Одноразовий токен на ZIP-архів з вибраних покупок"""
+    lang = current_user.language_code or "uk"
+
+    if len(product_ids) > settings.BULK_DOWNLOAD_MAX_PRODUCTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Не більше {settings.BULK_DOWNLOAD_MAX_PRODUCTS} товарів в одному архіві"
+        )
+
+    accessible_ids = await get_accessible_product_ids(db, current_user.id, product_ids)
+    selected_ids = [product_id for product_id in product_ids if product_id in accessible_ids]
+    if not selected_ids:
+        raise HTTPException(
+            status_code=403,
+            detail=get_text("profile_download_access_denied", lang)
+        )
+
+    token = await DownloadTokenService.generate_bundle_token(current_user.id, selected_ids)
+    return {
+        "download_token": token,
+        "product_ids": selected_ids,
+        "expires_in": settings.DOWNLOAD_TOKEN_TTL_SECONDS
+    }
+
+
+@router.get("/download/archive")
+async def download_archive(
+        download_token: str,
+        db: AsyncSession = Depends(get_db)
+):
+    """Потоковий ZIP з кількох покупок (stored-записи, ZIP64, без тимчасового файлу)"""
+    # Слот береться до погашення токена: 503 не витрачає одноразовий токен
+    release_slot = bulk_download_slots.lease()
+    if release_slot is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Забагато одночасних завантажень, спробуйте пізніше",
+            headers={"Retry-After": "30"}
+        )
+
+    try:
+        bundle = await DownloadTokenService.consume_bundle(download_token)
+        if bundle is None:
+            raise HTTPException(
+                status_code=403,
+                detail="Токен недійсний або вже використаний"
+            )
+        _, product_ids = bundle
+
+        result = await db.execute(
+            select(Product.id, Product.zip_file_path).where(Product.id.in_(product_ids))
+        )
+        paths = dict(result.all())
+
+        entries = []
+        downloaded_ids = []
+        upload_root = Path(settings.UPLOAD_PATH)
+        for product_id in product_ids:
+            zip_file_path = paths.get(product_id)
+            if not zip_file_path:
+                continue
+            file_path = upload_root / zip_file_path.removeprefix('/uploads/')
+            if file_path.is_file():
+                entries.append((file_path, f"{product_id}_{file_path.name}"))
+                downloaded_ids.append(product_id)
+            else:
+                logger.error(f"DOWNLOAD ERROR: File for product {product_id} is missing")
+
+        if not entries:
+            raise HTTPException(status_code=404, detail="Файл не знайдено")
+
+        await db.execute(
+            update(Product)
+            .where(Product.id.in_(downloaded_ids))
+            .values(downloads_count=Product.downloads_count + 1)
+        )
+        await db.commit()
+    except BaseException:
+        release_slot()
+        raise
+
+    filename = f"ohmyrevit-{datetime.utcnow().strftime('%Y%m%d')}.zip"
+    # Слот звільняє генератор архіву, а якщо тіло так і не почало віддаватись —
+    # фонова задача відповіді
+    return StreamingResponse(
+        stream_zip(entries, on_close=release_slot),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        background=BackgroundTask(release_slot)
+    )
+
+
 @router.post("/download/{product_id}/token")
 async def generate_download_token(
         product_id: int,
         current_user: User = Depends(get_current_user),
         db: AsyncSession = Depends(get_db)
 ):
-    """Генерує одноразовий токен для завантаження (діє 5 хвилин)"""
-    from app.profile.download_service import DownloadTokenService
-
+    """Генерує токен для завантаження (одноразовий або підписаний короткоживучий)"""
     lang = current_user.language_code or "uk"
 
-    # Перевіряємо доступ
-    access_response = await check_product_access(
-        product_ids=[product_id],
-        current_user=current_user,
-        db=db
-    )
-    if product_id not in access_response["accessible_product_ids"]:
+    if product_id not in await get_accessible_product_ids(db, current_user.id, [product_id]):
         raise HTTPException(
             status_code=403,
             detail=get_text("profile_download_access_denied", lang)
         )
 
-    # Генеруємо одноразовий токен
     token = await DownloadTokenService.generate_token(
         user_id=current_user.id,
         product_id=product_id
     )
 
-    return {"download_token": token, "expires_in": 300}
+    return {"download_token": token, "expires_in": _download_token_ttl()}
+
+
+@router.post("/download/tokens")
+async def generate_download_tokens(
+        product_ids: List[int] = Body(..., embed=True),
+        current_user: User = Depends(get_current_user),
+        db: AsyncSession = Depends(get_db)
+):
+    """Токени для кількох товарів одразу ("завантажити все"); недоступні товари пропускаються"""
+    if len(product_ids) > MAX_DOWNLOAD_TOKENS_PER_REQUEST:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Не більше {MAX_DOWNLOAD_TOKENS_PER_REQUEST} товарів за запит"
+        )
+
+    accessible_ids = await get_accessible_product_ids(db, current_user.id, product_ids)
+    tokens = await DownloadTokenService.generate_tokens(
+        user_id=current_user.id,
+        product_ids=[product_id for product_id in product_ids if product_id in accessible_ids]
+    )
+
+    return {
+        "tokens": {str(product_id): token for product_id, token in tokens.items()},
+        "expires_in": _download_token_ttl()
+    }
 
 
 @router.get("/download/{product_id}")
@@ -248,36 +376,15 @@ async def download_product_file(
         download_token: str,
         db: AsyncSession = Depends(get_db)
 ):
-    """Завантаження файлу з одноразовим токеном"""
-    from app.profile.download_service import DownloadTokenService
-
-    # Перевіряємо і споживаємо одноразовий токен (без user_id)
-    cached_data = await DownloadTokenService.get_token_data(download_token)
-
-    if not cached_data:
+    """Завантаження файлу за токеном"""
+    # Атомарно перевіряємо і споживаємо токен
+    grant = await DownloadTokenService.consume(download_token, product_id)
+    if grant is None:
         raise HTTPException(
             status_code=403,
             detail="Токен недійсний або вже використаний"
         )
 
-    try:
-        user_id, token_product_id = map(int, cached_data.split(':'))
-    except (ValueError, AttributeError):
-        raise HTTPException(
-            status_code=403,
-            detail="Некоректний токен"
-        )
-
-    # Перевіряємо що product_id співпадає
-    if token_product_id != product_id:
-        raise HTTPException(
-            status_code=403,
-            detail="Токен не відповідає товару"
-        )
-
-    # Видаляємо токен (одноразове використання)
-    await DownloadTokenService.consume_token(download_token)
-
     # Отримуємо продукт
     product = await db.get(Product, product_id)
     if not product or not product.zip_file_path:
@@ -1,20 +1,29 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, update, insert
 from datetime import datetime, timedelta, timezone
 import logging
+import time
 
 from app.subscriptions.models import Subscription, UserProductAccess, SubscriptionStatus, AccessType
 from app.products.models import Product, ProductType
 from app.users.models import User
 from app.wallet.models import Transaction, TransactionType
+from app.core.cache import cache
 from app.core.config import settings
+from app.core.email import email_service
+from app.core.notifications import enqueue_telegram_messages
 from app.core.telegram_service import telegram_service
 
 logger = logging.getLogger(__name__)
 
 SUBSCRIPTION_PRICE_COINS = settings.SUBSCRIPTION_PRICE_COINS
 
+# Скільки підписок продовжується в одній транзакції
+RENEWAL_CHUNK_SIZE = 200
+
+# Попередження про нестачу монет надсилається не частіше, ніж раз на цей час
+LOW_BALANCE_NOTICE_TTL = 24 * 60 * 60
+
 
 class SubscriptionService:
     def __init__(self, db: AsyncSession):
@@ -202,104 +211,194 @@ class SubscriptionService:
         await self.db.commit()
         return result.rowcount
 
-    async def cancel_stale_pending_subscriptions(self) -> int:
-        threshold_time = datetime.now(timezone.utc) - timedelta(hours=24)
-
-        stmt = (
-            update(Subscription)
-            .where(
-                Subscription.status == SubscriptionStatus.PENDING,
-                Subscription.created_at < threshold_time
-            )
-            .values(status=SubscriptionStatus.CANCELLED)
-        )
-        result = await self.db.execute(stmt)
-        await self.db.commit()
-        return result.rowcount
-
-    async def process_auto_renewals(self) -> dict:
-        # КРИТИЧНО: Перевіряємо чи підписки взагалі активні
-        if not settings.SUBSCRIPTION_ENABLED:
-            logger.info("Subscription auto-renewal skipped (feature disabled)")
-            return {"renewed": 0, "failed": 0, "skipped": "feature_disabled"}
-
-        now = datetime.now(timezone.utc)
-        tomorrow = now + timedelta(days=1)
-
-        result = await self.db.execute(
-            select(Subscription)
-            .options(selectinload(Subscription.user))
+    def _due_renewals_query(self, now: datetime, after_id: int, limit: int):
+        return (
+            select(Subscription.id, Subscription.user_id, Subscription.end_date)
             .where(
                 Subscription.status == SubscriptionStatus.ACTIVE,
                 Subscription.is_auto_renewal == True,
-                Subscription.end_date <= tomorrow,
-                Subscription.end_date > now
+                Subscription.end_date <= now + timedelta(days=1),
+                Subscription.end_date > now,
+                Subscription.id > after_id
             )
+            .order_by(Subscription.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
         )
-        subscriptions = list(result.scalars().all())
 
-        renewed = 0
-        failed = 0
+    async def _renew_chunk(self, subscriptions: list, now: datetime) -> dict:
+        """
+        Продовжує одну пачку підписок однією транзакцією
+
+        Підписки вже заблоковані; користувачі блокуються в порядку id, як і
+        при покупках, тому паралельна оплата не перезапише баланс.
+        """
+        user_ids = sorted({sub.user_id for sub in subscriptions})
+        users_result = await self.db.execute(
+            select(User.id, User.balance, User.telegram_id, User.email, User.is_email_verified, User.language_code)
+            .where(User.id.in_(user_ids))
+            .order_by(User.id)
+            .with_for_update()
+        )
+        balances = {}
+        telegram_ids = {}
+        emails = {}
+        for user_id, balance, telegram_id, email, is_email_verified, language_code in users_result.all():
+            balances[user_id] = balance
+            telegram_ids[user_id] = telegram_id
+            if email and is_email_verified:
+                emails[user_id] = (email, language_code or "uk")
+
+        renewed_subscriptions = []
+        ledger_rows = []
+        renewal_messages = []
+        renewal_emails = []
+        low_balance = []
         skipped = 0
 
         for sub in subscriptions:
-            user = sub.user
-            if not user:
+            if sub.user_id not in balances:
                 skipped += 1
                 continue
 
-            if user.balance < SUBSCRIPTION_PRICE_COINS:
-                try:
-                    shortfall = SUBSCRIPTION_PRICE_COINS - user.balance
-                    await telegram_service.send_message(
-                        user.telegram_id,
-                        f"⚠️ Підписка закінчується {sub.end_date.strftime('%d.%m.%Y')}!\n\n"
-                        f"💰 Для автопродовження потрібно: {SUBSCRIPTION_PRICE_COINS} монет\n"
-                        f"💵 У вас: {user.balance} монет\n"
-                        f"❌ Не вистачає: {shortfall} монет\n\n"
-                        f"Поповніть баланс, щоб зберегти Premium!"
-                    )
-                except Exception as e:
-                    logger.error(f"Failed to notify user {user.id} about low balance: {e}")
-                failed += 1
+            balance = balances[sub.user_id]
+            if balance < SUBSCRIPTION_PRICE_COINS:
+                low_balance.append((sub, balance))
                 continue
 
+            balance -= SUBSCRIPTION_PRICE_COINS
+            balances[sub.user_id] = balance
+            new_end_date = sub.end_date + timedelta(days=30)
+
+            renewed_subscriptions.append({"id": sub.id, "end_date": new_end_date})
+            ledger_rows.append({
+                "user_id": sub.user_id,
+                "type": TransactionType.SUBSCRIPTION,
+                "amount": -SUBSCRIPTION_PRICE_COINS,
+                "balance_after": balance,
+                "description": f"Автопродовження Premium до {new_end_date.strftime('%d.%m.%Y')}",
+                "subscription_id": sub.id
+            })
+            renewal_messages.append((
+                telegram_ids[sub.user_id],
+                f"✅ Premium автоматично продовжено!\n\n"
+                f"💰 Списано: {SUBSCRIPTION_PRICE_COINS} монет\n"
+                f"📅 Нова дата закінчення: {new_end_date.strftime('%d.%m.%Y')}\n"
+                f"💵 Залишок: {balance} монет"
+            ))
+            if sub.user_id in emails:
+                email, language_code = emails[sub.user_id]
+                renewal_emails.append(email_service.render_subscription_confirmation(
+                    email, new_end_date.strftime('%d.%m.%Y'), language_code
+                ))
+
+        if renewed_subscriptions:
+            charged_users = {row["user_id"] for row in ledger_rows}
+            await self.db.execute(
+                update(User),
+                [{"id": user_id, "balance": balances[user_id]} for user_id in sorted(charged_users)]
+            )
+            await self.db.execute(update(Subscription), renewed_subscriptions)
+            await self.db.execute(insert(Transaction), ledger_rows)
+        await self.db.commit()
+
+        for sub in renewed_subscriptions:
+            logger.info(f"Auto-renewed subscription {sub['id']}")
+
+        # Сповіщення після коміту і без очікування Telegram
+        messages = renewal_messages + await self._low_balance_messages(low_balance, telegram_ids)
+        try:
+            await enqueue_telegram_messages(messages)
+        except Exception as e:
+            logger.error(f"Failed to enqueue renewal notifications: {e}")
+        if renewal_emails:
             try:
-                user.balance -= SUBSCRIPTION_PRICE_COINS
-                new_balance = user.balance
-                sub.end_date = sub.end_date + timedelta(days=30)
-
-                transaction = Transaction(
-                    user_id=user.id,
-                    type=TransactionType.SUBSCRIPTION,
-                    amount=-SUBSCRIPTION_PRICE_COINS,
-                    balance_after=new_balance,
-                    description=f"Автопродовження Premium до {sub.end_date.strftime('%d.%m.%Y')}",
-                    subscription_id=sub.id
-                )
-                self.db.add(transaction)
-                await self.db.commit()
+                await email_service.send_batch(renewal_emails)
+            except Exception as e:
+                logger.error(f"Failed to send renewal emails: {e}")
+
+        return {"renewed": len(renewed_subscriptions), "failed": len(low_balance), "skipped": skipped}
+
+    async def _low_balance_messages(self, low_balance: list, telegram_ids: dict) -> list:
+        """Попередження про нестачу монет — одне на підписку за добу"""
+        if not low_balance:
+            return []
 
-                try:
-                    await telegram_service.send_message(
-                        user.telegram_id,
-                        f"✅ Premium автоматично продовжено!\n\n"
-                        f"💰 Списано: {SUBSCRIPTION_PRICE_COINS} монет\n"
-                        f"📅 Нова дата закінчення: {sub.end_date.strftime('%d.%m.%Y')}\n"
-                        f"💵 Залишок: {new_balance} монет"
-                    )
-                except Exception as e:
-                    logger.error(f"Failed to notify user {user.id} about renewal: {e}")
+        async with cache.redis.pipeline(transaction=False) as pipe:
+            for sub, _ in low_balance:
+                pipe.set(f"renewal:low_balance:{sub.id}", 1, nx=True, ex=LOW_BALANCE_NOTICE_TTL)
+            first_notice = await pipe.execute()
 
-                renewed += 1
-                logger.info(f"Auto-renewed subscription {sub.id} for user {user.id}")
+        messages = []
+        for (sub, balance), is_first in zip(low_balance, first_notice):
+            if not is_first:
+                continue
+            messages.append((
+                telegram_ids[sub.user_id],
+                f"⚠️ Підписка закінчується {sub.end_date.strftime('%d.%m.%Y')}!\n\n"
+                f"💰 Для автопродовження потрібно: {SUBSCRIPTION_PRICE_COINS} монет\n"
+                f"💵 У вас: {balance} монет\n"
+                f"❌ Не вистачає: {SUBSCRIPTION_PRICE_COINS - balance} монет\n\n"
+                f"Поповніть баланс, щоб зберегти Premium!"
+            ))
+        return messages
+
+    async def process_auto_renewals(self, chunk_size: int = RENEWAL_CHUNK_SIZE) -> dict:
+        """
+        Автопродовження підписок, що закінчуються протягом доби
+
+        Підписки обробляються пачками по chunk_size (keyset за id) під
+        FOR UPDATE SKIP LOCKED: кілька воркерів можуть ділити роботу, а рядки,
+        які вже обробляє інший воркер, пропускаються. Кожна пачка — одна
+        транзакція з пакетним записом у журнал.
+
+        Returns:
+            Лічильники renewed/failed/skipped та метрики проходу
+        """
+        # КРИТИЧНО: Перевіряємо чи підписки взагалі активні
+        if not settings.SUBSCRIPTION_ENABLED:
+            logger.info("Subscription auto-renewal skipped (feature disabled)")
+            return {"renewed": 0, "failed": 0, "skipped": "feature_disabled"}
 
+        started = time.perf_counter()
+        now = datetime.now(timezone.utc)
+        totals = {"renewed": 0, "failed": 0, "skipped": 0}
+        chunks = 0
+        last_id = 0
+
+        while True:
+            result = await self.db.execute(self._due_renewals_query(now, last_id, chunk_size))
+            subscriptions = result.all()
+            if not subscriptions:
+                # Знімаємо блокування порожнього SELECT ... FOR UPDATE
+                await self.db.commit()
+                break
+
+            last_id = subscriptions[-1].id
+            try:
+                counts = await self._renew_chunk(subscriptions, now)
             except Exception as e:
-                logger.error(f"Failed to auto-renew subscription {sub.id}: {e}")
+                logger.error(f"Failed to auto-renew subscriptions up to id {last_id}: {e}", exc_info=True)
                 await self.db.rollback()
-                failed += 1
-
-        return {"renewed": renewed, "failed": failed, "skipped": skipped}
+                counts = {"failed": len(subscriptions)}
+
+            chunks += 1
+            for key, value in counts.items():
+                totals[key] += value
+
+            if len(subscriptions) < chunk_size:
+                break
+
+        elapsed = time.perf_counter() - started
+        processed = totals["renewed"] + totals["failed"] + totals["skipped"]
+        metrics = {
+            **totals,
+            "chunks": chunks,
+            "duration_ms": round(elapsed * 1000, 1),
+            "per_second": round(processed / elapsed, 1) if elapsed > 0 else 0,
+        }
+        logger.info(f"Auto-renewal run: {metrics}")
+        return metrics
 
     async def create_subscription(self, user_id: int) -> Subscription:
         existing = await self.db.execute(
@@ -24,10 +24,12 @@ from app.referrals.models import ReferralLog, ReferralBonusType
 from app.orders.models import Order
 from app.subscriptions.models import Subscription, UserProductAccess
 from app.wallet.models import Transaction
+from app.wallet.ledger import LedgerService
 from app.core.telegram_service import telegram_service
 from app.core.email import email_service
 from app.core.translations import get_text
 from app.core.cache import cache
+from app.core.executors import security_executor
 
 logger = logging.getLogger(__name__)
 
@@ -37,12 +39,13 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 class AuthService:
 
     @staticmethod
-    def verify_password(plain_password: str, hashed_password: str) -> bool:
-        return pwd_context.verify(plain_password, hashed_password)
+    async def verify_password(plain_password: str, hashed_password: str) -> bool:
+        # bcrypt займає ~250 мс, тому виконується в пулі, а не в event loop
+        return await security_executor.run(pwd_context.verify, plain_password, hashed_password)
 
     @staticmethod
-    def get_password_hash(password: str) -> str:
-        return pwd_context.hash(password)
+    async def get_password_hash(password: str) -> str:
+        return await security_executor.run(pwd_context.hash, password)
 
     @staticmethod
     def generate_strong_password(length: int = 12) -> str:
@@ -274,6 +277,7 @@ class AuthService:
         # 4. Переносимо дані (використовуємо збережений source_id)
         await db.execute(update(Order).where(Order.user_id == source_id).values(user_id=target_user.id))
         await db.execute(update(Transaction).where(Transaction.user_id == source_id).values(user_id=target_user.id))
+        await LedgerService(db).merge_snapshots(source_id, target_user.id)
         await db.execute(update(Subscription).where(Subscription.user_id == source_id).values(user_id=target_user.id))
 
         await db.execute(update(User).where(User.referrer_id == source_id).values(referrer_id=target_user.id))
@@ -436,7 +440,7 @@ class AuthService:
 
         # Звичайна реєстрація
         password = AuthService.generate_strong_password()
-        target_user.hashed_password = AuthService.get_password_hash(password)
+        target_user.hashed_password = await AuthService.get_password_hash(password)
         target_user.is_email_verified = True
         target_user.is_active = True  # Активуємо після підтвердження
         target_user.verification_token = None
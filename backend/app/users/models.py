@@ -1,6 +1,6 @@
 from sqlalchemy import (
     Column, Integer, BigInteger, String, Boolean,
-    Date, DateTime, func, ForeignKey
+    Date, DateTime, func, ForeignKey, Index
 )
 from sqlalchemy.orm import relationship, Mapped
 from typing import List
@@ -9,6 +9,10 @@ from app.core.database import Base
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Пошук непідтверджених акаунтів для прибирання
+        Index('ix_users_email_verified_created', 'is_email_verified', 'created_at'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     telegram_id = Column(BigInteger, unique=True, nullable=True, index=True)
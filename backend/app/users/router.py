@@ -91,7 +91,7 @@ async def login_site(
     result = await db.execute(select(User).where(User.email == data.email))
     user = result.scalar_one_or_none()
 
-    if not user or not user.hashed_password or not AuthService.verify_password(data.password, user.hashed_password):
+    if not user or not user.hashed_password or not await AuthService.verify_password(data.password, user.hashed_password):
         raise HTTPException(status_code=401, detail="Невірний email або пароль")
 
     access_token = AuthService.create_access_token(user.id)
@@ -112,7 +112,7 @@ async def forgot_password(
     if user and user.is_email_verified:
         # Генеруємо новий пароль
         password = AuthService.generate_strong_password()
-        user.hashed_password = AuthService.get_password_hash(password)
+        user.hashed_password = await AuthService.get_password_hash(password)
         await db.commit()
 
         # ВІДПРАВЛЯЄМО ЛИСТ (Додано цей блок)
@@ -133,10 +133,10 @@ async def change_password(
         user: User = Depends(get_current_user),
         db: AsyncSession = Depends(get_db)
 ):
-    if not user.hashed_password or not AuthService.verify_password(data.old_password, user.hashed_password):
+    if not user.hashed_password or not await AuthService.verify_password(data.old_password, user.hashed_password):
         raise HTTPException(status_code=400, detail="Невірний старий пароль")
 
-    user.hashed_password = AuthService.get_password_hash(data.new_password)
+    user.hashed_password = await AuthService.get_password_hash(data.new_password)
     await db.commit()
     return {"message": "Пароль змінено"}
 
@@ -179,6 +179,7 @@ async def update_profile(
                 from app.subscriptions.models import Subscription, UserProductAccess
                 from app.collections.models import Collection
                 from app.wallet.models import Transaction
+                from app.wallet.ledger import LedgerService
                 from app.referrals.models import ReferralLog
 
                 # Оновлюємо user_id у всіх пов'язаних записах
@@ -194,6 +195,7 @@ async def update_profile(
                 await db.execute(
                     Transaction.__table__.update().where(Transaction.user_id == existing_user.id).values(user_id=user.id)
                 )
+                await LedgerService(db).merge_snapshots(existing_user.id, user.id)
                 # Update referrer_id where old user was the referrer
                 await db.execute(
                     ReferralLog.__table__.update().where(ReferralLog.referrer_id == existing_user.id).values(referrer_id=user.id)
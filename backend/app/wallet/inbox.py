@@ -0,0 +1,322 @@
+"""
+Inbox для Stripe webhook-подій
+
+Webhook перевіряє підпис, записує подію в таблицю inbox і одразу відповідає
+200. Воркер забирає події через SELECT ... FOR UPDATE SKIP LOCKED та в одній
+транзакції БД нараховує монети і ставить статус PROCESSED, тому кожна подія
+змінює баланс рівно один раз навіть при кількох воркерах. Повторні доставки
+однієї події відсікає унікальний (provider, event_id), а різні події однієї
+оплати — перевірка external_id у журналі під блокуванням користувача.
+"""
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select, update, func, desc
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import AsyncSessionLocal
+from app.core.telegram_service import telegram_service
+from app.users.models import User
+from app.wallet.models import InboxEvent, InboxStatus
+from app.wallet.service import WalletService
+
+logger = logging.getLogger(__name__)
+
+STRIPE_PROVIDER = "stripe"
+PAYMENT_EVENT_TYPES = ("checkout.session.completed", "payment_intent.succeeded")
+
+# Скільки подій воркер обробляє за один прохід
+INBOX_BATCH_SIZE = 50
+
+# Інтервал опитування, якщо webhook не розбудив воркер
+INBOX_POLL_INTERVAL = 5
+
+# Після стількох невдалих спроб подія стає DEAD
+INBOX_MAX_ATTEMPTS = 8
+
+# Експоненційна затримка між спробами: 30с, 1хв, 2хв ... до 1 години
+INBOX_RETRY_BASE_DELAY = 30
+INBOX_RETRY_MAX_DELAY = 3600
+
+_wakeup: Optional[asyncio.Event] = None
+
+
+class InboxEventRejected(ValueError):
+    """Подію неможливо обробити (некоректні дані) — повтор не допоможе"""
+
+
+def notify_inbox_worker() -> None:
+    """Будить воркер цього процесу одразу після запису нової події"""
+    if _wakeup is not None:
+        _wakeup.set()
+
+
+def retry_delay(attempts: int) -> timedelta:
+    seconds = INBOX_RETRY_BASE_DELAY * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(seconds, INBOX_RETRY_MAX_DELAY))
+
+
+class StripeInboxService:
+    """Запис, обробка та повторне програвання Stripe подій"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    # ============ Ingestion ============
+
+    async def store_event(self, payload: bytes) -> bool:
+        """
+        Зберігає перевірену подію
+
+        Args:
+            payload: Тіло запиту Stripe (підпис уже перевірено)
+
+        Returns:
+            True, якщо подія нова; False для повторної доставки
+        """
+        event = json.loads(payload)
+        statement = (
+            pg_insert(InboxEvent)
+            .values(
+                provider=STRIPE_PROVIDER,
+                event_id=event["id"],
+                event_type=event["type"],
+                payload=event,
+                status=InboxStatus.PENDING,
+                attempts=0
+            )
+            .on_conflict_do_nothing(constraint="uq_inbox_provider_event")
+            .returning(InboxEvent.id)
+        )
+        inserted_id = (await self.db.execute(statement)).scalar_one_or_none()
+        await self.db.commit()
+
+        if inserted_id is None:
+            logger.info(f"Duplicate Stripe event ignored: {event['id']}")
+            return False
+
+        logger.info(f"Stripe event stored: {event['id']} ({event['type']})")
+        return True
+
+    # ============ Processing ============
+
+    async def _claim_next(self) -> Optional[InboxEvent]:
+        query = (
+            select(InboxEvent)
+            .where(
+                InboxEvent.provider == STRIPE_PROVIDER,
+                InboxEvent.status.in_([InboxStatus.PENDING, InboxStatus.FAILED]),
+                InboxEvent.available_at <= func.now()
+            )
+            .order_by(InboxEvent.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        return await self.db.scalar(query)
+
+    async def _apply_payment(self, event: InboxEvent) -> Optional[Tuple[int, str]]:
+        """
+        Нараховує монети за подію оплати (без коміту)
+
+        Returns:
+            (telegram_id, текст) для сповіщення або None
+        """
+        event_object = event.payload["data"]["object"]
+        object_id = event_object["id"]
+        if event.event_type == "checkout.session.completed":
+            amount_cents = event_object.get("amount_total") or 0
+        else:
+            amount_cents = event_object.get("amount") or 0
+
+        metadata = event_object.get("metadata") or {}
+        try:
+            user_id = int(metadata["user_id"])
+            pack_id = int(metadata["pack_id"])
+        except (KeyError, TypeError, ValueError):
+            raise InboxEventRejected("Missing or invalid user_id/pack_id in metadata")
+
+        service = WalletService(self.db)
+        try:
+            transaction = await service.process_stripe_purchase(
+                user_id=user_id,
+                pack_id=pack_id,
+                session_id=object_id,
+                amount_cents=amount_cents,
+                commit=False
+            )
+        except ValueError as e:
+            if "already processed" in str(e):
+                logger.info(f"Stripe payment {object_id} already credited (event {event.event_id})")
+                return None
+            raise InboxEventRejected(str(e))
+
+        logger.info(
+            f"Stripe purchase successful: user={user_id}, "
+            f"coins={transaction.amount}, balance={transaction.balance_after}"
+        )
+
+        user = await self.db.get(User, user_id)
+        if not user or not user.telegram_id:
+            return None
+
+        coin_pack = await service.get_coin_pack_by_id(pack_id)
+        pack_name = coin_pack.name if coin_pack else f"Pack #{pack_id}"
+        message = (
+            f"✅ *Баланс поповнено!*\n\n"
+            f"💰 Сума: *+{transaction.amount} OMR*\n"
+            f"📦 Пакет: {pack_name}\n"
+            f"💳 Вартість: ${amount_cents / 100:.2f}\n"
+            f"💵 Поточний баланс: *{transaction.balance_after} OMR*"
+        )
+        return user.telegram_id, message
+
+    async def process_next(self) -> Optional[InboxStatus]:
+        """
+        Обробляє одну подію
+
+        Нарахування та новий статус події комітяться однією транзакцією,
+        рядок inbox залишається заблокованим до коміту.
+
+        Returns:
+            Новий статус події або None, якщо черга порожня
+        """
+        event = await self._claim_next()
+        if event is None:
+            return None
+
+        event.attempts += 1
+        notification = None
+
+        try:
+            if event.event_type not in PAYMENT_EVENT_TYPES:
+                raise InboxEventRejected(f"Unhandled event type: {event.event_type}")
+            async with self.db.begin_nested():
+                notification = await self._apply_payment(event)
+        except InboxEventRejected as e:
+            event.status = InboxStatus.IGNORED
+            event.last_error = str(e)
+            event.processed_at = datetime.now(timezone.utc)
+        except Exception as e:
+            logger.error(f"Error processing Stripe event {event.event_id}: {e}", exc_info=True)
+            event.last_error = str(e)[:1000]
+            if event.attempts >= INBOX_MAX_ATTEMPTS:
+                event.status = InboxStatus.DEAD
+            else:
+                event.status = InboxStatus.FAILED
+                event.available_at = datetime.now(timezone.utc) + retry_delay(event.attempts)
+        else:
+            event.status = InboxStatus.PROCESSED
+            event.last_error = None
+            event.processed_at = datetime.now(timezone.utc)
+
+        status = event.status
+        await self.db.commit()
+
+        # Сповіщення після коміту: нарахування не залежить від Telegram
+        if notification:
+            try:
+                await telegram_service.send_message(*notification)
+            except Exception as e:
+                logger.error(f"Failed to send Telegram notification: {e}")
+
+        return status
+
+    async def process_pending(self, limit: int = INBOX_BATCH_SIZE) -> Dict[str, int]:
+        """Обробляє до limit подій, повертає кількість за статусами"""
+        counts: Dict[str, int] = {}
+        for _ in range(limit):
+            status = await self.process_next()
+            if status is None:
+                break
+            counts[status.value] = counts.get(status.value, 0) + 1
+        return counts
+
+    # ============ Replay / admin ============
+
+    async def replay(
+            self,
+            event_ids: Optional[List[str]] = None,
+            status: Optional[InboxStatus] = None,
+            received_from: Optional[datetime] = None
+    ) -> int:
+        """
+        Повертає збережені події в чергу
+
+        Безпечно для вже оброблених подій: повторне нарахування відсікає
+        перевірка external_id у журналі транзакцій.
+
+        Raises:
+            ValueError: Якщо не задано жодного фільтра
+        """
+        if not event_ids and status is None and received_from is None:
+            raise ValueError("At least one filter is required for replay")
+
+        statement = update(InboxEvent).where(InboxEvent.provider == STRIPE_PROVIDER)
+        if event_ids:
+            statement = statement.where(InboxEvent.event_id.in_(event_ids))
+        if status is not None:
+            statement = statement.where(InboxEvent.status == status)
+        if received_from is not None:
+            statement = statement.where(InboxEvent.received_at >= received_from)
+
+        result = await self.db.execute(
+            statement.values(
+                status=InboxStatus.PENDING,
+                attempts=0,
+                last_error=None,
+                available_at=func.now()
+            )
+        )
+        await self.db.commit()
+
+        notify_inbox_worker()
+        logger.info(f"Stripe inbox replay: {result.rowcount} events re-queued")
+        return result.rowcount
+
+    async def list_events(
+            self,
+            status: Optional[InboxStatus] = None,
+            limit: int = 50,
+            offset: int = 0
+    ) -> List[InboxEvent]:
+        query = select(InboxEvent).where(InboxEvent.provider == STRIPE_PROVIDER)
+        if status is not None:
+            query = query.where(InboxEvent.status == status)
+        query = query.order_by(desc(InboxEvent.id)).offset(offset).limit(limit)
+        result = await self.db.execute(query)
+        return list(result.scalars().all())
+
+
+async def run_inbox_worker():
+    """Фоновий воркер: обробляє inbox, чекаючи на нові події між проходами"""
+    global _wakeup
+    _wakeup = asyncio.Event()
+
+    logger.info("Stripe inbox worker started")
+
+    while True:
+        processed = 0
+        try:
+            async with AsyncSessionLocal() as db:
+                counts = await StripeInboxService(db).process_pending()
+            processed = sum(counts.values())
+            if processed:
+                logger.info(f"Stripe inbox: {counts}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Stripe inbox worker error: {e}", exc_info=True)
+
+        # Повний батч — у черзі, ймовірно, є ще події
+        if processed >= INBOX_BATCH_SIZE:
+            continue
+
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=INBOX_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
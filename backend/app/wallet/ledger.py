@@ -0,0 +1,234 @@
+"""
+Журнал транзакцій: партиції, знімки балансів та звірка
+
+Таблиця transactions партиціонована по місяцях. Знімки (wallet_balance_snapshots)
+зберігають суму журналу до covered_until, тому звірка User.balance з журналом
+читає лише партиції після останнього знімка, а не весь журнал.
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+# Знімок не покриває останні хвилини: created_at = now() береться на початку
+# транзакції БД, тож довгі транзакції можуть закомітити "старіші" рядки пізніше
+SNAPSHOT_SAFETY_LAG = timedelta(minutes=10)
+
+# На скільки місяців наперед створювати партиції
+PARTITIONS_AHEAD_MONTHS = 3
+
+# Ключ advisory lock для серіалізації оновлення знімків
+SNAPSHOT_LOCK_KEY = 730_001
+
+
+def month_start(value: datetime) -> datetime:
+    """Початок місяця (UTC) для дати"""
+    value = value.astimezone(timezone.utc)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    """Зсуває початок місяця на months місяців"""
+    month_index = value.month - 1 + months
+    return value.replace(year=value.year + month_index // 12, month=month_index % 12 + 1)
+
+
+def partition_name(start: datetime) -> str:
+    return f"transactions_{start:%Y_%m}"
+
+
+class LedgerService:
+    """Обслуговування журналу транзакцій"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    # ============ Partitions ============
+
+    async def ensure_partitions(
+            self,
+            months_ahead: int = PARTITIONS_AHEAD_MONTHS,
+            now: Optional[datetime] = None
+    ) -> List[str]:
+        """
+        Створює місячні партиції від поточного місяця на months_ahead вперед
+
+        Партиції потрібно створювати заздалегідь: якщо рядки вже потрапили в
+        transactions_default, нову партицію на цей діапазон створити не вийде.
+
+        Returns:
+            Назви створених партицій
+        """
+        start = month_start(now or datetime.now(timezone.utc))
+        existing = set((await self.db.execute(text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = 'transactions'"
+        ))).scalars().all())
+
+        created = []
+        for offset in range(months_ahead + 1):
+            lower = add_months(start, offset)
+            name = partition_name(lower)
+            if name in existing:
+                continue
+
+            upper = add_months(lower, 1)
+            await self.db.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF transactions "
+                f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+            ))
+            created.append(name)
+
+        if created:
+            await self.db.commit()
+            logger.info(f"Ledger partitions created: {', '.join(created)}")
+
+        return created
+
+    # ============ Snapshots ============
+
+    async def get_watermark(self) -> datetime:
+        """
+        Межа, до якої журнал покритий знімками
+
+        Кожен запуск refresh_snapshots ставить covered_until = cutoff лише тим
+        знімкам, які змінив, але знімки без нових транзакцій і так актуальні,
+        тому загальна межа — це максимальний covered_until.
+        """
+        watermark = await self.db.scalar(text("SELECT max(covered_until) FROM wallet_balance_snapshots"))
+        return watermark or datetime.min.replace(tzinfo=timezone.utc)
+
+    async def refresh_snapshots(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Інкрементально оновлює знімки балансів
+
+        Додає до знімків транзакції з [watermark, cutoff): читаються лише
+        партиції після попереднього запуску.
+
+        Returns:
+            users: скільки знімків оновлено
+        """
+        cutoff = (now or datetime.now(timezone.utc)) - SNAPSHOT_SAFETY_LAG
+
+        # Паралельні запуски (кілька воркерів) не повинні додати одну дельту двічі
+        await self.db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SNAPSHOT_LOCK_KEY})
+
+        watermark = await self.get_watermark()
+        if watermark >= cutoff:
+            await self.db.commit()
+            return {"users": 0}
+
+        result = await self.db.execute(text("""
+            INSERT INTO wallet_balance_snapshots
+                (user_id, balance, deposited, transactions_count, covered_until, updated_at)
+            SELECT user_id,
+                   sum(amount),
+                   coalesce(sum(amount) FILTER (WHERE type = 'DEPOSIT'), 0),
+                   count(*),
+                   :cutoff,
+                   now()
+            FROM transactions
+            WHERE created_at >= :watermark AND created_at < :cutoff
+            GROUP BY user_id
+            ON CONFLICT (user_id) DO UPDATE SET
+                balance = wallet_balance_snapshots.balance + EXCLUDED.balance,
+                deposited = wallet_balance_snapshots.deposited + EXCLUDED.deposited,
+                transactions_count = wallet_balance_snapshots.transactions_count
+                                     + EXCLUDED.transactions_count,
+                covered_until = EXCLUDED.covered_until,
+                updated_at = now()
+            RETURNING user_id
+        """), {"watermark": watermark, "cutoff": cutoff})
+        updated = len(result.all())
+        await self.db.commit()
+
+        logger.info(f"Balance snapshots refreshed: users={updated}, cutoff={cutoff.isoformat()}")
+        return {"users": updated}
+
+    async def merge_snapshots(self, source_user_id: int, target_user_id: int) -> None:
+        """
+        Переносить знімок при об'єднанні акаунтів
+
+        Викликається разом з перенесенням транзакцій source -> target, інакше
+        старі транзакції source випадуть зі звірки target.
+        """
+        await self.db.execute(text("""
+            INSERT INTO wallet_balance_snapshots
+                (user_id, balance, deposited, transactions_count, covered_until, updated_at)
+            SELECT :target, balance, deposited, transactions_count, covered_until, now()
+            FROM wallet_balance_snapshots WHERE user_id = :source
+            ON CONFLICT (user_id) DO UPDATE SET
+                balance = wallet_balance_snapshots.balance + EXCLUDED.balance,
+                deposited = wallet_balance_snapshots.deposited + EXCLUDED.deposited,
+                transactions_count = wallet_balance_snapshots.transactions_count
+                                     + EXCLUDED.transactions_count,
+                covered_until = greatest(wallet_balance_snapshots.covered_until, EXCLUDED.covered_until),
+                updated_at = now()
+        """), {"source": source_user_id, "target": target_user_id})
+        await self.db.execute(
+            text("DELETE FROM wallet_balance_snapshots WHERE user_id = :source"),
+            {"source": source_user_id}
+        )
+
+    # ============ Reconciliation ============
+
+    async def get_ledger_balance(self, user_id: int) -> int:
+        """Баланс користувача за журналом: знімок + транзакції після watermark"""
+        watermark = await self.get_watermark()
+        snapshot_balance = await self.db.scalar(
+            text("SELECT balance FROM wallet_balance_snapshots WHERE user_id = :user_id"),
+            {"user_id": user_id}
+        )
+        recent = await self.db.scalar(text(
+            "SELECT coalesce(sum(amount), 0) FROM transactions "
+            "WHERE user_id = :user_id AND created_at >= :watermark"
+        ), {"user_id": user_id, "watermark": watermark})
+        return (snapshot_balance or 0) + int(recent)
+
+    async def find_balance_drift(self, limit: int = 100) -> List[Dict[str, int]]:
+        """
+        Користувачі, у яких User.balance не збігається з журналом
+
+        Читає лише транзакції після watermark, тому вартість не залежить від
+        розміру всього журналу.
+        """
+        watermark = await self.get_watermark()
+        result = await self.db.execute(text("""
+            WITH delta AS (
+                SELECT user_id, sum(amount) AS amount
+                FROM transactions
+                WHERE created_at >= :watermark
+                GROUP BY user_id
+            )
+            SELECT u.id AS user_id,
+                   u.balance AS balance,
+                   coalesce(s.balance, 0) + coalesce(d.amount, 0) AS ledger_balance
+            FROM users u
+            LEFT JOIN wallet_balance_snapshots s ON s.user_id = u.id
+            LEFT JOIN delta d ON d.user_id = u.id
+            WHERE coalesce(u.balance, 0) <> coalesce(s.balance, 0) + coalesce(d.amount, 0)
+            ORDER BY u.id
+            LIMIT :limit
+        """), {"watermark": watermark, "limit": limit})
+        return [
+            {**row, "difference": row["balance"] - row["ledger_balance"]}
+            for row in result.mappings().all()
+        ]
+
+    async def get_total_deposits(self) -> int:
+        """Сума всіх поповнень: знімки + поповнення після watermark"""
+        watermark = await self.get_watermark()
+        snapshot_total = await self.db.scalar(
+            text("SELECT coalesce(sum(deposited), 0) FROM wallet_balance_snapshots")
+        )
+        recent_total = await self.db.scalar(text(
+            "SELECT coalesce(sum(amount), 0) FROM transactions "
+            "WHERE type = 'DEPOSIT' AND created_at >= :watermark"
+        ), {"watermark": watermark})
+        return int(snapshot_total) + int(recent_total)
@@ -1,7 +1,8 @@
 from sqlalchemy import (
-    Column, Integer, String, Float, Boolean,
-    DateTime, ForeignKey, Text, func, Enum
+    Column, Integer, BigInteger, String, Float, Boolean,
+    DateTime, ForeignKey, Text, func, Enum, Index, DDL, event, UniqueConstraint
 )
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 import enum
@@ -16,6 +17,14 @@ class TransactionType(str, enum.Enum):
     REFERRAL = "referral"  # Бонус за реферала
 
 
+class InboxStatus(str, enum.Enum):
+    PENDING = "pending"  # Очікує обробки
+    PROCESSED = "processed"  # Оброблено (або дублікат вже обробленої оплати)
+    IGNORED = "ignored"  # Подія не потребує дій або містить некоректні дані
+    FAILED = "failed"  # Помилка, буде повторена після available_at
+    DEAD = "dead"  # Вичерпано спроби, потрібне ручне втручання
+
+
 class CoinPack(Base):
     """Пакети монет для покупки через Stripe"""
 
@@ -62,14 +71,21 @@ class CoinPack(Base):
 
 
 class Transaction(Base):
-    """Історія транзакцій користувача"""
+    """
+    Історія транзакцій користувача (append-only журнал)
+
+    Таблиця партиціонована по місяцях за created_at, тому первинний ключ
+    складений (id, created_at). Змінювати суми або видаляти записи заборонено
+    тригером у БД — виправлення робляться новою транзакцією.
+    """
 
     __tablename__ = "transactions"
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
 
     # Зв'язок з користувачем
-    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     user = relationship("User", backref="transactions")
 
     # Тип транзакції
@@ -94,8 +110,115 @@ class Transaction(Base):
     # Зовнішній ID (наприклад, Stripe session_id)
     external_id = Column(String(100), nullable=True, index=True)
 
-    # Часова мітка
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Часова мітка (ключ партиціонування)
+    created_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
 
     def __repr__(self):
-        return f"<Transaction(id={self.id}, user_id={self.user_id}, type={self.type}, amount={self.amount})>"
\ No newline at end of file
+        return f"<Transaction(id={self.id}, user_id={self.user_id}, type={self.type}, amount={self.amount})>"
+
+
+class BalanceSnapshot(Base):
+    """
+    Знімок балансу користувача за журналом транзакцій
+
+    Містить суму транзакцій з created_at < covered_until. Звірка з
+    User.balance читає лише транзакції після covered_until.
+    """
+
+    __tablename__ = "wallet_balance_snapshots"
+
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+
+    # Сума всіх транзакцій до covered_until
+    balance = Column(Integer, nullable=False, default=0)
+
+    # Сума поповнень через Stripe (для статистики дашборду)
+    deposited = Column(Integer, nullable=False, default=0)
+
+    transactions_count = Column(Integer, nullable=False, default=0)
+
+    covered_until = Column(DateTime(timezone=True), nullable=False, index=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<BalanceSnapshot(user_id={self.user_id}, balance={self.balance})>"
+
+
+class InboxEvent(Base):
+    """
+    Вхідні webhook-події (Stripe), збережені до обробки
+
+    Webhook лише перевіряє підпис і записує подію; нарахування виконує
+    воркер. Унікальність (provider, event_id) відсікає повторні доставки.
+    """
+
+    __tablename__ = "inbox"
+    __table_args__ = (
+        UniqueConstraint("provider", "event_id", name="uq_inbox_provider_event"),
+        Index("ix_inbox_status_available", "status", "available_at"),
+    )
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    provider = Column(String(20), nullable=False, default="stripe")
+    event_id = Column(String(255), nullable=False)
+    event_type = Column(String(100), nullable=False)
+    payload = Column(JSONB, nullable=False)
+
+    status = Column(Enum(InboxStatus), nullable=False, default=InboxStatus.PENDING)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+
+    received_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Не раніше якого часу брати подію в обробку (backoff після помилки)
+    available_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<InboxEvent(id={self.id}, event_id={self.event_id}, status={self.status})>"
+
+
+# Історія користувача: WHERE user_id = ? ORDER BY created_at DESC, id DESC
+Index(
+    "ix_transactions_user_created",
+    Transaction.user_id, Transaction.created_at.desc(), Transaction.id.desc()
+)
+
+# Партиція за замовчуванням: при create_all (тести) всі рядки потрапляють сюди,
+# у продакшні місячні партиції створює LedgerService.ensure_partitions
+event.listen(
+    Transaction.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS transactions_default PARTITION OF transactions DEFAULT")
+)
+
+# Журнал тільки доповнюється: дозволено лише перенесення між акаунтами (user_id)
+event.listen(
+    Transaction.__table__,
+    "after_create",
+    DDL("""
+    CREATE OR REPLACE FUNCTION transactions_append_only() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            RAISE EXCEPTION 'transactions ledger is append-only';
+        END IF;
+        IF NEW.amount IS DISTINCT FROM OLD.amount
+            OR NEW.balance_after IS DISTINCT FROM OLD.balance_after
+            OR NEW.type IS DISTINCT FROM OLD.type
+            OR NEW.created_at IS DISTINCT FROM OLD.created_at
+            OR NEW.external_id IS DISTINCT FROM OLD.external_id THEN
+            RAISE EXCEPTION 'transactions ledger is append-only';
+        END IF;
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql
+    """)
+)
+event.listen(
+    Transaction.__table__,
+    "after_create",
+    DDL("""
+    CREATE TRIGGER transactions_append_only
+        BEFORE UPDATE OR DELETE ON transactions
+        FOR EACH ROW EXECUTE FUNCTION transactions_append_only();
+    """)
+)
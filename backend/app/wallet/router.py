@@ -1,36 +1,43 @@
 import logging
-import stripe
+from datetime import datetime
 from typing import Optional, List
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
 from app.core.config import settings
-from app.core.cache import cache
 from app.users.dependencies import get_current_user, get_current_admin_user
 from app.users.models import User
-from app.wallet.service import WalletService, WalletAdminService
+from app.core.lazy import lazy_import
+from app.core.export import streaming_export_response, iter_query_rows
+from app.core.pagination import encode_cursor
+from app.core.http_cache import REFERENCE_POLICY, conditional_response
+from app.core.response_cache import cached_body
+from app.wallet.service import WalletService, WalletAdminService, TRANSACTIONS_EXPORT_FIELDS, COIN_PACKS_CACHE_KEY
+from app.wallet.ledger import LedgerService
+from app.wallet.inbox import StripeInboxService, notify_inbox_worker
+from app.wallet.stripe_gateway import StripeGateway, get_stripe_gateway
 from app.wallet.schemas import (
     CoinPackResponse, CoinPackCreate, CoinPackUpdate,
     TransactionResponse, TransactionListResponse,
     WalletBalanceResponse, WalletInfoResponse,
     StripeCheckoutResponse, StripeWebhookResponse,
     StripePaymentIntentResponse, StripeConfigResponse,
-    TransactionTypeEnum
+    TransactionTypeEnum, InboxEventResponse, InboxReplayRequest, InboxStatusEnum
 )
-from app.wallet.models import TransactionType
-from app.core.telegram_service import telegram_service
+from app.wallet.models import TransactionType, InboxStatus
 from app.wallet.utils import coin_pack_to_response
 
 logger = logging.getLogger(__name__)
 
-# Initialize Stripe
-stripe.api_key = settings.STRIPE_SECRET_KEY
+stripe = lazy_import("stripe")
 
 router = APIRouter(tags=["Wallet"])
 admin_router = APIRouter(tags=["Admin - Wallet"])
 webhook_router = APIRouter(tags=["Webhooks"])
 
+COIN_PACKS_CACHE_TTL = 3600
+
 
 @router.get("/balance", response_model=WalletBalanceResponse)
 async def get_my_balance(
@@ -79,32 +86,57 @@ async def get_wallet_info(
 
 @router.get("/coin-packs", response_model=List[CoinPackResponse])
 async def get_coin_packs(
+        request: Request,
         db: AsyncSession = Depends(get_db)
 ):
-    service = WalletService(db)
-    packs = await service.get_active_coin_packs()
-    return [coin_pack_to_response(p) for p in packs]
+    async def build():
+        packs = await WalletService(db).get_active_coin_packs()
+        return [coin_pack_to_response(p).model_dump(mode="json") for p in packs]
+
+    body = await cached_body(COIN_PACKS_CACHE_KEY, build, ttl=COIN_PACKS_CACHE_TTL)
+    return conditional_response(request, body, REFERENCE_POLICY)
 
 
 @router.get("/transactions", response_model=TransactionListResponse)
 async def get_my_transactions(
         page: int = Query(1, ge=1),
         size: int = Query(20, ge=1, le=100),
+        cursor: Optional[str] = Query(None, description="Курсор наступної сторінки (next_cursor)"),
         type: Optional[TransactionTypeEnum] = None,
         current_user: User = Depends(get_current_user),
         db: AsyncSession = Depends(get_db)
 ):
-    service = WalletService(db)
+    """
+    Історія транзакцій
 
-    offset = (page - 1) * size
+    З cursor використовується keyset-пагінація без підрахунку total.
+    Без cursor — сторінка page з total (сумісність зі старими клієнтами).
+    """
+    service = WalletService(db)
     transaction_type = TransactionType(type.value) if type else None
 
-    transactions, total = await service.get_user_transactions(
-        user_id=current_user.id,
-        limit=size,
-        offset=offset,
-        transaction_type=transaction_type
-    )
+    total = None
+    if cursor:
+        try:
+            transactions, next_cursor = await service.get_user_transactions_page(
+                user_id=current_user.id,
+                limit=size,
+                cursor=cursor,
+                transaction_type=transaction_type
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    else:
+        transactions, total = await service.get_user_transactions(
+            user_id=current_user.id,
+            limit=size,
+            offset=(page - 1) * size,
+            transaction_type=transaction_type
+        )
+        next_cursor = None
+        if transactions and page * size < total:
+            last = transactions[-1]
+            next_cursor = encode_cursor(last.created_at, last.id)
 
     return TransactionListResponse(
         items=[
@@ -122,7 +154,8 @@ async def get_my_transactions(
         ],
         total=total,
         page=page,
-        size=size
+        size=size,
+        next_cursor=next_cursor
     )
 
 
@@ -185,6 +218,99 @@ async def admin_delete_coin_pack(
     return {"success": True, "message": "CoinPack deactivated"}
 
 
+@admin_router.get("/transactions/export")
+async def admin_export_transactions(
+        format: str = Query("csv", pattern="^(csv|ndjson)$"),
+        user_id: Optional[int] = None,
+        type: Optional[TransactionTypeEnum] = None,
+        date_from: Optional[datetime] = Query(None, description="Створені з (включно)"),
+        date_to: Optional[datetime] = Query(None, description="Створені до (не включно)"),
+        admin: User = Depends(get_current_admin_user),
+        db: AsyncSession = Depends(get_db)
+):
+    """Потоковий експорт транзакцій у CSV або NDJSON"""
+    service = WalletAdminService(db)
+    query = service.get_transactions_export_query(
+        user_id=user_id,
+        transaction_type=TransactionType(type.value) if type else None,
+        date_from=date_from,
+        date_to=date_to
+    )
+
+    return streaming_export_response(
+        iter_query_rows(query),
+        fields=TRANSACTIONS_EXPORT_FIELDS,
+        export_format=format,
+        filename="transactions"
+    )
+
+
+@admin_router.get("/ledger/reconciliation")
+async def admin_ledger_reconciliation(
+        limit: int = Query(100, ge=1, le=1000),
+        admin: User = Depends(get_current_admin_user),
+        db: AsyncSession = Depends(get_db)
+):
+    """Користувачі, чий баланс розходиться з журналом транзакцій"""
+    service = LedgerService(db)
+    watermark = await service.get_watermark()
+    drift = await service.find_balance_drift(limit=limit)
+
+    return {
+        "snapshot_watermark": watermark if watermark.year > 1 else None,
+        "count": len(drift),
+        "items": drift
+    }
+
+
+@admin_router.post("/ledger/snapshots/refresh")
+async def admin_refresh_balance_snapshots(
+        admin: User = Depends(get_current_admin_user),
+        db: AsyncSession = Depends(get_db)
+):
+    """Примусово оновлює знімки балансів"""
+    result = await LedgerService(db).refresh_snapshots()
+    return {"success": True, **result}
+
+
+@admin_router.get("/webhooks/inbox", response_model=List[InboxEventResponse])
+async def admin_get_inbox_events(
+        status_filter: Optional[InboxStatusEnum] = Query(None, alias="status"),
+        limit: int = Query(50, ge=1, le=500),
+        offset: int = Query(0, ge=0),
+        admin: User = Depends(get_current_admin_user),
+        db: AsyncSession = Depends(get_db)
+):
+    """Збережені Stripe події (останні першими)"""
+    service = StripeInboxService(db)
+    events = await service.list_events(
+        status=InboxStatus(status_filter.value) if status_filter else None,
+        limit=limit,
+        offset=offset
+    )
+    return [InboxEventResponse.model_validate(e) for e in events]
+
+
+@admin_router.post("/webhooks/inbox/replay")
+async def admin_replay_inbox_events(
+        data: InboxReplayRequest,
+        admin: User = Depends(get_current_admin_user),
+        db: AsyncSession = Depends(get_db)
+):
+    """Повертає збережені Stripe події в чергу обробки"""
+    service = StripeInboxService(db)
+    try:
+        requeued = await service.replay(
+            event_ids=data.event_ids,
+            status=InboxStatus(data.status.value) if data.status else None,
+            received_from=data.received_from
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return {"success": True, "requeued": requeued}
+
+
 @admin_router.post("/users/{user_id}/add-coins")
 async def admin_add_coins_to_user(
         user_id: int,
@@ -232,7 +358,8 @@ async def get_stripe_config():
 async def create_payment_intent(
         pack_id: int,
         current_user: User = Depends(get_current_user),
-        db: AsyncSession = Depends(get_db)
+        db: AsyncSession = Depends(get_db),
+        gateway: StripeGateway = Depends(get_stripe_gateway)
 ):
     """
     Creates a Stripe Payment Intent for embedded checkout.
@@ -241,7 +368,7 @@ async def create_payment_intent(
     service = WalletService(db)
 
     # Get the coin pack
-    coin_pack = await service.get_coin_pack_by_id(pack_id)
+    coin_pack = await service.get_coin_pack_cached(pack_id)
     if not coin_pack:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -258,21 +385,14 @@ async def create_payment_intent(
         # Calculate amount in cents
         amount_cents = int(coin_pack.price_usd * 100)
 
-        # Create Stripe Payment Intent with wallet support
-        payment_intent = stripe.PaymentIntent.create(
-            amount=amount_cents,
-            currency='usd',
+        payment_intent = await gateway.create_payment_intent(
+            amount_cents=amount_cents,
             metadata={
                 'user_id': str(current_user.id),
                 'pack_id': str(pack_id),
                 'coins_amount': str(coin_pack.get_total_coins()),
             },
-            receipt_email=current_user.email if current_user.email else None,
-            # Enable automatic payment methods including wallets
-            automatic_payment_methods={
-                'enabled': True,
-                'allow_redirects': 'never',  # Keep user in app
-            },
+            receipt_email=current_user.email
         )
 
         logger.info(
@@ -302,7 +422,8 @@ async def create_payment_intent(
 async def create_checkout_session(
         pack_id: int,
         current_user: User = Depends(get_current_user),
-        db: AsyncSession = Depends(get_db)
+        db: AsyncSession = Depends(get_db),
+        gateway: StripeGateway = Depends(get_stripe_gateway)
 ):
     """
     Creates a Stripe Checkout Session for purchasing a coin pack.
@@ -312,7 +433,7 @@ async def create_checkout_session(
     service = WalletService(db)
 
     # Get the coin pack
-    coin_pack = await service.get_coin_pack_by_id(pack_id)
+    coin_pack = await service.get_coin_pack_cached(pack_id)
     if not coin_pack:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -326,14 +447,8 @@ async def create_checkout_session(
         )
 
     try:
-        # Create Stripe Checkout Session
-        checkout_session = stripe.checkout.Session.create(
-            payment_method_types=['card'],
-            line_items=[{
-                'price': coin_pack.stripe_price_id,
-                'quantity': 1,
-            }],
-            mode='payment',
+        checkout_session = await gateway.create_checkout_session(
+            price_id=coin_pack.stripe_price_id,
             success_url=f"{settings.FRONTEND_URL}/profile/wallet/return"
                         f"?session_id={{CHECKOUT_SESSION_ID}}",
             cancel_url=f"{settings.FRONTEND_URL}/profile/wallet",
@@ -342,7 +457,7 @@ async def create_checkout_session(
                 'pack_id': str(pack_id),
                 'coins_amount': str(coin_pack.get_total_coins()),
             },
-            customer_email=current_user.email if current_user.email else None,
+            customer_email=current_user.email
         )
 
         logger.info(
@@ -369,15 +484,17 @@ async def stripe_webhook(
         db: AsyncSession = Depends(get_db)
 ):
     """
-    Handles Stripe webhook events.
-    Listens for checkout.session.completed to add coins to user.
+    Приймає Stripe webhook
+
+    Перевіряє підпис і записує подію в inbox; нарахування монет виконує
+    воркер (app.wallet.inbox), тому Stripe отримує 200 без очікування.
     """
     payload = await request.body()
     sig_header = request.headers.get('stripe-signature')
 
     # Verify webhook signature
     try:
-        event = stripe.Webhook.construct_event(
+        stripe.Webhook.construct_event(
             payload, sig_header, settings.STRIPE_WEBHOOK_SECRET
         )
     except ValueError as e:
@@ -393,118 +510,11 @@ async def stripe_webhook(
             detail="Invalid signature"
         )
 
-    # Handle the event - support both checkout.session.completed and payment_intent.succeeded
-    event_type = event['type']
-
-    if event_type in ['checkout.session.completed', 'payment_intent.succeeded']:
-        event_object = event['data']['object']
-
-        # Determine the unique ID and amount based on event type
-        if event_type == 'checkout.session.completed':
-            event_id = event_object['id']
-            amount_cents = event_object.get('amount_total', 0)
-            idempotency_key = f"stripe:session:{event_id}"
-        else:  # payment_intent.succeeded
-            event_id = event_object['id']
-            amount_cents = event_object.get('amount', 0)
-            idempotency_key = f"stripe:intent:{event_id}"
-
-        logger.info(f"Stripe {event_type}: id={event_id}")
-
-        # Check for duplicate processing
-        if await cache.get(idempotency_key):
-            logger.info(f"Duplicate Stripe webhook ignored: {event_id}")
-            return StripeWebhookResponse(
-                success=True,
-                message="Transaction already processed"
-            )
-
-        # Extract metadata
-        metadata = event_object.get('metadata', {})
-        user_id = metadata.get('user_id')
-        pack_id = metadata.get('pack_id')
-        coins_amount = metadata.get('coins_amount')
-
-        if not user_id or not pack_id:
-            logger.error(
-                f"Missing metadata in Stripe event: {event_id}"
-            )
-            return StripeWebhookResponse(
-                success=False,
-                message="Missing user_id or pack_id in metadata"
-            )
-
-        try:
-            user_id = int(user_id)
-            pack_id = int(pack_id)
-        except (ValueError, TypeError) as e:
-            logger.error(f"Invalid metadata format: {e}")
-            return StripeWebhookResponse(
-                success=False,
-                message="Invalid metadata format"
-            )
-
-        # Process the purchase
-        service = WalletService(db)
-
-        try:
-            transaction = await service.process_stripe_purchase(
-                user_id=user_id,
-                pack_id=pack_id,
-                session_id=event_id,
-                amount_cents=amount_cents
-            )
-        except ValueError as e:
-            if "already processed" in str(e):
-                logger.info(f"Transaction {event_id} already processed")
-                return StripeWebhookResponse(
-                    success=True,
-                    message="Transaction already processed"
-                )
-            logger.error(f"Error processing Stripe purchase: {e}")
-            return StripeWebhookResponse(
-                success=False,
-                message=str(e)
-            )
-
-        # Mark as processed
-        await cache.set(idempotency_key, "1", ttl=86400)
-
-        # Send Telegram notification
-        try:
-            user = await db.get(User, user_id)
-            if user and user.telegram_id:
-                coin_pack = await service.get_coin_pack_by_id(pack_id)
-                pack_name = coin_pack.name if coin_pack else f"Pack #{pack_id}"
-                price_usd = amount_cents / 100
-
-                message = (
-                    f"✅ *Баланс поповнено!*\n\n"
-                    f"💰 Сума: *+{transaction.amount} OMR*\n"
-                    f"📦 Пакет: {pack_name}\n"
-                    f"💳 Вартість: ${price_usd:.2f}\n"
-                    f"💵 Поточний баланс: *{transaction.balance_after} OMR*"
-                )
-                await telegram_service.send_message(user.telegram_id, message)
-        except Exception as e:
-            logger.error(f"Failed to send Telegram notification: {e}")
-
-        logger.info(
-            f"Stripe purchase successful: user={user_id}, "
-            f"coins={transaction.amount}, balance={transaction.balance_after}"
-        )
-
-        return StripeWebhookResponse(
-            success=True,
-            message="Coins added successfully",
-            user_id=user_id,
-            coins_added=transaction.amount,
-            new_balance=transaction.balance_after
-        )
+    is_new = await StripeInboxService(db).store_event(payload)
+    if is_new:
+        notify_inbox_worker()
 
-    # For other event types, just acknowledge
-    logger.info(f"Unhandled Stripe event type: {event_type}")
     return StripeWebhookResponse(
         success=True,
-        message=f"Event {event_type} received"
-    )
\ No newline at end of file
+        message="Event queued" if is_new else "Event already received"
+    )
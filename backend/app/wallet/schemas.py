@@ -72,9 +72,11 @@ class TransactionResponse(TransactionBase):
 
 class TransactionListResponse(BaseModel):
     items: List[TransactionResponse]
-    total: int
+    # None для keyset-сторінок (cursor)
+    total: Optional[int] = None
     page: int
     size: int
+    next_cursor: Optional[str] = None
 
 
 # ============ Wallet Schemas ============
@@ -118,4 +120,34 @@ class StripeWebhookResponse(BaseModel):
     message: str
     user_id: Optional[int] = None
     coins_added: Optional[int] = None
-    new_balance: Optional[int] = None
\ No newline at end of file
+    new_balance: Optional[int] = None
+
+
+# ============ Webhook Inbox Schemas ============
+
+class InboxStatusEnum(str, Enum):
+    PENDING = "pending"
+    PROCESSED = "processed"
+    IGNORED = "ignored"
+    FAILED = "failed"
+    DEAD = "dead"
+
+
+class InboxEventResponse(BaseModel):
+    id: int
+    event_id: str
+    event_type: str
+    status: InboxStatusEnum
+    attempts: int
+    last_error: Optional[str] = None
+    received_at: Optional[datetime] = None
+    processed_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class InboxReplayRequest(BaseModel):
+    """Фільтри для повторної обробки (потрібен хоча б один)"""
+    event_ids: Optional[List[str]] = None
+    status: Optional[InboxStatusEnum] = None
+    received_from: Optional[datetime] = None
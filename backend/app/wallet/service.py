@@ -1,13 +1,35 @@
+import json
 import logging
+from datetime import datetime
 from typing import Optional, List
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc
+from sqlalchemy import select, desc, func, tuple_, Select
+
+from app.core.cache import cache
+from app.core.export import apply_date_range
+from app.core.pagination import encode_cursor, decode_cursor, parse_cursor_datetime
 
 from app.users.models import User
 from app.wallet.models import CoinPack, Transaction, TransactionType
 
 logger = logging.getLogger(__name__)
 
+# Пакети змінюються лише через адмінку, яка скидає кеш
+COIN_PACK_CACHE_TTL = 3600
+
+# Поля пакета, потрібні для створення оплати
+COIN_PACK_CACHE_FIELDS = (
+    "id", "name", "price_usd", "coins_amount", "bonus_percent", "stripe_price_id", "is_active"
+)
+
+
+def coin_pack_cache_key(pack_id: int) -> str:
+    return f"wallet:coin_pack:{pack_id}"
+
+
+# Готове тіло GET /wallet/coin-packs (response_cache)
+COIN_PACKS_CACHE_KEY = "wallet:coin_packs:body"
+
 
 class WalletService:
     """Сервіс для роботи з OMR Coins гаманцем"""
@@ -32,7 +54,8 @@ class WalletService:
             description: str,
             external_id: Optional[str] = None,
             order_id: Optional[int] = None,
-            subscription_id: Optional[int] = None
+            subscription_id: Optional[int] = None,
+            commit: bool = True
     ) -> Transaction:
         """
         Додає монети на баланс користувача
@@ -45,6 +68,7 @@ class WalletService:
             external_id: Зовнішній ID (наприклад, Gumroad sale_id)
             order_id: ID замовлення (якщо пов'язано)
             subscription_id: ID підписки (якщо пов'язано)
+            commit: False — лише flush, коміт робить викликач (обробка inbox)
         """
         if amount <= 0:
             raise ValueError("Amount must be positive")
@@ -74,8 +98,11 @@ class WalletService:
         )
 
         self.db.add(transaction)
-        await self.db.commit()
-        await self.db.refresh(transaction)
+        if commit:
+            await self.db.commit()
+            await self.db.refresh(transaction)
+        else:
+            await self.db.flush()
 
         logger.info(f"Added {amount} coins to user {user_id}. New balance: {new_balance}")
 
@@ -168,8 +195,36 @@ class WalletService:
         """Знаходить пакет монет за ID"""
         return await self.db.get(CoinPack, pack_id)
 
+    async def get_coin_pack_cached(self, pack_id: int) -> Optional[CoinPack]:
+        """
+        Пакет для створення оплати з кешу Redis
+
+        Повертає від'єднаний від сесії CoinPack лише з полями
+        COIN_PACK_CACHE_FIELDS — тільки для читання.
+        """
+        key = coin_pack_cache_key(pack_id)
+        cached = await cache.get(key)
+        if cached:
+            return CoinPack(**json.loads(cached))
+
+        coin_pack = await self.get_coin_pack_by_id(pack_id)
+        if coin_pack:
+            data = {field: getattr(coin_pack, field) for field in COIN_PACK_CACHE_FIELDS}
+            await cache.set(key, json.dumps(data), ttl=COIN_PACK_CACHE_TTL)
+        return coin_pack
+
     # ============ Transaction Operations ============
 
+    def _user_transactions_query(
+            self,
+            user_id: int,
+            transaction_type: Optional[TransactionType] = None
+    ) -> Select:
+        query = select(Transaction).where(Transaction.user_id == user_id)
+        if transaction_type:
+            query = query.where(Transaction.type == transaction_type)
+        return query
+
     async def get_user_transactions(
             self,
             user_id: int,
@@ -178,19 +233,14 @@ class WalletService:
             transaction_type: Optional[TransactionType] = None
     ) -> tuple[List[Transaction], int]:
         """
-        Отримує історію транзакцій користувача
+        Отримує історію транзакцій користувача (offset-пагінація)
 
         Returns:
             Tuple[List[Transaction], int]: Список транзакцій та загальна кількість
         """
-        # Базовий запит
-        base_query = select(Transaction).where(Transaction.user_id == user_id)
-
-        if transaction_type:
-            base_query = base_query.where(Transaction.type == transaction_type)
+        base_query = self._user_transactions_query(user_id, transaction_type)
 
         # Загальна кількість
-        from sqlalchemy import func
         count_query = select(func.count()).select_from(base_query.subquery())
         total_result = await self.db.execute(count_query)
         total = total_result.scalar()
@@ -198,7 +248,7 @@ class WalletService:
         # Отримуємо транзакції з пагінацією
         query = (
             base_query
-            .order_by(desc(Transaction.created_at))
+            .order_by(desc(Transaction.created_at), desc(Transaction.id))
             .offset(offset)
             .limit(limit)
         )
@@ -207,6 +257,48 @@ class WalletService:
 
         return transactions, total
 
+    async def get_user_transactions_page(
+            self,
+            user_id: int,
+            limit: int = 20,
+            cursor: Optional[str] = None,
+            transaction_type: Optional[TransactionType] = None
+    ) -> tuple[List[Transaction], Optional[str]]:
+        """
+        Отримує сторінку історії за курсором (keyset по created_at, id)
+
+        Читає лише індекс (user_id, created_at DESC, id DESC) без COUNT,
+        тому час не залежить від глибини сторінки.
+
+        Raises:
+            ValueError: Якщо курсор пошкоджений
+
+        Returns:
+            Tuple[List[Transaction], Optional[str]]: Транзакції та курсор наступної сторінки
+        """
+        query = self._user_transactions_query(user_id, transaction_type)
+
+        if cursor:
+            created_at, last_id = decode_cursor(cursor, 2)
+            if not isinstance(last_id, int):
+                raise ValueError("Invalid cursor")
+            query = query.where(
+                tuple_(Transaction.created_at, Transaction.id)
+                < tuple_(parse_cursor_datetime(created_at), last_id)
+            )
+
+        query = query.order_by(desc(Transaction.created_at), desc(Transaction.id)).limit(limit + 1)
+        result = await self.db.execute(query)
+        transactions = list(result.scalars().all())
+
+        next_cursor = None
+        if len(transactions) > limit:
+            transactions = transactions[:limit]
+            last = transactions[-1]
+            next_cursor = encode_cursor(last.created_at, last.id)
+
+        return transactions, next_cursor
+
     async def check_duplicate_transaction(self, external_id: str) -> bool:
         """Перевіряє, чи вже існує транзакція з таким external_id"""
         query = select(Transaction).where(Transaction.external_id == external_id)
@@ -220,7 +312,8 @@ class WalletService:
             user_id: int,
             pack_id: int,
             session_id: str,
-            amount_cents: int
+            amount_cents: int,
+            commit: bool = True
     ) -> Transaction:
         """
         Обробляє покупку пакету монет через Stripe
@@ -230,7 +323,14 @@ class WalletService:
             pack_id: ID пакету монет
             session_id: Stripe session ID (для дедуплікації)
             amount_cents: Сума в центах (для логування)
+            commit: False — нарахування комітиться разом зі статусом події inbox
         """
+        # Блокуємо користувача до перевірки дубліката, щоб паралельні
+        # обробники однієї оплати виконувались послідовно
+        user = await self.db.scalar(select(User).where(User.id == user_id).with_for_update())
+        if not user:
+            raise ValueError(f"User {user_id} not found")
+
         # Перевіряємо на дублікат
         if await self.check_duplicate_transaction(session_id):
             logger.warning(f"Duplicate Stripe transaction: {session_id}")
@@ -256,7 +356,8 @@ class WalletService:
             amount=total_coins,
             transaction_type=TransactionType.DEPOSIT,
             description=description,
-            external_id=session_id
+            external_id=session_id,
+            commit=commit
         )
 
         logger.info(
@@ -267,6 +368,13 @@ class WalletService:
         return transaction
 
 
+# Колонки експорту транзакцій
+TRANSACTIONS_EXPORT_FIELDS = (
+    "id", "user_id", "type", "amount", "balance_after", "description",
+    "order_id", "subscription_id", "external_id", "created_at"
+)
+
+
 # ============ Admin Operations ============
 
 class WalletAdminService(WalletService):
@@ -299,6 +407,7 @@ class WalletAdminService(WalletService):
 
         self.db.add(coin_pack)
         await self.db.commit()
+        await cache.delete(COIN_PACKS_CACHE_KEY)
         await self.db.refresh(coin_pack)
 
         return coin_pack
@@ -318,6 +427,7 @@ class WalletAdminService(WalletService):
                 setattr(coin_pack, key, value)
 
         await self.db.commit()
+        await cache.delete(coin_pack_cache_key(pack_id), COIN_PACKS_CACHE_KEY)
         await self.db.refresh(coin_pack)
 
         return coin_pack
@@ -330,6 +440,7 @@ class WalletAdminService(WalletService):
 
         coin_pack.is_active = False
         await self.db.commit()
+        await cache.delete(coin_pack_cache_key(pack_id), COIN_PACKS_CACHE_KEY)
 
         return True
 
@@ -360,4 +471,22 @@ class WalletAdminService(WalletService):
             amount=amount,
             transaction_type=TransactionType.BONUS,
             description=description
-        )
\ No newline at end of file
+        )
+
+    def get_transactions_export_query(
+            self,
+            user_id: Optional[int] = None,
+            transaction_type: Optional[TransactionType] = None,
+            date_from: Optional[datetime] = None,
+            date_to: Optional[datetime] = None
+    ) -> Select:
+        """Запит для потокового експорту транзакцій (для бухгалтерії)"""
+        query = select(*[getattr(Transaction, field) for field in TRANSACTIONS_EXPORT_FIELDS])
+
+        if user_id is not None:
+            query = query.where(Transaction.user_id == user_id)
+        if transaction_type:
+            query = query.where(Transaction.type == transaction_type)
+
+        query = apply_date_range(query, Transaction.created_at, date_from, date_to)
+        return query.order_by(Transaction.id)
@@ -0,0 +1,191 @@
+"""
+Асинхронний шлюз до Stripe API
+
+Виклики йдуть через StripeClient з httpx.AsyncClient: один пул з'єднань на
+процес, таймаути та мережеві повтори налаштовуються в settings. Event loop не
+блокується на час запиту до Stripe, на відміну від синхронних
+stripe.PaymentIntent.create / stripe.checkout.Session.create.
+"""
+import asyncio
+import logging
+import ssl
+from functools import lru_cache
+from typing import Dict, Mapping, Optional
+
+import httpx
+
+from app.core.config import settings
+from app.core.lazy import lazy_import
+
+stripe = lazy_import("stripe")
+
+logger = logging.getLogger(__name__)
+
+CURRENCY = "usd"
+
+
+@lru_cache(maxsize=1)
+def _pooled_client_class() -> type:
+    """
+    Підклас stripe.HTTPClient (підтримуваний SDK спосіб підключити свій транспорт)
+
+    Клас будується при першому виклику, щоб не імпортувати stripe на старті.
+    """
+
+    class PooledHTTPClient(stripe.HTTPClient):
+        """Асинхронний клієнт Stripe поверх власного httpx.AsyncClient з лімітами пулу"""
+
+        name = "httpx"
+
+        def __init__(
+                self,
+                timeout: float,
+                max_connections: int,
+                transport: Optional[httpx.AsyncBaseTransport] = None
+        ):
+            super().__init__()
+            self._http = httpx.AsyncClient(
+                verify=ssl.create_default_context(cafile=stripe.ca_bundle_path),
+                timeout=timeout,
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections
+                ),
+                transport=transport
+            )
+
+        def _request(self, method: str, url: str, headers: Mapping[str, str], post_data) -> httpx.Request:
+            # Stripe передає тіло вже закодованим (application/x-www-form-urlencoded)
+            return self._http.build_request(method, url, headers=headers, content=post_data)
+
+        @staticmethod
+        def _connection_error(e: Exception):
+            # Мережеві помилки Stripe повторює сам (max_network_retries)
+            return stripe.APIConnectionError(
+                f"Network error communicating with Stripe: {type(e).__name__}",
+                should_retry=True
+            )
+
+        async def request_async(self, method, url, headers, post_data=None):
+            try:
+                response = await self._http.send(self._request(method, url, headers, post_data))
+            except httpx.HTTPError as e:
+                raise self._connection_error(e) from e
+            return response.content, response.status_code, response.headers
+
+        async def request_stream_async(self, method, url, headers, post_data=None):
+            try:
+                response = await self._http.send(self._request(method, url, headers, post_data), stream=True)
+            except httpx.HTTPError as e:
+                raise self._connection_error(e) from e
+            return response.aiter_bytes(), response.status_code, response.headers
+
+        def sleep_async(self, secs: float):
+            return asyncio.sleep(secs)
+
+        async def close_async(self):
+            await self._http.aclose()
+
+    return PooledHTTPClient
+
+
+def _pooled_http_client(
+        timeout: float,
+        max_connections: int,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+) -> "stripe.HTTPClient":
+    """HTTP-клієнт Stripe зі спільним пулом з'єднань та власним transport"""
+    return _pooled_client_class()(timeout, max_connections, transport)
+
+
+class StripeGateway:
+    """Операції Stripe, які потрібні гаманцю"""
+
+    def __init__(
+            self,
+            api_key: str,
+            api_base: Optional[str] = None,
+            timeout: float = 10.0,
+            max_network_retries: int = 2,
+            max_connections: int = 20,
+            transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        """
+        Args:
+            api_key: Секретний ключ Stripe
+            api_base: Адреса API (fake-Stripe для тестів); None — api.stripe.com
+            transport: Власний httpx transport (наприклад, ASGITransport у тестах)
+        """
+        self._http_client = _pooled_http_client(timeout, max_connections, transport)
+        self._client = stripe.StripeClient(
+            api_key,
+            http_client=self._http_client,
+            base_addresses={"api": api_base} if api_base else None,
+            max_network_retries=max_network_retries
+        )
+
+    async def create_payment_intent(
+            self,
+            amount_cents: int,
+            metadata: Dict[str, str],
+            receipt_email: Optional[str] = None
+    ) -> "stripe.PaymentIntent":
+        params = {
+            "amount": amount_cents,
+            "currency": CURRENCY,
+            "metadata": metadata,
+            # Гаманці (Apple/Google Pay) без редіректів — користувач лишається в застосунку
+            "automatic_payment_methods": {"enabled": True, "allow_redirects": "never"},
+        }
+        if receipt_email:
+            params["receipt_email"] = receipt_email
+
+        return await self._client.v1.payment_intents.create_async(params)
+
+    async def create_checkout_session(
+            self,
+            price_id: str,
+            metadata: Dict[str, str],
+            success_url: str,
+            cancel_url: str,
+            customer_email: Optional[str] = None
+    ) -> "stripe.checkout.Session":
+        params = {
+            "payment_method_types": ["card"],
+            "line_items": [{"price": price_id, "quantity": 1}],
+            "mode": "payment",
+            "success_url": success_url,
+            "cancel_url": cancel_url,
+            "metadata": metadata,
+        }
+        if customer_email:
+            params["customer_email"] = customer_email
+
+        return await self._client.v1.checkout.sessions.create_async(params)
+
+    async def close(self):
+        await self._http_client.close_async()
+
+
+_gateway: Optional[StripeGateway] = None
+
+
+def get_stripe_gateway() -> StripeGateway:
+    """Спільний шлюз процесу (FastAPI-залежність, підміняється в тестах)"""
+    global _gateway
+    if _gateway is None:
+        _gateway = StripeGateway(
+            api_key=settings.STRIPE_SECRET_KEY,
+            api_base=settings.STRIPE_API_BASE or None,
+            timeout=settings.STRIPE_TIMEOUT_SECONDS,
+            max_network_retries=settings.STRIPE_MAX_NETWORK_RETRIES,
+            max_connections=settings.STRIPE_MAX_CONNECTIONS
+        )
+    return _gateway
+
+
+async def close_stripe_gateway():
+    global _gateway
+    if _gateway is not None:
+        await _gateway.close()
+        _gateway = None
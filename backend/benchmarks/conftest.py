@@ -0,0 +1,136 @@
+"""
+Оточення для бенчмарків: окрема БД, пул з'єднань та ASGI-клієнт
+
+На відміну від tests/, кожен запит отримує власну сесію з пулу, тому
+SELECT ... FOR UPDATE реально конкурують між собою. Потрібні локальні
+Postgres (DATABASE_URL) та Redis (REDIS_URL).
+
+Запуск: pytest benchmarks --benchmark-only
+"""
+import asyncio
+from decimal import Decimal
+from typing import AsyncGenerator, List
+
+import httpx
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.core.config import settings
+from app.core.database import Base, get_db
+from app.core.telegram_service import telegram_service
+from app.main import app, limiter
+from app.products.models import Product, ProductTranslation
+from app.users.auth_service import AuthService
+from app.users.models import User
+
+BENCH_DB_NAME = "ohmyrevit_bench_db"
+BENCH_DATABASE_URL = settings.DATABASE_URL.replace(settings.DB_NAME, BENCH_DB_NAME)
+BENCH_WEBHOOK_SECRET = "whsec_benchmark_secret"
+
+
+class BenchEnv:
+    """Власний event loop і пул БД, спільні для всієї сесії бенчмарків"""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.engine = create_async_engine(BENCH_DATABASE_URL, pool_size=30, max_overflow=20)
+        self.session_maker = async_sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
+
+    def run(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    async def get_db(self) -> AsyncGenerator[AsyncSession, None]:
+        async with self.session_maker() as session:
+            try:
+                yield session
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+
+    def client(self, token: str = "") -> httpx.AsyncClient:
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        return httpx.AsyncClient(app=app, base_url="http://bench", headers=headers, timeout=60)
+
+    async def create_users(self, count: int, balance: int = 0, prefix: int = 0) -> List[User]:
+        async with self.session_maker() as session:
+            users = [
+                User(telegram_id=prefix + i, first_name=f"Bench {prefix + i}", balance=balance)
+                for i in range(count)
+            ]
+            session.add_all(users)
+            await session.commit()
+            return users
+
+    async def create_products(self, count: int, price: str = "5.00") -> List[Product]:
+        async with self.session_maker() as session:
+            products = []
+            for i in range(count):
+                product = Product(price=Decimal(price), main_image_url="/img.jpg",
+                                  zip_file_path="/file.zip", file_size_mb=1)
+                product.translations.append(
+                    ProductTranslation(language_code="uk", title=f"Bench product {i}", description="...")
+                )
+                products.append(product)
+            session.add_all(products)
+            await session.commit()
+            return products
+
+    async def scalar(self, statement, **params):
+        async with self.session_maker() as session:
+            return await session.scalar(text(statement), params)
+
+    @staticmethod
+    def token(user: User) -> str:
+        return AuthService.create_access_token(user.id)
+
+
+async def _noop_send_message(*args, **kwargs):
+    return True
+
+
+@pytest.fixture(scope="session")
+def bench_env():
+    env = BenchEnv()
+    service_engine = create_async_engine(
+        settings.DATABASE_URL.replace(f"/{settings.DB_NAME}", "/postgres"),
+        isolation_level="AUTOCOMMIT"
+    )
+
+    async def setup():
+        async with service_engine.connect() as conn:
+            await conn.execute(text(f"DROP DATABASE IF EXISTS {BENCH_DB_NAME} WITH (FORCE)"))
+            await conn.execute(text(f"CREATE DATABASE {BENCH_DB_NAME}"))
+        async with env.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    async def teardown():
+        await env.engine.dispose()
+        async with service_engine.connect() as conn:
+            await conn.execute(text(f"DROP DATABASE IF EXISTS {BENCH_DB_NAME} WITH (FORCE)"))
+        await service_engine.dispose()
+
+    env.run(setup())
+
+    original_secret = settings.STRIPE_WEBHOOK_SECRET
+    original_send = telegram_service.send_message
+    settings.STRIPE_WEBHOOK_SECRET = BENCH_WEBHOOK_SECRET
+    # Зовнішні виклики Telegram не повинні потрапляти у виміри
+    telegram_service.send_message = _noop_send_message
+    app.dependency_overrides[get_db] = env.get_db
+    app.dependency_overrides[limiter.check_rate_limit] = lambda: None
+
+    yield env
+
+    app.dependency_overrides.clear()
+    telegram_service.send_message = original_send
+    settings.STRIPE_WEBHOOK_SECRET = original_secret
+    env.run(teardown())
+    env.loop.close()
+
+
+def record(benchmark, report):
+    """Додає метрики драйвера у звіт pytest-benchmark"""
+    benchmark.extra_info.update(report.as_dict())
+    print(f"\n{report.summary()}")
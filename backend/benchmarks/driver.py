@@ -0,0 +1,155 @@
+"""
+Асинхронний драйвер навантаження для гарячих грошових шляхів
+
+Використовується бенчмарками з benchmarks/ (in-process через ASGI) і як CLI
+для живого сервера:
+
+    python -m benchmarks.driver --url http://localhost:8000 --token <JWT> \\
+        --scenario bonus --requests 200 --concurrency 20
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+
+
+@dataclass
+class LoadReport:
+    """Результат прогону: латентності, статуси та пропускна здатність"""
+    name: str
+    concurrency: int
+    duration: float = 0.0
+    latencies: List[float] = field(default_factory=list)
+    status_counts: Dict[int, int] = field(default_factory=dict)
+    errors: int = 0
+
+    @property
+    def requests(self) -> int:
+        return len(self.latencies)
+
+    def percentile(self, pct: float) -> float:
+        """Латентність (мс) для перцентиля методом nearest-rank"""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+        return ordered[index] * 1000
+
+    @property
+    def p50(self) -> float:
+        return self.percentile(50)
+
+    @property
+    def p99(self) -> float:
+        return self.percentile(99)
+
+    @property
+    def throughput(self) -> float:
+        """Запитів за секунду"""
+        return self.requests / self.duration if self.duration else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "requests": self.requests,
+            "concurrency": self.concurrency,
+            "errors": self.errors,
+            "duration_s": round(self.duration, 3),
+            "throughput_rps": round(self.throughput, 1),
+            "p50_ms": round(self.p50, 2),
+            "p99_ms": round(self.p99, 2),
+            "status_counts": self.status_counts,
+        }
+
+    def summary(self) -> str:
+        return (
+            f"{self.name}: {self.requests} req, c={self.concurrency}, "
+            f"{self.throughput:.1f} rps, p50={self.p50:.1f}ms, p99={self.p99:.1f}ms, "
+            f"errors={self.errors}, statuses={self.status_counts}"
+        )
+
+
+async def run_load(
+        name: str,
+        request: Callable[[int], Awaitable[int]],
+        total: int,
+        concurrency: int
+) -> LoadReport:
+    """
+    Виконує total запитів з обмеженою паралельністю
+
+    Args:
+        name: Назва сценарію для звіту
+        request: Корутина-фабрика, приймає номер запиту, повертає HTTP статус
+        total: Загальна кількість запитів
+        concurrency: Максимум одночасних запитів
+    """
+    report = LoadReport(name=name, concurrency=concurrency)
+    statuses = Counter()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                status_code = await request(i)
+            except Exception:
+                report.errors += 1
+                status_code = 0
+            report.latencies.append(time.perf_counter() - started)
+            statuses[status_code] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    report.duration = time.perf_counter() - started
+    report.status_counts = dict(statuses)
+    return report
+
+
+# ============ CLI для живого сервера ============
+
+SCENARIOS = {
+    "bonus": ("POST", "/api/v1/profile/bonus/claim", None),
+    "balance": ("GET", "/api/v1/wallet/balance", None),
+    "checkout": ("POST", "/api/v1/orders/checkout", "product_ids"),
+}
+
+
+async def _run_cli(args: argparse.Namespace) -> LoadReport:
+    method, path, body_kind = SCENARIOS[args.scenario]
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    body = None
+    if body_kind == "product_ids":
+        body = {"product_ids": [int(p) for p in args.product_ids.split(",")]}
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, headers=headers, limits=limits, timeout=30) as client:
+        async def request(_: int) -> int:
+            response = await client.request(method, path, json=body)
+            return response.status_code
+
+        return await run_load(args.scenario, request, args.requests, args.concurrency)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Навантажувальний драйвер OhMyRevit API")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--token", default="", help="JWT користувача")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="balance")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--product-ids", default="", help="Для checkout: id через кому")
+    parser.add_argument("--json", action="store_true", help="Вивести звіт у JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(_run_cli(args))
+    print(json.dumps(report.as_dict(), indent=2) if args.json else report.summary())
+
+
+if __name__ == "__main__":
+    main()
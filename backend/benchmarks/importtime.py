@@ -0,0 +1,100 @@
+"""
+Звіт про час імпорту (python -X importtime)
+
+Запускає імпорт модуля в окремому процесі й агрегує час за пакетами
+верхнього рівня, щоб видно було, що саме сповільнює старт воркера.
+
+Запуск без pytest:
+    python -m benchmarks.importtime --module app.main --top 20
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, NamedTuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class ImportRecord(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+
+
+@dataclass
+class ImportReport:
+    module: str
+    records: List[ImportRecord] = field(default_factory=list)
+    top: int = 15
+
+    @property
+    def total_ms(self) -> float:
+        return sum(record.self_us for record in self.records) / 1000
+
+    @property
+    def modules(self) -> set:
+        return {record.module for record in self.records}
+
+    def by_package(self) -> Dict[str, float]:
+        """Сумарний власний час імпорту за пакетом верхнього рівня, мс"""
+        totals: Dict[str, float] = defaultdict(float)
+        for record in self.records:
+            totals[record.module.split(".")[0]] += record.self_us / 1000
+        return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+    def as_dict(self) -> Dict:
+        packages = self.by_package()
+        return {
+            "module": self.module,
+            "modules_imported": len(self.records),
+            "total_ms": round(self.total_ms, 1),
+            "top_packages_ms": {name: round(ms, 1) for name, ms in list(packages.items())[:self.top]},
+        }
+
+    def summary(self) -> str:
+        lines = [f"import {self.module}: {self.total_ms:.0f} ms, {len(self.records)} modules"]
+        for name, ms in list(self.by_package().items())[:self.top]:
+            lines.append(f"  {name:<32} {ms:8.1f} ms")
+        return "\n".join(lines)
+
+
+def parse_importtime(output: str) -> List[ImportRecord]:
+    """Розбирає рядки 'import time: self | cumulative | module' з stderr"""
+    records = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        records.append(ImportRecord(module.strip(), int(self_us), int(cumulative_us)))
+    return records
+
+
+def profile_import(module: str = "app.main", top: int = 15) -> ImportReport:
+    """Імпортує module у чистому інтерпретаторі з -X importtime"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return ImportReport(module=module, records=parse_importtime(result.stderr), top=top)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Час імпорту модулів OhMyRevit")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", action="store_true", help="Вивести звіт у JSON")
+    args = parser.parse_args()
+
+    report = profile_import(args.module, args.top)
+    print(json.dumps(report.as_dict(), indent=2) if args.json else report.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Бенчмарки щоденного бонусу під конкуренцією
+"""
+from benchmarks.conftest import record
+from benchmarks.driver import run_load
+
+
+def test_concurrent_bonus_claims_same_user(benchmark, bench_env):
+    """Одночасні запити одного користувача: бонус нараховується рівно один раз"""
+    user, = bench_env.run(bench_env.create_users(1, prefix=40_000))
+    token = bench_env.token(user)
+
+    async def scenario():
+        async with bench_env.client(token) as client:
+            async def claim(_: int) -> int:
+                response = await client.post("/api/v1/profile/bonus/claim")
+                return response.status_code
+
+            return await run_load("bonus_same_user", claim, 25, 25)
+
+    report = benchmark.pedantic(lambda: bench_env.run(scenario()), rounds=1, iterations=1)
+    record(benchmark, report)
+
+    bonus_count = bench_env.run(bench_env.scalar(
+        "SELECT count(*) FROM transactions WHERE user_id = :id AND type = 'BONUS'", id=user.id
+    ))
+    balance = bench_env.run(bench_env.scalar("SELECT balance FROM users WHERE id = :id", id=user.id))
+    ledger = bench_env.run(bench_env.scalar(
+        "SELECT coalesce(sum(amount), 0) FROM transactions WHERE user_id = :id", id=user.id
+    ))
+    assert bonus_count == 1
+    assert balance == ledger
+
+
+def test_bonus_claims_throughput(benchmark, bench_env):
+    """Пропускна здатність нарахування бонусів різним користувачам"""
+    users = bench_env.run(bench_env.create_users(200, prefix=41_000))
+
+    async def scenario():
+        async with bench_env.client() as client:
+            async def claim(i: int) -> int:
+                response = await client.post(
+                    "/api/v1/profile/bonus/claim",
+                    headers={"Authorization": f"Bearer {bench_env.token(users[i])}"}
+                )
+                return response.status_code
+
+            return await run_load("bonus_distinct_users", claim, len(users), 20)
+
+    report = benchmark.pedantic(lambda: bench_env.run(scenario()), rounds=1, iterations=1)
+    record(benchmark, report)
+
+    assert report.status_counts.get(200) == len(users)
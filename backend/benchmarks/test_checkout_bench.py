@@ -0,0 +1,109 @@
+"""
+Бенчмарки оформлення замовлень та промокодів під конкуренцією
+"""
+from app.orders.models import DiscountType, PromoCode
+
+from benchmarks.conftest import record
+from benchmarks.driver import run_load
+
+CONCURRENCY = 20
+
+
+def test_concurrent_checkouts_distinct_buyers(benchmark, bench_env):
+    """Багато покупців одночасно купують один товар"""
+    buyers = bench_env.run(bench_env.create_users(100, balance=1000, prefix=10_000))
+    product, = bench_env.run(bench_env.create_products(1))
+
+    async def scenario():
+        async with bench_env.client() as client:
+            async def checkout(i: int) -> int:
+                response = await client.post(
+                    "/api/v1/orders/checkout",
+                    json={"product_ids": [product.id]},
+                    headers={"Authorization": f"Bearer {bench_env.token(buyers[i])}"}
+                )
+                return response.status_code
+
+            return await run_load("checkout_distinct_buyers", checkout, len(buyers), CONCURRENCY)
+
+    report = benchmark.pedantic(lambda: bench_env.run(scenario()), rounds=1, iterations=1)
+    record(benchmark, report)
+
+    buyer_ids = [u.id for u in buyers]
+    assert report.status_counts.get(200) == len(buyers)
+    assert bench_env.run(bench_env.scalar(
+        "SELECT count(*) FROM users WHERE id = ANY(:ids) AND balance <> 500", ids=buyer_ids
+    )) == 0
+    assert bench_env.run(bench_env.scalar(
+        "SELECT count(*) FROM user_product_access WHERE product_id = :pid", pid=product.id
+    )) == len(buyers)
+
+
+def test_checkout_contention_single_buyer(benchmark, bench_env):
+    """Один покупець одночасно оформлює більше замовлень, ніж дозволяє баланс"""
+    buyer, = bench_env.run(bench_env.create_users(1, balance=1500, prefix=20_000))
+    products = bench_env.run(bench_env.create_products(10))
+    token = bench_env.token(buyer)
+
+    async def scenario():
+        async with bench_env.client(token) as client:
+            async def checkout(i: int) -> int:
+                response = await client.post(
+                    "/api/v1/orders/checkout", json={"product_ids": [products[i].id]}
+                )
+                return response.status_code
+
+            return await run_load("checkout_single_buyer", checkout, len(products), len(products))
+
+    report = benchmark.pedantic(lambda: bench_env.run(scenario()), rounds=1, iterations=1)
+    record(benchmark, report)
+
+    # 1500 монет / 500 за товар — рівно три успішні покупки
+    assert report.status_counts.get(200) == 3
+    balance = bench_env.run(bench_env.scalar("SELECT balance FROM users WHERE id = :id", id=buyer.id))
+    ledger = bench_env.run(bench_env.scalar(
+        "SELECT coalesce(sum(amount), 0) FROM transactions WHERE user_id = :id", id=buyer.id
+    ))
+    assert balance == 0
+    assert balance == 1500 + ledger
+
+
+def test_concurrent_promo_redemptions(benchmark, bench_env):
+    """Промокод з лімітом використань під одночасними покупками"""
+    buyers = bench_env.run(bench_env.create_users(40, balance=1000, prefix=30_000))
+    product, = bench_env.run(bench_env.create_products(1))
+
+    async def create_promo():
+        async with bench_env.session_maker() as session:
+            promo = PromoCode(code="BENCH5", discount_type=DiscountType.PERCENTAGE, value=10,
+                              max_uses=5, is_active=True, current_uses=0)
+            session.add(promo)
+            await session.commit()
+            return promo
+
+    promo = bench_env.run(create_promo())
+
+    async def scenario():
+        async with bench_env.client() as client:
+            async def redeem(i: int) -> int:
+                response = await client.post(
+                    "/api/v1/orders/checkout",
+                    json={"product_ids": [product.id], "promo_code": promo.code},
+                    headers={"Authorization": f"Bearer {bench_env.token(buyers[i])}"}
+                )
+                return response.status_code
+
+            return await run_load("promo_redemptions", redeem, len(buyers), CONCURRENCY)
+
+    report = benchmark.pedantic(lambda: bench_env.run(scenario()), rounds=1, iterations=1)
+    record(benchmark, report)
+
+    current_uses = bench_env.run(bench_env.scalar(
+        "SELECT current_uses FROM promo_codes WHERE id = :id", id=promo.id
+    ))
+    orders_with_promo = bench_env.run(bench_env.scalar(
+        "SELECT count(*) FROM orders WHERE promo_code_id = :id", id=promo.id
+    ))
+    assert current_uses <= 5
+    assert orders_with_promo == current_uses
+    assert report.status_counts.get(200) == current_uses
@@ -0,0 +1,17 @@
+"""
+Бенчмарк старту: час імпорту app.main у чистому процесі
+
+Не потребує БД: pytest benchmarks/test_startup_bench.py --benchmark-only -s
+"""
+from benchmarks.conftest import record
+from benchmarks.importtime import profile_import
+
+# Важкі залежності, які мають завантажуватися лише при першому використанні
+LAZY_DEPENDENCIES = ("stripe", "sentry_sdk", "bleach", "magic", "fastapi_mail", "resend")
+
+
+def test_app_import_time(benchmark):
+    report = benchmark.pedantic(profile_import, args=("app.main",), rounds=3, iterations=1)
+    record(benchmark, report)
+
+    assert not report.modules & set(LAZY_DEPENDENCIES)
@@ -0,0 +1,60 @@
+"""
+Мікробенчмарк get_text на гарячих ключах
+
+Не потребує БД: pytest benchmarks/test_translations_bench.py --benchmark-only
+"""
+from app.core.translations import TRANSLATIONS, get_text
+
+
+def _legacy_get_text(key: str, lang: str = "uk", **kwargs) -> str:
+    """Попередня реалізація: два пошуки у словниках і format на кожен виклик"""
+    lang_data = TRANSLATIONS.get(lang, TRANSLATIONS["uk"])
+    text = lang_data.get(key, TRANSLATIONS["uk"].get(key, key))
+    if kwargs:
+        try:
+            return text.format(**kwargs)
+        except KeyError:
+            return text
+    return text
+
+
+def _plain_lookups(lookup):
+    for _ in range(1000):
+        lookup("main_root_message", "en")
+        lookup("email_footer_thanks", "de")
+
+
+def _fallback_lookups(lookup):
+    # Ключ відсутній в es — береться українська
+    for _ in range(1000):
+        lookup("email_verify_subject", "es")
+        lookup("main_root_message", "pl")
+
+
+def _formatted_lookups(lookup):
+    for _ in range(1000):
+        lookup("bot_start_referral_welcome", "en", name="Olena")
+
+
+def test_get_text_plain(benchmark):
+    benchmark(_plain_lookups, get_text)
+
+
+def test_get_text_plain_legacy(benchmark):
+    benchmark(_plain_lookups, _legacy_get_text)
+
+
+def test_get_text_fallback(benchmark):
+    benchmark(_fallback_lookups, get_text)
+
+
+def test_get_text_fallback_legacy(benchmark):
+    benchmark(_fallback_lookups, _legacy_get_text)
+
+
+def test_get_text_formatted(benchmark):
+    benchmark(_formatted_lookups, get_text)
+
+
+def test_get_text_formatted_legacy(benchmark):
+    benchmark(_formatted_lookups, _legacy_get_text)
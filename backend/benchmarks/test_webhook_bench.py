@@ -0,0 +1,105 @@
+"""
+Бенчмарки Stripe webhook: повторна доставка подій та обробка inbox
+"""
+import asyncio
+import uuid
+
+from app.wallet.inbox import StripeInboxService
+from app.wallet.models import CoinPack
+
+from benchmarks.conftest import record, BENCH_WEBHOOK_SECRET
+from benchmarks.driver import run_load
+from tests.stripe_events import build_payment_event, signed_request
+
+INBOX_WORKERS = 4
+
+
+async def _create_pack(bench_env) -> CoinPack:
+    async with bench_env.session_maker() as session:
+        pack = CoinPack(name="Bench pack", price_usd=5.0, coins_amount=500,
+                        stripe_price_id=f"price_bench_{uuid.uuid4().hex[:12]}")
+        session.add(pack)
+        await session.commit()
+        return pack
+
+
+async def _drain_inbox(bench_env) -> None:
+    """Кілька паралельних воркерів розбирають inbox до кінця"""
+    async def worker():
+        while True:
+            async with bench_env.session_maker() as session:
+                counts = await StripeInboxService(session).process_pending()
+            if not counts:
+                return
+
+    await asyncio.gather(*(worker() for _ in range(INBOX_WORKERS)))
+
+
+def test_stripe_webhook_replays(benchmark, bench_env):
+    """Stripe повторює одну подію паралельно — в inbox один запис, монети нараховуються один раз"""
+    user, = bench_env.run(bench_env.create_users(1, prefix=50_000))
+    pack = bench_env.run(_create_pack(bench_env))
+    event = build_payment_event(user.id, pack.id, coins_amount=500, amount_cents=500)
+    payload, headers = signed_request(event, BENCH_WEBHOOK_SECRET)
+
+    async def scenario():
+        async with bench_env.client() as client:
+            async def deliver(_: int) -> int:
+                response = await client.post("/api/webhooks/stripe", content=payload, headers=headers)
+                return response.status_code
+
+            report = await run_load("stripe_webhook_replays", deliver, 25, 25)
+        await _drain_inbox(bench_env)
+        return report
+
+    report = benchmark.pedantic(lambda: bench_env.run(scenario()), rounds=1, iterations=1)
+    record(benchmark, report)
+
+    assert report.status_counts.get(200) == 25
+    assert bench_env.run(bench_env.scalar(
+        "SELECT count(*) FROM inbox WHERE event_id = :eid", eid=event["id"]
+    )) == 1
+    deposits = bench_env.run(bench_env.scalar(
+        "SELECT count(*) FROM transactions WHERE external_id = :oid",
+        oid=event["data"]["object"]["id"]
+    ))
+    balance = bench_env.run(bench_env.scalar("SELECT balance FROM users WHERE id = :id", id=user.id))
+    assert deposits == 1
+    assert balance == 500
+
+
+def test_stripe_distinct_events_same_payment(benchmark, bench_env):
+    """Різні події однієї оплати обробляються паралельними воркерами — одне нарахування"""
+    user, = bench_env.run(bench_env.create_users(1, prefix=51_000))
+    pack = bench_env.run(_create_pack(bench_env))
+    object_id = "pi_test_bench_same_payment"
+    requests = [
+        signed_request(
+            build_payment_event(user.id, pack.id, 500, 500, object_id=object_id),
+            BENCH_WEBHOOK_SECRET
+        )
+        for _ in range(20)
+    ]
+
+    async def scenario():
+        async with bench_env.client() as client:
+            async def deliver(i: int) -> int:
+                payload, headers = requests[i]
+                response = await client.post("/api/webhooks/stripe", content=payload, headers=headers)
+                return response.status_code
+
+            report = await run_load("stripe_distinct_events", deliver, len(requests), 20)
+        await _drain_inbox(bench_env)
+        return report
+
+    report = benchmark.pedantic(lambda: bench_env.run(scenario()), rounds=1, iterations=1)
+    record(benchmark, report)
+
+    assert bench_env.run(bench_env.scalar(
+        "SELECT count(*) FROM inbox WHERE payload->'data'->'object'->>'id' = :oid "
+        "AND status = 'PROCESSED'", oid=object_id
+    )) == len(requests)
+    assert bench_env.run(bench_env.scalar(
+        "SELECT count(*) FROM transactions WHERE external_id = :oid", oid=object_id
+    )) == 1
+    assert bench_env.run(bench_env.scalar("SELECT balance FROM users WHERE id = :id", id=user.id)) == 500
@@ -1,5 +1,6 @@
 # ЗАМІНА БЕЗ ВИДАЛЕНЬ: старі рядки — закоментовано, нові — додано нижче
 import asyncio
+from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 import pytest
 from httpx import AsyncClient
@@ -100,6 +101,18 @@ async def async_client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient,
     del app.dependency_overrides[get_db]
 
 
+@pytest.fixture(scope="function")
+def export_session(db_session: AsyncSession, monkeypatch):
+    """Потоковий експорт читає тестову сесію замість власної (AsyncSessionLocal)"""
+
+    @asynccontextmanager
+    async def session_factory():
+        yield db_session
+
+    monkeypatch.setattr("app.core.export.AsyncSessionLocal", session_factory)
+    return db_session
+
+
 @pytest.fixture(scope="function")
 async def referrer_user(db_session: AsyncSession) -> User:
     user = User(
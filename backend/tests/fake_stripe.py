@@ -0,0 +1,95 @@
+"""
+Локальний fake-Stripe сервер для тестів та розробки
+
+Реалізує лише ті ендпоінти, які викликає StripeGateway, і відповідає у форматі
+Stripe API. У тестах підключається без мережі через httpx.ASGITransport,
+локально запускається як окремий сервер:
+
+    uvicorn tests.fake_stripe:app --port 12111
+    STRIPE_API_BASE=http://localhost:12111
+"""
+import uuid
+from typing import Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="Fake Stripe")
+
+# Отримані запити (path, форма) — для перевірок у тестах
+received: List[Dict] = []
+
+# Якщо задано — наступний запит отримає цю помилку Stripe
+fail_next: Optional[Dict] = None
+
+
+def reset():
+    global fail_next
+    received.clear()
+    fail_next = None
+
+
+def _metadata(form: Dict[str, str]) -> Dict[str, str]:
+    """metadata[key]=value -> {key: value}"""
+    return {
+        key[len("metadata["):-1]: value
+        for key, value in form.items()
+        if key.startswith("metadata[")
+    }
+
+
+async def _read_form(request: Request) -> Dict[str, str]:
+    form = dict(await request.form())
+    received.append({"path": request.url.path, "form": form})
+    return form
+
+
+def _maybe_fail() -> Optional[JSONResponse]:
+    global fail_next
+    if fail_next is None:
+        return None
+    error, fail_next = fail_next, None
+    return JSONResponse(status_code=error.get("status", 402), content={"error": error})
+
+
+@app.post("/v1/payment_intents")
+async def create_payment_intent(request: Request):
+    form = await _read_form(request)
+    failure = _maybe_fail()
+    if failure:
+        return failure
+
+    intent_id = f"pi_fake_{uuid.uuid4().hex[:24]}"
+    return {
+        "id": intent_id,
+        "object": "payment_intent",
+        "amount": int(form["amount"]),
+        "currency": form.get("currency", "usd"),
+        "client_secret": f"{intent_id}_secret_{uuid.uuid4().hex[:16]}",
+        "metadata": _metadata(form),
+        "receipt_email": form.get("receipt_email"),
+        "status": "requires_payment_method",
+        "livemode": False,
+    }
+
+
+@app.post("/v1/checkout/sessions")
+async def create_checkout_session(request: Request):
+    form = await _read_form(request)
+    failure = _maybe_fail()
+    if failure:
+        return failure
+
+    session_id = f"cs_fake_{uuid.uuid4().hex[:24]}"
+    return {
+        "id": session_id,
+        "object": "checkout.session",
+        "mode": form.get("mode", "payment"),
+        "url": f"http://fake-stripe.local/checkout/{session_id}",
+        "success_url": form.get("success_url"),
+        "cancel_url": form.get("cancel_url"),
+        "customer_email": form.get("customer_email"),
+        "metadata": _metadata(form),
+        "status": "open",
+        "livemode": False,
+    }
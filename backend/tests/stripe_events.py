@@ -0,0 +1,104 @@
+"""
+Локальний генератор підписаних Stripe webhook подій (тести, бенчмарки, dev)
+
+Підпис формується так само, як у Stripe (заголовок Stripe-Signature:
+t=<timestamp>,v1=<HMAC-SHA256>), тому stripe.Webhook.construct_event
+приймає ці події без звернення до API Stripe.
+
+Надіслати подію на локальний сервер:
+
+    python -m tests.stripe_events --url http://localhost:8000 \\
+        --secret whsec_... --user-id 1 --pack-id 1 --coins 500 --repeat 3
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import time
+import uuid
+from typing import Optional, Tuple
+
+import httpx
+
+
+def sign_payload(payload: bytes, secret: str, timestamp: Optional[int] = None) -> str:
+    """Повертає значення заголовка Stripe-Signature для payload"""
+    timestamp = timestamp or int(time.time())
+    signed = f"{timestamp}.".encode() + payload
+    signature = hmac.new(secret.encode(), signed, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+def build_payment_event(
+        user_id: int,
+        pack_id: int,
+        coins_amount: int,
+        amount_cents: int,
+        object_id: Optional[str] = None,
+        event_type: str = "payment_intent.succeeded"
+) -> dict:
+    """Будує подію checkout.session.completed або payment_intent.succeeded"""
+    is_session = event_type == "checkout.session.completed"
+    object_id = object_id or f"{'cs' if is_session else 'pi'}_test_{uuid.uuid4().hex[:24]}"
+    amount_key = "amount_total" if is_session else "amount"
+
+    return {
+        "id": f"evt_test_{uuid.uuid4().hex[:24]}",
+        "object": "event",
+        "type": event_type,
+        "created": int(time.time()),
+        "livemode": False,
+        "data": {
+            "object": {
+                "id": object_id,
+                "object": "checkout.session" if is_session else "payment_intent",
+                amount_key: amount_cents,
+                "currency": "usd",
+                "metadata": {
+                    "user_id": str(user_id),
+                    "pack_id": str(pack_id),
+                    "coins_amount": str(coins_amount),
+                },
+            }
+        },
+    }
+
+
+def signed_request(event: dict, secret: str) -> Tuple[bytes, dict]:
+    """Серіалізує подію і повертає (тіло, заголовки) для POST /api/webhooks/stripe"""
+    payload = json.dumps(event).encode()
+    headers = {
+        "Content-Type": "application/json",
+        "Stripe-Signature": sign_payload(payload, secret),
+    }
+    return payload, headers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Надсилає підписану Stripe подію на локальний webhook")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--secret", required=True, help="STRIPE_WEBHOOK_SECRET сервера")
+    parser.add_argument("--user-id", type=int, required=True)
+    parser.add_argument("--pack-id", type=int, required=True)
+    parser.add_argument("--coins", type=int, default=500)
+    parser.add_argument("--amount-cents", type=int, default=500)
+    parser.add_argument(
+        "--type", default="payment_intent.succeeded",
+        choices=["payment_intent.succeeded", "checkout.session.completed"]
+    )
+    parser.add_argument("--repeat", type=int, default=1, help="Повторні доставки тієї ж події")
+    args = parser.parse_args()
+
+    event = build_payment_event(
+        args.user_id, args.pack_id, args.coins, args.amount_cents, event_type=args.type
+    )
+    payload, headers = signed_request(event, args.secret)
+
+    with httpx.Client(base_url=args.url, timeout=10) as client:
+        for _ in range(args.repeat):
+            response = client.post("/api/webhooks/stripe", content=payload, headers=headers)
+            print(response.status_code, response.text)
+
+
+if __name__ == "__main__":
+    main()
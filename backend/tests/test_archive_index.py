@@ -0,0 +1,178 @@
+import zipfile
+from contextlib import asynccontextmanager
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.products import archive_index
+from app.products.archive_index import (
+    inspect_archive, link_product_files, revit_version_from_basic_file_info, save_archive_index
+)
+from app.products.models import ArchiveIndexStatus, Product, ProductFile, ProductTranslation
+from app.products.schemas import ProductFilter
+from app.products.service import product_service
+
+
+def _zip(path, files):
+    with zipfile.ZipFile(path, "w") as archive:
+        for name, data in files.items():
+            archive.writestr(name, data)
+    return path
+
+
+def test_revit_version_from_basic_file_info():
+    data = "Worksharing: Not enabled\r\nFormat: 2022\r\nBuild: 20210224_1515(x64)".encode("utf-16-le")
+    assert revit_version_from_basic_file_info(b"\x00\x01" + data) == 2022
+    assert revit_version_from_basic_file_info(b"Autodesk Revit 2019 (Build: 20180216)") == 2019
+    assert revit_version_from_basic_file_info(b"no version here") is None
+
+
+def test_inspect_zip(tmp_path, monkeypatch):
+    versions = iter([2021, 2023])
+    monkeypatch.setattr(archive_index, "_revit_version", lambda stream: next(versions))
+    path = _zip(tmp_path / "doors.zip", {
+        "Doors/Door_A.rfa": b"a" * 100,
+        "Doors/Door_B.RFA": b"b" * 50,
+        "readme.txt": b"hello",
+    })
+
+    result = inspect_archive(str(path))
+
+    assert result["status"] == ArchiveIndexStatus.INDEXED
+    assert result["entry_count"] == 3
+    assert result["uncompressed_size"] == 155
+    assert result["revit_file_count"] == 2
+    assert result["revit_versions"] == [2021, 2023]
+    assert (result["min_revit_version"], result["max_revit_version"]) == (2021, 2023)
+    assert result["entries"][0] == {"name": "Doors/Door_A.rfa", "size": 100}
+    assert len(result["sha256"]) == 64
+
+
+def test_inspect_7z(tmp_path):
+    py7zr = pytest.importorskip("py7zr")
+    path = tmp_path / "windows.7z"
+    with py7zr.SevenZipFile(path, "w") as archive:
+        archive.writestr(b"x" * 10, "Window.rfa")
+
+    result = inspect_archive(str(path))
+
+    assert result["status"] == ArchiveIndexStatus.INDEXED
+    assert result["entries"] == [{"name": "Window.rfa", "size": 10}]
+    assert result["revit_file_count"] == 1
+
+
+def test_inspect_unsupported_and_broken(tmp_path):
+    rar = tmp_path / "pack.rar"
+    rar.write_bytes(b"Rar!\x1a\x07\x00" + b"\x00" * 20)
+    assert inspect_archive(str(rar))["status"] == ArchiveIndexStatus.UNSUPPORTED
+
+    broken = tmp_path / "broken.7z"
+    broken.write_bytes(b"not a 7z")
+    result = inspect_archive(str(broken))
+    assert result["status"] == ArchiveIndexStatus.FAILED
+    assert result["error"]
+
+
+@pytest.mark.anyio
+async def test_index_links_product_and_filters_by_revit_version(db_session: AsyncSession):
+    products = []
+    for index, max_version in enumerate((2021, 2024)):
+        product = Product(price=Decimal("1.00"), main_image_url="/img.jpg",
+                          zip_file_path=f"/uploads/archives/pack{index}.zip", file_size_mb=1)
+        product.translations.append(ProductTranslation(language_code="uk", title=f"Pack {index}", description="..."))
+        db_session.add(product)
+        products.append((product, max_version))
+    await db_session.commit()
+
+    for product, max_version in products:
+        await save_archive_index(db_session, product.zip_file_path, {
+            "status": ArchiveIndexStatus.INDEXED, "sha256": "0" * 64, "size_bytes": 1, "entry_count": 1,
+            "uncompressed_size": 1, "revit_file_count": 1, "revit_versions": [max_version],
+            "min_revit_version": max_version, "max_revit_version": max_version,
+            "entries": [{"name": "a.rfa", "size": 1}], "error": None,
+        })
+
+    linked = (await db_session.execute(select(ProductFile.product_id))).scalars().all()
+    assert sorted(linked) == sorted(product.id for product, _ in products)
+
+    result = await product_service.get_products_list("uk", db_session, ProductFilter(revit_version=2022))
+    assert [item["id"] for item in result["products"]] == [products[0][0].id]
+    assert result["total"] == 1
+
+    # Після заміни архіву старий індекс відв'язується
+    old_product = products[0][0]
+    old_product.zip_file_path = "/uploads/archives/new.zip"
+    await link_product_files(db_session, old_product)
+    await db_session.commit()
+    file_row = (await db_session.execute(
+        select(ProductFile).where(ProductFile.archive_path == "/uploads/archives/pack0.zip")
+    )).scalar_one()
+    assert file_row.product_id is None
+
+
+@pytest.mark.anyio
+async def test_backfill_indexes_existing_archives(db_session: AsyncSession, tmp_path, monkeypatch):
+    @asynccontextmanager
+    async def session_factory():
+        yield db_session
+
+    monkeypatch.setattr(archive_index, "AsyncSessionLocal", session_factory)
+    monkeypatch.setattr(settings, "UPLOAD_PATH", str(tmp_path))
+    (tmp_path / "archives").mkdir()
+    _zip(tmp_path / "archives" / "old.zip", {"readme.txt": b"x"})
+
+    old = Product(price=Decimal("1.00"), main_image_url="/img.jpg",
+                  zip_file_path="/uploads/archives/old.zip", file_size_mb=1)
+    lost = Product(price=Decimal("1.00"), main_image_url="/img.jpg",
+                   zip_file_path="/uploads/archives/lost.zip", file_size_mb=1)
+    for product in (old, lost):
+        product.translations.append(ProductTranslation(language_code="uk", title="Old", description="..."))
+    db_session.add_all([old, lost])
+    await db_session.commit()
+
+    # До індексації товари не ховаються фільтром сумісності
+    result = await product_service.get_products_list("uk", db_session, ProductFilter(revit_version=2020))
+    assert {old.id, lost.id} <= {item["id"] for item in result["products"]}
+
+    assert await archive_index.backfill_archive_index() == {"indexed": 1, "failed": 1, "remaining": False}
+    rows = {row.archive_path: row for row in (await db_session.execute(select(ProductFile))).scalars()}
+    assert rows["/uploads/archives/old.zip"].status == ArchiveIndexStatus.INDEXED
+    assert rows["/uploads/archives/old.zip"].product_id == old.id
+    assert rows["/uploads/archives/lost.zip"].status == ArchiveIndexStatus.FAILED
+
+    # Повторний запуск нічого не бере
+    assert await archive_index.backfill_archive_index() == {"indexed": 0, "failed": 0, "remaining": False}
+
+
+@pytest.mark.anyio
+async def test_backfill_marks_broken_archive_failed(db_session: AsyncSession, tmp_path, monkeypatch):
+    @asynccontextmanager
+    async def session_factory():
+        yield db_session
+
+    async def broken_run(func, *args):
+        raise RuntimeError("worker crashed")
+
+    monkeypatch.setattr(archive_index, "AsyncSessionLocal", session_factory)
+    monkeypatch.setattr(archive_index.cpu_executor, "run", broken_run)
+    monkeypatch.setattr(settings, "UPLOAD_PATH", str(tmp_path))
+    (tmp_path / "archives").mkdir()
+    _zip(tmp_path / "archives" / "poison.zip", {"readme.txt": b"x"})
+
+    product = Product(price=Decimal("1.00"), main_image_url="/img.jpg",
+                      zip_file_path="/uploads/archives/poison.zip", file_size_mb=1)
+    product.translations.append(ProductTranslation(language_code="uk", title="Poison", description="..."))
+    db_session.add(product)
+    await db_session.commit()
+
+    assert await archive_index.backfill_archive_index() == {"indexed": 0, "failed": 1, "remaining": False}
+    row = (await db_session.execute(select(ProductFile))).scalar_one()
+    assert row.status == ArchiveIndexStatus.FAILED
+    assert row.error == "worker crashed"
+    assert row.product_id == product.id
+
+    # Битий архів більше не береться автоматично
+    assert await archive_index.backfill_archive_index() == {"indexed": 0, "failed": 0, "remaining": False}
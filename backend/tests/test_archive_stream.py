@@ -0,0 +1,111 @@
+import io
+import os
+import zipfile
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.products.models import Product
+from app.profile.archive_stream import BulkDownloadSlots, iter_zip, stream_zip
+
+
+@pytest.fixture(scope="function")
+def archive_files(tmp_path):
+    files = []
+    for index, size in enumerate((0, 1000, 300_000)):
+        path = tmp_path / f"family_{index}.zip"
+        path.write_bytes(os.urandom(size))
+        files.append(path)
+    return files
+
+
+def test_iter_zip_builds_stored_archive(archive_files):
+    chunks = list(iter_zip(((path, f"{i}_{path.name}") for i, path in enumerate(archive_files)), chunk_size=64 * 1024))
+
+    # Частини не більші за блок читання з запасом на заголовки
+    assert max(len(chunk) for chunk in chunks) < 64 * 1024 + 1024
+
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+        assert archive.testzip() is None
+        infos = archive.infolist()
+        assert [info.filename for info in infos] == [f"{i}_{p.name}" for i, p in enumerate(archive_files)]
+        assert all(info.compress_type == zipfile.ZIP_STORED for info in infos)
+        for info, path in zip(infos, archive_files):
+            assert archive.read(info) == path.read_bytes()
+
+
+@pytest.mark.anyio
+async def test_stream_zip_releases_slot_when_client_disconnects(archive_files):
+    slots = BulkDownloadSlots(1)
+    assert slots.try_acquire()
+    assert not slots.try_acquire()
+
+    stream = stream_zip([(archive_files[2], "big.zip")], chunk_size=1024, on_close=slots.release)
+    await stream.__anext__()
+    await stream.aclose()
+
+    assert slots.in_use == 0
+
+
+@pytest.mark.anyio
+async def test_download_archive_endpoint(authorized_client: AsyncClient, db_session: AsyncSession,
+                                         tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_PATH", str(tmp_path))
+    (tmp_path / "archives").mkdir()
+    products = []
+    for index in range(2):
+        (tmp_path / "archives" / f"p{index}.zip").write_bytes(b"data" * (index + 1))
+        products.append(Product(price=0, product_type="free", main_image_url="/img.jpg",
+                                zip_file_path=f"/uploads/archives/p{index}.zip", file_size_mb=1))
+    db_session.add_all(products)
+    await db_session.commit()
+
+    response = await authorized_client.post(
+        "/api/v1/profile/download/archive/token",
+        json={"product_ids": [p.id for p in products]}
+    )
+    assert response.status_code == 200
+    token = response.json()["download_token"]
+
+    response = await authorized_client.get("/api/v1/profile/download/archive", params={"download_token": token})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        assert archive.namelist() == [f"{products[0].id}_p0.zip", f"{products[1].id}_p1.zip"]
+
+    # Токен одноразовий
+    response = await authorized_client.get("/api/v1/profile/download/archive", params={"download_token": token})
+    assert response.status_code == 403
+
+
+def test_slot_lease_releases_once():
+    slots = BulkDownloadSlots(1)
+    release = slots.lease()
+    assert release is not None
+    assert slots.lease() is None
+
+    release()
+    release()
+    assert slots.in_use == 0
+
+
+@pytest.mark.anyio
+async def test_busy_archive_download_keeps_token(authorized_client: AsyncClient, monkeypatch):
+    from app.profile import router as profile_router
+
+    consumed = []
+
+    async def consume_bundle(token):
+        consumed.append(token)
+        return None
+
+    monkeypatch.setattr(profile_router, "bulk_download_slots", BulkDownloadSlots(0))
+    monkeypatch.setattr(profile_router.DownloadTokenService, "consume_bundle", staticmethod(consume_bundle))
+
+    response = await authorized_client.get("/api/v1/profile/download/archive", params={"download_token": "t"})
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "30"
+    assert consumed == []
@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import cache
+from app.products.catalog_index import (
+    CATALOG_CHANGES_KEY, CATALOG_VERSION_KEY, CatalogIndex, CatalogSnapshot
+)
+from app.products.models import ProductType
+from app.products.schemas import ProductFilter
+from app.products.service import ProductService
+
+NOW = datetime(2024, 5, 1, tzinfo=timezone.utc)
+
+
+def _row(product_id, price="10.00", rating=None, age_days=0, downloads=0, author_id=None,
+         is_on_sale=False, product_type=ProductType.PREMIUM):
+    return SimpleNamespace(
+        id=product_id, price=Decimal(price), average_rating=Decimal(rating) if rating else None,
+        created_at=NOW - timedelta(days=age_days), downloads_count=downloads, author_id=author_id,
+        is_on_sale=is_on_sale, product_type=product_type,
+    )
+
+
+ROWS = [
+    _row(1, price="10.00", rating="4.50", age_days=3, downloads=7),
+    _row(2, price="25.50", rating="3.99", age_days=1, downloads=7, is_on_sale=True, author_id=42),
+    _row(3, price="0.00", age_days=2, downloads=100, product_type=ProductType.FREE),
+    _row(4, price="10.00", rating="5.00", age_days=1, downloads=0, author_id=43),
+]
+LINKS = [(1, 10), (2, 10), (3, 20), (99, 10)]
+
+
+@pytest.fixture
+def snapshot():
+    return CatalogSnapshot.from_rows(ROWS, LINKS)
+
+
+def test_sorting_matches_list_order(snapshot):
+    assert snapshot.query(None, 10, 0) == ([4, 2, 3, 1], 4)
+    assert snapshot.query(ProductFilter(sort_by="price_asc"), 10, 0)[0] == [3, 4, 1, 2]
+    assert snapshot.query(ProductFilter(sort_by="price_desc"), 10, 0)[0] == [2, 4, 1, 3]
+    # Однакові значення впорядковуються за id DESC
+    assert snapshot.query(ProductFilter(sort_by="popular"), 10, 0)[0] == [3, 2, 1, 4]
+
+
+def test_filters_and_pagination(snapshot):
+    assert snapshot.query(ProductFilter(category_id=10), 10, 0) == ([2, 1], 2)
+    assert snapshot.query(ProductFilter(category_id=30), 10, 0) == ([], 0)
+    assert snapshot.query(ProductFilter(product_type="free"), 10, 0) == ([3], 1)
+    assert snapshot.query(ProductFilter(is_on_sale=False), 10, 0)[1] == 3
+    assert snapshot.query(ProductFilter(min_price=Decimal("9.995"), max_price=Decimal("25.50")), 10, 0)[0] == [4, 2, 1]
+    # Товари без рейтингу не проходять фільтр, як NULL у SQL
+    assert snapshot.query(ProductFilter(min_rating=Decimal("4")), 10, 0)[0] == [4, 1]
+    assert snapshot.query(ProductFilter(creator_only=True), 10, 0)[0] == [4, 2]
+    assert snapshot.query(ProductFilter(author_id=42), 10, 0)[0] == [2]
+
+    assert snapshot.query(None, 2, 1) == ([2, 3], 4)
+    assert snapshot.query(None, 2, 4) == ([], 4)
+
+
+def test_patch_replaces_and_removes_rows(snapshot):
+    changed = CatalogSnapshot.from_rows([_row(1, price="99.00", age_days=0), _row(5, age_days=5)], [(1, 20)])
+
+    patched = snapshot.without([1, 2]).concat(changed)
+
+    assert sorted(patched.columns["ids"].tolist()) == [1, 3, 4, 5]
+    assert patched.query(ProductFilter(category_id=20), 10, 0)[0] == [1, 3]
+    assert patched.query(ProductFilter(category_id=10), 10, 0)[0] == []
+    assert patched.query(None, 10, 0)[0] == [1, 4, 3, 5]
+
+
+def test_search_and_revit_go_to_postgres():
+    index = CatalogIndex()
+    assert not index.can_serve(None)
+
+    index.snapshot = CatalogSnapshot.from_rows(ROWS, LINKS)
+    assert index.can_serve(ProductFilter(category_id=10, sort_by="popular"))
+    assert not index.can_serve(ProductFilter(search="стіл"))
+    assert not index.can_serve(ProductFilter(revit_version=2024))
+
+
+@pytest.mark.anyio
+async def test_sync_patches_changes_from_other_workers(monkeypatch):
+    await cache.redis.delete(CATALOG_VERSION_KEY, CATALOG_CHANGES_KEY)
+    rows = {row.id: row for row in ROWS}
+    loads = []
+
+    async def load(db, product_ids=None):
+        loads.append(product_ids)
+        selected = rows.values() if product_ids is None else [rows[i] for i in product_ids if i in rows]
+        return list(selected), LINKS
+
+    monkeypatch.setattr(CatalogIndex, "_load", staticmethod(load))
+    ours, other = CatalogIndex(), CatalogIndex()
+    await ours.sync(db=None)
+    await other.sync(db=None)
+
+    # Товар 2 приховано, товар 4 здешевшав
+    del rows[2]
+    rows[4] = _row(4, price="1.00", age_days=1, author_id=43)
+    await ours.publish_change([2])
+    await ours.publish_change([4])
+
+    # Воркер, що змінив товари, бачить зміну одразу
+    assert await ours.query(None, ProductFilter(sort_by="price_asc"), 10, 0) == ([3, 4, 1], 3)
+    assert loads[-1] == [2, 4]
+
+    # Інший — після синхронізації, довантаживши лише змінені товари
+    assert (await other.query(None, None, 10, 0))[1] == 4
+    await other.sync(db=None)
+    assert loads[-1] == [2, 4]
+    assert await other.query(None, ProductFilter(sort_by="price_asc"), 10, 0) == ([3, 4, 1], 3)
+    assert other.version == 2
+
+    # Без нових змін синхронізація не ходить у БД
+    loads.clear()
+    await other.sync(db=None)
+    assert loads == []
+
+
+@pytest.mark.anyio
+async def test_index_matches_postgres(db_session: AsyncSession, test_products):
+    index = CatalogIndex()
+    await index.rebuild(db_session)
+    service = ProductService()
+
+    for filters in (
+        None,
+        ProductFilter(sort_by="price_asc"),
+        ProductFilter(sort_by="popular", is_on_sale=False),
+        ProductFilter(product_type="premium", min_price=Decimal("10.00"), sort_by="price_desc"),
+    ):
+        assert index.snapshot.query(filters, 2, 0) == await service._query_list_ids(db_session, filters, 2, 0)
@@ -0,0 +1,113 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+from decimal import Decimal
+
+from app.users.models import User
+from app.products.models import Product
+from app.creators.models import CreatorTransaction
+from app.core.pagination import encode_cursor, decode_cursor
+
+
+@pytest.fixture(scope="function")
+async def test_creators(db_session: AsyncSession) -> list[User]:
+    creators = [
+        User(telegram_id=2001 + i, first_name=f"Creator {i}", is_creator=True, creator_balance=100 * i)
+        for i in range(3)
+    ]
+    db_session.add_all(creators)
+    await db_session.flush()
+
+    # Creator 0: 2 товари, Creator 1: 1 товар, Creator 2: без товарів
+    for creator, products_count in zip(creators, (2, 1, 0)):
+        for _ in range(products_count):
+            db_session.add(Product(
+                price=Decimal("5.00"), author_id=creator.id, main_image_url="/img.jpg",
+                zip_file_path="/file.zip", file_size_mb=1
+            ))
+
+    db_session.add(CreatorTransaction(creator_id=creators[1].id, transaction_type="sale", amount_coins=85))
+    await db_session.commit()
+    return creators
+
+
+def test_cursor_roundtrip():
+    """Курсор зберігає значення та відхиляє пошкоджені дані."""
+    cursor = encode_cursor(5, 42)
+    assert decode_cursor(cursor, 2) == [5, 42]
+
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor", 2)
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 3)
+
+
+@pytest.mark.anyio
+async def test_creators_list_sorted_by_products_with_cursor(authorized_admin_client: AsyncClient, test_creators):
+    """Сортування за кількістю товарів та перехід на наступну сторінку курсором."""
+    response = await authorized_admin_client.get(
+        "/api/v1/admin/creators/list", params={"sort_by": "products", "limit": 2}
+    )
+    assert response.status_code == 200
+    first_page = response.json()
+    assert [c["total_products"] for c in first_page] == [2, 1]
+    assert first_page[1]["total_sales"] == 1
+
+    cursor = response.headers.get("X-Next-Cursor")
+    assert cursor
+
+    response = await authorized_admin_client.get(
+        "/api/v1/admin/creators/list", params={"sort_by": "products", "limit": 2, "cursor": cursor}
+    )
+    assert response.status_code == 200
+    second_page = response.json()
+    assert [c["id"] for c in second_page] == [test_creators[2].id]
+    assert "X-Next-Cursor" not in response.headers
+
+
+@pytest.mark.anyio
+async def test_creators_list_filter_by_balance(authorized_admin_client: AsyncClient, test_creators):
+    response = await authorized_admin_client.get(
+        "/api/v1/admin/creators/list", params={"min_balance": 150}
+    )
+    assert response.status_code == 200
+    assert [c["id"] for c in response.json()] == [test_creators[2].id]
+
+
+@pytest.mark.anyio
+async def test_creators_list_invalid_sort(authorized_admin_client: AsyncClient):
+    response = await authorized_admin_client.get(
+        "/api/v1/admin/creators/list", params={"sort_by": "unknown"}
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("values", [(5, "1; DROP TABLE users"), ("abc", 1), (5, True)])
+async def test_creators_list_tampered_cursor(authorized_admin_client: AsyncClient, values):
+    response = await authorized_admin_client.get(
+        "/api/v1/admin/creators/list", params={"sort_by": "products", "cursor": encode_cursor(*values)}
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.anyio
+async def test_creators_list_balance_cursor_with_null_balance(
+        authorized_admin_client: AsyncClient, db_session: AsyncSession, test_creators
+):
+    test_creators[0].creator_balance = None
+    await db_session.commit()
+
+    seen = []
+    params = {"sort_by": "balance", "order": "asc", "limit": 1}
+    while True:
+        response = await authorized_admin_client.get("/api/v1/admin/creators/list", params=params)
+        assert response.status_code == 200
+        seen += [c["id"] for c in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        params["cursor"] = cursor
+
+    # Креатор без балансу йде як 0 і не губиться між сторінками
+    assert seen == [c.id for c in test_creators]
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from app.core.cache import cache
+from app.core.config import settings
+from app.profile.download_service import DownloadGrant, DownloadTokenService
+
+
+@pytest.fixture(scope="function")
+def one_time_tokens(monkeypatch):
+    monkeypatch.setattr(settings, "DOWNLOAD_SIGNED_URLS", False)
+
+
+@pytest.fixture(scope="function")
+def signed_tokens(monkeypatch):
+    monkeypatch.setattr(settings, "DOWNLOAD_SIGNED_URLS", True)
+
+
+@pytest.mark.anyio
+async def test_token_is_consumed_once_under_concurrency(one_time_tokens):
+    token = await DownloadTokenService.generate_token(user_id=7, product_id=42)
+
+    results = await asyncio.gather(*(DownloadTokenService.consume(token, 42) for _ in range(10)))
+
+    assert [r for r in results if r is not None] == [DownloadGrant(7, 42)]
+
+
+@pytest.mark.anyio
+async def test_token_for_other_product_is_rejected(one_time_tokens):
+    token = await DownloadTokenService.generate_token(user_id=7, product_id=42)
+
+    assert await DownloadTokenService.consume(token, 43) is None
+    # Спроба з чужим товаром теж витрачає токен
+    assert await DownloadTokenService.consume(token, 42) is None
+
+
+@pytest.mark.anyio
+async def test_bulk_issuance(one_time_tokens):
+    tokens = await DownloadTokenService.generate_tokens(user_id=7, product_ids=[1, 2, 3, 2])
+
+    assert list(tokens) == [1, 2, 3]
+    for product_id, token in tokens.items():
+        key = f"{DownloadTokenService.TOKEN_PREFIX}{token}"
+        assert 0 < await cache.redis.ttl(key) <= DownloadTokenService.TOKEN_TTL
+        assert await DownloadTokenService.consume(token, product_id) == DownloadGrant(7, product_id)
+
+
+@pytest.mark.anyio
+async def test_bundle_token_is_not_a_single_download_token(one_time_tokens):
+    token = await DownloadTokenService.generate_bundle_token(user_id=7, product_ids=[42])
+
+    assert await DownloadTokenService.consume(f"bundle:{token}", 42) is None
+    assert await DownloadTokenService.consume_bundle(token) == (7, [42])
+
+
+@pytest.mark.anyio
+async def test_signed_token_needs_no_redis(signed_tokens):
+    token = await DownloadTokenService.generate_token(user_id=7, product_id=42)
+
+    assert token.startswith("s1.")
+    assert await cache.redis.keys(f"{DownloadTokenService.TOKEN_PREFIX}*") == []
+    assert await DownloadTokenService.consume(token, 42) == DownloadGrant(7, 42)
+    assert await DownloadTokenService.consume(token, 43) is None
+
+
+def test_signed_token_rejects_tampering_and_expiry():
+    token = DownloadTokenService.sign(7, 42)
+    prefix, user_id, expires, signature = token.split(".")
+
+    assert DownloadTokenService.verify_signed(token, 42) == DownloadGrant(7, 42)
+    assert DownloadTokenService.verify_signed(f"{prefix}.8.{expires}.{signature}", 42) is None
+    assert DownloadTokenService.verify_signed(f"{prefix}.{user_id}.{int(expires) + 60}.{signature}", 42) is None
+    assert DownloadTokenService.verify_signed("garbage", 42) is None
+
+    expired = DownloadTokenService.sign(7, 42, ttl=-1)
+    assert DownloadTokenService.verify_signed(expired, 42) is None
@@ -0,0 +1,140 @@
+import email
+import socket
+from email.policy import default as default_policy
+
+import httpx
+import pytest
+from aiosmtpd.controller import Controller
+
+from app.core.email import EmailService, OutgoingEmail, get_email_template, _base_template_parts
+from app.core.mail_transport import ResendClient, SMTPConnectionPool
+
+
+class SinkHandler:
+    """Локальний SMTP-приймач: зберігає отримані листи"""
+
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(email.message_from_bytes(envelope.content, policy=default_policy))
+        return "250 Message accepted for delivery"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope="function")
+def smtp_sink():
+    handler = SinkHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    yield controller, handler
+    controller.stop()
+
+
+@pytest.fixture(scope="function")
+async def smtp_service(smtp_sink):
+    controller, _ = smtp_sink
+    pool = SMTPConnectionPool(
+        hostname=controller.hostname,
+        port=controller.port,
+        start_tls=False,
+        size=2
+    )
+    service = EmailService(smtp_pool=pool)
+    yield service
+    await service.close()
+
+
+@pytest.mark.anyio
+async def test_send_email_via_smtp_pool(smtp_service: EmailService, smtp_sink):
+    _, handler = smtp_sink
+    assert await smtp_service.send_email("user@example.com", "Subject", "<p>Hello</p>")
+
+    message = handler.messages[-1]
+    assert message["To"] == "user@example.com"
+    assert message["Subject"] == "Subject"
+    assert "<p>Hello</p>" in message.get_body(("html",)).get_content()
+
+
+@pytest.mark.anyio
+async def test_smtp_connections_are_reused(smtp_service: EmailService, smtp_sink):
+    """Кілька листів поспіль не відкривають нове з'єднання на кожен лист."""
+    _, handler = smtp_sink
+    for index in range(5):
+        assert await smtp_service.send_email(f"user{index}@example.com", "Hi", "<p>Hi</p>")
+
+    assert len(handler.messages) == 5
+    assert smtp_service._smtp_pool.connections_opened == 1
+
+
+@pytest.mark.anyio
+async def test_send_batch_bounded_by_pool(smtp_service: EmailService, smtp_sink):
+    _, handler = smtp_sink
+    emails = [OutgoingEmail(f"user{index}@example.com", "News", "<p>News</p>") for index in range(20)]
+
+    results = await smtp_service.send_batch(emails, concurrency=8)
+    assert results == [True] * 20
+    assert sorted(m["To"] for m in handler.messages) == sorted(e.to for e in emails)
+    # Пул на 2 з'єднання: більше не відкривається навіть при concurrency=8
+    assert smtp_service._smtp_pool.connections_opened <= 2
+
+
+@pytest.mark.anyio
+async def test_resend_batch_failure_falls_back_to_smtp(smtp_service: EmailService, smtp_sink):
+    _, handler = smtp_sink
+    requests = []
+
+    def resend_api(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(500, json={"message": "Internal error"})
+
+    smtp_service._resend_client = ResendClient("re_test", transport=httpx.MockTransport(resend_api))
+    emails = [OutgoingEmail(f"user{index}@example.com", "News", "<p>News</p>") for index in range(3)]
+
+    assert await smtp_service.send_batch(emails) == [True] * 3
+    assert [r.url.path for r in requests] == ["/emails/batch"]
+    assert len(handler.messages) == 3
+
+
+@pytest.mark.anyio
+async def test_download_links_use_resend_batch(smtp_service: EmailService, smtp_sink):
+    _, handler = smtp_sink
+    requests = []
+
+    def resend_api(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json={"data": [{"id": "email-1"}]})
+
+    smtp_service._resend_client = ResendClient("re_test", transport=httpx.MockTransport(resend_api))
+    products = [{"title": "Doors", "download_url": "https://example.com/d/1", "file_size_mb": 2}]
+
+    assert await smtp_service.send_download_links("user@example.com", products, "en")
+    assert [r.url.path for r in requests] == ["/emails/batch"]
+    assert "https://example.com/d/1" in requests[0].content.decode()
+    assert handler.messages == []
+
+
+def test_email_template_cached_per_language():
+    _base_template_parts.cache_clear()
+    first = get_email_template("<p>A</p>", "en")
+    second = get_email_template("<p>B</p>", "en")
+
+    assert _base_template_parts.cache_info().hits == 1
+    assert '<html lang="en">' in first and "<p>A</p>" in first
+    assert first.replace("<p>A</p>", "<p>B</p>") == second
+
+
+def test_render_download_links():
+    rendered = EmailService().render_download_links(
+        "user@example.com",
+        [{"title": "Family Pack", "download_url": "https://example.com/d/1", "file_size_mb": 12}],
+        "en"
+    )
+    assert rendered.to == "user@example.com"
+    assert "Family Pack" in rendered.html_content
+    assert "https://example.com/d/1" in rendered.html_content
@@ -0,0 +1,141 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.core import sanitize
+from app.core.exceptions import AppException
+from app.core.executors import BoundedExecutor, ExecutorOverloaded
+from app.core.loop_monitor import LoopLagMonitor
+
+
+def _executor(max_pending: int = 2, workers: int = 1) -> BoundedExecutor:
+    return BoundedExecutor("test", lambda: ThreadPoolExecutor(max_workers=workers), max_pending)
+
+
+@pytest.mark.anyio
+async def test_runs_off_the_event_loop():
+    executor = _executor()
+    loop_thread = threading.get_ident()
+
+    thread_id = await executor.run(threading.get_ident)
+    joined = await executor.run("-".join, ["a", "b"])
+
+    assert thread_id != loop_thread
+    assert joined == "a-b"
+    stats = executor.stats()
+    assert (stats["submitted"], stats["completed"], stats["in_flight"]) == (2, 2, 0)
+    executor.shutdown()
+
+
+@pytest.mark.anyio
+async def test_rejects_when_queue_is_full():
+    executor = _executor(max_pending=2)
+    release = threading.Event()
+
+    running = [asyncio.create_task(executor.run(release.wait, 5)) for _ in range(2)]
+    await asyncio.sleep(0)
+
+    with pytest.raises(ExecutorOverloaded) as exc_info:
+        await executor.run(time.sleep, 0)
+    assert isinstance(exc_info.value, AppException)
+    assert exc_info.value.status_code == 503
+
+    release.set()
+    await asyncio.gather(*running)
+    stats = executor.stats()
+    assert stats["rejected"] == 1
+    assert stats["peak_in_flight"] == 2
+    assert stats["completed"] == 2
+    executor.shutdown()
+
+
+@pytest.mark.anyio
+async def test_failures_are_counted():
+    executor = _executor()
+
+    with pytest.raises(ValueError):
+        await executor.run(int, "not a number")
+
+    assert executor.stats()["failed"] == 1
+    assert executor.in_flight == 0
+    executor.shutdown()
+
+
+@pytest.mark.anyio
+async def test_loop_monitor_records_blocking():
+    monitor = LoopLagMonitor(interval=0.01, threshold_ms=50)
+    task = asyncio.create_task(monitor.run(refresh_config=False))
+    await asyncio.sleep(0.03)
+
+    time.sleep(0.12)  # Блокуємо loop
+    await asyncio.sleep(0.03)
+    task.cancel()
+
+    stats = monitor.stats()
+    assert stats["blocked"] >= 1
+    assert stats["max_lag_ms"] >= 50
+    assert stats["recent"][-1]["lag_ms"] >= 50
+    assert stats["histogram"]["le_+Inf"] == stats["samples"]
+
+    # Сторожовий потік зняв стек саме цієї функції
+    site = stats["top_call_sites"][0]
+    assert "test_loop_monitor_records_blocking" in site["call_site"]
+    assert "time.sleep(0.12)" in site["stack"]
+
+
+@pytest.mark.anyio
+async def test_loop_monitor_can_be_disabled_and_sampled():
+    monitor = LoopLagMonitor(interval=0.01, threshold_ms=30)
+    monitor.configure(enabled=False)
+    task = asyncio.create_task(monitor.run(refresh_config=False))
+    await asyncio.sleep(0.02)
+    time.sleep(0.06)
+    await asyncio.sleep(0.02)
+    assert monitor.samples == 0
+
+    # Стек лише для кожного другого блокування
+    monitor.configure(enabled=True, sample_every=2)
+    await asyncio.sleep(0.03)
+    for _ in range(2):
+        time.sleep(0.06)
+        await asyncio.sleep(0.03)
+    task.cancel()
+
+    assert monitor.blocked == 2
+    assert sum(site["count"] for site in monitor.top_call_sites()) == 1
+
+
+def test_metrics_render_prometheus_histogram(monkeypatch):
+    from app.core import metrics
+
+    monitor = LoopLagMonitor(interval=0.5, threshold_ms=100)
+    for lag in (1, 7, 300):
+        monitor.record(lag)
+    monkeypatch.setattr(metrics, "loop_monitor", monitor)
+
+    text = metrics.render_metrics("host:1")
+
+    assert 'event_loop_lag_seconds_bucket{worker="host:1",le="0.005"} 1' in text
+    assert 'event_loop_lag_seconds_bucket{worker="host:1",le="0.5"} 3' in text
+    assert 'event_loop_lag_seconds_count{worker="host:1"} 3' in text
+    assert 'event_loop_blocked_total{worker="host:1"} 1' in text
+    assert 'executor_tasks_rejected_total{worker="host:1",executor="security"}' in text
+
+
+@pytest.mark.anyio
+async def test_long_html_is_sanitized_in_executor(monkeypatch):
+    pytest.importorskip("bleach")
+    executor = _executor()
+    monkeypatch.setattr(sanitize, "security_executor", executor)
+
+    short = await sanitize.sanitize_html_async("<script>x</script><p>ok</p>")
+    long_text = "<p>" + "a" * sanitize.SANITIZE_INLINE_LENGTH + "</p><script>x</script>"
+    cleaned = await sanitize.sanitize_html_async(long_text)
+
+    assert short == "x<p>ok</p>"
+    assert "<script>" not in cleaned
+    assert executor.stats()["submitted"] == 1
+    executor.shutdown()
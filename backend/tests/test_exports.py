@@ -0,0 +1,94 @@
+import csv
+import io
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.orders.models import Order, OrderStatus
+from app.users.models import User
+from app.wallet.models import TransactionType
+from app.wallet.service import WalletService
+
+
+def _csv_rows(response) -> list[dict]:
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    return list(csv.DictReader(io.StringIO(response.content.decode("utf-8-sig"))))
+
+
+@pytest.mark.anyio
+async def test_users_export_csv(authorized_admin_client: AsyncClient, export_session: AsyncSession):
+    export_session.add_all([
+        User(telegram_id=2101 + i, first_name=f"Exported {i}", creator_balance=100 * i)
+        for i in range(3)
+    ])
+    await export_session.commit()
+
+    response = await authorized_admin_client.get("/api/v1/admin/users/export", params={"search": "Exported"})
+
+    assert 'filename="users.csv"' in response.headers["content-disposition"]
+    rows = _csv_rows(response)
+    assert [row["first_name"] for row in rows] == ["Exported 0", "Exported 1", "Exported 2"]
+    assert rows[1]["creator_balance"] == "100"
+    assert "telegram_id" in rows[0] and "email" in rows[0]
+
+
+@pytest.mark.anyio
+async def test_orders_export_csv_with_filters(
+        authorized_admin_client: AsyncClient, export_session: AsyncSession, referred_user: User
+):
+    export_session.add_all([
+        Order(user_id=referred_user.id, subtotal=500, discount_amount=50, final_total=450, status=OrderStatus.PAID),
+        Order(user_id=referred_user.id, subtotal=100, final_total=100, status=OrderStatus.FAILED),
+    ])
+    await export_session.commit()
+
+    response = await authorized_admin_client.get("/api/v1/admin/orders/export", params={"status": "paid"})
+    assert response.status_code == 200
+    lines = response.content.decode("utf-8-sig").splitlines()
+    assert lines[0] == (
+        "id,user_id,username,email,subtotal,discount_amount,final_total,status,"
+        "promo_code_id,items_count,created_at,paid_at"
+    )
+    assert len(lines) == 2
+    assert ",referred_user,,500,50,450,paid,,0," in lines[1]
+
+    response = await authorized_admin_client.get(
+        "/api/v1/admin/orders/export", params={"format": "ndjson", "date_to": "2000-01-01T00:00:00"}
+    )
+    assert response.status_code == 200
+    assert response.content == b""
+
+
+@pytest.mark.anyio
+async def test_transactions_export_csv(
+        authorized_admin_client: AsyncClient, export_session: AsyncSession, referred_user: User
+):
+    service = WalletService(export_session)
+    await service.add_coins(referred_user.id, 25, TransactionType.BONUS, "Bonus")
+    await service.add_coins(referred_user.id, 100, TransactionType.DEPOSIT, "Deposit")
+
+    response = await authorized_admin_client.get(
+        "/api/v1/admin/wallet/transactions/export",
+        params={"user_id": referred_user.id, "type": "bonus"}
+    )
+
+    assert 'filename="transactions.csv"' in response.headers["content-disposition"]
+    rows = _csv_rows(response)
+    assert list(rows[0]) == [
+        "id", "user_id", "type", "amount", "balance_after", "description",
+        "order_id", "subscription_id", "external_id", "created_at"
+    ]
+    assert [(row["type"], row["amount"], row["description"]) for row in rows] == [("bonus", "25", "Bonus")]
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("path", [
+    "/api/v1/admin/users/export",
+    "/api/v1/admin/orders/export",
+    "/api/v1/admin/wallet/transactions/export",
+])
+async def test_exports_require_admin(authorized_client: AsyncClient, path: str):
+    response = await authorized_client.get(path)
+    assert response.status_code == 403
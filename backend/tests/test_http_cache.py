@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+from httpx import AsyncClient
+from starlette.requests import Request
+
+from app.core.http_cache import REFERENCE_POLICY, conditional_response, etag_matches
+from app.core.response_cache import body_etag, cached_body, encode_body
+
+MODIFIED = datetime(2026, 1, 10, 12, 0, tzinfo=timezone.utc)
+
+
+def _request(**headers) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+def test_etag_matching():
+    etag = 'W/"abc"'
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('W/"zzz", W/"abc"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"abcd"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_validators_and_cache_control():
+    blob = encode_body({"id": 1}, last_modified=MODIFIED)
+
+    response = conditional_response(_request(), blob, REFERENCE_POLICY)
+
+    assert response.status_code == 200
+    assert response.headers["etag"] == body_etag(blob)
+    assert response.headers["last-modified"] == "Sat, 10 Jan 2026 12:00:00 GMT"
+    assert "stale-while-revalidate=3600" in response.headers["cache-control"]
+    assert response.headers["vary"] == "Accept-Language, Accept-Encoding"
+
+
+def test_not_modified():
+    blob = encode_body({"id": 1}, last_modified=MODIFIED)
+    etag = body_etag(blob)
+
+    assert conditional_response(_request(if_none_match=etag), blob, REFERENCE_POLICY).status_code == 304
+    assert conditional_response(_request(if_none_match='"other"'), blob, REFERENCE_POLICY).status_code == 200
+
+    since = format_datetime(MODIFIED + timedelta(minutes=1), usegmt=True)
+    not_modified = conditional_response(_request(if_modified_since=since), blob, REFERENCE_POLICY)
+    assert not_modified.status_code == 304
+    assert not_modified.body == b""
+    assert not_modified.headers["etag"] == etag
+
+    # If-None-Match має пріоритет над If-Modified-Since
+    both = _request(if_none_match='"other"', if_modified_since=since)
+    assert conditional_response(both, blob, REFERENCE_POLICY).status_code == 200
+
+
+def test_etag_changes_with_content():
+    assert body_etag(encode_body({"id": 1})) != body_etag(encode_body({"id": 2}))
+    assert body_etag(encode_body({"id": 1})) == body_etag(encode_body({"id": 1}))
+
+
+@pytest.mark.anyio
+async def test_cached_body_builds_once():
+    calls = []
+
+    async def build():
+        calls.append(1)
+        return [{"id": 1}]
+
+    first = await cached_body("test:http_cache:body", build, ttl=60)
+    second = await cached_body("test:http_cache:body", build, ttl=60)
+
+    assert first == second
+    assert len(calls) == 1
+
+
+@pytest.mark.anyio
+async def test_product_revalidation(async_client: AsyncClient, test_products):
+    url = f"/api/v1/products/{test_products[0].id}"
+
+    response = await async_client.get(url)
+    assert response.status_code == 200
+    assert response.headers["last-modified"]
+
+    revalidated = await async_client.get(url, headers={"If-None-Match": response.headers["etag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+
+
+@pytest.mark.anyio
+async def test_categories_and_coin_packs_send_validators(async_client: AsyncClient):
+    for url in ("/api/v1/products/categories", "/api/v1/wallet/coin-packs", "/api/v1/products/stats/platform"):
+        response = await async_client.get(url)
+        assert response.status_code == 200
+        assert response.headers["etag"]
+        assert "stale-while-revalidate" in response.headers["cache-control"]
+
+        revalidated = await async_client.get(url, headers={"If-None-Match": response.headers["etag"]})
+        assert revalidated.status_code == 304
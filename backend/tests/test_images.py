@@ -0,0 +1,69 @@
+import pytest
+from PIL import Image
+
+from app.core.config import settings
+from app.core.images import build_variants, collect_image_variants, generate_image_variants
+
+
+@pytest.fixture(scope="function")
+def upload_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_PATH", str(tmp_path))
+    (tmp_path / "images").mkdir()
+    return tmp_path
+
+
+def _photo(path, size=(1600, 1000), mode="RGB"):
+    Image.new(mode, size, (200, 120, 40)).save(path)
+    return path
+
+
+def test_build_variants_srcset_and_placeholder(upload_root):
+    source = _photo(upload_root / "images" / "family.jpg")
+
+    variants = build_variants(str(source), str(upload_root), (320, 640, 1280, 2560))
+
+    assert variants["width"] == 1600 and variants["height"] == 1000
+    assert variants["placeholder"].startswith("data:image/webp;base64,")
+    assert len(variants["placeholder"]) < 400
+    # Ширини, більші за оригінал, пропускаються
+    assert variants["srcset"]["webp"] == ", ".join(
+        f"/uploads/images/variants/family.jpg_{w}.webp {w}w" for w in (320, 640, 1280)
+    )
+    with Image.open(upload_root / "images" / "variants" / "family.jpg_640.webp") as variant:
+        assert variant.size == (640, 400)
+
+
+def test_small_image_keeps_one_variant(upload_root):
+    source = _photo(upload_root / "images" / "icon.png", size=(100, 100), mode="RGBA")
+
+    variants = build_variants(str(source), str(upload_root), (320, 640))
+
+    assert variants["srcset"]["webp"] == "/uploads/images/variants/icon.png_100.webp 100w"
+
+
+def test_same_stem_different_extension_do_not_collide(upload_root):
+    jpg = build_variants(str(_photo(upload_root / "images" / "foo.jpg", size=(400, 200))), str(upload_root), (320,))
+    png = build_variants(str(_photo(upload_root / "images" / "foo.png", size=(400, 400))), str(upload_root), (320,))
+
+    assert jpg["srcset"]["webp"] != png["srcset"]["webp"]
+    with Image.open(upload_root / "images" / "variants" / "foo.jpg_320.webp") as variant:
+        assert variant.size == (320, 160)
+
+
+@pytest.mark.anyio
+async def test_generate_in_process_pool_and_collect(upload_root):
+    source = _photo(upload_root / "images" / "main.jpg")
+
+    variants = await generate_image_variants(source)
+
+    assert variants is not None
+    collected = await collect_image_variants(["/uploads/images/main.jpg", "/uploads/images/missing.jpg"])
+    assert collected == {"/uploads/images/main.jpg": variants}
+
+
+@pytest.mark.anyio
+async def test_broken_image_does_not_fail_upload(upload_root):
+    source = upload_root / "images" / "broken.jpg"
+    source.write_bytes(b"not an image")
+
+    assert await generate_image_variants(source) is None
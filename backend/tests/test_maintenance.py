@@ -0,0 +1,160 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import cache
+from app.core.maintenance import MaintenanceService, _find_orphan_uploads, sweep_download_tokens
+from app.products.models import Product
+from app.subscriptions.models import AccessType, Subscription, SubscriptionStatus, UserProductAccess
+from app.users.models import User
+
+
+def _email_user(index: int, age: timedelta, verified: bool = False) -> User:
+    return User(
+        first_name=f"Email {index}",
+        email=f"user{index}@example.com",
+        is_email_verified=verified,
+        verification_token=None if verified else f"token-{index}",
+        created_at=datetime.now(timezone.utc) - age
+    )
+
+
+@pytest.mark.anyio
+async def test_purge_unverified_accounts_in_batches(db_session: AsyncSession):
+    stale = [_email_user(i, timedelta(hours=2)) for i in range(5)]
+    fresh = _email_user(10, timedelta(minutes=10))
+    verified = _email_user(11, timedelta(days=3), verified=True)
+    db_session.add_all([*stale, fresh, verified])
+    await db_session.commit()
+
+    result = await MaintenanceService(db_session, batch_size=2).purge_unverified_accounts()
+
+    assert result["deleted"] == 5
+    assert result["batches"] == 3
+    assert "duration_ms" in result
+
+    remaining = (await db_session.execute(
+        select(User.email).where(User.email.like("user%@example.com"))
+    )).scalars().all()
+    assert sorted(remaining) == ["user10@example.com", "user11@example.com"]
+
+
+@pytest.mark.anyio
+async def test_purge_unverified_keeps_accounts_with_subscriptions(db_session: AsyncSession):
+    user = _email_user(20, timedelta(hours=2))
+    db_session.add(user)
+    await db_session.commit()
+    db_session.add(Subscription(
+        user_id=user.id,
+        start_date=datetime.now(timezone.utc),
+        end_date=datetime.now(timezone.utc) + timedelta(days=30),
+        status=SubscriptionStatus.ACTIVE
+    ))
+    await db_session.commit()
+
+    result = await MaintenanceService(db_session).purge_unverified_accounts()
+
+    assert result["deleted"] == 0
+    assert await db_session.get(User, user.id) is not None
+
+
+@pytest.mark.anyio
+async def test_purge_unverified_skips_rows_blocking_delete(db_session: AsyncSession, test_products):
+    with_access = _email_user(30, timedelta(hours=2))
+    author = _email_user(31, timedelta(hours=2))
+    stale = _email_user(32, timedelta(hours=2))
+    db_session.add_all([with_access, author, stale])
+    await db_session.commit()
+    db_session.add(UserProductAccess(user_id=with_access.id, product_id=test_products[0].id,
+                                     access_type=AccessType.PURCHASE))
+    test_products[1].author_id = author.id
+    await db_session.commit()
+
+    result = await MaintenanceService(db_session).purge_unverified_accounts()
+
+    # FK-залежні акаунти пропускаються, решта пачки видаляється
+    assert result["deleted"] == 1
+    assert await db_session.get(User, with_access.id) is not None
+    assert await db_session.get(User, author.id) is not None
+
+
+@pytest.mark.anyio
+async def test_purge_stale_pending_subscriptions(db_session: AsyncSession, referred_user: User):
+    now = datetime.now(timezone.utc)
+    stale = Subscription(user_id=referred_user.id, start_date=now, end_date=now + timedelta(days=30),
+                         status=SubscriptionStatus.PENDING, created_at=now - timedelta(days=2))
+    recent = Subscription(user_id=referred_user.id, start_date=now, end_date=now + timedelta(days=30),
+                          status=SubscriptionStatus.PENDING)
+    active = Subscription(user_id=referred_user.id, start_date=now, end_date=now + timedelta(days=30),
+                          status=SubscriptionStatus.ACTIVE, created_at=now - timedelta(days=2))
+    db_session.add_all([stale, recent, active])
+    await db_session.commit()
+
+    result = await MaintenanceService(db_session).purge_stale_pending_subscriptions()
+
+    assert result["deleted"] == 1
+    ids = (await db_session.execute(
+        select(Subscription.id).where(Subscription.user_id == referred_user.id)
+    )).scalars().all()
+    assert sorted(ids) == sorted([recent.id, active.id])
+
+
+@pytest.mark.anyio
+async def test_purge_orphan_uploads(db_session: AsyncSession, tmp_path):
+    images = tmp_path / "images"
+    archives = tmp_path / "archives"
+    images.mkdir()
+    archives.mkdir()
+
+    product = Product(price=1, main_image_url="/uploads/images/used.jpg",
+                      gallery_image_urls=["/uploads/images/gallery.jpg"],
+                      zip_file_path="/uploads/archives/used.zip", file_size_mb=1)
+    db_session.add(product)
+    await db_session.commit()
+
+    old = (datetime.now(timezone.utc) - timedelta(days=2)).timestamp()
+    for path in (images / "used.jpg", images / "gallery.jpg", archives / "used.zip",
+                 images / "orphan.jpg", archives / "orphan.zip", images / "just_uploaded.jpg"):
+        path.write_bytes(b"x" * 10)
+        if path.name != "just_uploaded.jpg":
+            os.utime(path, (old, old))
+
+    result = await MaintenanceService(db_session).purge_orphan_uploads(upload_dir=tmp_path)
+
+    assert result["deleted"] == 2
+    assert result["freed_bytes"] == 20
+    assert sorted(p.name for p in tmp_path.rglob("*") if p.is_file()) == [
+        "gallery.jpg", "just_uploaded.jpg", "used.jpg", "used.zip"
+    ]
+
+
+def test_orphan_image_variants_follow_their_source(tmp_path):
+    variants = tmp_path / "images" / "variants"
+    variants.mkdir(parents=True)
+    old = (datetime.now(timezone.utc) - timedelta(days=2)).timestamp()
+    names = ("used.jpg_320.webp", "used.jpg.json", "legacy_320.webp", "gone.png_320.webp", "gone.png.json")
+    for name in names:
+        (variants / name).write_bytes(b"x")
+        os.utime(variants / name, (old, old))
+
+    referenced = {"/uploads/images/used.jpg", "/uploads/images/legacy.jpg"}
+    orphans = _find_orphan_uploads(tmp_path, referenced, datetime.now(timezone.utc).timestamp(), 100)
+
+    assert sorted(p.name for p in orphans) == ["gone.png.json", "gone.png_320.webp"]
+
+
+@pytest.mark.anyio
+async def test_sweep_download_tokens_removes_only_keys_without_ttl():
+    await cache.redis.set("download_token:leaked", "1:1")
+    await cache.redis.set("download_token:live", "1:2", ex=300)
+    await cache.redis.set("download_bundle:leaked", "1:1,2")
+
+    result = await sweep_download_tokens(batch_size=1)
+
+    assert result["deleted"] == 2
+    assert await cache.redis.exists("download_token:leaked", "download_bundle:leaked") == 0
+    assert await cache.redis.exists("download_token:live") == 1
+    await cache.redis.delete("download_token:live")
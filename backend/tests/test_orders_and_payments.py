@@ -3,6 +3,7 @@ backend/tests/test_orders_and_payments.py - ВИПРАВЛЕНА ВЕРСІЯ
 Тести для замовлень з OMR Coins (без Cryptomus)
 """
 import pytest
+from fastapi import BackgroundTasks
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
@@ -10,6 +11,8 @@ from app.users.models import User
 from app.orders.models import Order, OrderStatus, PromoCode
 from app.products.models import Product
 from app.subscriptions.models import UserProductAccess
+from app.core.email import email_service
+from app.orders.service import OrderService
 from decimal import Decimal
 
 
@@ -205,3 +208,83 @@ async def test_cannot_buy_same_product_twice(
     )
     # Повинна бути помилка (вже є доступ)
     assert response2.status_code in [400, 409]
+
+
+@pytest.mark.anyio
+async def test_multi_item_order_with_creator_and_referral(
+        authorized_client: AsyncClient,
+        db_session: AsyncSession,
+        test_products: list[Product],
+        referred_user: User,
+        referrer_user: User
+):
+    """Тест: кошик з товаром креатора — доступ, реферальний бонус та комісія в одній транзакції"""
+    from app.creators.models import CreatorTransaction
+    from app.products.models import ProductTranslation
+
+    creator = User(telegram_id=3001, first_name="Creator", is_creator=True, creator_balance=0)
+    db_session.add(creator)
+    await db_session.flush()
+
+    creator_product = Product(price=Decimal("10.00"), author_id=creator.id, main_image_url="/img.jpg",
+                              zip_file_path="/file.zip", file_size_mb=1)
+    creator_product.translations.append(
+        ProductTranslation(language_code='uk', title='Товар креатора', description='...')
+    )
+    db_session.add(creator_product)
+    referred_user.balance = 10000
+    referrer_balance = referrer_user.balance
+    await db_session.commit()
+
+    product_ids = [p.id for p in test_products if p.product_type == 'premium'] + [creator_product.id]
+
+    response = await authorized_client.post(
+        "/api/v1/orders/checkout",
+        json={"product_ids": product_ids}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["new_balance"] == 10000 - data["coins_spent"]
+
+    access_count_res = await db_session.execute(
+        select(func.count(UserProductAccess.id)).where(UserProductAccess.user_id == referred_user.id)
+    )
+    assert access_count_res.scalar_one() == len(product_ids)
+
+    ledger_res = await db_session.execute(
+        select(CreatorTransaction).where(CreatorTransaction.order_id == data["order_id"])
+    )
+    ledger = ledger_res.scalars().all()
+    assert {t.transaction_type for t in ledger} == {"sale", "commission"}
+
+    await db_session.refresh(creator)
+    sale = next(t for t in ledger if t.transaction_type == "sale")
+    assert creator.creator_balance == sale.amount_coins
+
+    await db_session.refresh(referrer_user)
+    assert referrer_user.balance > referrer_balance
+
+
+@pytest.mark.anyio
+async def test_paid_order_queues_download_links_email(
+        db_session: AsyncSession,
+        test_products: list[Product],
+        referred_user: User
+):
+    referred_user.balance = 5000
+    referred_user.email = "buyer@example.com"
+    referred_user.is_email_verified = True
+    await db_session.commit()
+
+    product = next(p for p in test_products if p.product_type == 'premium')
+    background_tasks = BackgroundTasks()
+    await OrderService(db_session).create_order(
+        referred_user.id, [product.id], background_tasks=background_tasks
+    )
+
+    [task] = background_tasks.tasks
+    assert task.func == email_service.send_download_links
+    user_email, links, language_code = task.args
+    assert user_email == "buyer@example.com"
+    assert links[0]["title"] == "Преміум Товар 1"
+    assert f"/api/v1/profile/download/{product.id}?download_token=s1.{referred_user.id}." in links[0]["download_url"]
@@ -0,0 +1,169 @@
+import json
+
+import pytest
+from httpx import AsyncClient
+
+from app.core.cache import cache
+from app.core.projection import parse_fields
+from app.core.response_cache import decode_body
+from app.core.translations import get_text
+from app.products.schemas import ProductFilter, ProductListResponse
+from app.products.service import ProductService, invalidate_product_cache, product_card_key
+
+
+def _card(product_id: int, title: str = "Стіл") -> dict:
+    return {
+        "id": product_id, "title": title, "description": "...", "price": 10.0, "product_type": "premium",
+        "main_image_url": "/img.jpg", "is_on_sale": False, "sale_price": None, "actual_price": 10.0,
+        "categories": [], "views_count": 0, "file_size_mb": 1.0,
+    }
+
+
+@pytest.fixture
+def service(monkeypatch):
+    service = ProductService()
+    loads = []
+
+    async def load_cards(db, product_ids, language_code, fields=None):
+        loads.append(list(product_ids))
+        cards = {product_id: _card(product_id, f"{language_code}-{product_id}") for product_id in product_ids if product_id != 404}
+        if fields is not None:
+            cards = {product_id: {name: card[name] for name in fields} for product_id, card in cards.items()}
+        return cards
+
+    async def query_list_ids(db, filters, limit, offset):
+        loads.append("ids")
+        return [3, 1, 404, 2], 4
+
+    monkeypatch.setattr(service, "_load_cards", load_cards)
+    monkeypatch.setattr(service, "_query_list_ids", query_list_ids)
+    service.loads = loads
+    return service
+
+
+@pytest.mark.anyio
+async def test_cards_mget_with_single_batched_fallback(service):
+    await cache.raw.delete(*(product_card_key(product_id, "en") for product_id in (1, 2, 3, 404)))
+
+    first = await service.get_cards([3, 1, 404], "en", db=None)
+    second = await service.get_cards([1, 2, 3], "en", db=None)
+
+    assert set(first) == {1, 3}
+    assert json.loads(first[3])["title"] == "en-3"
+    # Другий раз з БД довантажується лише відсутня картка
+    assert service.loads == [[3, 1, 404], [2]]
+    assert set(second) == {1, 2, 3}
+
+
+@pytest.mark.anyio
+async def test_list_page_composed_from_cached_ids_and_cards(service):
+    await cache.delete_pattern("products_list:*")
+    await cache.delete_pattern("product:*")
+    filters = ProductFilter(sort_by="newest")
+
+    body = await service.get_products_list_body("uk", db=None, filters=filters, limit=4, offset=0)
+    page = json.loads(decode_body(body))
+
+    assert [card["id"] for card in page["products"]] == [3, 1, 2]
+    assert (page["total"], page["pages"]) == (4, 1)
+    assert page["products"][0]["title"] == "uk-3"
+
+    # Інша мова: список ID спільний, картки — свої
+    service.loads.clear()
+    english = json.loads(decode_body(await service.get_products_list_body("en", db=None, filters=filters, limit=4)))
+    assert service.loads == [[3, 1, 404, 2]]
+    assert english["products"][0]["title"] == "en-3"
+
+    # Зміна товару скидає лише його картки, список ID лишається
+    await invalidate_product_cache(1, lists=False)
+    service.loads.clear()
+    await service.get_products_list_body("uk", db=None, filters=filters, limit=4)
+    assert service.loads == [[1, 404]]
+
+
+@pytest.mark.anyio
+async def test_title_edit_refreshes_card_in_list(authorized_admin_client: AsyncClient, async_client: AsyncClient,
+                                                 test_products):
+    product = test_products[0]
+    await async_client.get("/api/v1/products")
+
+    response = await authorized_admin_client.put(f"/api/v1/admin/products/{product.id}", json={"title_uk": "Нова назва"})
+    assert response.status_code == 200
+
+    page = (await async_client.get("/api/v1/products")).json()
+    titles = {card["id"]: card["title"] for card in page["products"]}
+    assert titles[product.id] == "Нова назва"
+
+
+@pytest.mark.anyio
+async def test_batch_keeps_request_order_and_reports_missing(service):
+    await cache.raw.delete(*(product_card_key(product_id, "de") for product_id in (1, 2, 3, 404)))
+
+    body = await service.get_cards_batch_body([2, 404, 3, 1], "de", db=None)
+    batch = json.loads(decode_body(body))
+
+    assert [card["id"] for card in batch["products"]] == [2, 3, 1]
+    assert batch["missing"] == [404]
+    assert batch["products"][0]["title"] == "de-2"
+    assert service.loads == [[2, 404, 3, 1]]
+
+
+@pytest.mark.anyio
+async def test_batch_endpoint(async_client: AsyncClient, test_products):
+    ids = [product.id for product in reversed(test_products)]
+    query = ",".join(str(product_id) for product_id in [*ids, 999999])
+
+    response = await async_client.get(f"/api/v1/products/batch?ids={query}&lang=en")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [card["id"] for card in data["products"]] == ids
+    assert data["missing"] == [999999]
+
+    too_many = ",".join(str(i) for i in range(1, 102))
+    response = await async_client.get(f"/api/v1/products/batch?ids={too_many}")
+    assert response.status_code == 400
+    assert response.json()["detail"] == get_text("product_error_batch_ids_too_many", "uk", max=100)
+    assert (await async_client.get("/api/v1/products/batch?ids=1,x")).status_code == 400
+
+
+@pytest.mark.anyio
+async def test_projected_list_cached_separately(service):
+    await cache.delete_pattern("products_list:*")
+    await cache.delete_pattern("product:*")
+    filters = ProductFilter(sort_by="newest")
+    fields = parse_fields("price,actual_price", ProductListResponse)
+
+    page = json.loads(decode_body(await service.get_products_list_body("uk", db=None, filters=filters, fields=fields)))
+
+    # Ті самі типи, що й у повній картці (Decimal як рядок)
+    assert page["products"][0] == {"id": 3, "price": "10.0", "actual_price": "10.0"}
+    # Без локалізованих полів картка спільна для всіх мов
+    assert product_card_key(3, "uk", fields) == product_card_key(3, "en", fields) == "product:3:card:-:actual_price,id,price"
+    service.loads.clear()
+    await service.get_products_list_body("en", db=None, filters=filters, fields=fields)
+    assert service.loads == [[404]]
+
+    # Повна картка не зачеплена проекцією, а зміна товару скидає обидві
+    full = json.loads(decode_body(await service.get_products_list_body("uk", db=None, filters=filters)))
+    assert full["products"][0]["title"] == "uk-3"
+    await invalidate_product_cache(3, lists=False)
+    assert await cache.raw.get(product_card_key(3, "uk", fields)) is None
+
+
+@pytest.mark.anyio
+async def test_projection_endpoints(async_client: AsyncClient, test_products):
+    product = test_products[0]
+
+    page = (await async_client.get("/api/v1/products?fields=title")).json()
+    assert all(set(card) == {"id", "title"} for card in page["products"])
+
+    detail = (await async_client.get(f"/api/v1/products/{product.id}?fields=price,categories")).json()
+    assert set(detail) == {"id", "price", "categories"}
+
+    batch = (await async_client.get(f"/api/v1/products/batch?ids={product.id}&fields=price")).json()
+    assert [set(card) for card in batch["products"]] == [{"id", "price"}]
+
+    response = await async_client.get("/api/v1/products?fields=title,secret")
+    assert response.status_code == 400
+    assert response.json()["detail"] == get_text("product_error_unknown_fields", "uk", fields="secret")
@@ -0,0 +1,40 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+
+import pytest
+from pydantic import BaseModel
+
+from app.core.projection import UnknownFieldsError, parse_fields, projection_key, projection_model
+
+
+class Item(BaseModel):
+    id: int
+    title: str
+    price: Decimal
+    created_at: Optional[datetime] = None
+
+
+def test_parse_fields():
+    assert parse_fields(None, Item) is None
+    assert parse_fields("", Item) is None
+    assert parse_fields(" title , price", Item) == {"id", "title", "price"}
+    # Усі поля — те саме, що без проекції
+    assert parse_fields("title,price,created_at", Item) is None
+
+    with pytest.raises(UnknownFieldsError, match="password") as error:
+        parse_fields("title,password", Item)
+    assert error.value.fields == {"password"}
+
+
+def test_projection_model_keeps_field_types():
+    fields = parse_fields("price", Item)
+    model = projection_model(Item, fields)
+
+    assert model is projection_model(Item, fields)
+    assert projection_model(Item, None) is Item
+    assert model.model_validate({"id": 1, "title": "x", "price": 9.5}).model_dump(mode="json") == {
+        "id": 1, "price": Item(id=1, title="x", price=9.5).model_dump(mode="json")["price"]
+    }
+    assert projection_key(fields) == "id,price"
+    assert projection_key(None) == "all"
@@ -0,0 +1,59 @@
+import gzip
+import json
+
+import pytest
+from httpx import AsyncClient
+from pydantic import BaseModel
+
+from app.core.response_cache import (
+    GZIP, GZIP_MIN_SIZE, RAW, body_response, decode_body, encode_body, get_cached_body, set_cached_body
+)
+
+
+class _Item(BaseModel):
+    id: int
+    title: str
+
+
+def test_small_body_is_stored_raw():
+    blob = encode_body({"id": 1, "title": "Стіл", "secret": "x"}, _Item)
+
+    assert blob[:1] == RAW
+    assert json.loads(decode_body(blob)) == {"id": 1, "title": "Стіл"}
+
+
+def test_large_body_is_gzipped_and_served_as_is():
+    content = {"items": [{"id": i, "title": "Двері " * 10} for i in range(50)]}
+    blob = encode_body(content)
+    assert blob[:1] == GZIP
+    assert len(decode_body(blob)) >= GZIP_MIN_SIZE
+
+    compressed = body_response(blob, "br, gzip")
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert json.loads(gzip.decompress(compressed.body)) == content
+
+    plain = body_response(blob, None)
+    assert "content-encoding" not in plain.headers
+    assert json.loads(plain.body) == content
+    assert plain.media_type == "application/json"
+
+
+@pytest.mark.anyio
+async def test_cached_body_roundtrip():
+    blob = encode_body({"id": 7, "title": "Вікно"})
+    await set_cached_body("test:body", blob, ttl=60)
+
+    assert await get_cached_body("test:body") == blob
+
+
+@pytest.mark.anyio
+async def test_product_hit_returns_same_bytes(async_client: AsyncClient, test_products):
+    product_id = test_products[0].id
+
+    first = await async_client.get(f"/api/v1/products/{product_id}")
+    second = await async_client.get(f"/api/v1/products/{product_id}")
+
+    assert first.status_code == second.status_code == 200
+    assert first.content == second.content
+    assert first.json()["id"] == product_id
+    assert first.headers["content-type"] == "application/json"
@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core.cache import cache
+from app.core.scheduler import CronSchedule, JobAlreadyRunning, RedisLock, ScheduledJob, Scheduler
+
+NOW = datetime(2026, 10, 19, 10, 7, tzinfo=timezone.utc)  # понеділок
+
+
+@pytest.mark.parametrize("expression, expected", [
+    ("*/15 * * * *", datetime(2026, 10, 19, 10, 15, tzinfo=timezone.utc)),
+    ("5 * * * *", datetime(2026, 10, 19, 11, 5, tzinfo=timezone.utc)),
+    ("0 9 * * 1", datetime(2026, 10, 26, 9, 0, tzinfo=timezone.utc)),
+    ("0 0 29 2 *", datetime(2028, 2, 29, 0, 0, tzinfo=timezone.utc)),
+    ("30 4 1,15 * 5", datetime(2026, 10, 23, 4, 30, tzinfo=timezone.utc)),
+])
+def test_cron_next_after(expression, expected):
+    assert CronSchedule(expression).next_after(NOW) == expected
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "*/0 * * * *", "0 0 31 2 *"])
+def test_cron_rejects_invalid(expression):
+    with pytest.raises(ValueError):
+        CronSchedule(expression).next_after(NOW)
+
+
+def test_jitter_is_bounded():
+    job = ScheduledJob("jittered", "0 * * * *", lambda: None, jitter_seconds=90)
+    for _ in range(20):
+        delay = job.next_run_after(NOW) - datetime(2026, 10, 19, 11, 0, tzinfo=timezone.utc)
+        assert timedelta(0) <= delay <= timedelta(seconds=90)
+
+
+@pytest.fixture(scope="function")
+async def test_scheduler():
+    instance = Scheduler(prefix="test-scheduler")
+    yield instance
+    await cache.delete_pattern("test-scheduler:*")
+
+
+@pytest.mark.anyio
+async def test_leader_lock_single_owner(test_scheduler):
+    first = RedisLock("test-scheduler:leader", 30)
+    second = RedisLock("test-scheduler:leader", 30)
+
+    assert await first.acquire_or_renew()
+    assert not await second.acquire_or_renew()
+    assert await first.acquire_or_renew()
+
+    assert not await second.release()
+    assert await first.release()
+    assert await second.acquire_or_renew()
+
+
+@pytest.mark.anyio
+async def test_run_job_records_history_and_metrics(test_scheduler):
+    async def succeed():
+        return {"processed": 3}
+
+    async def fail():
+        raise RuntimeError("boom")
+
+    test_scheduler.add_job(ScheduledJob("succeed", "* * * * *", succeed))
+    test_scheduler.add_job(ScheduledJob("fail", "* * * * *", fail))
+
+    run = await test_scheduler.run_job("succeed", trigger="cli")
+    assert run["status"] == "success" and run["result"] == {"processed": 3}
+    assert (await test_scheduler.run_job("fail"))["status"] == "failed"
+
+    history = await test_scheduler.get_history("fail")
+    assert history[0]["error"] == "boom"
+
+    statuses = {status["name"]: status for status in await test_scheduler.get_jobs_status()}
+    assert statuses["succeed"]["runs"] == 1 and statuses["succeed"]["last_status"] == "success"
+    assert statuses["fail"]["failures"] == 1 and statuses["fail"]["consecutive_failures"] == 1
+
+
+@pytest.mark.anyio
+async def test_run_job_is_exclusive(test_scheduler):
+    async def noop():
+        return 0
+
+    test_scheduler.add_job(ScheduledJob("exclusive", "* * * * *", noop))
+    lock = RedisLock("test-scheduler:running:exclusive", 30)
+    assert await lock.acquire()
+
+    with pytest.raises(JobAlreadyRunning):
+        await test_scheduler.run_job("exclusive")
+    await lock.release()
+
+
+@pytest.mark.anyio
+async def test_tick_runs_due_jobs_once(test_scheduler):
+    calls = []
+
+    async def job():
+        calls.append(1)
+
+    test_scheduler.add_job(ScheduledJob("tick_job", "* * * * *", job))
+
+    # Перший такт лише планує запуск
+    assert await test_scheduler.tick(NOW) == []
+    assert await test_scheduler.tick(NOW + timedelta(minutes=2)) == ["tick_job"]
+    await test_scheduler._running["tick_job"]
+    # Наступний запуск перенесено, повторний такт у ту ж хвилину нічого не запускає
+    assert await test_scheduler.tick(NOW + timedelta(minutes=2)) == []
+    assert calls == [1]
@@ -0,0 +1,112 @@
+import pytest
+import httpx
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import cache
+from app.main import app
+from app.users.models import User
+from app.wallet.models import CoinPack
+from app.wallet.service import coin_pack_cache_key
+from app.wallet.stripe_gateway import StripeGateway, get_stripe_gateway
+from tests import fake_stripe
+
+
+@pytest.fixture(scope="function")
+async def fake_gateway():
+    """StripeGateway, що ходить у fake-Stripe через ASGI без мережі"""
+    fake_stripe.reset()
+    gateway = StripeGateway(
+        api_key="sk_test_fake",
+        api_base="http://fake-stripe.local",
+        max_network_retries=0,
+        transport=httpx.ASGITransport(app=fake_stripe.app)
+    )
+    app.dependency_overrides[get_stripe_gateway] = lambda: gateway
+    yield gateway
+    del app.dependency_overrides[get_stripe_gateway]
+    await gateway.close()
+
+
+@pytest.mark.anyio
+async def test_gateway_uses_pooled_client_and_closes_it(fake_gateway):
+    intent = await fake_gateway.create_payment_intent(499, {"user_id": "1"})
+
+    assert intent.id.startswith("pi_fake_")
+    assert fake_stripe.received[-1]["form"]["amount"] == "499"
+
+    http = fake_gateway._http_client._http
+    await fake_gateway.close()
+    assert http.is_closed
+
+
+@pytest.fixture(scope="function")
+async def coin_pack(db_session: AsyncSession) -> CoinPack:
+    pack = CoinPack(name="Starter", price_usd=4.99, coins_amount=500, bonus_percent=10,
+                    stripe_price_id="price_test_gateway")
+    db_session.add(pack)
+    await db_session.commit()
+    yield pack
+    await cache.delete(coin_pack_cache_key(pack.id))
+
+
+@pytest.mark.anyio
+async def test_create_payment_intent_via_gateway(
+        authorized_client: AsyncClient, referred_user: User, coin_pack: CoinPack, fake_gateway
+):
+    response = await authorized_client.post(f"/api/v1/wallet/create-payment-intent/{coin_pack.id}")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["payment_intent_id"].startswith("pi_fake_")
+    assert data["amount"] == 499
+
+    form = fake_stripe.received[-1]["form"]
+    assert form["amount"] == "499"
+    assert form["metadata[user_id]"] == str(referred_user.id)
+    assert form["metadata[coins_amount]"] == "550"
+
+
+@pytest.mark.anyio
+async def test_create_checkout_session_via_gateway(
+        authorized_client: AsyncClient, coin_pack: CoinPack, fake_gateway
+):
+    response = await authorized_client.post(f"/api/v1/wallet/create-checkout-session/{coin_pack.id}")
+    assert response.status_code == 200
+    assert response.json()["session_id"].startswith("cs_fake_")
+    assert fake_stripe.received[-1]["form"]["line_items[0][price]"] == "price_test_gateway"
+
+
+@pytest.mark.anyio
+async def test_stripe_error_maps_to_500(authorized_client: AsyncClient, coin_pack: CoinPack, fake_gateway):
+    fake_stripe.fail_next = {"type": "api_error", "message": "Stripe is down", "status": 500}
+    response = await authorized_client.post(f"/api/v1/wallet/create-payment-intent/{coin_pack.id}")
+    assert response.status_code == 500
+
+
+@pytest.mark.anyio
+async def test_coin_pack_cache_invalidated_on_update(db_session: AsyncSession, coin_pack: CoinPack):
+    """Кеш пакета скидається, коли адмін змінює пакет."""
+    from app.wallet.service import WalletAdminService
+
+    service = WalletAdminService(db_session)
+    cached = await service.get_coin_pack_cached(coin_pack.id)
+    assert cached.price_usd == 4.99
+    assert await cache.get(coin_pack_cache_key(coin_pack.id))
+
+    await service.update_coin_pack(coin_pack.id, price_usd=9.99)
+    assert await cache.get(coin_pack_cache_key(coin_pack.id)) is None
+    assert (await service.get_coin_pack_cached(coin_pack.id)).price_usd == 9.99
+
+
+@pytest.mark.anyio
+async def test_coin_pack_list_cache_invalidated_on_delete(db_session: AsyncSession, coin_pack: CoinPack):
+    """Деактивація пакета скидає і його кеш, і кеш списку пакетів."""
+    from app.wallet.service import COIN_PACKS_CACHE_KEY, WalletAdminService
+
+    service = WalletAdminService(db_session)
+    await service.get_coin_pack_cached(coin_pack.id)
+    await cache.raw.set(COIN_PACKS_CACHE_KEY, b"stale")
+
+    assert await service.delete_coin_pack(coin_pack.id) is True
+    assert await cache.get(coin_pack_cache_key(coin_pack.id)) is None
+    assert await cache.raw.get(COIN_PACKS_CACHE_KEY) is None
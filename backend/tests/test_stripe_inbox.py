@@ -0,0 +1,110 @@
+import pytest
+from unittest.mock import AsyncMock
+from httpx import AsyncClient
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.telegram_service import telegram_service
+from app.users.models import User
+from app.wallet.inbox import StripeInboxService
+from app.wallet.models import CoinPack, InboxEvent, InboxStatus, Transaction
+from tests.stripe_events import build_payment_event, signed_request
+
+WEBHOOK_SECRET = "whsec_test_secret"
+
+
+@pytest.fixture(autouse=True)
+def stripe_webhook_env(monkeypatch):
+    monkeypatch.setattr(settings, "STRIPE_WEBHOOK_SECRET", WEBHOOK_SECRET)
+    monkeypatch.setattr(telegram_service, "send_message", AsyncMock(return_value=True))
+
+
+@pytest.fixture(scope="function")
+async def coin_pack(db_session: AsyncSession) -> CoinPack:
+    pack = CoinPack(name="Starter", price_usd=5.0, coins_amount=500, stripe_price_id="price_test_inbox")
+    db_session.add(pack)
+    await db_session.commit()
+    return pack
+
+
+async def _deliver(client: AsyncClient, event: dict):
+    payload, headers = signed_request(event, WEBHOOK_SECRET)
+    return await client.post("/api/webhooks/stripe", content=payload, headers=headers)
+
+
+@pytest.mark.anyio
+async def test_webhook_stores_event_once(
+        async_client: AsyncClient, db_session: AsyncSession, referred_user: User, coin_pack: CoinPack
+):
+    """Webhook лише записує подію; повторна доставка не створює дубліката."""
+    event = build_payment_event(referred_user.id, coin_pack.id, 500, 500)
+
+    first = await _deliver(async_client, event)
+    second = await _deliver(async_client, event)
+    assert first.status_code == 200 and first.json()["message"] == "Event queued"
+    assert second.status_code == 200 and second.json()["message"] == "Event already received"
+
+    stored = await db_session.scalar(select(func.count()).where(InboxEvent.event_id == event["id"]))
+    assert stored == 1
+
+    # Баланс не змінюється до обробки воркером
+    await db_session.refresh(referred_user)
+    assert referred_user.balance == 1000
+
+
+@pytest.mark.anyio
+async def test_inbox_processing_and_replay_credit_once(
+        async_client: AsyncClient, db_session: AsyncSession, referred_user: User, coin_pack: CoinPack
+):
+    """Обробка нараховує монети, replay обробленої події не нараховує вдруге."""
+    event = build_payment_event(referred_user.id, coin_pack.id, 500, 500)
+    # Інша подія тієї ж оплати (той самий payment_intent)
+    duplicate = build_payment_event(
+        referred_user.id, coin_pack.id, 500, 500, object_id=event["data"]["object"]["id"]
+    )
+    await _deliver(async_client, event)
+    await _deliver(async_client, duplicate)
+
+    service = StripeInboxService(db_session)
+    assert await service.process_pending() == {"processed": 2}
+    assert await service.process_pending() == {}
+
+    await db_session.refresh(referred_user)
+    assert referred_user.balance == 1500
+    telegram_service.send_message.assert_awaited_once()
+
+    assert await service.replay(event_ids=[event["id"]]) == 1
+    assert await service.process_pending() == {"processed": 1}
+
+    await db_session.refresh(referred_user)
+    assert referred_user.balance == 1500
+    deposits = await db_session.scalar(
+        select(func.count()).where(Transaction.external_id == event["data"]["object"]["id"])
+    )
+    assert deposits == 1
+
+
+@pytest.mark.anyio
+async def test_inbox_ignores_invalid_metadata(async_client: AsyncClient, db_session: AsyncSession):
+    event = build_payment_event(0, 0, 500, 500)
+    event["data"]["object"]["metadata"] = {}
+    await _deliver(async_client, event)
+
+    assert await StripeInboxService(db_session).process_pending() == {"ignored": 1}
+    stored = await db_session.scalar(select(InboxEvent).where(InboxEvent.event_id == event["id"]))
+    assert stored.status == InboxStatus.IGNORED
+    assert stored.last_error
+
+
+@pytest.mark.anyio
+async def test_webhook_rejects_invalid_signature(async_client: AsyncClient):
+    payload, headers = signed_request(build_payment_event(1, 1, 500, 500), "whsec_wrong")
+    response = await async_client.post("/api/webhooks/stripe", content=payload, headers=headers)
+    assert response.status_code == 401
+
+
+@pytest.mark.anyio
+async def test_replay_requires_filter(db_session: AsyncSession):
+    with pytest.raises(ValueError):
+        await StripeInboxService(db_session).replay()
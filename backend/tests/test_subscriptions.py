@@ -197,4 +197,94 @@ async def test_subscription_extension(authorized_client: AsyncClient, db_session
     latest_sub = sub_res.scalars().first()
 
     expected_end = original_end + timedelta(days=30)
-    assert abs((latest_sub.end_date - expected_end).total_seconds()) < 60  # Допуск 1 хвилина
\ No newline at end of file
+    assert abs((latest_sub.end_date - expected_end).total_seconds()) < 60  # Допуск 1 хвилина
+
+
+async def _due_subscription(db_session: AsyncSession, user: User) -> Subscription:
+    sub = Subscription(
+        user_id=user.id,
+        start_date=datetime.now(timezone.utc) - timedelta(days=29),
+        end_date=datetime.now(timezone.utc) + timedelta(hours=12),
+        status=SubscriptionStatus.ACTIVE,
+        is_auto_renewal=True
+    )
+    db_session.add(sub)
+    return sub
+
+
+@pytest.mark.anyio
+async def test_auto_renewal_in_chunks(db_session: AsyncSession):
+    """Автопродовження пачками: баланси, журнал і черга сповіщень."""
+    from app.core.cache import cache
+    from app.core.notifications import NOTIFICATION_QUEUE_KEY
+    from app.subscriptions.service import SubscriptionService, SUBSCRIPTION_PRICE_COINS
+    from app.wallet.models import Transaction, TransactionType
+
+    await cache.redis.delete(NOTIFICATION_QUEUE_KEY)
+
+    rich = [User(telegram_id=5000 + i, first_name=f"Rich {i}", balance=SUBSCRIPTION_PRICE_COINS * 2)
+            for i in range(3)]
+    poor = User(telegram_id=5100, first_name="Poor", balance=SUBSCRIPTION_PRICE_COINS - 1)
+    db_session.add_all([*rich, poor])
+    await db_session.commit()
+
+    subs = [await _due_subscription(db_session, user) for user in [*rich, poor]]
+    await db_session.commit()
+    original_ends = {sub.id: sub.end_date for sub in subs}
+
+    result = await SubscriptionService(db_session).process_auto_renewals(chunk_size=2)
+
+    assert result["renewed"] == 3
+    assert result["failed"] == 1
+    assert result["chunks"] == 2
+    assert "duration_ms" in result and "per_second" in result
+
+    for user in rich:
+        await db_session.refresh(user)
+        assert user.balance == SUBSCRIPTION_PRICE_COINS
+    await db_session.refresh(poor)
+    assert poor.balance == SUBSCRIPTION_PRICE_COINS - 1
+
+    for sub in subs[:3]:
+        await db_session.refresh(sub)
+        assert sub.end_date == original_ends[sub.id] + timedelta(days=30)
+
+    ledger = (await db_session.execute(
+        select(Transaction).where(Transaction.type == TransactionType.SUBSCRIPTION)
+    )).scalars().all()
+    assert sorted(t.subscription_id for t in ledger) == sorted(sub.id for sub in subs[:3])
+    assert all(t.amount == -SUBSCRIPTION_PRICE_COINS and t.balance_after == SUBSCRIPTION_PRICE_COINS
+               for t in ledger)
+
+    queued = await cache.redis.lrange(NOTIFICATION_QUEUE_KEY, 0, -1)
+    assert len(queued) == 4
+
+    # Повторний прохід не надсилає попередження вдруге
+    await cache.redis.delete(NOTIFICATION_QUEUE_KEY)
+    await SubscriptionService(db_session).process_auto_renewals(chunk_size=2)
+    assert await cache.redis.llen(NOTIFICATION_QUEUE_KEY) == 0
+
+    await cache.redis.delete(f"renewal:low_balance:{subs[3].id}")
+
+
+@pytest.mark.anyio
+async def test_auto_renewal_several_subscriptions_one_user(db_session: AsyncSession):
+    """Кілька підписок одного користувача списуються з одного балансу."""
+    from app.core.cache import cache
+    from app.core.notifications import NOTIFICATION_QUEUE_KEY
+    from app.subscriptions.service import SubscriptionService, SUBSCRIPTION_PRICE_COINS
+
+    user = User(telegram_id=5200, first_name="Twice", balance=SUBSCRIPTION_PRICE_COINS + 1)
+    db_session.add(user)
+    await db_session.commit()
+    subs = [await _due_subscription(db_session, user) for _ in range(2)]
+    await db_session.commit()
+
+    result = await SubscriptionService(db_session).process_auto_renewals()
+
+    assert result["renewed"] == 1
+    assert result["failed"] == 1
+    await db_session.refresh(user)
+    assert user.balance == 1
+
+    await cache.redis.delete(NOTIFICATION_QUEUE_KEY, *(f"renewal:low_balance:{sub.id}" for sub in subs))
@@ -0,0 +1,49 @@
+from app.core.translation_catalog import TranslationCatalog, load_directory
+from app.core.translations import catalog, get_text
+
+
+def test_builtin_catalogue_is_consistent():
+    """Усі мови мають ті самі плейсхолдери, що й українська, і не мають зайвих ключів."""
+    problems = [issue for issue in catalog.validate() if issue.problem != "missing"]
+    assert problems == []
+
+
+def test_get_text_fallbacks():
+    assert get_text("main_root_message", "xx") == get_text("main_root_message", "uk")
+    assert get_text("unknown_key", "en") == "unknown_key"
+    assert "{name}" not in get_text("bot_start_referral_welcome", "en", name="Olena")
+
+
+def test_missing_parameter_keeps_placeholder():
+    compiled = TranslationCatalog({"uk": {"greet": "{greeting}, {name}!"}})
+    assert compiled.get("greet", "uk", name="Olena") == "{greeting}, Olena!"
+
+
+def test_validate_reports_problems():
+    compiled = TranslationCatalog({
+        "uk": {"a": "Привіт, {name}", "b": "Б"},
+        "en": {"a": "Hello, {user}", "c": "C"},
+    })
+    assert {(issue.key, issue.problem.split()[0]) for issue in compiled.validate()} == {
+        ("a", "placeholders"), ("b", "missing"), ("c", "unknown"),
+    }
+
+
+def test_load_directory_json_and_po(tmp_path):
+    (tmp_path / "pl.json").write_text('{"main_root_message": "API działa", "hello": "Cześć"}', encoding="utf-8")
+    (tmp_path / "pl.po").write_text(
+        '# Polish\n'
+        'msgid ""\n'
+        'msgstr "Content-Type: text/plain; charset=UTF-8\\n"\n'
+        '\n'
+        'msgid "hello"\n'
+        'msgstr ""\n'
+        '"Cześć, "\n'
+        '"{name}!"\n',
+        encoding="utf-8"
+    )
+    sources = load_directory(str(tmp_path))
+    assert sources == {"pl": {"main_root_message": "API działa", "hello": "Cześć, {name}!"}}
+
+    compiled = TranslationCatalog({"uk": {"main_root_message": "Працює", "hello": "Привіт, {name}!"}, **sources})
+    assert compiled.get("hello", "pl", name="Ola") == "Cześć, Ola!"
@@ -0,0 +1,101 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from httpx import AsyncClient
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.users.models import User
+from app.wallet.ledger import LedgerService, add_months, month_start, partition_name
+from app.wallet.models import TransactionType
+from app.wallet.service import WalletService
+
+
+@pytest.fixture(scope="function")
+async def ledger_user(db_session: AsyncSession) -> User:
+    user = User(telegram_id=3001, first_name="Ledger", balance=0)
+    db_session.add(user)
+    await db_session.commit()
+    return user
+
+
+def test_partition_months():
+    """Межі місячних партицій переходять через рік."""
+    start = month_start(datetime(2026, 11, 17, 12, 30, tzinfo=timezone.utc))
+    assert start == datetime(2026, 11, 1, tzinfo=timezone.utc)
+    assert add_months(start, 2) == datetime(2027, 1, 1, tzinfo=timezone.utc)
+    assert partition_name(add_months(start, 2)) == "transactions_2027_01"
+
+
+@pytest.mark.anyio
+async def test_transactions_keyset_pagination(
+        authorized_client: AsyncClient, db_session: AsyncSession, referred_user: User
+):
+    """Перша сторінка повертає total і курсор, наступні — лише курсор."""
+    service = WalletService(db_session)
+    for i in range(5):
+        await service.add_coins(referred_user.id, 10 + i, TransactionType.BONUS, f"Bonus {i}")
+
+    response = await authorized_client.get("/api/v1/wallet/transactions", params={"size": 2})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 5
+    seen = [t["id"] for t in data["items"]]
+
+    while data["next_cursor"]:
+        response = await authorized_client.get(
+            "/api/v1/wallet/transactions", params={"size": 2, "cursor": data["next_cursor"]}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] is None
+        seen.extend(t["id"] for t in data["items"])
+
+    assert len(seen) == 5
+    assert seen == sorted(seen, reverse=True)
+
+
+@pytest.mark.anyio
+async def test_transactions_invalid_cursor(authorized_client: AsyncClient):
+    response = await authorized_client.get("/api/v1/wallet/transactions", params={"cursor": "broken"})
+    assert response.status_code == 400
+
+
+@pytest.mark.anyio
+async def test_balance_snapshots_and_drift(db_session: AsyncSession, ledger_user: User):
+    """Знімок покриває журнал, а зміна балансу в обхід журналу видна у звірці."""
+    service = WalletService(db_session)
+    await service.add_coins(ledger_user.id, 300, TransactionType.DEPOSIT, "Deposit")
+    await service.add_coins(ledger_user.id, 50, TransactionType.BONUS, "Bonus")
+
+    ledger = LedgerService(db_session)
+    result = await ledger.refresh_snapshots(now=datetime.now(timezone.utc) + timedelta(hours=1))
+    assert result["users"] >= 1
+    assert await ledger.get_ledger_balance(ledger_user.id) == 350
+    assert await ledger.get_total_deposits() >= 300
+
+    drift = await ledger.find_balance_drift(limit=1000)
+    assert ledger_user.id not in [row["user_id"] for row in drift]
+
+    ledger_user.balance += 7
+    await db_session.commit()
+
+    drift = {row["user_id"]: row for row in await ledger.find_balance_drift(limit=1000)}
+    assert drift[ledger_user.id]["difference"] == 7
+
+
+@pytest.mark.anyio
+async def test_ledger_is_append_only(db_session: AsyncSession, ledger_user: User):
+    transaction = await WalletService(db_session).add_coins(
+        ledger_user.id, 100, TransactionType.BONUS, "Bonus"
+    )
+
+    with pytest.raises(DBAPIError):
+        async with db_session.begin_nested():
+            await db_session.execute(
+                text("UPDATE transactions SET amount = 1 WHERE id = :id"), {"id": transaction.id}
+            )
+
+    with pytest.raises(DBAPIError):
+        async with db_session.begin_nested():
+            await db_session.execute(text("DELETE FROM transactions WHERE id = :id"), {"id": transaction.id})
@@ -311,6 +311,7 @@ export const walletAPI = {
   getTransactions: async (params?: {
     page?: number;
     size?: number;
+    cursor?: string;
     type?: string;
   }): Promise<TransactionListResponse> => {
     return getData(await api.get('/wallet/transactions', { params }));
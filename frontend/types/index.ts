@@ -129,9 +129,10 @@ export interface WalletInfo {
 
 export interface TransactionListResponse {
   items: Transaction[];
-  total: number;
+  total: number | null;
   page: number;
   size: number;
+  next_cursor?: string | null;
 }
 
 export interface CheckoutResponse {